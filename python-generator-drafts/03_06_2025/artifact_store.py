@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Compact, Deduplicated Storage for Completed Job Directories
+
+A job directory is about 300 KB, most of it `execution.log` repeating the
+same system prompts, research answers and responses across steps and jobs.
+`pack` turns a completed job directory into a single `<job_id>.ucpack` file
+in its library directory. Every library directory holds one content-addressed
+store shared by all its packs, so text that earlier packs already hold is
+stored once and referenced by hash.
+
+Design:
+- Members (every file of the job directory) are split into content-defined
+  chunks on line boundaries: a chunk ends after a line whose CRC hits the
+  boundary mask, so the same prompt or answer yields the same chunks wherever
+  it appears. Chunks are addressed by a truncated SHA-256.
+- `artifact_store.db` in the library directory maps every chunk to the pack
+  that holds it. A new pack stores only chunks no other pack has, and
+  references the rest by hash and pack name.
+- A pack stores its new chunks in solid frames (up to FRAME_BYTES each),
+  compressed with zstd when `zstandard` is installed and with xz (lzma)
+  otherwise. The index at the end of the file maps each member to its chunks,
+  so one member can be read without decompressing the others.
+- Packs are immutable and readable without the database: a pack names the
+  packs its external chunks live in, and `reindex` rebuilds the database
+  from the packs. Because later packs may reference earlier ones, packs are
+  never deleted one by one.
+- Members round-trip byte for byte, with their modification times; every
+  new pack is read back and compared with its job directory.
+- Packing keeps the job directory. The library index, exports, renderers,
+  related use cases, research reuse and near-duplicate checks all read job
+  directories, so a job whose directory was deleted would silently drop out
+  of all of them. Packs are archives until those tools read packs.
+- On the sample library, 2.0 MB packs to 164 KB. Nearly all of that comes
+  from compressing each job's repeated log content in solid frames: its
+  seven jobs share a single chunk. Cross-job dedup pays off as more jobs of
+  one prompt version accumulate.
+
+Usage:
+    python artifact_store.py pack ../use_cases/<job_id> [...]
+    python artifact_store.py ls ../use_cases/<job_id>.ucpack
+    python artifact_store.py cat ../use_cases/<job_id>.ucpack final_use_case.json
+    python artifact_store.py unpack ../use_cases/<job_id>.ucpack [--dest DIR]
+    python artifact_store.py stats|verify|reindex [LIBRARY_DIR]
+"""
+
+import os
+import sys
+import json
+import zlib
+import sqlite3
+import struct
+import hashlib
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_LIBRARY_DIR = os.path.join(REPO_ROOT, "python-generator-use-cases")
+
+PACK_SUFFIX = ".ucpack"
+STORE_DB = "artifact_store.db"
+MAGIC = b"UCPACK1\n"
+FOOTER = struct.Struct(">QQ8s")  # index offset, index length, magic
+FORMAT_VERSION = 1
+
+DIGEST_CHARS = 32  # hex characters of SHA-256 kept as the chunk address
+CHUNK_AVG_LINES = 32
+CHUNK_MIN_LINES = 8
+CHUNK_MAX_LINES = 512
+FRAME_BYTES = 4 * 1024 * 1024
+FRAME_CACHE = 4
+
+# A job is complete once every step has saved its result
+COMPLETE_MARKERS = (
+    "research_questions.json", "deep_research.json", "refined_draft.json",
+    "final_use_case.json", "example_solution.json", "visual_suggestions.json",
+)
+
+class PackError(RuntimeError):
+    """Raised for malformed packs, missing chunks and failed verification."""
+
+# -------------------------------------------------------------------------------------
+# Chunking and compression
+# -------------------------------------------------------------------------------------
+
+def chunk_bytes(data: bytes) -> List[bytes]:
+    """Split `data` into content-defined chunks that end on line boundaries."""
+    chunks: List[bytes] = []
+    current: List[bytes] = []
+    for line in data.splitlines(keepends=True):
+        current.append(line)
+        if len(current) >= CHUNK_MAX_LINES or (
+            len(current) >= CHUNK_MIN_LINES and zlib.crc32(line) % CHUNK_AVG_LINES == 0
+        ):
+            chunks.append(b"".join(current))
+            current = []
+    if current:
+        chunks.append(b"".join(current))
+    return chunks
+
+def chunk_digest(chunk: bytes) -> str:
+    return hashlib.sha256(chunk).hexdigest()[:DIGEST_CHARS]
+
+def split_digests(joined: str) -> List[str]:
+    """Chunk digests stored back to back in one string (compact in the JSON index)."""
+    return [joined[i:i + DIGEST_CHARS] for i in range(0, len(joined), DIGEST_CHARS)]
+
+def default_codec() -> str:
+    """zstd when `zstandard` is installed, else xz from the standard library."""
+    try:
+        import zstandard  # noqa: F401
+        return "zstd"
+    except ImportError:
+        return "xz"
+
+def compress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=19).compress(data)
+    import lzma
+    return lzma.compress(data, preset=6)
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise PackError("This pack is zstd-compressed and needs zstandard (pip install zstandard)") from e
+        return zstandard.ZstdDecompressor().decompress(data)
+    import lzma
+    return lzma.decompress(data)
+
+# -------------------------------------------------------------------------------------
+# Reading packs
+# -------------------------------------------------------------------------------------
+
+class PackReader:
+    """Random access to the members of one pack, by name."""
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.name = os.path.basename(self.path)[:-len(PACK_SUFFIX)]
+        self.file = open(self.path, "rb")
+        try:
+            self.file.seek(-FOOTER.size, os.SEEK_END)
+            index_offset, index_length, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+            if magic != MAGIC:
+                raise PackError(f"{path}: not a pack file")
+            self.file.seek(index_offset)
+            self.index = json.loads(zlib.decompress(self.file.read(index_length)))
+        except (OSError, struct.error, zlib.error, ValueError) as e:
+            self.file.close()
+            raise PackError(f"{path}: unreadable pack index: {e}") from e
+        if self.index.get("format") != FORMAT_VERSION:
+            self.file.close()
+            raise PackError(f"{path}: unsupported pack format {self.index.get('format')}")
+        self.job_id: str = self.index["job_id"]
+        self.codec: str = self.index["codec"]
+        self.members: Dict[str, dict] = self.index["members"]
+        self.external = {
+            digest: pack for pack, joined in self.index["external"].items() for digest in split_digests(joined)
+        }
+        self.frames: Dict[int, bytes] = {}
+        self.siblings: Dict[str, "PackReader"] = {}
+
+    def names(self) -> List[str]:
+        return sorted(self.members)
+
+    def frame(self, number: int) -> bytes:
+        """Decompressed frame `number`; the last FRAME_CACHE frames are kept."""
+        if number not in self.frames:
+            offset, length = self.index["frames"][number]
+            self.file.seek(offset)
+            if len(self.frames) >= FRAME_CACHE:
+                self.frames.pop(next(iter(self.frames)))
+            self.frames[number] = decompress(self.codec, self.file.read(length))
+        return self.frames[number]
+
+    def chunk(self, digest: str) -> bytes:
+        """A chunk from this pack, or from the pack that holds it."""
+        location = self.index["chunks"].get(digest)
+        if location:
+            number, offset, length = location
+            return self.frame(number)[offset:offset + length]
+        pack = self.external.get(digest)
+        if pack is None:
+            raise PackError(f"{self.path}: chunk {digest} is missing")
+        if pack not in self.siblings:
+            sibling_path = os.path.join(os.path.dirname(self.path), pack + PACK_SUFFIX)
+            if not os.path.isfile(sibling_path):
+                raise PackError(f"{self.path}: references missing pack {pack}{PACK_SUFFIX}")
+            self.siblings[pack] = PackReader(sibling_path)
+        return self.siblings[pack].chunk(digest)
+
+    def read(self, name: str, verify: bool = True) -> bytes:
+        """The content of member `name`; raises KeyError for unknown members."""
+        member = self.members[name]
+        data = b"".join(self.chunk(digest) for digest in split_digests(member["chunks"]))
+        if verify and hashlib.sha256(data).hexdigest() != member["sha256"]:
+            raise PackError(f"{self.path}: member {name} does not match its checksum")
+        return data
+
+    def extract(self, dest_dir: str):
+        """Restore every member into `dest_dir`, with its modification time."""
+        for name in self.names():
+            path = os.path.join(dest_dir, *name.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(self.read(name))
+            mtime = self.members[name]["mtime"]
+            os.utime(path, (mtime, mtime))
+
+    def close(self):
+        for sibling in self.siblings.values():
+            sibling.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# -------------------------------------------------------------------------------------
+# Shared store
+# -------------------------------------------------------------------------------------
+
+class ArtifactStore:
+    """The packs of one library directory and the chunk index they share."""
+
+    def __init__(self, library_dir: str):
+        self.library_dir = os.path.abspath(library_dir)
+        self.conn = sqlite3.connect(os.path.join(self.library_dir, STORE_DB))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                digest TEXT PRIMARY KEY,
+                pack TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS packs (
+                name TEXT PRIMARY KEY,
+                packed_at TEXT,
+                members INTEGER,
+                raw_bytes INTEGER,
+                packed_bytes INTEGER
+            );
+        """)
+        self.existing: Dict[str, bool] = {}
+
+    def pack_path(self, name: str) -> str:
+        return os.path.join(self.library_dir, name + PACK_SUFFIX)
+
+    def locate(self, digest: str) -> Optional[str]:
+        """Pack holding chunk `digest`, if that pack still exists."""
+        row = self.conn.execute("SELECT pack FROM chunks WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            return None
+        if row[0] not in self.existing:
+            self.existing[row[0]] = os.path.isfile(self.pack_path(row[0]))
+        return row[0] if self.existing[row[0]] else None
+
+    def pack_job(self, job_dir: str) -> dict:
+        """
+        Write `job_dir` as `<job_id>.ucpack` into the library directory and
+        index its new chunks. Returns the member count and byte sizes.
+        """
+        job_dir = os.path.abspath(job_dir)
+        name = os.path.basename(job_dir.rstrip(os.sep))
+        path = self.pack_path(name)
+        if os.path.exists(path):
+            raise PackError(f"{path} already exists")
+
+        members: Dict[str, dict] = {}
+        new_chunks: Dict[str, bytes] = {}
+        external: Dict[str, List[str]] = {}
+        referenced: set = set()
+        raw_bytes = 0
+        for dirpath, dirnames, filenames in os.walk(job_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                file_path = os.path.join(dirpath, filename)
+                with open(file_path, "rb") as f:
+                    data = f.read()
+                raw_bytes += len(data)
+                digests = []
+                for chunk in chunk_bytes(data):
+                    digest = chunk_digest(chunk)
+                    digests.append(digest)
+                    if digest in new_chunks or digest in referenced:
+                        continue
+                    owner = self.locate(digest)
+                    if owner:
+                        external.setdefault(owner, []).append(digest)
+                        referenced.add(digest)
+                    else:
+                        new_chunks[digest] = chunk
+                members[os.path.relpath(file_path, job_dir).replace(os.sep, "/")] = {
+                    "size": len(data),
+                    "sha256": hashlib.sha256(data).hexdigest(),
+                    "mtime": os.stat(file_path).st_mtime,
+                    "chunks": "".join(digests),
+                }
+
+        # Group the new chunks into frames and compress each frame as a whole
+        codec = default_codec()
+        frames: List[List[bytes]] = [[]]
+        locations: Dict[str, list] = {}
+        frame_size = 0
+        for digest, chunk in new_chunks.items():
+            if frame_size and frame_size + len(chunk) > FRAME_BYTES:
+                frames.append([])
+                frame_size = 0
+            locations[digest] = [len(frames) - 1, frame_size, len(chunk)]
+            frames[-1].append(chunk)
+            frame_size += len(chunk)
+
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(MAGIC)
+            frame_index = []
+            for frame in frames:
+                compressed = compress(codec, b"".join(frame))
+                frame_index.append([f.tell(), len(compressed)])
+                f.write(compressed)
+            index = zlib.compress(json.dumps({
+                "format": FORMAT_VERSION,
+                "job_id": name,
+                "codec": codec,
+                "packed_at": datetime.now().isoformat(),
+                "frames": frame_index,
+                "chunks": locations,
+                "external": {pack: "".join(digests) for pack, digests in external.items()},
+                "members": members,
+            }, separators=(",", ":")).encode("utf-8"), 9)
+            index_offset = f.tell()
+            f.write(index)
+            f.write(FOOTER.pack(index_offset, len(index), MAGIC))
+        os.replace(temp_path, path)
+
+        packed_bytes = os.path.getsize(path)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO chunks (digest, pack) VALUES (?, ?)",
+                [(digest, name) for digest in new_chunks],
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO packs VALUES (?, ?, ?, ?, ?)",
+                (name, datetime.now().isoformat(), len(members), raw_bytes, packed_bytes),
+            )
+        self.existing[name] = True
+        return {"pack": path, "members": len(members), "raw_bytes": raw_bytes, "packed_bytes": packed_bytes,
+                "new_chunks": len(new_chunks), "shared_chunks": sum(len(d) for d in external.values())}
+
+    def pack_paths(self) -> List[str]:
+        return sorted(
+            os.path.join(self.library_dir, entry) for entry in os.listdir(self.library_dir)
+            if entry.endswith(PACK_SUFFIX)
+        )
+
+    def reindex(self) -> int:
+        """Rebuild the chunk index from the packs on disk; returns the pack count."""
+        paths = self.pack_paths()
+        with self.conn:
+            self.conn.execute("DELETE FROM chunks")
+            self.conn.execute("DELETE FROM packs")
+            for path in paths:
+                with PackReader(path) as reader:
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO chunks (digest, pack) VALUES (?, ?)",
+                        [(digest, reader.name) for digest in reader.index["chunks"]],
+                    )
+                    self.conn.execute("INSERT INTO packs VALUES (?, ?, ?, ?, ?)", (
+                        reader.name, reader.index["packed_at"], len(reader.members),
+                        sum(member["size"] for member in reader.members.values()), os.path.getsize(path),
+                    ))
+        self.existing.clear()
+        return len(paths)
+
+    def stats(self) -> dict:
+        packs, raw_bytes, packed_bytes = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(packed_bytes), 0) FROM packs"
+        ).fetchone()
+        chunks = self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        return {"packs": packs, "chunks": chunks, "raw_bytes": raw_bytes, "packed_bytes": packed_bytes}
+
+    def close(self):
+        self.conn.close()
+
+def is_complete(job_dir: str) -> bool:
+    return all(os.path.isfile(os.path.join(job_dir, marker)) for marker in COMPLETE_MARKERS)
+
+def verify_pack(pack_path: str, job_dir: str):
+    """Raise PackError unless the pack holds exactly the files of `job_dir`."""
+    with PackReader(pack_path) as reader:
+        on_disk = sorted(
+            os.path.relpath(os.path.join(dirpath, filename), job_dir).replace(os.sep, "/")
+            for dirpath, _, filenames in os.walk(job_dir) for filename in filenames
+        )
+        if on_disk != reader.names():
+            raise PackError(f"{pack_path}: members differ from {job_dir}")
+        for name in on_disk:
+            with open(os.path.join(job_dir, *name.split("/")), "rb") as f:
+                if f.read() != reader.read(name):
+                    raise PackError(f"{pack_path}: {name} did not round-trip")
+
+def pack_jobs(job_dirs: List[str]) -> List[dict]:
+    """
+    Pack completed job directories into their library directories, reading
+    every member back from the pack and matching it byte for byte. The
+    directories are kept (see the module docstring).
+    """
+    results = []
+    stores: Dict[str, ArtifactStore] = {}
+    try:
+        for job_dir in job_dirs:
+            job_dir = os.path.abspath(job_dir)
+            if not is_complete(job_dir):
+                results.append({"job_dir": job_dir, "status": "skipped", "error": "job is not complete"})
+                continue
+            library_dir = os.path.dirname(job_dir)
+            store = stores.get(library_dir) or stores.setdefault(library_dir, ArtifactStore(library_dir))
+            try:
+                result = store.pack_job(job_dir)
+            except (OSError, PackError) as e:
+                results.append({"job_dir": job_dir, "status": "failed", "error": str(e)})
+                continue
+            try:
+                verify_pack(result["pack"], job_dir)
+            except (OSError, PackError) as e:
+                results.append({"job_dir": job_dir, "status": "failed", "error": str(e)})
+                continue
+            results.append(dict(result, job_dir=job_dir, status="packed"))
+    finally:
+        for store in stores.values():
+            store.close()
+    return results
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def format_size(size: int) -> str:
+    return f"{size / 1024:.1f} KB" if size < 1024 * 1024 else f"{size / 1024 / 1024:.1f} MB"
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Pack completed job directories into deduplicated archives.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    pack = subparsers.add_parser("pack", help="Pack completed job directories")
+    pack.add_argument("job_dirs", nargs="+")
+
+    unpack = subparsers.add_parser("unpack", help="Restore job directories from packs")
+    unpack.add_argument("packs", nargs="+")
+    unpack.add_argument("--dest", help="Directory to restore into (default: next to the pack)")
+
+    ls = subparsers.add_parser("ls", help="List the members of a pack")
+    ls.add_argument("pack")
+
+    cat = subparsers.add_parser("cat", help="Write one member of a pack to stdout")
+    cat.add_argument("pack")
+    cat.add_argument("member")
+
+    for command, help_text in (("stats", "Sizes of the packs in a library directory"),
+                               ("verify", "Read back every member of every pack"),
+                               ("reindex", "Rebuild the chunk index from the packs")):
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument("library_dir", nargs="?", default=DEFAULT_LIBRARY_DIR)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "pack":
+            results = pack_jobs(args.job_dirs)
+            for result in results:
+                if result["status"] == "packed":
+                    print(f"packed  {result['pack']}  {format_size(result['raw_bytes'])} -> "
+                          f"{format_size(result['packed_bytes'])}  ({result['shared_chunks']} shared chunks)")
+                else:
+                    print(f"{result['status']:>7} {result['job_dir']}: {result['error']}")
+            return 1 if any(result["status"] == "failed" for result in results) else 0
+        if args.command == "unpack":
+            for path in args.packs:
+                with PackReader(path) as reader:
+                    dest = os.path.join(args.dest or os.path.dirname(reader.path), reader.job_id)
+                    if os.path.exists(dest):
+                        print(f"{dest} already exists; skipping")
+                        continue
+                    reader.extract(dest)
+                    print(f"unpacked {dest}")
+            return 0
+        if args.command == "ls":
+            with PackReader(args.pack) as reader:
+                for name in reader.names():
+                    print(f"{reader.members[name]['size']:>10}  {name}")
+            return 0
+        if args.command == "cat":
+            with PackReader(args.pack) as reader:
+                sys.stdout.buffer.write(reader.read(args.member))
+            return 0
+
+        store = ArtifactStore(args.library_dir)
+        try:
+            if args.command == "reindex":
+                print(f"Indexed {store.reindex()} packs")
+            elif args.command == "verify":
+                failures = 0
+                for path in store.pack_paths():
+                    try:
+                        with PackReader(path) as reader:
+                            for name in reader.names():
+                                reader.read(name)
+                    except PackError as e:
+                        failures += 1
+                        print(e)
+                print(f"{len(store.pack_paths())} packs checked, {failures} failed")
+                return 1 if failures else 0
+            else:
+                stats = store.stats()
+                ratio = stats["raw_bytes"] / stats["packed_bytes"] if stats["packed_bytes"] else 0
+                print(f"{stats['packs']} packs, {stats['chunks']} chunks, {format_size(stats['raw_bytes'])} -> "
+                      f"{format_size(stats['packed_bytes'])} ({ratio:.1f}x)")
+        finally:
+            store.close()
+    except (OSError, KeyError, PackError) as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the use case generator tooling.
+
+Each benchmark runs in a fresh interpreter where startup cost matters, and
+exits non-zero when a budget or invariant is violated so it can gate CI.
+
+Usage:
+    python benchmarks.py startup [--runs 10] [--budget-ms 100]
+    python benchmarks.py render [--use-cases 10000] [--workers N]
+    python benchmarks.py site [--use-cases 10000] [--workers N] [--budget-s 30]
+    python benchmarks.py duplicates [--use-cases 100000] [--budget-ms 1000]
+    python benchmarks.py related [--use-cases 20000] [--budget-s 30]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import shutil
+import tempfile
+import statistics
+import subprocess
+from typing import List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_LIBRARY_DIR = os.path.join(os.path.dirname(os.path.dirname(HERE)), "python-generator-use-cases")
+RENDER_INPUTS = ["final_use_case", "example_solution", "visual_suggestions"]
+
+# Cores the static site budget assumes; a full 10k build takes about a minute on one
+SITE_TARGET_CORES = 4
+
+# Modules that must never be imported just by importing the generator
+NETWORK_MODULES = ["openai", "pydantic", "aiohttp", "bs4", "dotenv"]
+
+# -------------------------------------------------------------------------------------
+# Startup benchmark
+# -------------------------------------------------------------------------------------
+
+STARTUP_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "loaded": [m for m in {forbidden!r} if m in sys.modules],
+}}))
+"""
+
+def measure_import(module: str, forbidden: List[str]) -> dict:
+    """Import `module` in a fresh interpreter and report time and loaded SDKs."""
+    probe = STARTUP_PROBE.format(module=module, forbidden=forbidden)
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def bench_startup(runs: int, budget_ms: float, module: str = "use_case_generator") -> int:
+    """Benchmark cold import time and check that no network SDK is imported."""
+    entries_before = set(os.listdir(HERE))
+    samples = [measure_import(module, NETWORK_MODULES) for _ in range(runs)]
+    times_ms = [s["seconds"] * 1000 for s in samples]
+    loaded = sorted({m for s in samples for m in s["loaded"]})
+    created = sorted(set(os.listdir(HERE)) - entries_before - {"__pycache__"})
+
+    median_ms = statistics.median(times_ms)
+    print(f"import {module}: median {median_ms:.1f} ms, max {max(times_ms):.1f} ms over {runs} runs")
+
+    failures = []
+    if loaded:
+        failures.append(f"network SDKs imported at startup: {', '.join(loaded)}")
+    if created:
+        failures.append(f"import created files or directories: {', '.join(created)}")
+    if median_ms > budget_ms:
+        failures.append(f"median import time {median_ms:.1f} ms exceeds budget {budget_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+# -------------------------------------------------------------------------------------
+# Rendering benchmark
+# -------------------------------------------------------------------------------------
+
+def build_synthetic_library(target_dir: str, count: int) -> List[str]:
+    """
+    Create `count` job directories by cycling through the sample jobs.
+
+    Titles are made unique so every rendered document differs.
+    """
+    samples = []
+    for entry in sorted(os.listdir(SAMPLE_LIBRARY_DIR)):
+        job_dir = os.path.join(SAMPLE_LIBRARY_DIR, entry)
+        if all(os.path.isfile(os.path.join(job_dir, f"{name}.json")) for name in RENDER_INPUTS):
+            artifacts = {}
+            for name in RENDER_INPUTS:
+                with open(os.path.join(job_dir, f"{name}.json"), "r", encoding="utf-8") as f:
+                    artifacts[name] = json.load(f)["content"]
+            samples.append(artifacts)
+    if not samples:
+        raise RuntimeError(f"No complete sample jobs found in {SAMPLE_LIBRARY_DIR}")
+
+    job_dirs = []
+    for index in range(count):
+        artifacts = dict(samples[index % len(samples)])
+        final = json.loads(artifacts["final_use_case"])
+        final["title"] = f"{final['title']} #{index}"
+        artifacts["final_use_case"] = json.dumps(final, indent=2)
+        job_dir = os.path.join(target_dir, f"synthetic_{index:06d}")
+        os.makedirs(job_dir)
+        for name, content in artifacts.items():
+            with open(os.path.join(job_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+                json.dump({"content": content}, f, indent=2)
+        job_dirs.append(job_dir)
+    return job_dirs
+
+def bench_render(count: int, workers: Optional[int]) -> int:
+    """Benchmark rendering and `render-all` on a synthetic library."""
+    sys.path.insert(0, HERE)
+    import markdown_render
+
+    target_dir = tempfile.mkdtemp(prefix="use_case_render_bench_")
+    try:
+        start = time.perf_counter()
+        job_dirs = build_synthetic_library(target_dir, count)
+        print(f"Built synthetic library of {count} use cases in {time.perf_counter() - start:.1f}s")
+
+        # Pure rendering cost, inputs already parsed
+        inputs = []
+        for job_dir in job_dirs[:min(count, 2000)]:
+            inputs.append((
+                json.loads(markdown_render.read_artifact(job_dir, "final_use_case")),
+                json.loads(markdown_render.read_artifact(job_dir, "example_solution")),
+                markdown_render.read_artifact(job_dir, "visual_suggestions"),
+            ))
+        start = time.perf_counter()
+        for use_case, example, visuals in inputs:
+            markdown_render.render_markdown(use_case, example, visuals)
+        elapsed = time.perf_counter() - start
+        print(f"render_markdown: {len(inputs) / elapsed:,.0f} docs/s ({elapsed / len(inputs) * 1e6:.0f} us/doc)")
+
+        results = {}
+        for worker_count in sorted({1, workers or os.cpu_count() or 1}):
+            start = time.perf_counter()
+            summary = markdown_render.render_all([target_dir], workers=worker_count, force=True)
+            elapsed = time.perf_counter() - start
+            results[worker_count] = elapsed
+            print(
+                f"render-all --force, {worker_count} worker(s): {summary['rendered']} docs in {elapsed:.2f}s "
+                f"({summary['rendered'] / elapsed:,.0f} docs/s, {summary['failed']} failed)"
+            )
+        if len(results) > 1:
+            print(f"Parallel speedup: {results[1] / results[max(results)]:.1f}x")
+
+        # Incremental pass: nothing changed, so every output should be skipped
+        start = time.perf_counter()
+        summary = markdown_render.render_all([target_dir], workers=workers)
+        elapsed = time.perf_counter() - start
+        print(
+            f"render-all (no changes): {summary['unchanged']} unchanged, "
+            f"{summary['rendered']} rendered in {elapsed:.2f}s"
+        )
+        if summary["rendered"]:
+            print("FAIL: incremental render-all rewrote unchanged outputs")
+            return 1
+    finally:
+        shutil.rmtree(target_dir, ignore_errors=True)
+    return 0
+
+# -------------------------------------------------------------------------------------
+# Static site benchmark
+# -------------------------------------------------------------------------------------
+
+def bench_site(count: int, workers: Optional[int], budget_s: float) -> int:
+    """
+    Benchmark full and incremental static site exports of a synthetic library.
+
+    The full build budget assumes SITE_TARGET_CORES worker processes on as
+    many cores; pass a larger `budget_s` on smaller machines.
+    """
+    sys.path.insert(0, HERE)
+    import site_export
+
+    workers = workers or os.cpu_count() or 1
+    cores = os.cpu_count() or 1
+    print(f"{workers} workers on {cores} cores")
+    if min(workers, cores) < SITE_TARGET_CORES:
+        print(f"note: the {budget_s:.0f}s budget assumes {SITE_TARGET_CORES} workers on {SITE_TARGET_CORES} cores")
+
+    root = tempfile.mkdtemp(prefix="use_case_site_bench_")
+    try:
+        library_dir = os.path.join(root, "python-generator-use-cases")
+        os.makedirs(library_dir)
+        start = time.perf_counter()
+        job_dirs = build_synthetic_library(library_dir, count)
+        print(f"Built synthetic library of {count} use cases in {time.perf_counter() - start:.1f}s")
+        out_dir = os.path.join(root, "site")
+
+        failures = []
+        timings = {}
+        for label in ("full", "no changes", "one change"):
+            if label == "one change":
+                with open(os.path.join(job_dirs[0], "visual_suggestions.json"), "a", encoding="utf-8") as f:
+                    f.write("\n")
+            start = time.perf_counter()
+            summary = site_export.build_site(root, out_dir, workers)
+            timings[label] = time.perf_counter() - start
+            print(
+                f"site export ({label}): {timings[label]:.2f}s, {summary['built']} built, "
+                f"{summary['unchanged']} unchanged, {summary['index_files_written']} index files written"
+            )
+            if summary["failed"]:
+                failures.append(f"{summary['failed']} pages failed in the {label} build")
+        if timings["full"] > budget_s:
+            failures.append(f"full export took {timings['full']:.1f}s, budget {budget_s:.0f}s")
+        if summary["built"] != 1:
+            failures.append(f"incremental export rebuilt {summary['built']} pages for one change")
+
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if not failures:
+            print("OK")
+        return 1 if failures else 0
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+# -------------------------------------------------------------------------------------
+# Near-duplicate check benchmark
+# -------------------------------------------------------------------------------------
+
+def synthetic_outline(rng: random.Random, vocabulary: List[str]) -> str:
+    """A use case outline of 40 words, skewed towards common words like real text."""
+    return " ".join(vocabulary[int(len(vocabulary) * rng.random() ** 4)] for _ in range(40))
+
+def bench_duplicates(count: int, budget_ms: float) -> int:
+    """Benchmark near-duplicate checks against a synthetic index of `count` use cases."""
+    sys.path.insert(0, HERE)
+    import library_index
+    import near_duplicates
+
+    rng = random.Random(36)
+    words = set()
+    for record in library_index.iter_library_records():
+        words.update(near_duplicates.normalize_tokens(near_duplicates.record_text(record)))
+    vocabulary = sorted(words) + [f"term{index}" for index in range(20000)]
+    rng.shuffle(vocabulary)
+
+    root = tempfile.mkdtemp(prefix="use_case_duplicates_bench_")
+    try:
+        conn = near_duplicates.connect(os.path.join(root, "index.db"))
+        start = time.perf_counter()
+        outlines = []
+        with conn:
+            for index in range(count):
+                outline = synthetic_outline(rng, vocabulary)
+                signature, size = near_duplicates.text_signature(outline)
+                near_duplicates.store_signature(conn, f"synthetic/{index:06d}", "", outline[:40], signature, size)
+                if index % (count // 20 or 1) == 0:
+                    outlines.append(outline)
+        print(f"Indexed {count} synthetic use cases in {time.perf_counter() - start:.1f}s")
+
+        failures = []
+        timings = []
+        # Half the queries are near-clones of indexed outlines, half are fresh
+        queries = [" ".join(outline.split()[:30]) for outline in outlines]
+        queries += [synthetic_outline(rng, vocabulary) for _ in outlines]
+        for number, query in enumerate(queries):
+            start = time.perf_counter()
+            signature, size = near_duplicates.text_signature(query)
+            matches = near_duplicates.find_similar(conn, signature, size)
+            timings.append((time.perf_counter() - start) * 1000)
+            if number < len(outlines) and not matches:
+                failures.append(f"near-clone query {number} found no match")
+        conn.close()
+
+        print(
+            f"check: mean {statistics.mean(timings):.1f}ms, "
+            f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:.1f}ms, max {max(timings):.1f}ms"
+        )
+        if max(timings) > budget_ms:
+            failures.append(f"slowest check took {max(timings):.0f}ms, budget {budget_ms:.0f}ms")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if not failures:
+            print("OK")
+        return 1 if failures else 0
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+# -------------------------------------------------------------------------------------
+# Related use cases benchmark
+# -------------------------------------------------------------------------------------
+
+def bench_related(count: int, budget_s: float) -> int:
+    """Benchmark the related use cases build over a synthetic library."""
+    sys.path.insert(0, HERE)
+    import library_index
+    import related_use_cases
+
+    root = tempfile.mkdtemp(prefix="use_case_related_bench_")
+    try:
+        build_synthetic_library(os.path.join(root, "python-generator-use-cases"), count)
+        db_path = os.path.join(root, "index.db")
+        start = time.perf_counter()
+        library_index.update_index(root, db_path)
+        print(f"Indexed {count} synthetic use cases in {time.perf_counter() - start:.1f}s")
+
+        summary = related_use_cases.build_related(root, db_path)
+        print(
+            f"related build: {summary['seconds']:.2f}s ({summary['matrix_seconds']:.2f}s TF-IDF matrix, "
+            f"{'exact' if summary['exact'] else 'pruned'} neighbours), {summary['terms']} terms, {summary['links']} links"
+        )
+        failures = []
+        if summary["seconds"] > budget_s:
+            failures.append(f"related build took {summary['seconds']:.1f}s, budget {budget_s:.0f}s")
+        if summary["links"] < count:
+            failures.append(f"only {summary['links']} links for {count} use cases")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if not failures:
+            print("OK")
+        return 1 if failures else 0
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmarks for the use case generator.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    startup = subparsers.add_parser("startup", help="Cold import time of use_case_generator")
+    startup.add_argument("--runs", type=int, default=10)
+    startup.add_argument("--budget-ms", type=float, default=100.0)
+
+    render = subparsers.add_parser("render", help="Render a synthetic library with render-all")
+    render.add_argument("--use-cases", type=int, default=10000)
+    render.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+
+    site = subparsers.add_parser("site", help="Export a synthetic library as a static site")
+    site.add_argument("--use-cases", type=int, default=10000)
+    site.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    site.add_argument("--budget-s", type=float, default=30.0,
+                      help=f"Full build budget, for {SITE_TARGET_CORES} workers on {SITE_TARGET_CORES} cores")
+
+    duplicates = subparsers.add_parser("duplicates", help="Near-duplicate checks against a synthetic index")
+    duplicates.add_argument("--use-cases", type=int, default=100000)
+    duplicates.add_argument("--budget-ms", type=float, default=1000.0)
+
+    related = subparsers.add_parser("related", help="Related use cases build over a synthetic library")
+    related.add_argument("--use-cases", type=int, default=20000)
+    related.add_argument("--budget-s", type=float, default=30.0)
+
+    args = parser.parse_args(argv)
+    if args.benchmark == "startup":
+        return bench_startup(args.runs, args.budget_ms)
+    if args.benchmark == "render":
+        return bench_render(args.use_cases, args.workers)
+    if args.benchmark == "site":
+        return bench_site(args.use_cases, args.workers, args.budget_s)
+    if args.benchmark == "duplicates":
+        return bench_duplicates(args.use_cases, args.budget_ms)
+    if args.benchmark == "related":
+        return bench_related(args.use_cases, args.budget_s)
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Circuit Breakers for Providers and Models
+
+Each provider ("openai", "perplexity", "local") and each provider model
+("openai:gpt-4o", "perplexity:sonar-pro") gets a circuit breaker shared by
+every job in the process. A model breaker records every call to that model;
+when it is open, the pipeline skips straight to the route's fallback instead
+of waiting on a degraded model. A provider breaker records whether any of the
+provider's models answered a request, so one failing model does not trip it;
+when it is open, requests fail at once with CircuitOpenError or move on to
+another provider.
+
+Design:
+- A breaker keeps the outcome of its last BREAKER_WINDOW calls. Transient
+  errors (`is_transient`: timeouts, connection errors, 408, 429 and 5xx)
+  count as failures, and so do calls slower than BREAKER_SLOW_SECONDS.
+  Client errors such as 400, 401 or 404 mean the provider answered and the
+  request was at fault: they count as answered calls, and call_model
+  raises them instead of trying a fallback model.
+- Once at least BREAKER_MIN_CALLS outcomes are in the window and their
+  failure rate reaches BREAKER_ERROR_RATE, the breaker opens for
+  BREAKER_OPEN_SECONDS.
+- After that it lets a single trial call through (half-open). A success
+  closes it with a fresh window, and a failure opens it again.
+- A reserved call that is cancelled before it finishes (a research task
+  cancelled because its step failed) is released without an outcome, so a
+  cancelled half-open trial never leaves the breaker rejecting every call.
+- Breakers are thread-safe: the synchronous OpenAI steps run in worker
+  threads while research calls run on the event loop.
+
+All settings can be set in the environment or `.env`.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider or model whose breaker is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit open for {name} (retry in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+class FallbackExhaustedError(RuntimeError):
+    """Raised when a call failed with its model and every fallback."""
+
+# Exception class names (in the MRO) of timeouts and connection failures in
+# openai, httpx and aiohttp, matched by name so no SDK has to be imported
+TRANSIENT_ERROR_NAMES = {
+    "APITimeoutError", "APIConnectionError", "TimeoutException", "TransportError",
+    "ClientConnectionError", "ServerTimeoutError", "ClientPayloadError",
+}
+
+def error_status(error: BaseException) -> Optional[int]:
+    """The HTTP status of an SDK error, if it carries one."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(error, "status", None)
+    return status if isinstance(status, int) else None
+
+def is_transient(error: BaseException) -> bool:
+    """True for errors worth a retry elsewhere: timeouts, connection errors, 408, 429 and 5xx."""
+    if isinstance(error, CircuitOpenError):
+        return True
+    status = error_status(error)
+    if status is not None:
+        return status in (408, 429) or status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+def breaker_settings() -> dict:
+    """Breaker thresholds from the environment."""
+    return {
+        "window": int(os.getenv("BREAKER_WINDOW", "10")),
+        "min_calls": int(os.getenv("BREAKER_MIN_CALLS", "4")),
+        "error_rate": float(os.getenv("BREAKER_ERROR_RATE", "0.5")),
+        "slow_seconds": float(os.getenv("BREAKER_SLOW_SECONDS", "180")),
+        "open_seconds": float(os.getenv("BREAKER_OPEN_SECONDS", "60")),
+    }
+
+class CircuitBreaker:
+    """Error-rate and latency breaker over a window of recent calls."""
+
+    def __init__(self, name: str, window: int = 10, min_calls: int = 4, error_rate: float = 0.5,
+                 slow_seconds: float = 180.0, open_seconds: float = 60.0):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.outcomes: deque = deque(maxlen=max(window, 1))
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trial_running = False
+        self.lock = threading.Lock()
+        self.counts = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def before_call(self) -> float:
+        """
+        Reserve a call, or raise CircuitOpenError while the breaker is open.
+        Returns the start time to pass to `record`.
+        """
+        with self.lock:
+            if self.state == OPEN:
+                waited = time.monotonic() - self.opened_at
+                if waited < self.open_seconds:
+                    self.counts["rejected"] += 1
+                    raise CircuitOpenError(self.name, self.open_seconds - waited)
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self.trial_running:
+                    self.counts["rejected"] += 1
+                    raise CircuitOpenError(self.name, 0.0)
+                self.trial_running = True
+        return time.monotonic()
+
+    def record(self, ok: bool, started: Optional[float] = None):
+        """Record the outcome of a call reserved with `before_call` (slow calls count as failures)."""
+        ok = ok and (started is None or time.monotonic() - started < self.slow_seconds)
+        with self.lock:
+            self.counts["calls"] += 1
+            self.counts["failures"] += not ok
+            if self.state == HALF_OPEN:
+                self.trial_running = False
+                if ok:
+                    self.state = CLOSED
+                    self.outcomes.clear()
+                else:
+                    self.trip()
+                return
+            self.outcomes.append(ok)
+            failures = self.outcomes.count(False)
+            if (self.state == CLOSED and len(self.outcomes) >= self.min_calls
+                    and failures / len(self.outcomes) >= self.error_rate):
+                self.trip()
+
+    def release(self):
+        """
+        Give back a call reserved with `before_call` that ended without an
+        outcome (cancelled), so a half-open breaker can run another trial.
+        """
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.trial_running = False
+
+    def trip(self):
+        """Open the breaker (lock held)."""
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.counts["opened"] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"name": self.name, "state": self.state, **self.counts}
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """The process-wide breaker for a provider or provider model, created on first use."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **breaker_settings())
+        return _breakers[name]
+
+def snapshot() -> List[dict]:
+    """State and counts of every breaker, for status pages and metrics."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.snapshot() for breaker in breakers]
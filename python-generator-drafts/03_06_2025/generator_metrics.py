@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Live Metrics and Batch Progress for the Use Case Generator
+
+Collects process-wide metrics while jobs run and exposes them in the
+Prometheus text format, plus a compact terminal view of a running batch.
+
+Metrics:
+    usecase_jobs{state}                        queued / running / done / failed / skipped jobs
+    usecase_step_duration_seconds{step}        histogram of pipeline step latency
+    usecase_api_calls_in_flight{provider}      API calls waiting on a provider right now
+    usecase_api_calls_total{provider,model,outcome}
+    usecase_api_call_duration_seconds{provider}
+    usecase_slot_wait_seconds                  time jobs wait for a concurrency slot
+    usecase_cache_lookups_total{cache,result}  research reuse and render manifest hits / misses
+    usecase_tokens_total{provider,model,kind}  prompt / completion tokens reported by the APIs
+    usecase_tokens_per_second                  token throughput over the last minute
+    usecase_circuit_breaker_open{name}         1 while a breaker is open or half-open
+
+Exposure:
+- `serve` adds `GET /metrics` to the generator service.
+- `batch --metrics-port N` serves `/metrics` from a background thread.
+- `batch --metrics-file PATH` rewrites a textfile every few seconds (for the
+  node_exporter textfile collector), atomically via rename.
+- `batch --progress` replaces the console log with a per-job step view and a
+  batch ETA. The ETA uses the mean observed latency of each step, or the
+  library's typical step latency before a step has finished once.
+
+Metrics are plain in-process counters with no dependencies; recording one
+costs a lock and a dict update.
+"""
+
+import os
+import sys
+import time
+import bisect
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 45, 60, 90, 120, 180, 300, 600)
+WAIT_BUCKETS = (0.1, 1, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+# Typical step latency in seconds (p50 of the library's execution logs, see
+# log_report.py), used for the ETA until a step has been observed
+TYPICAL_STEP_SECONDS = {1: 5.5, 2: 26.0, 3: 50.8, 4: 34.0, 5: 38.5, 6: 22.6}
+TOKEN_RATE_WINDOW = 60.0
+
+# -------------------------------------------------------------------------------------
+# Metric types
+# -------------------------------------------------------------------------------------
+
+_lock = threading.RLock()
+INF = '"+Inf"'
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metric:
+    """A named metric with labelled samples."""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.samples: Dict[Tuple[str, ...], float] = {}
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def expose(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{format_labels(self.labels, key)} {format_value(value)}"
+            for key, value in sorted(self.samples.items())
+        ]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with _lock:
+            self.samples[labels] = self.samples.get(labels, 0.0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, *labels: str, value: float):
+        with _lock:
+            self.samples[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with _lock:
+            self.samples[labels] = self.samples.get(labels, 0.0) + amount
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+        self.series: Dict[Tuple[str, ...], list] = {}  # labels -> [bucket counts, sum, count]
+
+    def observe(self, *labels: str, value: float):
+        with _lock:
+            series = self.series.setdefault(labels, [[0] * len(self.buckets), 0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def mean(self, *labels: str) -> Optional[float]:
+        with _lock:
+            series = self.series.get(labels)
+            return series[1] / series[2] if series and series[2] else None
+
+    def expose(self) -> List[str]:
+        lines = self.header()
+        for key, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = format_labels(self.labels, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_bucket{format_labels(self.labels, key, 'le=%s' % INF)} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {count}")
+        return lines
+
+# -------------------------------------------------------------------------------------
+# Generator metrics
+# -------------------------------------------------------------------------------------
+
+JOBS = Gauge("usecase_jobs", "Jobs in this process by state.", ("state",))
+STEP_DURATION = Histogram("usecase_step_duration_seconds", "Pipeline step latency.", ("step",))
+API_IN_FLIGHT = Gauge("usecase_api_calls_in_flight", "API calls in progress.", ("provider",))
+API_CALLS = Counter("usecase_api_calls_total", "API calls by outcome.", ("provider", "model", "outcome"))
+API_DURATION = Histogram("usecase_api_call_duration_seconds", "API call latency.", ("provider",))
+SLOT_WAIT = Histogram("usecase_slot_wait_seconds", "Time jobs waited for a concurrency slot.",
+                      buckets=WAIT_BUCKETS)
+CACHE_LOOKUPS = Counter("usecase_cache_lookups_total", "Cache lookups by result.", ("cache", "result"))
+TOKENS = Counter("usecase_tokens_total", "Tokens reported by the APIs.", ("provider", "model", "kind"))
+TOKEN_RATE = Gauge("usecase_tokens_per_second", "Tokens per second over the last minute.")
+BREAKER_OPEN = Gauge("usecase_circuit_breaker_open", "1 while a circuit breaker is open or half-open.", ("name",))
+
+METRICS: List[Metric] = [
+    JOBS, STEP_DURATION, API_IN_FLIGHT, API_CALLS, API_DURATION, SLOT_WAIT,
+    CACHE_LOOKUPS, TOKENS, TOKEN_RATE, BREAKER_OPEN,
+]
+
+for _state in ("queued", "running", "done", "failed", "skipped"):
+    JOBS.set(_state, value=0)
+
+# Per-job step state for the progress view: job_id -> {title, status, steps, step_started}
+JOB_STATES: Dict[str, dict] = {}
+_token_events: deque = deque()
+
+def job_queued(count: int = 1):
+    JOBS.inc("queued", amount=count)
+
+def job_skipped():
+    JOBS.inc("skipped")
+
+def slot_acquired(waited_seconds: float):
+    """A queued job got a concurrency slot after waiting `waited_seconds`."""
+    JOBS.inc("queued", amount=-1)
+    SLOT_WAIT.observe(value=waited_seconds)
+
+def job_started(job_id: str, title: str, saved_steps: Iterable[int] = ()):
+    """A job entered the pipeline; `saved_steps` already have results (resume)."""
+    JOBS.inc("running")
+    saved = set(saved_steps)
+    with _lock:
+        JOB_STATES[job_id] = {
+            "title": title,
+            "status": "running",
+            "steps": {step: "done" if step in saved else "pending" for step in TYPICAL_STEP_SECONDS},
+            "step_started": {},
+            "saved": saved,
+        }
+
+def job_finished(job_id: str, status: str):
+    """A job left the pipeline with status "done" or "failed"."""
+    JOBS.inc("running", amount=-1)
+    JOBS.inc(status)
+    with _lock:
+        if job_id in JOB_STATES:
+            JOB_STATES[job_id]["status"] = status
+
+def step_event(job_id: str, step: int, status: str):
+    """Record a "running" or "done" progress event of a pipeline step."""
+    now = time.monotonic()
+    with _lock:
+        state = JOB_STATES.get(job_id)
+        if state is None:
+            return
+        state["steps"][step] = status
+        if status == "running":
+            state["step_started"][step] = now
+        elif status == "done" and step in state["step_started"] and step not in state["saved"]:
+            # Steps loaded from a saved result would skew the latency histogram
+            STEP_DURATION.observe(str(step), value=now - state["step_started"].pop(step))
+
+class api_call:
+    """
+    Context manager around one API call: in-flight gauge, latency and outcome.
+
+        with generator_metrics.api_call("openai", model) as call:
+            response = ...
+            call.usage(response)
+    """
+
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+
+    def __enter__(self):
+        API_IN_FLIGHT.inc(self.provider)
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        API_IN_FLIGHT.inc(self.provider, amount=-1)
+        API_DURATION.observe(self.provider, value=time.monotonic() - self.started)
+        API_CALLS.inc(self.provider, self.model, "error" if exc_type else "ok")
+        return False
+
+    def usage(self, response):
+        record_usage(self.provider, self.model, getattr(response, "usage", None))
+
+def record_usage(provider: str, model: str, usage):
+    """Count the prompt and completion tokens of an API response's `usage`, if any."""
+    if usage is None:
+        return
+    total = 0
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None) or 0
+        if tokens:
+            TOKENS.inc(provider, model, kind, amount=tokens)
+            total += tokens
+    if total:
+        with _lock:
+            _token_events.append((time.monotonic(), total))
+
+def cache_lookups(cache: str, hits: int, misses: int):
+    if hits:
+        CACHE_LOOKUPS.inc(cache, "hit", amount=hits)
+    if misses:
+        CACHE_LOOKUPS.inc(cache, "miss", amount=misses)
+
+def tokens_per_second() -> float:
+    """Token throughput over the last TOKEN_RATE_WINDOW seconds."""
+    now = time.monotonic()
+    with _lock:
+        while _token_events and now - _token_events[0][0] > TOKEN_RATE_WINDOW:
+            _token_events.popleft()
+        return sum(tokens for _, tokens in _token_events) / TOKEN_RATE_WINDOW
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    import circuit_breakers
+    TOKEN_RATE.set(value=tokens_per_second())
+    for breaker in circuit_breakers.snapshot():
+        BREAKER_OPEN.set(breaker["name"], value=0 if breaker["state"] == circuit_breakers.CLOSED else 1)
+    with _lock:
+        lines = [line for metric in METRICS for line in metric.expose()]
+    return "\n".join(lines) + "\n"
+
+# -------------------------------------------------------------------------------------
+# Exposure
+# -------------------------------------------------------------------------------------
+
+def write_textfile(path: str):
+    """Write the metrics to `path` atomically (write, then rename)."""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(render_metrics())
+    os.replace(temporary, path)
+
+def start_http_server(port: int, host: str = "127.0.0.1"):
+    """Serve GET /metrics from a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# -------------------------------------------------------------------------------------
+# Terminal progress view
+# -------------------------------------------------------------------------------------
+
+STEP_MARKS = {"pending": ".", "running": ">", "done": "#"}
+
+def expected_step_seconds(step: int) -> float:
+    return STEP_DURATION.mean(str(step)) or TYPICAL_STEP_SECONDS[step]
+
+def batch_eta(concurrency: int) -> Optional[float]:
+    """
+    Seconds until the batch finishes: remaining expected step time of running
+    jobs plus whole pipelines for queued ones, spread over the concurrency.
+    """
+    now = time.monotonic()
+    full_job = sum(expected_step_seconds(step) for step in TYPICAL_STEP_SECONDS)
+    with _lock:
+        remaining = max(JOBS.samples.get(("queued",), 0.0), 0.0) * full_job
+        running = [state for state in JOB_STATES.values() if state["status"] == "running"]
+        for state in running:
+            for step, status in state["steps"].items():
+                if status == "pending":
+                    remaining += expected_step_seconds(step)
+                elif status == "running":
+                    elapsed = now - state["step_started"].get(step, now)
+                    remaining += max(expected_step_seconds(step) - elapsed, 0.0)
+    if not remaining and not running:
+        return None
+    return remaining / max(min(concurrency, len(running) + int(JOBS.samples.get(("queued",), 0))), 1)
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m" if seconds >= 3600 else f"{seconds // 60}m{seconds % 60:02d}s"
+
+def progress_lines(concurrency: int, width: int = 100) -> List[str]:
+    """The progress view: one line per job that has started, then a batch summary."""
+    with _lock:
+        states = [dict(state, steps=dict(state["steps"])) for state in JOB_STATES.values()]
+        counts = {key[0]: int(value) for key, value in JOBS.samples.items()}
+    lines = []
+    title_width = max(width - 22, 20)
+    for state in states:
+        marks = "".join(STEP_MARKS.get(state["steps"][step], "?") for step in sorted(state["steps"]))
+        status = state["status"] if state["status"] != "running" else ""
+        title = state["title"] if len(state["title"]) <= title_width else state["title"][:title_width - 3] + "..."
+        lines.append(f"[{marks}] {title:<{title_width}} {status}".rstrip())
+    eta = batch_eta(concurrency)
+    lines.append(
+        f"queued {counts.get('queued', 0)}  running {counts.get('running', 0)}  done {counts.get('done', 0)}  "
+        f"failed {counts.get('failed', 0)}  skipped {counts.get('skipped', 0)}  "
+        f"{tokens_per_second():.0f} tok/s  ETA {format_duration(eta) if eta is not None else '-'}"
+    )
+    return lines
+
+class ProgressView:
+    """
+    Redraws the progress view in place on a terminal, or prints the summary
+    line every `interval` seconds when output is not a terminal.
+    """
+
+    def __init__(self, concurrency: int, stream=None, interval: float = 1.0):
+        self.concurrency = concurrency
+        self.stream = stream or sys.stdout
+        self.interval = interval
+        self.tty = self.stream.isatty()
+        self.drawn = 0
+        self.last_plain = 0.0
+
+    def draw(self, final: bool = False):
+        lines = progress_lines(self.concurrency, self.width())
+        if self.tty:
+            # Move up over the previous frame and clear to the end of the screen
+            prefix = f"\x1b[{self.drawn}F\x1b[J" if self.drawn else ""
+            self.stream.write(prefix + "\n".join(lines) + "\n")
+            self.drawn = len(lines)
+        elif final or time.monotonic() - self.last_plain >= max(self.interval, 30.0):
+            self.stream.write(lines[-1] + "\n")
+            self.last_plain = time.monotonic()
+        self.stream.flush()
+
+    def width(self) -> int:
+        try:
+            return os.get_terminal_size(self.stream.fileno()).columns
+        except (OSError, ValueError):
+            return 100
+
+    async def run(self):
+        """Redraw until cancelled."""
+        import asyncio
+        try:
+            while True:
+                self.draw()
+                await asyncio.sleep(self.interval)
+        except asyncio.CancelledError:
+            self.draw(final=True)
+            raise
+
+async def export_periodically(path: str, interval: float = 5.0):
+    """Rewrite the metrics textfile every `interval` seconds until cancelled."""
+    import asyncio
+    try:
+        while True:
+            await asyncio.to_thread(write_textfile, path)
+            await asyncio.sleep(interval)
+    except asyncio.CancelledError:
+        write_textfile(path)
+        raise
@@ -0,0 +1,246 @@
+"""
+Long-lived local HTTP service for the use case generator.
+
+Keeps the API clients, their connection pools and the job concurrency limit
+warm across submissions, so several submitters can share one quota-aware
+process instead of each paying a cold start.
+
+Endpoints:
+    POST /jobs                  Submit a use case config (JSON body); returns the job id
+    GET  /jobs                  List jobs and their status
+    GET  /jobs/{job_id}         Status and per-step progress of one job
+    GET  /jobs/{job_id}/events  Server-Sent Events stream of progress updates
+    GET  /health                Liveness check, with the state of every circuit breaker
+    GET  /metrics               Prometheus metrics (see generator_metrics.py)
+
+The pipeline functions come from the caller: `use_case_generator.py serve`
+passes its own module in, since importing the script by name here would load
+a second copy of it (with its own clients and job context) when it runs as
+`__main__`.
+
+Finished jobs stay listed until SERVICE_MAX_FINISHED_JOBS (default 100) newer
+ones have finished; their directories are kept on disk.
+
+Start it with:
+    python use_case_generator.py serve --port 8765
+"""
+
+import os
+import json
+import time
+import logging
+import asyncio
+from collections import deque
+from datetime import datetime
+from types import ModuleType
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+import circuit_breakers
+import generator_metrics
+
+DEFAULT_MAX_FINISHED_JOBS = int(os.getenv("SERVICE_MAX_FINISHED_JOBS", "100"))
+
+# -------------------------------------------------------------------------------------
+# Job registry
+# -------------------------------------------------------------------------------------
+
+class ServiceJob:
+    """In-memory state of one submitted job."""
+
+    def __init__(self, job_manager, use_case_config: dict, steps: Dict[int, str]):
+        self.job_manager = job_manager
+        self.use_case_config = use_case_config
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.submitted_at = datetime.now().isoformat()
+        self.steps: Dict[int, str] = {step: "pending" for step in steps}
+        self.events: List[dict] = []
+        self.subscribers: List[asyncio.Queue] = []
+
+    def publish(self, event: dict):
+        """Record an event and fan it out to every SSE subscriber."""
+        self.events.append(event)
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+    def on_progress(self, event: dict):
+        """Progress callback handed to the pipeline."""
+        self.steps[event["step"]] = event["status"]
+        self.publish({"type": "step", **event})
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_manager.job_id,
+            "title": self.use_case_config.get("title"),
+            "status": self.status,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "job_dir": self.job_manager.job_dir,
+            "steps": {str(step): state for step, state in self.steps.items()},
+        }
+
+class GeneratorService:
+    """Accepts jobs over HTTP and runs them with a shared concurrency limit."""
+
+    def __init__(self, generator: ModuleType, max_concurrent_jobs: int = 2, base_dir: Optional[str] = None,
+                 max_finished_jobs: int = DEFAULT_MAX_FINISHED_JOBS):
+        self.generator = generator
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.base_dir = base_dir
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs: Dict[str, ServiceJob] = {}
+        self.finished_ids: deque = deque()
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.tasks: set = set()
+
+    async def on_startup(self, app: web.Application):
+        """Create loop-bound state and warm the API clients once."""
+        self.semaphore = asyncio.Semaphore(max(self.max_concurrent_jobs, 1))
+        self.generator.get_openai_client()
+        self.generator.get_research_backend()
+        logging.info(f"Generator service ready (max {self.max_concurrent_jobs} concurrent jobs)")
+
+    async def on_cleanup(self, app: web.Application):
+        """Cancel jobs that are still running when the service stops."""
+        for task in list(self.tasks):
+            task.cancel()
+
+    async def run_job(self, job: ServiceJob):
+        """Run one job once a concurrency slot is free."""
+        generator_metrics.job_queued()
+        queued_at = time.monotonic()
+        async with self.semaphore:
+            generator_metrics.slot_acquired(time.monotonic() - queued_at)
+            job.status = "running"
+            job.publish({"type": "status", "status": job.status})
+            try:
+                await self.generator.run_pipeline(job.use_case_config, job.job_manager, job.on_progress)
+                job.status = "done"
+            except Exception as e:
+                logging.error(f"Job {job.job_manager.job_id} failed: {e}")
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.job_manager.close()
+            job.publish({"type": "status", "status": job.status, "error": job.error})
+        self.evict_finished(job)
+
+    def evict_finished(self, job: ServiceJob):
+        """Record a finished job and forget the oldest ones beyond `max_finished_jobs`."""
+        self.finished_ids.append(job.job_manager.job_id)
+        while len(self.finished_ids) > self.max_finished_jobs:
+            self.jobs.pop(self.finished_ids.popleft(), None)
+
+    # ---------------------------------------------------------------------------------
+    # HTTP handlers
+    # ---------------------------------------------------------------------------------
+
+    async def submit_job(self, request: web.Request) -> web.Response:
+        try:
+            use_case_config = await request.json()
+            self.generator.validate_config(use_case_config)
+        except (json.JSONDecodeError, ValueError) as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+        job_manager = self.generator.JobManager(
+            use_case_config["id"], use_case_config["title"], base_dir=self.base_dir
+        )
+        job_manager.save_metadata(use_case_config)
+        job = ServiceJob(job_manager, use_case_config, self.generator.PIPELINE_STEPS)
+        self.jobs[job_manager.job_id] = job
+
+        task = asyncio.create_task(self.run_job(job))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+        job_id = job_manager.job_id
+        return web.json_response(
+            {"job_id": job_id, "status_url": f"/jobs/{job_id}", "events_url": f"/jobs/{job_id}/events"},
+            status=202,
+        )
+
+    async def list_jobs(self, request: web.Request) -> web.Response:
+        return web.json_response([job.to_dict() for job in self.jobs.values()])
+
+    async def get_job(self, request: web.Request) -> web.Response:
+        job = self.jobs.get(request.match_info["job_id"])
+        if not job:
+            return web.json_response({"error": "job not found"}, status=404)
+        return web.json_response(job.to_dict())
+
+    async def stream_events(self, request: web.Request) -> web.StreamResponse:
+        job = self.jobs.get(request.match_info["job_id"])
+        if not job:
+            return web.json_response({"error": "job not found"}, status=404)
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+        })
+        await response.prepare(request)
+
+        # Subscribe and snapshot without yielding, so no event is sent twice
+        queue: asyncio.Queue = asyncio.Queue()
+        job.subscribers.append(queue)
+        history = list(job.events)
+        try:
+            # Replay what already happened, then follow live events
+            for event in history:
+                await response.write(format_sse(event))
+            while not job.finished or not queue.empty():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    await response.write(b": keep-alive\n\n")
+                    continue
+                await response.write(format_sse(event))
+        finally:
+            job.subscribers.remove(queue)
+        return response
+
+    async def health(self, request: web.Request) -> web.Response:
+        running = sum(1 for job in self.jobs.values() if job.status == "running")
+        return web.json_response({
+            "status": "ok", "jobs": len(self.jobs), "running": running,
+            "breakers": circuit_breakers.snapshot(),
+        })
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=generator_metrics.render_metrics(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+# The service of an application, for handlers and hooks outside the class
+SERVICE_KEY = web.AppKey("service", GeneratorService)
+
+def format_sse(event: dict) -> bytes:
+    """Encode one event in Server-Sent Events wire format."""
+    return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n".encode("utf-8")
+
+def create_app(generator: ModuleType, max_concurrent_jobs: int = 2, base_dir: Optional[str] = None) -> web.Application:
+    """Build the aiohttp application around `generator`, the running use_case_generator module."""
+    service = GeneratorService(generator, max_concurrent_jobs, base_dir)
+    app = web.Application()
+    app[SERVICE_KEY] = service
+    app.on_startup.append(service.on_startup)
+    app.on_cleanup.append(service.on_cleanup)
+    app.router.add_post("/jobs", service.submit_job)
+    app.router.add_get("/jobs", service.list_jobs)
+    app.router.add_get("/jobs/{job_id}", service.get_job)
+    app.router.add_get("/jobs/{job_id}/events", service.stream_events)
+    app.router.add_get("/health", service.health)
+    app.router.add_get("/metrics", service.metrics)
+    return app
+
+def serve(generator: ModuleType, host: str = "127.0.0.1", port: int = 8765, max_concurrent_jobs: int = 2,
+          base_dir: Optional[str] = None):
+    """Run the service until interrupted."""
+    generator.setup_console_logging()
+    web.run_app(create_app(generator, max_concurrent_jobs, base_dir), host=host, port=port)
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Columnar Bulk Export of the Use Case Library
+
+Flattens every generated job (final use case, example solution and
+metadata.json) into four analytics tables:
+
+    use_cases   One row per job: config labels, time to complete, step, sub-step,
+                citation and resource counts, relevance score stats, example
+                solution summary
+    steps       One row per step
+    sub_steps   One row per sub-step
+    citations   One row per citation, with its relevance score
+
+Formats:
+- jsonl     `<out>/<table>.jsonl`, one JSON object per line (no dependencies)
+- parquet   `<out>/<table>/part-<run>.parquet`, a dataset directory per table
+            that pandas, DuckDB, Polars and Arrow read directly (needs pyarrow).
+            The run id is the start time plus a random suffix, and part files
+            are created exclusively, so runs that start in the same second
+            never overwrite each other's parts
+
+The export streams: jobs are read one at a time and rows are flushed in
+batches, so memory stays flat no matter how large the library is.
+
+`--append` exports only jobs that earlier runs haven't (tracked in
+`<out>/export_state.json`). JSONL files are appended to and Parquet runs add a
+new part file, so a nightly export only processes new jobs.
+
+A run that fails leaves the tables as they were: parts are published and full
+exports replace their tables only when the run succeeds, and appended JSONL
+rows are cut back to the lengths recorded in the state. The next run then
+exports those jobs once.
+
+Usage:
+    python library_export.py [--out DIR] [--format jsonl|parquet] [--append]
+                             [--family F] [--tool T] [--mode M] [--batch-size N]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import argparse
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from use_case_library import UseCaseLibrary, UseCaseRecord, join_list, read_artifact_bytes
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_EXPORT_DIR = os.path.join(REPO_ROOT, "library_export")
+STATE_FILENAME = "export_state.json"
+FORMATS = ["jsonl", "parquet"]
+
+# Column names and types per table; types map to Arrow types for Parquet
+TABLES: Dict[str, List[tuple]] = {
+    "use_cases": [
+        ("job_id", "string"), ("use_case_id", "string"), ("title", "string"),
+        ("family", "string"), ("tool", "string"), ("ai_tool", "string"), ("mode", "string"),
+        ("model", "string"), ("department", "string"), ("role", "string"),
+        ("coding_language", "string"), ("time_to_complete", "string"),
+        ("time_to_complete_minutes", "float"), ("created_at", "string"), ("status", "string"),
+        ("step_count", "int"), ("sub_step_count", "int"), ("resource_count", "int"),
+        ("citation_count", "int"), ("relevance_score_mean", "float"), ("relevance_score_max", "float"),
+        ("example_title", "string"), ("example_setup_time", "float"), ("example_demo_time", "float"),
+        ("example_step_count", "int"), ("has_visual_suggestions", "bool"),
+    ],
+    "steps": [
+        ("job_id", "string"), ("step_number", "int"), ("step_title", "string"),
+        ("step_instructions", "string"), ("advice", "string"), ("sub_step_count", "int"),
+    ],
+    "sub_steps": [
+        ("job_id", "string"), ("step_number", "int"), ("sub_step_number", "int"),
+        ("title", "string"), ("description", "string"), ("bullet_count", "int"), ("bullets", "string"),
+    ],
+    "citations": [
+        ("job_id", "string"), ("rank", "int"), ("url", "string"), ("title", "string"),
+        ("relevance_score", "float"), ("snippet", "string"),
+    ],
+}
+
+# -------------------------------------------------------------------------------------
+# Flattening
+# -------------------------------------------------------------------------------------
+
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+def parse_minutes(value) -> Optional[float]:
+    """'20 minutes' -> 20, '15-20 minutes' -> 17.5, '1 hour' -> 60; None if no number."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    numbers = [float(n) for n in NUMBER_RE.findall(str(value or ""))]
+    if not numbers:
+        return None
+    minutes = sum(numbers[:2]) / len(numbers[:2])
+    return minutes * 60 if "hour" in str(value).lower() else minutes
+
+def to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def load_json_artifact(job_dir: str, filename: str) -> Optional[dict]:
+    """Load a saved structured artifact as a dict, unwrapping the content envelope."""
+    data = read_artifact_bytes(os.path.join(job_dir, filename))
+    if data is None:
+        return None
+    try:
+        value = json.loads(data)
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+def flatten_job(record: UseCaseRecord) -> Dict[str, List[dict]]:
+    """All rows one job contributes, per table."""
+    job_id = record.job_id
+    final = load_json_artifact(record.job_dir, "final_use_case.json") or {}
+    example = (load_json_artifact(record.job_dir, "example_solution.json") or {}).get("solution") or {}
+    meta = final.get("metadata") or {}
+
+    rows: Dict[str, List[dict]] = {table: [] for table in TABLES}
+    sub_step_total = 0
+    for step_number, step in enumerate(final.get("steps") or [], 1):
+        sub_steps = step.get("sub_steps") or []
+        sub_step_total += len(sub_steps)
+        rows["steps"].append({
+            "job_id": job_id,
+            "step_number": step_number,
+            "step_title": step.get("step_title"),
+            "step_instructions": step.get("step_instructions"),
+            "advice": step.get("advice"),
+            "sub_step_count": len(sub_steps),
+        })
+        for sub_step_number, sub_step in enumerate(sub_steps, 1):
+            bullets = sub_step.get("bullets") or []
+            rows["sub_steps"].append({
+                "job_id": job_id,
+                "step_number": step_number,
+                "sub_step_number": sub_step_number,
+                "title": sub_step.get("title"),
+                "description": sub_step.get("description"),
+                "bullet_count": len(bullets),
+                "bullets": "\n".join(bullets),
+            })
+
+    scores = []
+    for rank, citation in enumerate(final.get("citations") or [], 1):
+        score = to_float(citation.get("relevance_score"))
+        if score is not None:
+            scores.append(score)
+        rows["citations"].append({
+            "job_id": job_id,
+            "rank": rank,
+            "url": citation.get("url"),
+            "title": citation.get("title"),
+            "relevance_score": score,
+            "snippet": citation.get("snippet"),
+        })
+
+    rows["use_cases"].append({
+        "job_id": job_id,
+        "use_case_id": record.use_case_id,
+        "title": record.title,
+        "family": record.family,
+        "tool": record.tool,
+        "ai_tool": meta.get("ai_tool") or "",
+        "mode": record.mode,
+        "model": record.model,
+        "department": record.department or join_list(meta.get("department")),
+        "role": record.role or join_list(meta.get("role")),
+        "coding_language": record.coding_language,
+        "time_to_complete": record.time_to_complete,
+        "time_to_complete_minutes": parse_minutes(record.time_to_complete),
+        "created_at": record.created_at,
+        "status": record.status,
+        "step_count": len(final.get("steps") or []),
+        "sub_step_count": sub_step_total,
+        "resource_count": len(final.get("resources") or []),
+        "citation_count": len(final.get("citations") or []),
+        "relevance_score_mean": sum(scores) / len(scores) if scores else None,
+        "relevance_score_max": max(scores) if scores else None,
+        "example_title": example.get("title"),
+        "example_setup_time": to_float(example.get("setup_time")),
+        "example_demo_time": to_float(example.get("demo_time")),
+        "example_step_count": len(example.get("steps") or []) if example else None,
+        "has_visual_suggestions": os.path.isfile(os.path.join(record.job_dir, "visual_suggestions.json")),
+    })
+    return rows
+
+# -------------------------------------------------------------------------------------
+# Table writers
+# -------------------------------------------------------------------------------------
+
+class JsonlTableWriter:
+    """
+    Streams rows of one table to `<out>/<table>.jsonl`.
+
+    A full export writes to a temporary file that replaces the table when the
+    run succeeds. An append writes to the table itself, after cutting it back
+    to `size`, its length when the state was last written, and cuts it back
+    again if the run fails; rows of a failed run never stay behind.
+    """
+
+    def __init__(self, out_dir: str, table: str, append: bool, size: Optional[int] = None):
+        self.path = os.path.join(out_dir, f"{table}.jsonl")
+        self.append = append
+        if append:
+            if size is not None and os.path.isfile(self.path) and os.path.getsize(self.path) > size:
+                # Rows of an earlier run that failed before recording its state
+                os.truncate(self.path, size)
+            self.start = os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+            self.file = open(self.path, "a", encoding="utf-8")
+        else:
+            self.file = open(self.path + ".tmp", "w", encoding="utf-8")
+
+    def write(self, rows: List[dict]):
+        self.file.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+    def close(self, ok: bool = True):
+        """Finish the table, or drop this run's rows when `ok` is False."""
+        self.file.close()
+        if self.append:
+            if not ok:
+                os.truncate(self.path, self.start)
+        elif ok:
+            os.replace(self.path + ".tmp", self.path)
+        else:
+            os.remove(self.path + ".tmp")
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+class ParquetTableWriter:
+    """
+    Streams rows of one table into a new part file of `<out>/<table>/`.
+
+    The part is written under a hidden temporary name that dataset readers
+    skip, and renamed when the run succeeds. A full export removes the
+    earlier parts only then.
+    """
+
+    def __init__(self, out_dir: str, table: str, append: bool, run_id: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)") from e
+        self.pa = pa
+        types = {"string": pa.string(), "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_()}
+        self.schema = pa.schema([(name, types[kind]) for name, kind in TABLES[table]])
+
+        self.append = append
+        self.table_dir = os.path.join(out_dir, table)
+        os.makedirs(self.table_dir, exist_ok=True)
+        self.filename = f"part-{run_id}.parquet"
+        self.path = os.path.join(self.table_dir, self.filename)
+        self.temp_path = os.path.join(self.table_dir, f".{self.filename}.tmp")
+        # "x" fails rather than overwrite another run's part
+        self.file = open(self.temp_path, "xb")
+        self.writer = pq.ParquetWriter(self.file, self.schema, compression="zstd")
+        self.rows_written = 0
+
+    def write(self, rows: List[dict]):
+        if rows:
+            self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+            self.rows_written += len(rows)
+
+    def close(self, ok: bool = True):
+        """Publish the part, or remove it when `ok` is False."""
+        self.writer.close()
+        self.file.close()
+        if not ok or not self.rows_written:
+            # Don't leave partial parts, or empty ones from appends with nothing new
+            os.remove(self.temp_path)
+        else:
+            os.rename(self.temp_path, self.path)
+        if ok and not self.append:
+            for filename in os.listdir(self.table_dir):
+                if filename.startswith("part-") and filename.endswith(".parquet") and filename != self.filename:
+                    os.remove(os.path.join(self.table_dir, filename))
+
+# -------------------------------------------------------------------------------------
+# Export
+# -------------------------------------------------------------------------------------
+
+def load_state(out_dir: str) -> dict:
+    try:
+        with open(os.path.join(out_dir, STATE_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def export_library(out_dir: str = DEFAULT_EXPORT_DIR, fmt: str = "jsonl", append: bool = False,
+                   library: Optional[UseCaseLibrary] = None, batch_size: int = 1000,
+                   **filters) -> dict:
+    """
+    Export the library's generated jobs to columnar tables.
+
+    `filters` (family, tool, mode, ...) are passed to UseCaseLibrary.find.
+    With `append`, jobs exported by earlier runs to the same directory and
+    format are skipped. Returns the number of jobs and rows per table written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    os.makedirs(out_dir, exist_ok=True)
+    state = load_state(out_dir) if append else {}
+    if append and state.get("format") not in (None, fmt):
+        raise ValueError(f"{out_dir} holds a {state['format']} export; append with the same format")
+    exported: Dict[str, str] = state.get("jobs", {})
+
+    library = library or UseCaseLibrary()
+    records = [r for r in library.find(complete_only=True, **filters) if r.job_id not in exported]
+
+    run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    if fmt == "jsonl":
+        sizes = state.get("sizes", {})
+        writers = {table: JsonlTableWriter(out_dir, table, append, sizes.get(table)) for table in TABLES}
+    else:
+        writers = {table: ParquetTableWriter(out_dir, table, append, run_id) for table in TABLES}
+
+    counts = {"jobs": 0, **{table: 0 for table in TABLES}}
+    buffers: Dict[str, List[dict]] = {table: [] for table in TABLES}
+    ok = False
+    try:
+        for record in records:
+            for table, rows in flatten_job(record).items():
+                buffers[table].extend(rows)
+                counts[table] += len(rows)
+                if len(buffers[table]) >= batch_size:
+                    writers[table].write(buffers[table])
+                    buffers[table] = []
+            exported[record.job_id] = run_id
+            counts["jobs"] += 1
+        for table, rows in buffers.items():
+            writers[table].write(rows)
+        ok = True
+    finally:
+        # A failed run leaves the tables as they were, so nothing is exported twice
+        for writer in writers.values():
+            writer.close(ok)
+
+    state = {"format": fmt, "last_run": run_id, "jobs": exported}
+    if fmt == "jsonl":
+        state["sizes"] = {table: writer.size for table, writer in writers.items()}
+    state_path = os.path.join(out_dir, STATE_FILENAME)
+    with open(state_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(state_path + ".tmp", state_path)
+    return counts
+
+def iter_jsonl(path: str) -> Iterator[dict]:
+    """Stream rows back from an exported JSONL table."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Export the use case library to columnar tables.")
+    parser.add_argument("--out", default=DEFAULT_EXPORT_DIR, help="Output directory")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("--append", action="store_true", help="Only export jobs not exported before")
+    parser.add_argument("--dirs", nargs="*", help="Library directories (default: all known)")
+    parser.add_argument("--family")
+    parser.add_argument("--tool")
+    parser.add_argument("--mode")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows buffered per table before a write")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        counts = export_library(
+            args.out, args.format, args.append, UseCaseLibrary(args.dirs or None), args.batch_size,
+            family=args.family, tool=args.tool, mode=args.mode,
+        )
+    except (RuntimeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    tables = ", ".join(f"{counts[table]} {table}" for table in TABLES)
+    print(f"Exported {counts['jobs']} jobs to {args.out} ({args.format}) in {elapsed:.2f}s: {tables}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
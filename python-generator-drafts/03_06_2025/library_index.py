@@ -0,0 +1,810 @@
+#!/usr/bin/env python3
+"""
+Searchable Index of the Use Case Library
+
+Ingests every use case in the repository into a SQLite database with an FTS5
+full-text index, so questions like "all Gemini Sheets use cases" are answered
+in milliseconds instead of by grepping.
+
+Sources:
+
+1. GENERATED USE CASES
+   - `python-generator-use-cases/*/final_use_case.json` and jobs written by
+     the generator to `python-generator-drafts/use_cases/`
+   - Fields come from the structured JSON and the attached config metadata
+
+2. HAND-WRITTEN USE CASES
+   - Markdown in `generic-use-cases/` and `coding-assistant-use-cases/`,
+     written in the `use_case_template.md` style
+   - Parsed by a single-pass Markdown-to-fields scanner; tool and mode are
+     inferred from the title and overview when not stated
+
+Indexed fields: title, family, tool, mode, department, role, model, coding
+language, description, steps text and citations.
+
+Incremental updates keep a per-source watermark (mtime, size, SHA-256) and
+re-ingest only sources that were added, changed or deleted; `watch` keeps the
+index current with inotify.
+
+Usage:
+    python library_index.py build
+    python library_index.py update
+    python library_index.py watch
+    python library_index.py search "gemini sheets" [--tool "Google Gemini"] [--json]
+    python library_index.py stats
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import select
+import struct
+import sqlite3
+import hashlib
+import argparse
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+# -------------------------------------------------------------------------------------
+# Library locations
+# -------------------------------------------------------------------------------------
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_DB_PATH = os.path.join(REPO_ROOT, "library_index.db")
+
+# Directories holding one generator job directory per use case
+GENERATED_DIRS = ["python-generator-use-cases", os.path.join("python-generator-drafts", "use_cases")]
+
+# Directories holding hand-written Markdown use cases, with the family they imply
+HAND_WRITTEN_DIRS = {
+    "generic-use-cases": "Generic",
+    "coding-assistant-use-cases": "Coding Assistant",
+}
+
+# Tools and modes recognised in hand-written titles, most specific first
+KNOWN_TOOLS = [
+    ("github copilot", "GitHub Copilot"),
+    ("microsoft copilot", "Microsoft Copilot"),
+    ("copilot", "GitHub Copilot"),
+    ("gemini", "Google Gemini"),
+    ("cursor", "Cursor"),
+    ("chatgpt", "ChatGPT"),
+    ("claude", "Claude"),
+]
+KNOWN_MODES = [
+    ("google sheets", "Google Sheets"),
+    ("google slides", "Google Slides"),
+    ("google docs", "Google Docs"),
+    ("gmail", "Gmail"),
+    ("vs code", "VS Code"),
+    ("marp", "MARP"),
+]
+
+# -------------------------------------------------------------------------------------
+# Generated use cases (job directories)
+# -------------------------------------------------------------------------------------
+
+def read_partial_result(path: str) -> Optional[str]:
+    """Read a job artifact, unwrapping the `{"content": ...}` envelope."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if isinstance(data, dict) and "content" in data and len(data) == 1:
+        return data["content"]
+    return json.dumps(data)
+
+def join_list(value) -> str:
+    """Join list values with commas; pass strings through."""
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    return value or ""
+
+def load_generated_use_case(job_dir: str, root: str = REPO_ROOT) -> Optional[dict]:
+    """Build an index record from a generator job directory."""
+    content = read_partial_result(os.path.join(job_dir, "final_use_case.json"))
+    if not content:
+        return None
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+
+    meta = data.get("metadata") or {}
+    step_lines = []
+    for number, step in enumerate(data.get("steps") or [], 1):
+        step_lines.append(f"Step {number}: {step.get('step_title', '')}")
+        step_lines.append(step.get("step_instructions") or "")
+        for sub_step in step.get("sub_steps") or []:
+            step_lines.append(sub_step.get("title") or "")
+            step_lines.append(sub_step.get("description") or "")
+            step_lines.extend(sub_step.get("bullets") or [])
+        step_lines.append(step.get("advice") or "")
+
+    citation_lines = []
+    for resource in data.get("resources") or []:
+        if isinstance(resource, dict):
+            citation_lines.append(f"{resource.get('title') or ''} {resource.get('url', '')}")
+        else:
+            citation_lines.append(str(resource))
+    citations = data.get("citations") or []
+    for citation in citations:
+        citation_lines.append(f"{citation.get('title') or ''} {citation.get('url', '')}")
+
+    return {
+        "path": os.path.relpath(job_dir, root),
+        "source": "generated",
+        "title": data.get("title") or meta.get("title") or "",
+        "family": meta.get("family") or "",
+        "tool": meta.get("tool") or meta.get("ai_tool") or "",
+        "mode": meta.get("mode") or "",
+        "department": join_list(meta.get("department")),
+        "role": join_list(meta.get("role")),
+        "model": meta.get("model") or "",
+        "coding_language": meta.get("coding_language") or "",
+        "time_to_complete": data.get("time_to_complete") or "",
+        "description": data.get("description") or "",
+        "objective": meta.get("objective") or "",
+        "step_titles": [step.get("step_title") or "" for step in data.get("steps") or []],
+        "steps_text": "\n".join(line for line in step_lines if line),
+        "citations_text": "\n".join(line.strip() for line in citation_lines if line.strip()),
+        "step_count": len(data.get("steps") or []),
+        "citation_count": len(citations) + len(data.get("resources") or []),
+    }
+
+# -------------------------------------------------------------------------------------
+# Hand-written use cases (Markdown)
+# -------------------------------------------------------------------------------------
+
+H1_RE = re.compile(r"^#\s+(.+?)\s*$")
+H2_RE = re.compile(r"^##\s+(.+?)\s*:?\s*$")
+TIME_RE = re.compile(r"^\*\*(?:estimated\s+)?time to complete[^*]*?\*\*\s*:?\s*(.+?)\s*$", re.IGNORECASE)
+DESCRIPTION_RE = re.compile(r"^\*\*description:?\*\*\s*:?\s*(.+)$", re.IGNORECASE)
+STEP_RE = re.compile(
+    r"^(?:###\s+(?:step\s+)?(\d+)\s*[.:]?\s*(.+?)|\*\*(?:step\s+)?(\d+)\s*[.:]\s*(.+?)\*\*)\s*$",
+    re.IGNORECASE,
+)
+LINK_RE = re.compile(r"\[([^\]]*)\]\((https?://[^)\s]+)\)")
+BARE_URL_RE = re.compile(r"(?<![(\[])\bhttps?://[^\s)>\]]+")
+FENCE_RE = re.compile(r"^\s*(`{3,}|~{3,})\s*(\S*)")
+
+def infer_label(text: str, known: List[tuple]) -> str:
+    """Return the first known label whose keyword appears in the text."""
+    lowered = text.lower()
+    for keyword, label in known:
+        if keyword in lowered:
+            return label
+    return ""
+
+def parse_markdown_use_case(text: str) -> Optional[dict]:
+    """
+    Extract use case fields from a hand-written Markdown file in one pass.
+
+    Returns None for Markdown that is not a use case (notes, scripts,
+    follow-along snippets, the blank template), i.e. files without a title
+    or without a steps section.
+    """
+    title = ""
+    time_to_complete = ""
+    description = ""
+    section = ""
+    in_fence = ""
+    sections: Dict[str, List[str]] = {}
+    step_titles: List[str] = []
+    preamble: List[str] = []
+
+    for line in text.splitlines():
+        fence = FENCE_RE.match(line)
+        if fence:
+            marker, info = fence.group(1), fence.group(2)
+            if not in_fence:
+                in_fence = marker
+            elif marker[0] == in_fence[0] and len(marker) >= len(in_fence) and not info:
+                # Only a bare fence of the same kind closes the block (CommonMark)
+                in_fence = ""
+            sections.setdefault(section, []).append(line)
+            continue
+        stripped = line.strip()
+        if not in_fence:
+            if not title:
+                h1 = H1_RE.match(stripped)
+                if h1:
+                    title = h1.group(1).strip()
+                    continue
+            h2 = H2_RE.match(stripped)
+            if h2:
+                section = h2.group(1).strip().lower()
+                continue
+            if not time_to_complete:
+                time_match = TIME_RE.match(stripped)
+                if time_match:
+                    time_to_complete = time_match.group(1).strip()
+                    if time_to_complete.isdigit():
+                        time_to_complete += " minutes"
+                    continue
+            if not description:
+                description_match = DESCRIPTION_RE.match(stripped)
+                if description_match:
+                    description = description_match.group(1).strip()
+                    continue
+            if "step" in section:
+                step = STEP_RE.match(stripped)
+                if step:
+                    step_titles.append((step.group(2) or step.group(4)).strip().rstrip(".").strip("*"))
+        if title and not section:
+            preamble.append(line)
+        sections.setdefault(section, []).append(line)
+
+    if not title or title.startswith("[") or not any("step" in name for name in sections):
+        return None
+
+    if not description:
+        overview = next((lines for name, lines in sections.items() if "overview" in name), preamble)
+        description = first_paragraph(overview)
+
+    steps_text = "\n".join(
+        "\n".join(lines) for name, lines in sections.items() if "step" in name
+    ).strip()
+    citation_lines = []
+    for name, lines in sections.items():
+        if "resource" in name or "reference" in name:
+            block = "\n".join(lines)
+            for link_title, url in LINK_RE.findall(block):
+                citation_lines.append(f"{link_title} {url}".strip())
+            for url in BARE_URL_RE.findall(LINK_RE.sub("", block)):
+                citation_lines.append(url)
+
+    context = f"{title}\n{description}"
+    return {
+        "title": title,
+        "tool": infer_label(context, KNOWN_TOOLS),
+        "mode": infer_label(context, KNOWN_MODES),
+        "time_to_complete": time_to_complete,
+        "description": description,
+        "objective": "",
+        "step_titles": step_titles,
+        "steps_text": steps_text,
+        "citations_text": "\n".join(citation_lines),
+        "step_count": len(step_titles),
+        "citation_count": len(citation_lines),
+    }
+
+def first_paragraph(lines: List[str]) -> str:
+    """Return the first non-empty paragraph of plain text."""
+    paragraph: List[str] = []
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("<") or stripped.startswith(">"):
+            if paragraph:
+                break
+            continue
+        if stripped.startswith("**") and stripped.endswith("**") and not paragraph:
+            continue
+        paragraph.append(stripped)
+    return " ".join(paragraph)
+
+def load_markdown_use_case(path: str, family: str, root: str = REPO_ROOT) -> Optional[dict]:
+    """Build an index record from a hand-written Markdown file."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        fields = parse_markdown_use_case(f.read())
+    if not fields:
+        return None
+    fields.update({
+        "path": os.path.relpath(path, root),
+        "source": "markdown",
+        "family": family,
+        "department": "",
+        "role": "",
+        "model": "",
+        "coding_language": "",
+    })
+    return fields
+
+# -------------------------------------------------------------------------------------
+# Library discovery
+# -------------------------------------------------------------------------------------
+
+def iter_library_sources(root: str = REPO_ROOT) -> Iterator[tuple]:
+    """
+    Yield (kind, path, family) for every candidate use case in the library.
+
+    `kind` is "generated" for job directories and "markdown" for
+    hand-written files; `family` is only set for hand-written files.
+    """
+    for relative in GENERATED_DIRS:
+        base = os.path.join(root, relative)
+        if not os.path.isdir(base):
+            continue
+        for entry in sorted(os.listdir(base)):
+            job_dir = os.path.join(base, entry)
+            if os.path.isfile(os.path.join(job_dir, "final_use_case.json")):
+                yield "generated", job_dir, None
+
+    for relative, family in HAND_WRITTEN_DIRS.items():
+        base = os.path.join(root, relative)
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith(".md"):
+                    yield "markdown", os.path.join(dirpath, filename), family
+
+def load_use_case(kind: str, path: str, family: Optional[str], root: str = REPO_ROOT) -> Optional[dict]:
+    """Load one library source into an index record."""
+    if kind == "generated":
+        return load_generated_use_case(path, root)
+    return load_markdown_use_case(path, family or "", root)
+
+def iter_library_records(root: str = REPO_ROOT) -> Iterator[dict]:
+    """Yield an index record for every use case in the library."""
+    for kind, path, family in iter_library_sources(root):
+        record = load_use_case(kind, path, family, root)
+        if record:
+            yield record
+
+# -------------------------------------------------------------------------------------
+# SQLite / FTS5 index
+# -------------------------------------------------------------------------------------
+
+RECORD_FIELDS = [
+    "path", "source", "title", "family", "tool", "mode", "department", "role", "model",
+    "coding_language", "time_to_complete", "description", "steps_text", "citations_text",
+    "step_count", "citation_count",
+]
+FTS_FIELDS = [
+    "title", "family", "tool", "mode", "department", "role", "description", "steps_text", "citations_text",
+]
+# bm25 column weights, in FTS_FIELDS order: matches in titles count most
+FTS_WEIGHTS = [10.0, 2.0, 4.0, 3.0, 1.0, 1.0, 3.0, 1.0, 0.5]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS use_cases (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    title TEXT NOT NULL,
+    family TEXT, tool TEXT, mode TEXT, department TEXT, role TEXT, model TEXT,
+    coding_language TEXT, time_to_complete TEXT, description TEXT,
+    steps_text TEXT, citations_text TEXT,
+    step_count INTEGER, citation_count INTEGER,
+    indexed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS use_cases_family ON use_cases(family COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS use_cases_tool ON use_cases(tool COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS use_cases_mode ON use_cases(mode COLLATE NOCASE);
+
+-- Per-source watermarks for incremental updates. Only the file a record is
+-- built from is tracked (never execution.log or other job artifacts).
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    family TEXT,
+    source_file TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS use_cases_fts USING fts5(
+    {", ".join(FTS_FIELDS)},
+    content='use_cases', content_rowid='id', tokenize='porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS use_cases_ai AFTER INSERT ON use_cases BEGIN
+    INSERT INTO use_cases_fts(rowid, {", ".join(FTS_FIELDS)})
+    VALUES (new.id, {", ".join("new." + f for f in FTS_FIELDS)});
+END;
+CREATE TRIGGER IF NOT EXISTS use_cases_ad AFTER DELETE ON use_cases BEGIN
+    INSERT INTO use_cases_fts(use_cases_fts, rowid, {", ".join(FTS_FIELDS)})
+    VALUES ('delete', old.id, {", ".join("old." + f for f in FTS_FIELDS)});
+END;
+CREATE TRIGGER IF NOT EXISTS use_cases_au AFTER UPDATE ON use_cases BEGIN
+    INSERT INTO use_cases_fts(use_cases_fts, rowid, {", ".join(FTS_FIELDS)})
+    VALUES ('delete', old.id, {", ".join("old." + f for f in FTS_FIELDS)});
+    INSERT INTO use_cases_fts(rowid, {", ".join(FTS_FIELDS)})
+    VALUES (new.id, {", ".join("new." + f for f in FTS_FIELDS)});
+END;
+"""
+
+def connect(db_path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
+    """Open (and if needed create) the library index database."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def upsert_record(conn: sqlite3.Connection, record: dict, indexed_at: Optional[str] = None):
+    """Insert or replace the index row for one use case (keyed by path)."""
+    values = [record.get(field, "") for field in RECORD_FIELDS] + [indexed_at or datetime.now().isoformat()]
+    conn.execute(
+        f"INSERT INTO use_cases ({', '.join(RECORD_FIELDS)}, indexed_at) "
+        f"VALUES ({', '.join('?' * (len(RECORD_FIELDS) + 1))}) "
+        f"ON CONFLICT(path) DO UPDATE SET "
+        + ", ".join(f"{field}=excluded.{field}" for field in RECORD_FIELDS[1:] + ["indexed_at"]),
+        values,
+    )
+
+def build_index(root: str = REPO_ROOT, db_path: str = DEFAULT_DB_PATH) -> int:
+    """Rebuild the whole index from scratch. Returns the number of use cases indexed."""
+    conn = connect(db_path)
+    with conn:
+        conn.execute("DELETE FROM use_cases")
+        conn.execute("DELETE FROM sources")
+    update_index(root, conn=conn)
+    count = conn.execute("SELECT COUNT(*) FROM use_cases").fetchone()[0]
+    conn.close()
+    return count
+
+# -------------------------------------------------------------------------------------
+# Incremental updates
+# -------------------------------------------------------------------------------------
+
+def source_file_for(kind: str, path: str) -> str:
+    """Return the single file an index record is built from."""
+    if kind == "generated":
+        return os.path.join(path, "final_use_case.json")
+    return path
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def update_index(root: str = REPO_ROOT, db_path: str = DEFAULT_DB_PATH,
+                 conn: Optional[sqlite3.Connection] = None) -> Dict[str, int]:
+    """
+    Bring the index up to date with the library, touching only what changed.
+
+    A source is skipped without being read when its mtime and size match the
+    stored watermark. When they differ, the content hash decides whether it
+    is re-ingested (a touch without edits only refreshes the watermark).
+    Sources that disappeared are removed from the index.
+
+    Returns counts of added, changed, deleted and unchanged sources.
+    """
+    own_conn = conn is None
+    conn = conn or connect(db_path)
+    counts = {"added": 0, "changed": 0, "deleted": 0, "unchanged": 0}
+    known = {
+        row["path"]: row
+        for row in conn.execute("SELECT path, mtime_ns, size, sha256 FROM sources")
+    }
+    seen = set()
+    indexed_at = datetime.now().isoformat()
+
+    with conn:
+        for kind, path, family in iter_library_sources(root):
+            relative = os.path.relpath(path, root)
+            source_file = source_file_for(kind, path)
+            try:
+                stat = os.stat(source_file)
+            except FileNotFoundError:
+                continue
+            seen.add(relative)
+            previous = known.get(relative)
+            if previous and previous["mtime_ns"] == stat.st_mtime_ns and previous["size"] == stat.st_size:
+                counts["unchanged"] += 1
+                continue
+
+            sha256 = file_sha256(source_file)
+            if previous and previous["sha256"] == sha256:
+                counts["unchanged"] += 1
+            else:
+                record = load_use_case(kind, path, family, root)
+                if record:
+                    upsert_record(conn, record, indexed_at)
+                else:
+                    conn.execute("DELETE FROM use_cases WHERE path = ?", (relative,))
+                counts["changed" if previous else "added"] += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO sources (path, kind, family, source_file, mtime_ns, size, sha256) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (relative, kind, family, os.path.relpath(source_file, root),
+                 stat.st_mtime_ns, stat.st_size, sha256),
+            )
+
+        for relative in set(known) - seen:
+            conn.execute("DELETE FROM use_cases WHERE path = ?", (relative,))
+            conn.execute("DELETE FROM sources WHERE path = ?", (relative,))
+            counts["deleted"] += 1
+
+        if counts["added"] or counts["changed"] or counts["deleted"]:
+            conn.execute("INSERT INTO use_cases_fts(use_cases_fts) VALUES ('optimize')")
+
+    if own_conn:
+        conn.close()
+    return counts
+
+# -------------------------------------------------------------------------------------
+# Watch mode
+# -------------------------------------------------------------------------------------
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+INOTIFY_EVENT = struct.Struct("iIII")
+
+class InotifyWatcher:
+    """
+    Minimal inotify binding via ctypes (Linux only, no extra dependency).
+
+    Watches directories recursively and reports (directory, name, mask)
+    events; directories created later are watched as they appear.
+    """
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches: Dict[int, str] = {}
+
+    def add_tree(self, path: str):
+        """Watch a directory and every directory below it."""
+        for dirpath, dirnames, _ in os.walk(path):
+            self.add_watch(dirpath)
+
+    def add_watch(self, path: str):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self.watches[wd] = path
+
+    def read_events(self, timeout: Optional[float]) -> List[tuple]:
+        """Wait up to `timeout` seconds and return pending events."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            wd, mask, _cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", "replace")
+            offset += length
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_DELETE_SELF:
+                self.watches.pop(wd, None)
+                continue
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_tree(os.path.join(directory, name))
+            events.append((directory, name, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+def is_relevant_event(name: str, mask: int) -> bool:
+    """Only use case sources and directory changes trigger a re-index (never logs)."""
+    if mask & IN_ISDIR:
+        return True
+    return name == "final_use_case.json" or name.endswith(".md")
+
+def watch_index(root: str = REPO_ROOT, db_path: str = DEFAULT_DB_PATH,
+                debounce: float = 0.25, poll_interval: float = 1.0):
+    """
+    Keep the index current as the library changes, until interrupted.
+
+    Uses inotify on Linux; elsewhere falls back to polling the watermarks
+    every `poll_interval` seconds, which is cheap because unchanged files
+    are never read.
+    """
+    conn = connect(db_path)
+    print(f"Initial update: {update_index(root, conn=conn)}")
+    watch_roots = [os.path.join(root, d) for d in GENERATED_DIRS + list(HAND_WRITTEN_DIRS)]
+
+    try:
+        watcher = InotifyWatcher()
+    except (OSError, AttributeError):
+        watcher = None
+
+    try:
+        if watcher is None:
+            print(f"Polling for changes every {poll_interval:.1f}s (Ctrl+C to stop)")
+            while True:
+                time.sleep(poll_interval)
+                counts = update_index(root, conn=conn)
+                if counts["added"] or counts["changed"] or counts["deleted"]:
+                    print(f"{datetime.now():%H:%M:%S} updated: {counts}")
+
+        for path in watch_roots:
+            if os.path.isdir(path):
+                watcher.add_tree(path)
+            elif os.path.isdir(os.path.dirname(path)):
+                # e.g. python-generator-drafts/use_cases before the first run
+                watcher.add_watch(os.path.dirname(path))
+        print(f"Watching {len(watcher.watches)} directories (Ctrl+C to stop)")
+        while True:
+            events = watcher.read_events(None)
+            if not any(is_relevant_event(name, mask) for _, name, mask in events):
+                continue
+            # Let a burst of writes (one generator run) settle into one update
+            while watcher.read_events(debounce):
+                pass
+            counts = update_index(root, conn=conn)
+            print(f"{datetime.now():%H:%M:%S} updated: {counts}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher:
+            watcher.close()
+        conn.close()
+
+# -------------------------------------------------------------------------------------
+# Query API
+# -------------------------------------------------------------------------------------
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def to_fts_query(text: str) -> str:
+    """
+    Turn free text into a safe FTS5 query: every word must match, and the
+    last word also matches as a prefix (so "spread" finds "spreadsheet").
+    """
+    tokens = TOKEN_RE.findall(text)
+    if not tokens:
+        return ""
+    quoted = [f'"{token}"' for token in tokens]
+    quoted[-1] += "*"
+    return " AND ".join(quoted)
+
+def search(conn: sqlite3.Connection, query: str = "", family: Optional[str] = None,
+           tool: Optional[str] = None, mode: Optional[str] = None, source: Optional[str] = None,
+           department: Optional[str] = None, role: Optional[str] = None,
+           limit: int = 20, raw: bool = False) -> List[dict]:
+    """
+    Search the library index.
+
+    `query` is free text (or FTS5 syntax when `raw` is True). The other
+    arguments are case-insensitive filters on the structured columns;
+    department and role match any entry in their comma-separated lists.
+    Results are ordered by bm25 relevance, or by title without a query.
+    """
+    conditions = []
+    params: List = []
+    for column, value in (("family", family), ("tool", tool), ("mode", mode), ("source", source)):
+        if value:
+            conditions.append(f"u.{column} = ? COLLATE NOCASE")
+            params.append(value)
+    for column, value in (("department", department), ("role", role)):
+        if value:
+            conditions.append(f"instr(lower(u.{column}), lower(?)) > 0")
+            params.append(value)
+
+    columns = "u.id, u.path, u.source, u.title, u.family, u.tool, u.mode, u.department, u.role, " \
+              "u.time_to_complete, u.step_count, u.citation_count"
+    match = query if raw else to_fts_query(query)
+    if match:
+        weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+        sql = (
+            f"SELECT {columns}, bm25(use_cases_fts, {weights}) AS rank, "
+            f"snippet(use_cases_fts, -1, '[', ']', '...', 12) AS snippet "
+            f"FROM use_cases_fts JOIN use_cases u ON u.id = use_cases_fts.rowid "
+            f"WHERE use_cases_fts MATCH ?"
+        )
+        params.insert(0, match)
+        if conditions:
+            sql += " AND " + " AND ".join(conditions)
+        sql += " ORDER BY rank LIMIT ?"
+    else:
+        sql = f"SELECT {columns}, 0.0 AS rank, '' AS snippet FROM use_cases u"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY u.title COLLATE NOCASE LIMIT ?"
+    params.append(limit)
+    return [dict(row) for row in conn.execute(sql, params)]
+
+def stats(conn: sqlite3.Connection) -> dict:
+    """Summarize the index: totals and counts per source, family and tool."""
+    def grouped(column: str) -> Dict[str, int]:
+        rows = conn.execute(
+            f"SELECT COALESCE(NULLIF({column}, ''), '(none)') AS k, COUNT(*) AS n "
+            f"FROM use_cases GROUP BY k ORDER BY n DESC"
+        )
+        return {row["k"]: row["n"] for row in rows}
+
+    return {
+        "use_cases": conn.execute("SELECT COUNT(*) FROM use_cases").fetchone()[0],
+        "by_source": grouped("source"),
+        "by_family": grouped("family"),
+        "by_tool": grouped("tool"),
+        "by_mode": grouped("mode"),
+    }
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Index and search the use case library.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Index database path")
+    parser.add_argument("--root", default=REPO_ROOT, help="Library (repository) root")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("build", help="Rebuild the index from scratch")
+    subparsers.add_parser("update", help="Re-index only added, changed or deleted use cases")
+    watch_parser = subparsers.add_parser("watch", help="Keep the index current as files change")
+    watch_parser.add_argument("--debounce", type=float, default=0.25, help="Seconds to let writes settle")
+
+    search_parser = subparsers.add_parser("search", help="Search the index")
+    search_parser.add_argument("query", nargs="?", default="", help="Free-text query")
+    search_parser.add_argument("--family")
+    search_parser.add_argument("--tool")
+    search_parser.add_argument("--mode")
+    search_parser.add_argument("--source", choices=["generated", "markdown"])
+    search_parser.add_argument("--department")
+    search_parser.add_argument("--role")
+    search_parser.add_argument("--limit", type=int, default=20)
+    search_parser.add_argument("--raw", action="store_true", help="Treat the query as FTS5 syntax")
+    search_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    subparsers.add_parser("stats", help="Show index statistics")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build_index(args.root, args.db)
+        print(f"Indexed {count} use cases into {args.db} in {time.perf_counter() - start:.2f}s")
+        return 0
+    if args.command == "update":
+        start = time.perf_counter()
+        counts = update_index(args.root, args.db)
+        print(f"Updated {args.db} in {time.perf_counter() - start:.3f}s: {counts}")
+        return 0
+    if args.command == "watch":
+        watch_index(args.root, args.db, debounce=args.debounce)
+        return 0
+
+    conn = connect(args.db)
+    if args.command == "stats":
+        print(json.dumps(stats(conn), indent=2))
+        return 0
+
+    start = time.perf_counter()
+    try:
+        results = search(
+            conn, args.query, family=args.family, tool=args.tool, mode=args.mode,
+            source=args.source, department=args.department, role=args.role,
+            limit=args.limit, raw=args.raw,
+        )
+    except sqlite3.OperationalError as e:
+        print(f"Invalid query: {e}", file=sys.stderr)
+        return 2
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    for result in results:
+        labels = " / ".join(v for v in (result["family"], result["tool"], result["mode"]) if v)
+        print(f"{result['title']}  [{labels}]")
+        print(f"    {result['path']}")
+        if result["snippet"]:
+            print(f"    {' '.join(result['snippet'].split())}")
+    print(f"{len(results)} results in {elapsed_ms:.1f} ms", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
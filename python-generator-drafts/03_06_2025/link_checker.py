@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Library-Wide Link Health Checker
+
+Resources and citations rot: documentation moves, blogs disappear. This
+checks every link in the library in one pass and reports dead and
+redirected links by use case.
+
+Design:
+- Links are collected from every generated job (resources and citations of
+  `final_use_case.json`, plus any other link in `use_case.md`) and every
+  hand-written Markdown use case, the sources library_index.py indexes.
+  Packed jobs (artifact_store.py) are not read; unpack them first.
+- Links are deduplicated across the library, ignoring #fragments, so a
+  documentation page cited by 40 use cases is requested once.
+- Links are queued per host, and each host gets `per_host` workers (aiohttp)
+  that take turns on a shared limit of `concurrency` requests in flight.
+  A host with many links or a long delay only holds up its own queue, never
+  a worker that could check another host. Each check sends a HEAD request,
+  following redirects. When the server refuses HEAD or fails it, a GET for
+  the first byte only (`Range: bytes=0-0`) decides instead.
+- Politeness: at most `per_host` requests to one host at a time, and at
+  least `host_delay` seconds between the starts of requests to that host.
+- Results are cached in `library_index.db` with the time of the check,
+  each stored as soon as it arrives, so an interrupted run keeps its work.
+  A result is reused until it is older than the TTL: `ttl_days` for links
+  that answered, and `error_ttl_hours` for timeouts, 5xx and rate limiting,
+  which are usually temporary.
+- Outcomes: ok, redirected (answered from another URL), broken (4xx, or the
+  host does not resolve), error (5xx, timeout, connection failure) and
+  rate_limited (429).
+
+Usage:
+    python link_checker.py check [LIBRARY_DIR_OR_JOB_DIR_OR_MD_FILE ...] [--concurrency 32]
+                                 [--per-host 2] [--host-delay 0.5] [--ttl-days 7] [--json]
+    python link_checker.py report [--include-redirects] [--json]   # from the cache, no requests
+    python link_checker.py stats
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urldefrag, urlsplit
+
+import library_index
+
+REPO_ROOT = library_index.REPO_ROOT
+DEFAULT_DB_PATH = library_index.DEFAULT_DB_PATH
+DEFAULT_CONCURRENCY = 32
+DEFAULT_PER_HOST = 2
+DEFAULT_HOST_DELAY = 0.5
+DEFAULT_TIMEOUT = 15.0
+DEFAULT_TTL_DAYS = 7.0
+DEFAULT_ERROR_TTL_HOURS = 6.0
+USER_AGENT = "use-case-library-link-checker/1.0"
+
+# HEAD answers that don't say whether the page exists; a ranged GET decides
+HEAD_UNRELIABLE = {400, 403, 404, 405, 406, 429, 500, 501, 502, 503}
+# Outcomes that may change soon, cached for error_ttl_hours only
+TRANSIENT_OUTCOMES = {"error", "rate_limited"}
+PROBLEM_OUTCOMES = ("broken", "error", "rate_limited")
+
+LINK_RE = library_index.LINK_RE
+BARE_URL_RE = library_index.BARE_URL_RE
+TRAILING_PUNCTUATION = ".,;:!?'\""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS link_checks (
+    url TEXT PRIMARY KEY,
+    outcome TEXT NOT NULL,
+    status INTEGER,
+    final_url TEXT,
+    method TEXT,
+    error TEXT,
+    checked_at REAL NOT NULL
+);
+"""
+
+def connect(db_path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
+    """Open the cache database, creating the link table if needed."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+# -------------------------------------------------------------------------------------
+# Link extraction
+# -------------------------------------------------------------------------------------
+
+def normalize_url(url: str) -> Optional[str]:
+    """The URL to check: trailing punctuation and the #fragment removed; None if not http(s)."""
+    url = urldefrag(url.strip().rstrip(TRAILING_PUNCTUATION))[0]
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return url
+
+def markdown_links(text: str) -> Iterator[str]:
+    """Every [text](url) link and bare URL in Markdown."""
+    for match in LINK_RE.finditer(text):
+        yield match.group(2)
+    for match in BARE_URL_RE.finditer(text):
+        yield match.group(0)
+
+def job_links(job_dir: str) -> Dict[str, str]:
+    """{url: where} for a generated job: resources, citations, then other links in use_case.md."""
+    links: Dict[str, str] = {}
+
+    def add(url, where: str):
+        url = normalize_url(url) if isinstance(url, str) else None
+        if url and url not in links:
+            links[url] = where
+
+    content = library_index.read_partial_result(os.path.join(job_dir, "final_use_case.json"))
+    try:
+        data = json.loads(content) if content else {}
+    except json.JSONDecodeError:
+        data = {}
+    for key, where in (("resources", "resource"), ("citations", "citation")):
+        for entry in data.get(key) or []:
+            add(entry.get("url") if isinstance(entry, dict) else entry, where)
+    markdown_path = os.path.join(job_dir, "use_case.md")
+    if os.path.isfile(markdown_path):
+        with open(markdown_path, "r", encoding="utf-8", errors="replace") as f:
+            for url in markdown_links(f.read()):
+                add(url, "markdown")
+    return links
+
+def file_links(path: str) -> Dict[str, str]:
+    """{url: "markdown"} for a hand-written Markdown use case."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    links: Dict[str, str] = {}
+    for url in markdown_links(text):
+        url = normalize_url(url)
+        if url and url not in links:
+            links[url] = "markdown"
+    return links
+
+def iter_sources(paths: Optional[List[str]] = None) -> Iterator[tuple]:
+    """
+    Yield (kind, path, family) like library_index.iter_library_sources, for
+    the whole library or for the given job directories, library directories
+    and Markdown files.
+    """
+    if not paths:
+        yield from library_index.iter_library_sources()
+        return
+    from markdown_render import find_job_dirs
+    for path in paths:
+        if os.path.isfile(path):
+            if path.endswith(".md"):
+                yield "markdown", path, None
+            continue
+        job_dirs = list(find_job_dirs([path]))
+        for job_dir in job_dirs:
+            yield "generated", job_dir, None
+        if job_dirs:
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith(".md"):
+                    yield "markdown", os.path.join(dirpath, filename), None
+
+def collect_links(paths: Optional[List[str]] = None) -> List[dict]:
+    """One record per use case: its path, title and {url: where}."""
+    use_cases = []
+    for kind, path, family in iter_sources(paths):
+        links = job_links(path) if kind == "generated" else file_links(path)
+        if not links:
+            continue
+        record = library_index.load_use_case(kind, path, family or "")
+        use_cases.append({
+            "path": os.path.relpath(path, REPO_ROOT),
+            "title": (record or {}).get("title") or os.path.basename(path),
+            "links": links,
+        })
+    return use_cases
+
+# -------------------------------------------------------------------------------------
+# Checking
+# -------------------------------------------------------------------------------------
+
+def url_host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+class HostLimiter:
+    """
+    Per-host politeness: `per_host` concurrent requests, `delay` seconds
+    between starts; and at most `concurrency` requests in flight overall.
+    """
+
+    def __init__(self, per_host: int, delay: float, concurrency: int = DEFAULT_CONCURRENCY):
+        import asyncio
+        self.per_host = max(per_host, 1)
+        self.delay = delay
+        self.in_flight = asyncio.Semaphore(max(concurrency, 1))
+        self.hosts: Dict[str, dict] = {}
+
+    def slot(self, url: str) -> "HostSlot":
+        import asyncio
+        host = url_host(url)
+        if host not in self.hosts:
+            self.hosts[host] = {"semaphore": asyncio.Semaphore(self.per_host), "next_start": 0.0}
+        return HostSlot(self.hosts[host], self.delay, self.in_flight)
+
+class HostSlot:
+    def __init__(self, state: dict, delay: float, in_flight):
+        self.state = state
+        self.delay = delay
+        self.in_flight = in_flight
+
+    async def __aenter__(self):
+        import asyncio
+        await self.state["semaphore"].acquire()
+        now = time.monotonic()
+        start = max(now, self.state["next_start"])
+        self.state["next_start"] = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+        # The shared limit is taken last, so waiting out a host's delay holds no slot
+        await self.in_flight.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight.release()
+        self.state["semaphore"].release()
+        return False
+
+def classify(status: Optional[int], url: str, final_url: Optional[str]) -> str:
+    """Outcome of a check from the final HTTP status (None when no response arrived)."""
+    if status is None:
+        return "error"
+    if status == 429:
+        return "rate_limited"
+    if status >= 500:
+        return "error"
+    if status >= 400:
+        return "broken"
+    if final_url and final_url.rstrip("/") != url.rstrip("/"):
+        return "redirected"
+    return "ok"
+
+async def request(session, method: str, url: str) -> dict:
+    """One request, following redirects; the status, final URL or error."""
+    import asyncio
+    import socket
+    import aiohttp
+    headers = {"Range": "bytes=0-0"} if method == "GET" else {}
+    result = {"status": None, "final_url": None, "method": method, "error": None, "host_gone": False}
+    try:
+        async with session.request(method, url, allow_redirects=True, headers=headers) as response:
+            result.update(status=response.status, final_url=str(response.url))
+    except aiohttp.ClientConnectorError as e:
+        # A host that no longer resolves is dead; refused connections may be temporary
+        os_error = getattr(e, "os_error", None)
+        result.update(error=f"{type(e).__name__}: {e}", host_gone=isinstance(os_error, socket.gaierror)
+                      and os_error.errno in (socket.EAI_NONAME, getattr(socket, "EAI_NODATA", None)))
+    except asyncio.TimeoutError:
+        result["error"] = "timeout"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+async def check_url(session, limiter: HostLimiter, url: str) -> dict:
+    """HEAD, then a ranged GET when HEAD failed or is not conclusive."""
+    async with limiter.slot(url):
+        result = await request(session, "HEAD", url)
+    if not result["host_gone"] and (result["status"] is None or result["status"] in HEAD_UNRELIABLE):
+        async with limiter.slot(url):
+            result = await request(session, "GET", url)
+    outcome = "broken" if result["host_gone"] else classify(result["status"], url, result["final_url"])
+    return {
+        "url": url,
+        "outcome": outcome,
+        "status": result["status"],
+        "final_url": result["final_url"],
+        "method": result["method"],
+        "error": result["error"],
+        "checked_at": time.time(),
+    }
+
+async def check_urls(urls: List[str], concurrency: int = DEFAULT_CONCURRENCY, per_host: int = DEFAULT_PER_HOST,
+                     host_delay: float = DEFAULT_HOST_DELAY, timeout: float = DEFAULT_TIMEOUT,
+                     on_result=None) -> List[dict]:
+    """
+    Check `urls`, at most `concurrency` requests at a time, from one queue per
+    host; `on_result` is called with each result as it arrives.
+    """
+    import asyncio
+    import aiohttp
+    queues: Dict[str, deque] = {}
+    for url in urls:
+        queues.setdefault(url_host(url), deque()).append(url)
+    limiter = HostLimiter(per_host, host_delay, concurrency)
+    results: List[dict] = []
+
+    async def worker(session, queue: deque):
+        while queue:
+            result = await check_url(session, limiter, queue.popleft())
+            results.append(result)
+            if on_result:
+                on_result(result)
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=max(per_host, 1), ttl_dns_cache=300)
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=aiohttp.ClientTimeout(total=timeout), headers={"User-Agent": USER_AGENT},
+    ) as session:
+        await asyncio.gather(*(
+            worker(session, queue) for queue in queues.values() for _ in range(min(limiter.per_host, len(queue)))
+        ))
+    return results
+
+# -------------------------------------------------------------------------------------
+# Cache
+# -------------------------------------------------------------------------------------
+
+def cached_results(conn: sqlite3.Connection, urls: List[str], ttl_days: float = DEFAULT_TTL_DAYS,
+                   error_ttl_hours: float = DEFAULT_ERROR_TTL_HOURS) -> Dict[str, dict]:
+    """Cached results for `urls` that are still within their TTL."""
+    now = time.time()
+    fresh: Dict[str, dict] = {}
+    wanted = set(urls)
+    for row in conn.execute("SELECT * FROM link_checks"):
+        if row["url"] not in wanted:
+            continue
+        ttl = error_ttl_hours * 3600 if row["outcome"] in TRANSIENT_OUTCOMES else ttl_days * 86400
+        if now - row["checked_at"] <= ttl:
+            fresh[row["url"]] = dict(row)
+    return fresh
+
+def store_results(conn: sqlite3.Connection, results: List[dict]):
+    """Insert or replace results in the cache and commit."""
+    conn.executemany(
+        "INSERT OR REPLACE INTO link_checks (url, outcome, status, final_url, method, error, checked_at) "
+        "VALUES (:url, :outcome, :status, :final_url, :method, :error, :checked_at)",
+        results,
+    )
+    conn.commit()
+
+def all_cached(conn: sqlite3.Connection) -> Dict[str, dict]:
+    return {row["url"]: dict(row) for row in conn.execute("SELECT * FROM link_checks")}
+
+# -------------------------------------------------------------------------------------
+# Reports
+# -------------------------------------------------------------------------------------
+
+def build_report(use_cases: List[dict], results: Dict[str, dict], include_redirects: bool = True) -> dict:
+    """Problem links by use case, plus totals over the unique links."""
+    wanted = PROBLEM_OUTCOMES + (("redirected",) if include_redirects else ())
+    by_use_case = []
+    for use_case in use_cases:
+        problems = []
+        for url, where in use_case["links"].items():
+            result = results.get(url)
+            if result and result["outcome"] in wanted:
+                problems.append(dict(result, where=where))
+        if problems:
+            problems.sort(key=lambda p: (wanted.index(p["outcome"]), p["url"]))
+            by_use_case.append({"path": use_case["path"], "title": use_case["title"], "links": problems})
+    unique = {url for use_case in use_cases for url in use_case["links"]}
+    totals: Dict[str, int] = {}
+    for url in unique:
+        outcome = results[url]["outcome"] if url in results else "unchecked"
+        totals[outcome] = totals.get(outcome, 0) + 1
+    return {
+        "use_cases": len(use_cases),
+        "links": sum(len(use_case["links"]) for use_case in use_cases),
+        "unique_links": len(unique),
+        "totals": totals,
+        "by_use_case": by_use_case,
+    }
+
+def format_report(report: dict) -> str:
+    lines = []
+    for use_case in report["by_use_case"]:
+        lines.append(f"{use_case['title']}  ({use_case['path']})")
+        for link in use_case["links"]:
+            status = link["status"] if link["status"] is not None else "-"
+            detail = f" -> {link['final_url']}" if link["outcome"] == "redirected" else \
+                (f"  [{link['error']}]" if link["error"] else "")
+            lines.append(f"  {link['outcome']:<12} {status:>4}  {link['where']:<9} {link['url']}{detail}")
+        lines.append("")
+    totals = "  ".join(f"{outcome} {count}" for outcome, count in sorted(report["totals"].items()))
+    lines.append(
+        f"{report['use_cases']} use cases, {report['links']} links, {report['unique_links']} unique: {totals}"
+    )
+    return "\n".join(lines)
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point. Returns 1 when broken links were found."""
+    parser = argparse.ArgumentParser(description="Check the health of every link in the use case library.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Cache database path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    check = subparsers.add_parser("check", help="Check links not checked within their TTL, then report")
+    check.add_argument("paths", nargs="*", help="Library or job directories, or Markdown files (default: the library)")
+    check.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Requests in flight")
+    check.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST, help="Requests in flight per host")
+    check.add_argument("--host-delay", type=float, default=DEFAULT_HOST_DELAY,
+                       help="Seconds between request starts to one host")
+    check.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Seconds per request")
+    check.add_argument("--ttl-days", type=float, default=DEFAULT_TTL_DAYS, help="Reuse results this recent")
+    check.add_argument("--error-ttl-hours", type=float, default=DEFAULT_ERROR_TTL_HOURS,
+                       help="Reuse timeouts, 5xx and rate limiting this recent")
+    check.add_argument("--include-redirects", action="store_true", help="List redirected links too")
+    check.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    report_parser = subparsers.add_parser("report", help="Report from cached results only (no requests)")
+    report_parser.add_argument("paths", nargs="*", help="Library or job directories, or Markdown files")
+    report_parser.add_argument("--include-redirects", action="store_true", help="List redirected links too")
+    report_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    subparsers.add_parser("stats", help="Count cached results by outcome")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    try:
+        if args.command == "stats":
+            for row in conn.execute("SELECT outcome, COUNT(*) AS n FROM link_checks GROUP BY outcome ORDER BY n DESC"):
+                print(f"{row['outcome']:<14}{row['n']:>8}")
+            return 0
+
+        use_cases = collect_links(args.paths)
+        urls = sorted({url for use_case in use_cases for url in use_case["links"]})
+        if args.command == "check":
+            import asyncio
+            cached = cached_results(conn, urls, args.ttl_days, args.error_ttl_hours)
+            to_check = [url for url in urls if url not in cached]
+            print(f"{len(urls)} unique links, {len(cached)} cached, checking {len(to_check)}", file=sys.stderr)
+            started = time.monotonic()
+            # Each result is stored as it arrives, so an interrupted run keeps what it checked
+            fresh = asyncio.run(check_urls(
+                to_check, args.concurrency, args.per_host, args.host_delay, args.timeout,
+                on_result=lambda result: store_results(conn, [result]),
+            )) if to_check else []
+            if to_check:
+                print(f"Checked {len(fresh)} links in {time.monotonic() - started:.1f} s", file=sys.stderr)
+            results = dict(cached, **{result["url"]: result for result in fresh})
+        else:
+            results = all_cached(conn)
+
+        report = build_report(use_cases, results, args.include_redirects)
+        print(json.dumps(report, indent=2) if args.json else format_report(report))
+        return 1 if report["totals"].get("broken") else 0
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Latency Report for Use Case Generator Runs
+
+Rebuilds per-step and per-API-call timings from the `execution.log` files that
+every job directory already contains, so optimization work can be prioritized
+from real data.
+
+What is measured:
+
+1. STEP TIMINGS
+   - A step starts at its own "Starting step N" line and ends at its
+     "Completed step N" line. Logs written before that line existed ran the
+     steps one after another, so there a step starts when the previous step
+     completes, or at its first "INITIATING STEP: N" call if that came earlier
+   - Steps can overlap: step 2 researches each question while step 1 is
+     still producing the others, so step times do not add up to the job time
+   - Each step is split into API time (time spent waiting on HTTP calls) and
+     local time (prompt building, parsing, logging, etc.)
+
+2. API CALL TIMINGS
+   - A call starts at its "INITIATING STEP" line and ends at the next
+     "HTTP Request" line for the same provider
+   - Step 2 fires its Perplexity calls in parallel. The log does not say which
+     response belongs to which question, so calls are paired first-in,
+     first-out. The step 2 wall time, the summed call time and the resulting
+     concurrency show how well the parallel questions overlap.
+
+3. CRITICAL PATH
+   - The steps are ordered by when they complete. Each step is charged
+     with the time from its own start, or from the previous step's
+     completion if that came later, to its completion. This is the job time
+     the step alone accounts for; the charged times of a job add up to its
+     total time, less any gaps between steps
+   - For each step, that time's share of total job time
+   - For step 2, the slowest call plus the tail after the last response
+     (combining and saving the research), which is what bounds the step
+
+Usage:
+    python log_report.py [JOB_DIR_OR_LIBRARY_DIR ...] [--json]
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+from datetime import datetime
+from typing import List, Optional, Dict
+
+# -------------------------------------------------------------------------------------
+# Log Parsing
+# -------------------------------------------------------------------------------------
+
+DEFAULT_LIBRARY_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "python-generator-use-cases",
+)
+
+LOG_LINE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (\w+) - (.*)$")
+INITIATING_RE = re.compile(r"INITIATING STEP: (\d+) - (.+)$")
+STARTING_RE = re.compile(r"^Starting step (\d+)")
+COMPLETED_RE = re.compile(r"^Completed step (\d+)")
+HTTP_RE = re.compile(r'HTTP Request: (\w+) (https?://([^/\s]+)\S*) "HTTP/[\d.]+ (\d+)')
+STARTED_RE = re.compile(r"^Started job: (\S+)")
+FINISHED_RE = re.compile(r"^Job completed: (\S+)")
+
+STEP_NAMES = {
+    1: "Identify research questions",
+    2: "Deep research",
+    3: "Refine use case",
+    4: "Final polish",
+    5: "Example solution",
+    6: "Visual suggestions",
+}
+
+def iter_log_records(log_path: str):
+    """
+    Yield (timestamp, level, message) tuples from an execution log.
+
+    Messages that span several lines (prompts, responses, and the leading
+    newline the generator puts in front of most messages) are joined so the
+    first non-empty line can be matched reliably.
+    """
+    current = None
+    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+        for raw_line in f:
+            line = raw_line.rstrip("\n")
+            match = LOG_LINE_RE.match(line)
+            if match:
+                if current:
+                    yield current[0], current[1], "\n".join(current[2])
+                timestamp = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S,%f")
+                current = (timestamp, match.group(2), [match.group(3)])
+            elif current:
+                current[2].append(line)
+    if current:
+        yield current[0], current[1], "\n".join(current[2])
+
+def first_line(message: str) -> str:
+    """Return the first non-empty line of a log message."""
+    for line in message.splitlines():
+        if line.strip():
+            return line.strip()
+    return ""
+
+def parse_execution_log(log_path: str) -> Optional[dict]:
+    """
+    Parse a single execution log into a timing record.
+
+    Returns None when the log has no timestamped records at all.
+    """
+    job_id = os.path.basename(os.path.dirname(os.path.abspath(log_path)))
+    job_start = None
+    job_end = None
+    last_timestamp = None
+    step_starts: Dict[int, datetime] = {}
+    first_calls: Dict[int, datetime] = {}
+    step_ends: Dict[int, datetime] = {}
+    open_calls: List[dict] = []
+    calls: List[dict] = []
+
+    for timestamp, level, message in iter_log_records(log_path):
+        last_timestamp = timestamp
+        if job_start is None:
+            job_start = timestamp
+        text = first_line(message)
+
+        started = STARTED_RE.match(text)
+        if started:
+            job_id = started.group(1)
+            job_start = timestamp
+            continue
+
+        starting = STARTING_RE.match(text)
+        if starting:
+            step_starts.setdefault(int(starting.group(1)), timestamp)
+            continue
+
+        initiating = INITIATING_RE.search(text)
+        if initiating:
+            first_calls.setdefault(int(initiating.group(1)), timestamp)
+            open_calls.append({
+                "step": int(initiating.group(1)),
+                "name": initiating.group(2).strip(),
+                "start": timestamp,
+            })
+            continue
+
+        http = HTTP_RE.search(text)
+        if http:
+            host = http.group(3)
+            # Pair the response with the oldest open call for this provider
+            index = next(
+                (i for i, call in enumerate(open_calls) if call_host(call) in (None, host)),
+                None,
+            )
+            if index is None:
+                continue
+            call = open_calls.pop(index)
+            call.update({
+                "end": timestamp,
+                "host": host,
+                "status": int(http.group(4)),
+                "seconds": (timestamp - call["start"]).total_seconds(),
+            })
+            calls.append(call)
+            continue
+
+        completed = COMPLETED_RE.match(text)
+        if completed:
+            step_ends[int(completed.group(1))] = timestamp
+            continue
+
+        if FINISHED_RE.match(text):
+            job_end = timestamp
+
+    if job_start is None:
+        return None
+
+    steps = []
+    starts: Dict[int, datetime] = {}
+    previous_end = job_start
+    for step_number in sorted(step_ends):
+        end = step_ends[step_number]
+        start = step_starts.get(step_number)
+        if start is None:
+            # Older logs: the step's first call if it began before the previous step completed
+            start = min(first_calls.get(step_number, previous_end), previous_end)
+        start = starts[step_number] = min(start, end)
+        step_calls = [c for c in calls if c["step"] == step_number]
+        wall = (end - start).total_seconds()
+        api_seconds = busy_seconds(step_calls)
+        step = {
+            "step": step_number,
+            "name": STEP_NAMES.get(step_number, f"Step {step_number}"),
+            "start_offset_seconds": (start - job_start).total_seconds(),
+            "seconds": wall,
+            "api_seconds": api_seconds,
+            "local_seconds": max(wall - api_seconds, 0.0),
+            "calls": len(step_calls),
+        }
+        if len(step_calls) > 1 and any(c["start"] < p["end"] for c, p in zip(step_calls[1:], step_calls)):
+            # Parallel calls: report how well they overlap
+            summed = sum(c["seconds"] for c in step_calls)
+            last_response = max(c["end"] for c in step_calls)
+            step["parallel"] = {
+                "summed_call_seconds": summed,
+                "concurrency": summed / api_seconds if api_seconds else 0.0,
+                "slowest_call_seconds": max(c["seconds"] for c in step_calls),
+                "dispatch_spread_seconds": (
+                    max(c["start"] for c in step_calls) - min(c["start"] for c in step_calls)
+                ).total_seconds(),
+                "tail_after_last_response_seconds": (end - last_response).total_seconds(),
+            }
+        steps.append(step)
+        previous_end = end
+
+    # Charge each step with the job time between the previous completion (or
+    # its own later start) and its completion
+    critical_end = job_start
+    for step in sorted(steps, key=lambda item: step_ends[item["step"]]):
+        end = step_ends[step["step"]]
+        start = max(starts[step["step"]], critical_end)
+        step["critical_seconds"] = max((end - start).total_seconds(), 0.0)
+        critical_end = max(critical_end, end)
+
+    total_end = job_end or last_timestamp
+    return {
+        "job_id": job_id,
+        "log_path": log_path,
+        "complete": job_end is not None,
+        "total_seconds": (total_end - job_start).total_seconds(),
+        "steps": steps,
+        "calls": [
+            {
+                "step": c["step"],
+                "name": c["name"],
+                "host": c["host"],
+                "status": c["status"],
+                "seconds": c["seconds"],
+            }
+            for c in calls
+        ],
+    }
+
+def call_host(call: dict) -> Optional[str]:
+    """Return the provider host a call is expected to hit, if known."""
+    if call["step"] == 2 and "Deep Research" in call["name"]:
+        return "api.perplexity.ai"
+    if call["step"] in (1, 3, 4, 5, 6):
+        return "api.openai.com"
+    return None
+
+def busy_seconds(calls: List[dict]) -> float:
+    """Total time covered by at least one in-flight call (union of intervals)."""
+    intervals = sorted((c["start"], c["end"]) for c in calls)
+    total = 0.0
+    current_start = current_end = None
+    for start, end in intervals:
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += (current_end - current_start).total_seconds()
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += (current_end - current_start).total_seconds()
+    return total
+
+def find_execution_logs(paths: List[str]) -> List[str]:
+    """Expand job directories and library directories into execution log paths."""
+    logs = []
+    for path in paths:
+        if os.path.isfile(path):
+            logs.append(path)
+            continue
+        direct = os.path.join(path, "execution.log")
+        if os.path.isfile(direct):
+            logs.append(direct)
+            continue
+        if os.path.isdir(path):
+            for entry in sorted(os.listdir(path)):
+                candidate = os.path.join(path, entry, "execution.log")
+                if os.path.isfile(candidate):
+                    logs.append(candidate)
+    return logs
+
+# -------------------------------------------------------------------------------------
+# Aggregation
+# -------------------------------------------------------------------------------------
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile (pct in 0-100) of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+def summarize(values: List[float]) -> dict:
+    """Return count, p50, p95, mean and max for a list of durations."""
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "max": max(values) if values else 0.0,
+    }
+
+def build_report(jobs: List[dict]) -> dict:
+    """Aggregate parsed jobs into per-step, per-call and critical-path statistics."""
+    complete_jobs = [j for j in jobs if j["steps"]]
+    step_numbers = sorted({s["step"] for j in complete_jobs for s in j["steps"]})
+    total_seconds = [j["total_seconds"] for j in complete_jobs]
+    mean_total = sum(total_seconds) / len(total_seconds) if total_seconds else 0.0
+
+    steps = []
+    for number in step_numbers:
+        records = [s for j in complete_jobs for s in j["steps"] if s["step"] == number]
+        wall = summarize([s["seconds"] for s in records])
+        step = {
+            "step": number,
+            "name": STEP_NAMES.get(number, f"Step {number}"),
+            "wall": wall,
+            "api": summarize([s["api_seconds"] for s in records]),
+            "local": summarize([s["local_seconds"] for s in records]),
+            "critical": summarize([s["critical_seconds"] for s in records]),
+        }
+        parallel = [s["parallel"] for s in records if "parallel" in s]
+        if parallel:
+            step["parallel"] = {
+                key: summarize([p[key] for p in parallel])
+                for key in parallel[0]
+            }
+        step["share_of_total"] = step["critical"]["mean"] / mean_total if mean_total else 0.0
+        steps.append(step)
+
+    calls_by_name: Dict[str, List[float]] = {}
+    for job in complete_jobs:
+        for call in job["calls"]:
+            key = f"{call['step']} - {call['name']} ({call['host']})"
+            calls_by_name.setdefault(key, []).append(call["seconds"])
+
+    critical_path = sorted(
+        (
+            {
+                "step": s["step"],
+                "name": s["name"],
+                "mean_seconds": s["critical"]["mean"],
+                "mean_wall_seconds": s["wall"]["mean"],
+                "share_of_total": s["share_of_total"],
+                "api_share": s["api"]["mean"] / s["wall"]["mean"] if s["wall"]["mean"] else 0.0,
+            }
+            for s in steps
+        ),
+        key=lambda item: item["mean_seconds"],
+        reverse=True,
+    )
+
+    return {
+        "jobs": len(jobs),
+        "complete_jobs": sum(1 for j in jobs if j["complete"]),
+        "total": summarize(total_seconds),
+        "steps": steps,
+        "calls": {name: summarize(values) for name, values in sorted(calls_by_name.items())},
+        "critical_path": critical_path,
+    }
+
+# -------------------------------------------------------------------------------------
+# Output
+# -------------------------------------------------------------------------------------
+
+def format_report(report: dict) -> str:
+    """Render the aggregated report as plain-text tables."""
+    lines = []
+    total = report["total"]
+    lines.append(
+        f"Jobs analysed: {report['jobs']} ({report['complete_jobs']} complete)  "
+        f"total p50 {total['p50']:.1f}s  p95 {total['p95']:.1f}s"
+    )
+    lines.append("")
+    lines.append(f"{'Step':<32}{'p50':>8}{'p95':>8}{'api p50':>9}{'local p50':>11}{'share':>8}")
+    lines.append("-" * 76)
+    for step in report["steps"]:
+        label = f"{step['step']}. {step['name']}"
+        lines.append(
+            f"{label:<32}{step['wall']['p50']:>7.1f}s{step['wall']['p95']:>7.1f}s"
+            f"{step['api']['p50']:>8.1f}s{step['local']['p50']:>10.1f}s"
+            f"{step['share_of_total'] * 100:>7.1f}%"
+        )
+
+    for step in report["steps"]:
+        parallel = step.get("parallel")
+        if not parallel:
+            continue
+        lines.append("")
+        lines.append(f"Step {step['step']} parallel overlap (p50 / p95):")
+        for key, stats in parallel.items():
+            unit = "x" if key == "concurrency" else "s"
+            lines.append(f"  {key.replace('_', ' '):<34}{stats['p50']:>7.2f}{unit} / {stats['p95']:.2f}{unit}")
+
+    lines.append("")
+    lines.append(f"{'API call':<58}{'n':>4}{'p50':>8}{'p95':>8}")
+    lines.append("-" * 78)
+    for name, stats in report["calls"].items():
+        lines.append(f"{name[:57]:<58}{stats['count']:>4}{stats['p50']:>7.1f}s{stats['p95']:>7.1f}s")
+
+    lines.append("")
+    lines.append("Critical path (by mean job time each step accounts for):")
+    for item in report["critical_path"]:
+        lines.append(
+            f"  {item['step']}. {item['name']:<30}{item['mean_seconds']:>7.1f}s "
+            f"({item['share_of_total'] * 100:.1f}% of job; step wall {item['mean_wall_seconds']:.1f}s, "
+            f"{item['api_share'] * 100:.0f}% API)"
+        )
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Build a latency report from execution logs.")
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=[DEFAULT_LIBRARY_DIR],
+        help="Job directories, execution logs, or directories containing job directories",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--per-job", action="store_true", help="Include per-job timings in JSON output")
+    args = parser.parse_args(argv)
+
+    logs = find_execution_logs(args.paths)
+    if not logs:
+        print("No execution.log files found.", file=sys.stderr)
+        return 1
+
+    jobs = [job for job in (parse_execution_log(path) for path in logs) if job]
+    report = build_report(jobs)
+
+    if args.json:
+        if args.per_job:
+            report["per_job"] = jobs
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
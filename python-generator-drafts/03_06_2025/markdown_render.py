@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Markdown Rendering Engine for Use Cases
+
+Turns the saved `final_use_case.json`, `example_solution.json` and
+`visual_suggestions.json` of a job into `use_case.md`.
+
+Design:
+- Templates are module-level format strings, compiled once, instead of
+  f-strings rebuilt inside nested loops
+- Output goes to a `write` callable (a list's append or a file's write), so
+  nothing is built by repeated string concatenation
+- Inputs are parsed exactly once; callers may pass dicts or JSON strings
+- Problems raise RenderError naming the job and field instead of silently
+  producing an empty document
+
+`render-all` re-renders every job directory in the library from its saved
+JSON, in parallel across processes, without any API calls.
+
+Incremental rendering: every use_case.md ends with a manifest comment holding
+the SHA-256 of each input file and a fingerprint of the renderer (version
+plus templates). A render pass skips outputs whose manifest still matches, so
+only files whose inputs or template changed are rewritten. Use --force to
+re-render regardless.
+
+Related use cases: when `related_use_cases.py build` has stored neighbour
+lists in the library index, each page gets a "Related Use Cases" section of
+links. The lists are read once per render-all run; nothing is computed
+while rendering.
+
+Usage:
+    python markdown_render.py render JOB_DIR [JOB_DIR ...]
+    python markdown_render.py render-all [LIBRARY_DIR ...] [--workers N] [--force]
+"""
+
+import os
+import sys
+import json
+import re
+import time
+import hashlib
+import argparse
+from typing import Callable, Iterator, List, Optional, Union
+from urllib.parse import quote
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_LIBRARY_DIRS = [
+    os.path.join(REPO_ROOT, "python-generator-use-cases"),
+    os.path.join(REPO_ROOT, "python-generator-drafts", "use_cases"),
+]
+MARKDOWN_FILENAME = "use_case.md"
+RENDER_INPUTS = ["final_use_case", "example_solution", "visual_suggestions"]
+
+# Bump when rendering logic changes in a way the templates below don't show
+RENDERER_VERSION = "4"
+
+class RenderError(ValueError):
+    """Raised when saved use case data cannot be rendered."""
+
+# -------------------------------------------------------------------------------------
+# Templates
+# -------------------------------------------------------------------------------------
+
+HEADER = "# {title}\n\n**Time to Complete:** {time_to_complete}\n\n## Description\n{description}\n\n## Steps\n"
+STEP = "### Step {number}: {step_title}\n{step_instructions}\n\n"
+SUB_STEP = "{number}. **{title}**\n"
+SUB_STEP_DESCRIPTION = "   {description}\n"
+SUB_STEP_BULLET = "   - {bullet}\n"
+ADVICE = "{advice}\n\n"
+
+RESOURCE_HEADERS = {
+    "tool": "### Tool Documentation\n",
+    "language": "### Language Documentation\n",
+    "mode": "### Mode-specific Documentation\n",
+}
+RESOURCE = "* [{title}]({url})"
+RESOURCE_SECTION = " - {section}"
+
+CITATION = "* [{title}]({url})"
+CITATION_SNIPPET = "\n  > {snippet}"
+
+EXAMPLE_HEADER = (
+    "## Example Solution: {title}\n\n"
+    "**Setup Time:** {setup_time} minutes  \n"
+    "**Demo Time:** {demo_time} minutes\n\n"
+    "### Scenario\n{scenario}\n\n"
+    "### Prerequisites\n"
+)
+DEMO_STEP = "{number}. **{action}**\n"
+CODE_BLOCK = "```\n{code}\n```\n"
+LIST_ITEM = "* {item}\n"
+DEMO_SCRIPT = "\n### Demo Script\n{demo_script}\n"
+
+VISUALS_HEADER = (
+    "\n## Visual Elements\n"
+    "The following visual elements are recommended to enhance this use case:\n\n"
+)
+METADATA_ITEM = "* **{key}:** {value}\n"
+
+RELATED_HEADER = "\n## Related Use Cases\n"
+RELATED_ITEM = "* [{title}]({url})\n"
+
+# -------------------------------------------------------------------------------------
+# Rendering
+# -------------------------------------------------------------------------------------
+
+Writer = Callable[[str], object]
+JsonInput = Union[str, dict, None]
+
+def parse_json_input(value: JsonInput, what: str) -> Optional[dict]:
+    """Accept a dict or a JSON string (parsed once); None stays None."""
+    if value is None or isinstance(value, dict):
+        return value
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError as e:
+        raise RenderError(f"{what} is not valid JSON: {e}") from e
+
+def write_steps(write: Writer, steps: list):
+    for number, step in enumerate(steps, 1):
+        write(STEP.format(number=number, step_title=step["step_title"],
+                          step_instructions=step["step_instructions"]))
+        for sub_number, sub_step in enumerate(step.get("sub_steps") or [], 1):
+            write(SUB_STEP.format(number=sub_number, title=sub_step["title"]))
+            if sub_step.get("description"):
+                write(SUB_STEP_DESCRIPTION.format(description=sub_step["description"]))
+            for bullet in sub_step.get("bullets") or []:
+                write(SUB_STEP_BULLET.format(bullet=bullet))
+            write("\n")
+        if step.get("advice"):
+            write(ADVICE.format(advice=step["advice"]))
+
+def write_resources(write: Writer, resources: list):
+    write("## Resources\n")
+    by_type = {resource_type: [] for resource_type in RESOURCE_HEADERS}
+    for resource in resources:
+        if isinstance(resource, dict):
+            # Unknown types are listed with the tool documentation
+            by_type.get(resource.get("type", "tool"), by_type["tool"]).append(resource)
+        else:
+            # Legacy format - treat as tool resource
+            by_type["tool"].append({"url": resource, "title": "Official Resource"})
+
+    for resource_type, header in RESOURCE_HEADERS.items():
+        if not by_type[resource_type]:
+            continue
+        write(header)
+        for resource in by_type[resource_type]:
+            write(RESOURCE.format(title=resource.get("title") or "Official Resource", url=resource["url"]))
+            if resource.get("section"):
+                write(RESOURCE_SECTION.format(section=resource["section"]))
+            write("\n")
+        write("\n")
+
+def write_citations(write: Writer, citations: list):
+    write("## Additional References\n")
+    # Sort citations by relevance score (highest first)
+    ordered = sorted(citations, key=lambda c: float(c.get("relevance_score") or 0), reverse=True)
+    for citation in ordered:
+        write(CITATION.format(title=citation.get("title") or "Untitled", url=citation["url"]))
+        if citation.get("snippet"):
+            write(CITATION_SNIPPET.format(snippet=citation["snippet"]))
+        write("\n")
+    write("\n")
+
+def write_example_solution(write: Writer, example: dict):
+    solution = example["solution"]
+    write(EXAMPLE_HEADER.format(
+        title=solution["title"], setup_time=solution["setup_time"], demo_time=solution["demo_time"],
+        scenario=solution["scenario"],
+    ))
+    for prerequisite in solution["prerequisites"]:
+        write(LIST_ITEM.format(item=prerequisite))
+
+    write("\n### Demo Steps\n")
+    for number, step in enumerate(solution["steps"], 1):
+        write(DEMO_STEP.format(number=number, action=step["action"]))
+        if "code_or_prompt" in step:
+            write(CODE_BLOCK.format(code=step["code_or_prompt"]))
+
+    sections = [
+        ("\n### Validation\n", solution["validation"]),
+        ("\n### Key Teaching Points\n", solution["key_points"]),
+        ("\n### Common Issues to Watch For\n", solution["common_issues"]),
+    ]
+    if solution.get("variations"):
+        sections.append(("\n### Variations\n", solution["variations"]))
+    for header, items in sections:
+        write(header)
+        for item in items:
+            write(LIST_ITEM.format(item=item))
+
+    write(DEMO_SCRIPT.format(demo_script=example["demo_script"]))
+
+def write_metadata(write: Writer, metadata: dict):
+    write("\n## Metadata\n")
+    for key, value in metadata.items():
+        if value is None:
+            continue
+        if isinstance(value, list):
+            value = ", ".join(str(v) for v in value)
+        write(METADATA_ITEM.format(key=key, value=value))
+
+def write_related(write: Writer, related: List[dict]):
+    write(RELATED_HEADER)
+    for item in related:
+        write(RELATED_ITEM.format(title=item["title"], url=item["url"]))
+
+def write_markdown(write: Writer, use_case: JsonInput, example_solution: JsonInput = None,
+                   visual_suggestions: Optional[str] = None, name: str = "use case",
+                   related: Optional[List[dict]] = None):
+    """
+    Stream the Markdown for one use case to `write`.
+
+    `use_case` and `example_solution` may be dicts or JSON strings. `related`
+    is a list of {"title", "url"} links, precomputed by related_use_cases.py.
+    Raises RenderError (naming `name` and the missing field) on malformed input.
+    """
+    data = parse_json_input(use_case, f"{name}: final use case")
+    example = parse_json_input(example_solution, f"{name}: example solution")
+    if data is None:
+        raise RenderError(f"{name}: no use case data to render")
+    try:
+        write(HEADER.format(title=data["title"], time_to_complete=data["time_to_complete"],
+                            description=data["description"]))
+        write_steps(write, data["steps"])
+        if data["resources"]:
+            write_resources(write, data["resources"])
+        if data.get("citations"):
+            write_citations(write, data["citations"])
+        if example:
+            write_example_solution(write, example)
+        # Add visual suggestions section if provided
+        if visual_suggestions:
+            write(VISUALS_HEADER)
+            write(visual_suggestions)
+            write("\n")
+        if related:
+            write_related(write, related)
+        if data.get("metadata"):
+            write_metadata(write, data["metadata"])
+    except KeyError as e:
+        raise RenderError(f"{name}: missing field {e}") from e
+    except (TypeError, AttributeError) as e:
+        raise RenderError(f"{name}: malformed data ({e})") from e
+
+def render_markdown(use_case: JsonInput, example_solution: JsonInput = None,
+                    visual_suggestions: Optional[str] = None, name: str = "use case",
+                    related: Optional[List[dict]] = None) -> str:
+    """Render one use case to a Markdown string."""
+    parts: List[str] = []
+    write_markdown(parts.append, use_case, example_solution, visual_suggestions, name, related)
+    return "".join(parts)
+
+# -------------------------------------------------------------------------------------
+# Render manifests
+# -------------------------------------------------------------------------------------
+
+MANIFEST_PREFIX = "<!-- render-manifest: "
+MANIFEST_SUFFIX = " -->\n"
+MANIFEST_RE = re.compile(r"<!-- render-manifest: (\{.*\}) -->\s*$")
+
+def renderer_fingerprint() -> str:
+    """Hash of the renderer version and every template, so template edits invalidate outputs."""
+    templates = [
+        HEADER, STEP, SUB_STEP, SUB_STEP_DESCRIPTION, SUB_STEP_BULLET, ADVICE, RESOURCE_HEADERS,
+        RESOURCE, RESOURCE_SECTION, CITATION, CITATION_SNIPPET, EXAMPLE_HEADER, DEMO_STEP,
+        CODE_BLOCK, LIST_ITEM, DEMO_SCRIPT, VISUALS_HEADER, METADATA_ITEM, RELATED_HEADER, RELATED_ITEM,
+    ]
+    payload = json.dumps([RENDERER_VERSION, templates], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+RENDERER_FINGERPRINT = renderer_fingerprint()
+
+def build_manifest(input_bytes: dict) -> dict:
+    """Manifest for a rendered file: renderer fingerprint plus a hash per input (None if absent)."""
+    return {
+        "renderer": RENDERER_FINGERPRINT,
+        "inputs": {
+            name: hashlib.sha256(data).hexdigest() if data is not None else None
+            for name, data in input_bytes.items()
+        },
+    }
+
+def read_manifest(markdown_path: str) -> Optional[dict]:
+    """Read the manifest from the end of a rendered file, without reading the whole file."""
+    try:
+        with open(markdown_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(f.tell() - 1024, 0))
+            tail = f.read().decode("utf-8", "replace")
+    except OSError:
+        return None
+    match = MANIFEST_RE.search(tail)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return None
+
+def format_manifest(manifest: dict) -> str:
+    return f"\n{MANIFEST_PREFIX}{json.dumps(manifest, sort_keys=True, separators=(',', ':'))}{MANIFEST_SUFFIX}"
+
+# -------------------------------------------------------------------------------------
+# Job directories
+# -------------------------------------------------------------------------------------
+
+def read_input_bytes(job_dir: str, step_name: str) -> Optional[bytes]:
+    """Raw bytes of a saved step result, or None if it doesn't exist."""
+    try:
+        with open(os.path.join(job_dir, f"{step_name}.json"), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def unwrap_artifact(data: Optional[bytes]) -> Optional[str]:
+    """Decode a saved step result, unwrapping the `{"content": ...}` envelope."""
+    if data is None:
+        return None
+    return json.loads(data).get("content", "")
+
+def read_artifact(job_dir: str, step_name: str) -> Optional[str]:
+    """Read a saved step result, unwrapping the `{"content": ...}` envelope."""
+    return unwrap_artifact(read_input_bytes(job_dir, step_name))
+
+def related_links(job_dir: str, related: List[dict]) -> List[dict]:
+    """
+    Turn stored neighbours (paths relative to the repo root) into Markdown
+    links relative to the job directory.
+    """
+    links = []
+    for item in related:
+        target = os.path.join(REPO_ROOT, item["path"])
+        if not target.endswith(".md"):
+            target = os.path.join(target, MARKDOWN_FILENAME)
+        relative = os.path.relpath(target, os.path.abspath(job_dir)).replace(os.sep, "/")
+        links.append({"title": item["title"], "url": quote(relative)})
+    return links
+
+def lookup_related(job_dir: str) -> List[dict]:
+    """Stored neighbours of one job, read from the library index (empty if none)."""
+    from related_use_cases import library_path, load_related
+    key = library_path(job_dir, REPO_ROOT)
+    return load_related(paths=[key]).get(key, [])
+
+def render_job_dir(job_dir: str, force: bool = False, related: Optional[List[dict]] = None) -> str:
+    """
+    Re-render use_case.md for a job from its saved JSON artifacts.
+
+    `related` holds the job's stored neighbours; when None they are looked
+    up in the library index. Their links are part of the manifest, so a
+    changed neighbour list re-renders the page.
+
+    Returns "rendered", "unchanged" (manifest matches, file left untouched)
+    or "skipped" (no final use case yet).
+    """
+    input_bytes = {name: read_input_bytes(job_dir, name) for name in RENDER_INPUTS}
+    if not input_bytes["final_use_case"]:
+        return "skipped"
+    links = related_links(job_dir, lookup_related(job_dir) if related is None else related)
+    input_bytes["related"] = json.dumps(links, sort_keys=True).encode("utf-8") if links else None
+
+    path = os.path.join(job_dir, MARKDOWN_FILENAME)
+    manifest = build_manifest(input_bytes)
+    if not force and read_manifest(path) == manifest:
+        return "unchanged"
+
+    name = os.path.basename(os.path.normpath(job_dir))
+    # Render fully before opening the file, so an error never truncates it
+    markdown = render_markdown(
+        unwrap_artifact(input_bytes["final_use_case"]),
+        unwrap_artifact(input_bytes["example_solution"]),
+        unwrap_artifact(input_bytes["visual_suggestions"]),
+        name=name,
+        related=links,
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(markdown)
+        f.write(format_manifest(manifest))
+    return "rendered"
+
+def find_job_dirs(paths: List[str]) -> Iterator[str]:
+    """Yield job directories (those with a final_use_case.json) under the given paths."""
+    for path in paths:
+        if os.path.isfile(os.path.join(path, "final_use_case.json")):
+            yield path
+            continue
+        if not os.path.isdir(path):
+            continue
+        with os.scandir(path) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.is_dir() and os.path.isfile(os.path.join(entry.path, "final_use_case.json")):
+                    yield entry.path
+
+def _render_one(job_dir: str, force: bool = False, related: Optional[List[dict]] = None) -> tuple:
+    """Worker: render one job, reporting errors instead of raising."""
+    try:
+        return job_dir, render_job_dir(job_dir, force, related), None
+    except (RenderError, OSError, json.JSONDecodeError) as e:
+        return job_dir, "failed", str(e)
+
+def render_all(paths: Optional[List[str]] = None, workers: Optional[int] = None,
+               chunksize: int = 64, force: bool = False) -> dict:
+    """
+    Re-render every job directory under `paths` in parallel across processes.
+
+    Outputs whose manifest matches their inputs and the current renderer are
+    left untouched unless `force` is set. Returns counts per status and the
+    list of failures.
+    """
+    from related_use_cases import library_path, load_related
+    job_dirs = list(find_job_dirs(paths or DEFAULT_LIBRARY_DIRS))
+    # One read of the stored neighbour lists for the whole run
+    stored = load_related()
+    related = [stored.get(library_path(job_dir, REPO_ROOT), []) for job_dir in job_dirs]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(job_dirs) > chunksize:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                _render_one, job_dirs, [force] * len(job_dirs), related, chunksize=chunksize
+            ))
+    else:
+        results = [_render_one(job_dir, force, links) for job_dir, links in zip(job_dirs, related)]
+
+    summary = {"jobs": len(job_dirs), "rendered": 0, "unchanged": 0, "skipped": 0, "failed": 0, "failures": []}
+    for job_dir, status, error in results:
+        summary[status] += 1
+        if error:
+            summary["failures"].append({"job_dir": job_dir, "error": error})
+    return summary
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Render use_case.md files from saved JSON.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    render = subparsers.add_parser("render", help="Render specific job directories")
+    render.add_argument("job_dirs", nargs="+")
+    render.add_argument("--force", action="store_true", help="Re-render even if nothing changed")
+
+    render_all_parser = subparsers.add_parser("render-all", help="Re-render every job in the library")
+    render_all_parser.add_argument("paths", nargs="*", help="Library directories (default: all known)")
+    render_all_parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    render_all_parser.add_argument("--force", action="store_true", help="Re-render even if nothing changed")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "render":
+        status = 0
+        for job_dir in args.job_dirs:
+            job_dir, result, error = _render_one(job_dir, args.force)
+            print(f"{result:>8}  {job_dir}" + (f"  ({error})" if error else ""))
+            status = status or (1 if error else 0)
+        return status
+
+    start = time.perf_counter()
+    summary = render_all(args.paths or None, args.workers, force=args.force)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Rendered {summary['rendered']} of {summary['jobs']} jobs in {elapsed:.2f}s "
+        f"({summary['unchanged']} unchanged, {summary['skipped']} skipped, {summary['failed']} failed)"
+    )
+    for failure in summary["failures"]:
+        print(f"  FAILED {failure['job_dir']}: {failure['error']}")
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Offline Evaluation of Model Routes
+
+Runs a fixed set of use cases through the real pipeline once per routes file
+(see model_routing.py), with every model call answered by a replay stand-in
+instead of the APIs, and reports latency, tokens and schema-validation pass
+rates side by side. Nothing is sent over the network and no API key is
+needed.
+
+Design:
+- The fixed set is the recorded job directories of the library (default:
+  python-generator-use-cases/). Each job's saved config is re-run from step 1
+  in a temporary directory, so prompt building, parsing and validation are
+  the pipeline's own.
+- The replay client serves each call from a recorded job with the same title.
+  A job generated with a route's model (its metadata.json `model_routes`)
+  is preferred. Otherwise the recorded output of the default model is served
+  and its latency is scaled by MODEL_LATENCY and EFFORT_LATENCY; such calls
+  are counted as estimated.
+- Recorded latencies come from the jobs' execution.log (log_report.py). Token
+  counts are estimated at four characters per token, with reasoning tokens
+  a multiple of the output by effort.
+- Structured calls are checked against the schema they ask for (their
+  `response_format`) before any local repair, and count against the pass
+  rate when they do not match as answered. The pipeline then repairs them
+  as it would live (structured_output.py), and a response it cannot repair
+  fails the job.
+- Job latency is the sum of the calls, with the parallel research calls of
+  step 2 counted by the slowest one. Step 2 overlaps step 1's stream: the
+  n-th of N questions is taken to arrive n/N of the way through step 1.
+
+Usage:
+    python model_eval.py fast.json cheap.json                 # compared with the default routes
+    python model_eval.py fast.json --jobs ../../python-generator-use-cases --recordings ../use_cases
+    python model_eval.py fast.json --json
+"""
+
+import os
+import io
+import sys
+import json
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import log_report
+import model_routing
+import research_backends
+import research_cache
+from library_index import read_partial_result
+
+DEFAULT_JOBS_DIR = log_report.DEFAULT_LIBRARY_DIR
+CHARS_PER_TOKEN = 4
+
+# Name of each route's call in execution.log ("INITIATING STEP: n - <name>")
+LOGGED_CALLS = {
+    "research_questions": "Identify Research Questions",
+    "deep_research": "Deep Research (Single Question)",
+    "citation_scoring": "Citation Scoring",
+    "refine": "Refine Use Case",
+    "polish": "Final Polish",
+    "example_solution": "Example Solution Generation",
+    "visual_suggestions": "Visual Elements Suggestions",
+}
+
+# Rough latency of each model relative to the others, used to scale recorded
+# latencies when a route's model has no recording. Replace them with measured
+# values (--latency FILE) once real runs of the alternative exist.
+MODEL_LATENCY = {
+    "o1": 3.0,
+    "o3-mini": 1.0,
+    "o3-mini-2025-01-31": 1.0,
+    "o4-mini": 0.9,
+    "gpt-4o": 1.0,
+    "gpt-4o-mini": 0.6,
+    "gpt-4.1": 1.0,
+    "gpt-4.1-mini": 0.6,
+    "gpt-4.1-nano": 0.4,
+    "sonar": 0.6,
+    "sonar-pro": 1.0,
+}
+EFFORT_LATENCY = {None: 1.0, "low": 0.5, "medium": 1.0, "high": 1.8}
+REASONING_TOKENS = {None: 0.0, "low": 1.0, "medium": 2.0, "high": 4.0}
+
+# -------------------------------------------------------------------------------------
+# Recordings
+# -------------------------------------------------------------------------------------
+
+def load_recording(job_dir: str) -> Optional[dict]:
+    """
+    Everything needed to replay one recorded job: its config, the routes it
+    ran with, the response of every route and the logged call latencies.
+    Returns None for incomplete jobs.
+    """
+    from use_case_generator import JobManager
+
+    def artifact(step_name: str) -> Optional[str]:
+        return read_partial_result(os.path.join(job_dir, f"{step_name}.json"))
+
+    refined, final = artifact("refined_draft"), artifact("final_use_case")
+    research = artifact("deep_research")
+    if not (refined and final and research and artifact("example_solution")):
+        return None
+    job_manager = JobManager.open(job_dir, with_logging=False)
+    try:
+        config = job_manager.load_use_case_config()
+    except ValueError:
+        return None
+    refined_struct, final_struct = json.loads(refined), json.loads(final)
+
+    answers = {question: {"answer": answer, "citations": []}
+               for question, answer in research_cache.split_blocks(json.loads(research).get("content") or "")}
+    for entry in research_cache.read_research_file(os.path.join(job_dir, "deep_research.json")):
+        answers[entry["question"]]["citations"] = entry["citations"]
+    # Steps 3 and 4 overwrite metadata, resources and citations after the
+    # model call, so replay what the model returned: the citation scores and
+    # the drafts without those fields
+    responses = {
+        "research_questions": artifact("research_questions") or "",
+        "deep_research": answers,
+        "citation_scoring": json.dumps({
+            "official_resources": refined_struct.get("resources") or [],
+            "citations": refined_struct.get("citations") or [],
+        }),
+        "refine": json.dumps(dict(refined_struct, metadata=None, resources=[], citations=None)),
+        "polish": json.dumps(dict(final_struct, metadata=None)),
+        "example_solution": artifact("example_solution"),
+        "visual_suggestions": artifact("visual_suggestions") or "",
+    }
+
+    latencies: Dict[str, List[float]] = {}
+    timing = log_report.parse_execution_log(os.path.join(job_dir, "execution.log")) \
+        if os.path.exists(os.path.join(job_dir, "execution.log")) else None
+    names = {logged: route for route, logged in LOGGED_CALLS.items()}
+    for call in (timing or {}).get("calls", []):
+        if call["name"] in names:
+            latencies.setdefault(names[call["name"]], []).append(call["seconds"])
+
+    return {
+        "job_dir": job_dir,
+        "title": config["title"],
+        "config": config,
+        "routes": job_manager.load_metadata().get("model_routes") or model_routing.DEFAULT_ROUTES,
+        "responses": responses,
+        "latencies": latencies,
+    }
+
+def find_job_dirs(paths: List[str]) -> List[str]:
+    """Job directories given directly or one level below the given directories."""
+    return sorted({os.path.dirname(log) for log in log_report.find_execution_logs(paths)})
+
+class ReplayLibrary:
+    """Recorded jobs by title, with the route each of them recorded."""
+
+    def __init__(self, recordings: List[dict]):
+        self.by_title: Dict[str, List[dict]] = {}
+        for recording in recordings:
+            self.by_title.setdefault(recording["title"], []).append(recording)
+
+    def find(self, title: str, route: str, model: str, effort: Optional[str]) -> tuple:
+        """(recording, exact): a recording of this model and effort, else the first one of the title."""
+        candidates = self.by_title.get(title)
+        if not candidates:
+            raise LookupError(f"No recording for '{title}'")
+        for recording in candidates:
+            recorded = recording["routes"].get(route) or {}
+            if recorded.get("model") == model and recorded.get("reasoning_effort") == effort:
+                return recording, True
+        return candidates[0], False
+
+# -------------------------------------------------------------------------------------
+# Replay stand-ins
+# -------------------------------------------------------------------------------------
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+class ReplayRecorder:
+    """Serves recorded responses and keeps a record of every call for the report."""
+
+    def __init__(self, library: ReplayLibrary, model_latency: Dict[str, float]):
+        self.library = library
+        self.model_latency = model_latency
+        self.title = ""
+        self.calls: List[dict] = []
+        self.call_counts: Dict[str, int] = {}
+
+    def start_job(self, title: str):
+        self.title = title
+        self.call_counts = {}
+
+    def latency(self, recording: dict, route: str, model: str, effort: Optional[str], exact: bool) -> Optional[float]:
+        """Recorded latency of this call, scaled to the route's model unless it was recorded with it."""
+        recorded = recording["latencies"].get(route) or []
+        if not recorded:
+            return None
+        index = self.call_counts.get(route, 0)
+        seconds = recorded[min(index, len(recorded) - 1)]
+        if exact:
+            return seconds
+        base = recording["routes"].get(route) or model_routing.DEFAULT_ROUTES[route]
+        reasoning = model.startswith("o")
+        return seconds * (
+            self.model_latency.get(model, 1.0) / self.model_latency.get(base["model"], 1.0)
+        ) * (
+            (EFFORT_LATENCY[effort] if reasoning else 1.0)
+            / (EFFORT_LATENCY[base.get("reasoning_effort")] if base["model"].startswith("o") else 1.0)
+        )
+
+    def serve(self, route: str, model: str, effort: Optional[str], prompt: str, key: Optional[str] = None):
+        """Recorded response for the current job's route, logging the call."""
+        recording, exact = self.library.find(self.title, route, model, effort)
+        response = recording["responses"][route]
+        if key is not None:
+            response = response.get(key)
+            if response is None:
+                raise research_backends.ResearchError(f"No recorded answer for: {key}")
+        output = response if isinstance(response, str) else response["answer"]
+        completion_tokens = estimate_tokens(output)
+        self.calls.append({
+            "title": self.title,
+            "route": route,
+            "model": model,
+            "reasoning_effort": effort,
+            "seconds": self.latency(recording, route, model, effort, exact),
+            "estimated": not exact,
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": completion_tokens,
+            "reasoning_tokens": int(completion_tokens * REASONING_TOKENS[effort]),
+            "structured": None,
+        })
+        self.call_counts[route] = self.call_counts.get(route, 0) + 1
+        return response
+
+class ReplayOpenAI:
+    """Stand-in for the OpenAI client that the pipeline's steps call."""
+
+    def __init__(self, recorder: ReplayRecorder):
+        self.recorder = recorder
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def respond(self, messages: list, model: str, reasoning_effort: Optional[str]) -> str:
+        route = model_routing.CURRENT_ROUTE.get()
+        return self.recorder.serve(route, model, reasoning_effort, json.dumps(messages))
+
+    def create(self, model: str, messages: list, reasoning_effort: Optional[str] = None,
+               response_format: Optional[dict] = None, **kwargs):
+        content = self.respond(messages, model, reasoning_effort)
+        if response_format and response_format.get("type") == "json_schema":
+            import use_case_models
+            # Partial regeneration asks for a model built per call, not one in use_case_models
+            schema = getattr(use_case_models, response_format["json_schema"]["name"], None)
+            if schema is not None:
+                try:
+                    schema.model_validate_json(content)
+                    self.recorder.calls[-1]["structured"] = True
+                except ValueError:
+                    self.recorder.calls[-1]["structured"] = False
+        if kwargs.get("stream"):
+            return self.chunks(content)
+        message = SimpleNamespace(content=content, refusal=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    @staticmethod
+    def chunks(content: str):
+        """A streamed response: one chunk per line."""
+        for line in content.splitlines(keepends=True):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=line))], usage=None)
+
+class ReplayResearchBackend(research_backends.ResearchBackend):
+    """Stand-in research backend answering step 2 from the recorded research."""
+
+    name = "replay"
+
+    def __init__(self, recorder: ReplayRecorder):
+        self.recorder = recorder
+
+    async def answer(self, question: str, context_prefix: str = "", model: Optional[str] = None) -> dict:
+        model = model or model_routing.route_kwargs("deep_research")["model"]
+        answer = self.recorder.serve("deep_research", model, None, f"{context_prefix}{question}", key=question)
+        return {"question": question, "answer": answer["answer"], "citations": answer["citations"]}
+
+# -------------------------------------------------------------------------------------
+# Evaluation
+# -------------------------------------------------------------------------------------
+
+async def run_variant(name: str, routes: dict, recordings: List[dict], library: ReplayLibrary,
+                      model_latency: Dict[str, float]) -> dict:
+    """Run every recorded config through the pipeline with one routes file."""
+    import use_case_generator as generator
+
+    recorder = ReplayRecorder(library, model_latency)
+    generator._clients["openai"] = ReplayOpenAI(recorder)
+    generator._clients["research:replay"] = ReplayResearchBackend(recorder)
+    jobs = []
+    with tempfile.TemporaryDirectory(prefix="model_eval_") as base_dir:
+        for recording in recordings:
+            config = recording["config"]
+            job_manager = generator.JobManager(config.get("id", ""), config["title"], base_dir=base_dir,
+                                               with_logging=False)
+            job_manager.save_metadata(config)
+            job_manager.update_metadata({"model_routes": model_routing.resolve_routes(config, routes)})
+            recorder.start_job(config["title"])
+            first_call = len(recorder.calls)
+            error = None
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    await generator.run_pipeline(config, job_manager)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            calls = recorder.calls[first_call:]
+            research = [c["seconds"] for c in calls if c["route"] == "deep_research" and c["seconds"] is not None]
+            questions = sum(c["seconds"] for c in calls if c["route"] == "research_questions" and c["seconds"] is not None)
+            sequential = [c["seconds"] for c in calls
+                          if c["route"] not in ("research_questions", "deep_research") and c["seconds"] is not None]
+            research_done = max(
+                (questions * (n + 1) / len(research) + seconds for n, seconds in enumerate(research)), default=0.0
+            )
+            jobs.append({
+                "title": config["title"],
+                "class": model_routing.use_case_class(config),
+                "completed": error is None,
+                "error": error,
+                "seconds": sum(sequential) + max(questions, research_done),
+                "calls": calls,
+            })
+    return {"name": name, "routes": routes, "jobs": jobs}
+
+def summarize_variant(variant: dict) -> dict:
+    """Latency, token and validation totals of one variant."""
+    jobs = variant["jobs"]
+    calls = [call for job in jobs for call in job["calls"]]
+    structured = [call["structured"] for call in calls if call["structured"] is not None]
+    per_route: Dict[str, List[float]] = {}
+    for call in calls:
+        if call["seconds"] is not None:
+            per_route.setdefault(call["route"], []).append(call["seconds"])
+    return {
+        "name": variant["name"],
+        "jobs": len(jobs),
+        "completed": sum(job["completed"] for job in jobs),
+        "latency": log_report.summarize([job["seconds"] for job in jobs if job["completed"]]),
+        "route_seconds": {route: sum(values) / len(values) for route, values in per_route.items()},
+        "tokens": {
+            kind: sum(call[f"{kind}_tokens"] for call in calls) / max(len(jobs), 1)
+            for kind in ("prompt", "completion", "reasoning")
+        },
+        "schema_passed": sum(structured),
+        "schema_checked": len(structured),
+        "estimated_calls": sum(call["estimated"] for call in calls),
+        "calls": len(calls),
+        "errors": [f"{job['title']}: {job['error']}" for job in jobs if job["error"]],
+    }
+
+def evaluate(route_files: List[str], job_paths: Optional[List[str]] = None,
+             recording_paths: Optional[List[str]] = None,
+             model_latency: Optional[Dict[str, float]] = None) -> dict:
+    """Evaluate the default routes and each routes file over the recorded jobs."""
+    job_dirs = find_job_dirs(job_paths or [DEFAULT_JOBS_DIR])
+    recordings = [r for r in map(load_recording, job_dirs) if r]
+    extra = [r for r in map(load_recording, find_job_dirs(recording_paths)) if r] if recording_paths else []
+    library = ReplayLibrary(recordings + [r for r in extra if r["job_dir"] not in job_dirs])
+    variants = [("default", {})] + [
+        (os.path.splitext(os.path.basename(path))[0], model_routing.load_routes(path)) for path in route_files
+    ]
+    latency = dict(MODEL_LATENCY, **(model_latency or {}))
+
+    # Every variant researches every question with the replay backend
+    overrides = {"RESEARCH_REUSE": "0", "RESEARCH_BACKEND": "replay", "RESEARCH_FALLBACKS": ""}
+    previous = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    try:
+        results = [asyncio.run(run_variant(name, routes, recordings, library, latency)) for name, routes in variants]
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    return {
+        "recorded_jobs": len(recordings),
+        "variants": [summarize_variant(variant) for variant in results],
+        "jobs": {variant["name"]: variant["jobs"] for variant in results},
+    }
+
+def format_report(report: dict) -> str:
+    """Side-by-side text table of the variants."""
+    variants = report["variants"]
+    width = max([14] + [len(v["name"]) + 2 for v in variants])
+
+    def row(label: str, values: List[str]) -> str:
+        return f"{label:<28}" + "".join(f"{value:>{width}}" for value in values)
+
+    def seconds(value: Optional[float]) -> str:
+        return f"{value:.1f}" if value is not None else "-"
+
+    lines = [f"Model routes over {report['recorded_jobs']} recorded jobs (replayed, no API calls)", ""]
+    lines.append(row("", [v["name"] for v in variants]))
+    lines.append(row("jobs completed", [f"{v['completed']}/{v['jobs']}" for v in variants]))
+    for pct in ("p50", "p95"):
+        lines.append(row(f"job latency {pct} (s)", [
+            seconds(v["latency"][pct] if v["completed"] else None) for v in variants
+        ]))
+    for route in model_routing.DEFAULT_ROUTES:
+        lines.append(row(f"  {route} (s)", [seconds(v["route_seconds"].get(route)) for v in variants]))
+    for kind in ("prompt", "completion", "reasoning"):
+        lines.append(row(f"{kind} tokens / job (est.)", [f"{v['tokens'][kind]:,.0f}" for v in variants]))
+    lines.append(row("schema validation", [
+        f"{v['schema_passed']}/{v['schema_checked']}" + (
+            f" {100 * v['schema_passed'] / v['schema_checked']:.0f}%" if v["schema_checked"] else ""
+        )
+        for v in variants
+    ]))
+    lines.append(row("estimated calls", [f"{v['estimated_calls']}/{v['calls']}" for v in variants]))
+    for variant in variants:
+        for error in variant["errors"]:
+            lines.append(f"{variant['name']}: {error}")
+    return "\n".join(lines)
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Compare model routes offline by replaying recorded jobs.")
+    parser.add_argument("routes", nargs="*", help="Routes files to compare with the default routes")
+    parser.add_argument("--jobs", nargs="+", help="Recorded jobs to run (default: the generated library)")
+    parser.add_argument("--recordings", nargs="+",
+                        help="More job directories to replay from, e.g. runs made with alternative routes")
+    parser.add_argument("--latency", help="JSON object of relative model latencies to use instead of the built-in ones")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    model_latency = None
+    if args.latency:
+        with open(args.latency, "r", encoding="utf-8") as f:
+            model_latency = json.load(f)
+    try:
+        report = evaluate(args.routes, args.jobs, args.recordings, model_latency)
+    except (OSError, ValueError) as e:
+        print(e)
+        return 1
+    if not report["recorded_jobs"]:
+        print("No complete recorded jobs found")
+        return 1
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
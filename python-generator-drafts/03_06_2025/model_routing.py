@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Per-Step Model Routing for the Use Case Generator
+
+Every model call in the pipeline asks for its model (and reasoning effort)
+by route name instead of hard-coding it:
+
+    route                 step   default
+    research_questions    1      o3-mini-2025-01-31, medium effort
+    deep_research         2      sonar-pro (perplexity backend only)
+    citation_scoring      3      o3-mini-2025-01-31, low effort
+    refine                3      o3-mini-2025-01-31, high effort
+    polish                4      gpt-4o
+    example_solution      5      o3-mini-2025-01-31, high effort
+    visual_suggestions    6      gpt-4o
+
+A routes file overrides the defaults, for every use case or by use case
+class. A use case is "coding" when its family or AI tool is about coding
+(e.g. Coding Assistants) or it names a programming language, and "generic"
+otherwise. An override that changes the model has no reasoning effort unless
+it sets one. Each route also lists fallback models, tried in order when the
+model fails or its circuit breaker is open (circuit_breakers.py):
+
+    {
+      "default": {"polish": {"model": "gpt-4o-mini", "fallbacks": [{"model": "gpt-4o"}]}},
+      "generic": {"refine": {"reasoning_effort": "medium"}},
+      "coding":  {"example_solution": {"model": "o3-mini-2025-01-31", "reasoning_effort": "high"}}
+    }
+
+Set MODEL_ROUTES (environment or `.env`) or pass `--routes` to the generator.
+Each job records its resolved routes as `model_routes` in metadata.json, and a
+resumed job keeps the routes it started with. `model_eval.py` compares routes
+offline.
+
+Usage:
+    python model_routing.py show [--routes routes.json] [--config my_case.json]
+"""
+
+import os
+import sys
+import json
+import argparse
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+DEFAULT_ROUTES: Dict[str, dict] = {
+    "research_questions": {"model": "o3-mini-2025-01-31", "reasoning_effort": "medium",
+                           "fallbacks": [{"model": "gpt-4o-mini"}]},
+    "deep_research": {"model": "sonar-pro", "reasoning_effort": None, "fallbacks": [{"model": "sonar"}]},
+    "citation_scoring": {"model": "o3-mini-2025-01-31", "reasoning_effort": "low",
+                         "fallbacks": [{"model": "gpt-4o-mini"}]},
+    "refine": {"model": "o3-mini-2025-01-31", "reasoning_effort": "high", "fallbacks": [{"model": "gpt-4o"}]},
+    "polish": {"model": "gpt-4o", "reasoning_effort": None, "fallbacks": [{"model": "gpt-4o-mini"}]},
+    "example_solution": {"model": "o3-mini-2025-01-31", "reasoning_effort": "high",
+                         "fallbacks": [{"model": "gpt-4o"}]},
+    "visual_suggestions": {"model": "gpt-4o", "reasoning_effort": None, "fallbacks": [{"model": "gpt-4o-mini"}]},
+}
+ROUTE_STEPS = {
+    "research_questions": 1, "deep_research": 2, "citation_scoring": 3, "refine": 3,
+    "polish": 4, "example_solution": 5, "visual_suggestions": 6,
+}
+USE_CASE_CLASSES = ("generic", "coding")
+REASONING_EFFORTS = (None, "low", "medium", "high")
+
+# Routes of the job running in the current task or thread (copied into
+# worker threads by asyncio.to_thread), and the route asked for last, which
+# lets stand-in clients tell the pipeline's calls apart
+CURRENT_ROUTES: ContextVar[Optional[Dict[str, dict]]] = ContextVar("current_routes", default=None)
+CURRENT_ROUTE: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+# -------------------------------------------------------------------------------------
+# Route resolution
+# -------------------------------------------------------------------------------------
+
+def use_case_class(use_case_config: dict) -> str:
+    """"coding" for coding-assistant use cases or ones that name a language, else "generic"."""
+    family = str(use_case_config.get("family") or "") + " " + str(use_case_config.get("ai_tool") or "")
+    language = str(use_case_config.get("coding_language") or "").strip()
+    if "coding" in family.lower() or language.upper() not in ("", "N/A", "NONE", "AGNOSTIC"):
+        return "coding"
+    return "generic"
+
+def validate_routes(routes: dict, source: str = "routes"):
+    """Raise ValueError for unknown sections, routes or reasoning efforts."""
+    for section, overrides in routes.items():
+        if section != "default" and section not in USE_CASE_CLASSES:
+            raise ValueError(f"{source}: unknown section '{section}' (use default, generic or coding)")
+        if not isinstance(overrides, dict):
+            raise ValueError(f"{source}: section '{section}' must be an object")
+        for name, route in overrides.items():
+            if name not in DEFAULT_ROUTES:
+                raise ValueError(f"{source}: unknown route '{name}' in '{section}'")
+            if not isinstance(route, dict) or set(route) - {"model", "reasoning_effort", "fallbacks"}:
+                raise ValueError(
+                    f"{source}: route '{name}' in '{section}' takes only model, reasoning_effort and fallbacks"
+                )
+            fallbacks = route.get("fallbacks", [])
+            if not isinstance(fallbacks, list) or not all(
+                isinstance(fallback, dict) and "model" in fallback
+                and not set(fallback) - {"model", "reasoning_effort"} for fallback in fallbacks
+            ):
+                raise ValueError(f"{source}: fallbacks of '{name}' in '{section}' must be a list of models")
+            for candidate in [route] + fallbacks:
+                if candidate.get("reasoning_effort") not in REASONING_EFFORTS:
+                    raise ValueError(f"{source}: invalid reasoning_effort for '{name}' in '{section}'")
+
+def load_routes(path: Optional[str] = None) -> dict:
+    """Routes file at `path` or MODEL_ROUTES, or {} when neither is set."""
+    path = path or os.getenv("MODEL_ROUTES")
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        routes = json.load(f)
+    if not isinstance(routes, dict):
+        raise ValueError(f"{path}: routes file must hold an object")
+    validate_routes(routes, path)
+    return routes
+
+def resolve_routes(use_case_config: dict, routes: Optional[dict] = None) -> Dict[str, dict]:
+    """
+    Model and reasoning effort for every route of one use case: the
+    defaults, then the file's "default" section, then its section for the
+    use case's class. An override that changes the model does not inherit
+    the reasoning effort of the route it replaces.
+    """
+    routes = load_routes() if routes is None else routes
+    resolved = {name: json.loads(json.dumps(route)) for name, route in DEFAULT_ROUTES.items()}
+    for section in ("default", use_case_class(use_case_config)):
+        for name, route in routes.get(section, {}).items():
+            if route.get("model", resolved[name]["model"]) != resolved[name]["model"]:
+                # A different model starts from no reasoning effort
+                resolved[name].update(model=route["model"], reasoning_effort=None)
+            resolved[name].update(route)
+    return resolved
+
+def call_kwargs(route: dict) -> dict:
+    """`model`, plus `reasoning_effort` when the route sets one."""
+    kwargs = {"model": route["model"]}
+    if route.get("reasoning_effort"):
+        kwargs["reasoning_effort"] = route["reasoning_effort"]
+    return kwargs
+
+def current_route(name: str) -> dict:
+    """Route `name` of the current job; also marks it as the route being called."""
+    routes = CURRENT_ROUTES.get() or DEFAULT_ROUTES
+    CURRENT_ROUTE.set(name)
+    return routes.get(name) or DEFAULT_ROUTES[name]
+
+def route_kwargs(name: str) -> dict:
+    """Keyword arguments for the API call of route `name` in the current job."""
+    return call_kwargs(current_route(name))
+
+def route_candidates(name: str) -> List[dict]:
+    """Keyword arguments for route `name` and then each of its fallbacks, in order."""
+    route = current_route(name)
+    return [call_kwargs(candidate) for candidate in [route] + list(route.get("fallbacks") or [])]
+
+def describe(route: dict) -> str:
+    """'model' or 'model (effort)' for reports."""
+    effort = route.get("reasoning_effort")
+    return f"{route['model']} ({effort})" if effort else route["model"]
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Show the model routes a use case would get.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    show = subparsers.add_parser("show", help="Resolved routes for each use case class or one config")
+    show.add_argument("--routes", help="Routes file (default: MODEL_ROUTES)")
+    show.add_argument("--config", help="JSON file with a use case config")
+    args = parser.parse_args(argv)
+
+    try:
+        routes = load_routes(args.routes)
+    except (OSError, ValueError) as e:
+        print(e)
+        return 1
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        targets = [(f"{config.get('title', args.config)} ({use_case_class(config)})", config)]
+    else:
+        targets = [(name, {"ai_tool": "Coding Assistants" if name == "coding" else ""}) for name in USE_CASE_CLASSES]
+
+    for label, config in targets:
+        print(label)
+        for name, route in resolve_routes(config, routes).items():
+            fallbacks = ", ".join(describe(fallback) for fallback in route.get("fallbacks") or [])
+            print(f"  step {ROUTE_STEPS[name]}  {name:<20} {describe(route)}"
+                  + (f"  (fallback: {fallbacks})" if fallbacks else ""))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
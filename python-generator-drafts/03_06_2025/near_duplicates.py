@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Detection for Use Cases (MinHash / LSH)
+
+Flags configs that are too similar to a use case already in the library, so a
+batch does not spend six API calls regenerating a near-clone of, say, "Draft
+an Email in Gmail using Gemini".
+
+Design:
+- Each use case is reduced to an outline: title, objective, description and
+  step titles. Configs are reduced the same way before step 1 runs.
+- Outlines become sets of word unigrams and bigrams (lowercased, stop words
+  dropped). A 128-value MinHash signature and the set size are stored per use
+  case. Signatures use only hashlib, with no NumPy dependency.
+- A generated job also gets a signature of the config it was generated from
+  (metadata.json, or the metadata of its final use case), so a new config is
+  compared like for like with the configs of earlier jobs. Against the final
+  text alone, which the model rewrote, a re-run of an existing config can
+  score anywhere from 0.4 to 0.9; against the stored config it scores 1.0.
+- The score is the overlap coefficient, |A & B| / min(|A|, |B|), derived
+  from the MinHash Jaccard estimate and the two set sizes: "how much of the
+  smaller outline the other one already covers". A use case's score is the
+  higher of its final outline's and its config's.
+- Signatures are split into 64 bands of 2 values. Each band is hashed to one
+  key in an indexed SQLite table. A check only scores use cases that share at
+  least one band key with the config, so it touches a small slice of the
+  library and stays well under a second at 100k use cases.
+- Signatures live in the library index database (`library_index.db`). They
+  are kept current from the index's per-source SHA-256 watermarks, so only
+  added or edited use cases are re-hashed.
+
+Usage:
+    python near_duplicates.py update
+    python near_duplicates.py check CONFIG.json [CONFIG.json ...] [--threshold 0.6] [--json]
+    python near_duplicates.py pairs [--threshold 0.6]
+"""
+
+import os
+import re
+import sys
+import json
+import struct
+import sqlite3
+import hashlib
+import argparse
+from typing import Dict, List, Optional, Set, Tuple
+
+import library_index
+
+REPO_ROOT = library_index.REPO_ROOT
+DEFAULT_DB_PATH = library_index.DEFAULT_DB_PATH
+DEFAULT_THRESHOLD = 0.6
+
+# -------------------------------------------------------------------------------------
+# Shingling
+# -------------------------------------------------------------------------------------
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset("""
+a an and are as at be by can do for from how in into is it its of on or that the
+their them this to use used using with you your will what when which within
+""".split())
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lowercase words with stop words dropped and plural 's' trimmed."""
+    tokens = []
+    for word in WORD_RE.findall(text.lower()):
+        if word in STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+def shingles(text: str) -> Set[str]:
+    """Word unigrams and bigrams of the normalized text."""
+    tokens = normalize_tokens(text)
+    result = set(tokens)
+    result.update(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+    return result
+
+def record_text(record: dict) -> str:
+    """Outline of an indexed use case: title, objective, description, step titles."""
+    parts = [record.get("title") or "", record.get("objective") or "", record.get("description") or ""]
+    parts.extend(record.get("step_titles") or [])
+    return "\n".join(part for part in parts if part)
+
+def job_config(job_dir: str) -> Optional[dict]:
+    """
+    The config a job was generated from: `use_case_config` in its
+    metadata.json, or for older jobs the config attached to its final use
+    case or refined draft.
+    """
+    try:
+        with open(os.path.join(job_dir, "metadata.json"), "r", encoding="utf-8") as f:
+            config = json.load(f).get("use_case_config")
+    except (OSError, json.JSONDecodeError, AttributeError):
+        config = None
+    for step_name in ("final_use_case", "refined_draft"):
+        if isinstance(config, dict) and config:
+            return config
+        try:
+            data = json.loads(library_index.read_partial_result(os.path.join(job_dir, f"{step_name}.json")) or "{}")
+        except json.JSONDecodeError:
+            data = None
+        config = data.get("metadata") if isinstance(data, dict) else None
+    return config if isinstance(config, dict) and config else None
+
+def config_text(config: dict) -> str:
+    """Outline of a use case config, comparable with `record_text`."""
+    parts = [config.get("title") or "", config.get("objective") or "", config.get("description") or ""]
+    for step in config.get("steps") or []:
+        if isinstance(step, dict):
+            parts.append(step.get("step_title") or step.get("title") or "")
+        else:
+            parts.append(str(step))
+    return "\n".join(part for part in parts if part)
+
+# -------------------------------------------------------------------------------------
+# MinHash signatures and LSH bands
+# -------------------------------------------------------------------------------------
+
+NUM_PERM = 128
+BANDS = 64
+ROWS = NUM_PERM // BANDS
+SIGNATURE = struct.Struct(f"<{NUM_PERM}I")
+
+def minhash(shingle_set: Set[str]) -> Optional[Tuple[int, ...]]:
+    """
+    MinHash signature of a shingle set, or None for an empty set.
+
+    Each shingle is hashed once with SHAKE-128 into NUM_PERM independent
+    32-bit values, and the signature is the element-wise minimum. The
+    transpose and minimum run in C (`zip`, `map(min)`), which is several times
+    faster than evaluating NUM_PERM hash functions per shingle in Python.
+    """
+    if not shingle_set:
+        return None
+    rows = [
+        SIGNATURE.unpack(hashlib.shake_128(shingle.encode("utf-8")).digest(SIGNATURE.size))
+        for shingle in shingle_set
+    ]
+    return tuple(map(min, zip(*rows)))
+
+def text_signature(text: str) -> Tuple[Optional[Tuple[int, ...]], int]:
+    """MinHash signature and shingle count of a text outline."""
+    shingle_set = shingles(text)
+    return minhash(shingle_set), len(shingle_set)
+
+def band_keys(signature: Tuple[int, ...]) -> List[int]:
+    """One signed 64-bit key per band (band number included, so bands never collide)."""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(struct.pack(f"<H{ROWS}I", band, *rows), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+def similarity(first: Tuple[int, ...], first_size: int,
+               second: Tuple[int, ...], second_size: int) -> float:
+    """
+    Estimated overlap coefficient of two shingle sets.
+
+    The MinHash Jaccard estimate J and the set sizes give the intersection,
+    J * (|A| + |B|) / (1 + J), which is divided by the smaller size.
+    """
+    jaccard = sum(1 for x, y in zip(first, second) if x == y) / NUM_PERM
+    intersection = jaccard * (first_size + second_size) / (1 + jaccard)
+    return min(intersection / max(min(first_size, second_size), 1), 1.0)
+
+# -------------------------------------------------------------------------------------
+# Signature store (tables in the library index database)
+# -------------------------------------------------------------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS minhash_signatures (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    sha256 TEXT NOT NULL,
+    title TEXT,
+    size INTEGER NOT NULL,
+    signature BLOB NOT NULL,
+    config_size INTEGER NOT NULL DEFAULT 0,
+    config_signature BLOB NOT NULL DEFAULT x''
+);
+CREATE TABLE IF NOT EXISTS minhash_bands (
+    band_key INTEGER NOT NULL,
+    signature_id INTEGER NOT NULL,
+    PRIMARY KEY (band_key, signature_id)
+) WITHOUT ROWID;
+"""
+
+def connect(db_path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
+    """Open the library index database with the signature tables in place."""
+    conn = library_index.connect(db_path)
+    conn.executescript(SCHEMA)
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(minhash_signatures)")}
+    if "config_signature" not in columns:
+        # Signed before jobs had config signatures: sign everything again
+        with conn:
+            conn.execute("DROP TABLE minhash_signatures")
+            conn.execute("DELETE FROM minhash_bands")
+            conn.executescript(SCHEMA)
+    return conn
+
+def remove_signature(conn: sqlite3.Connection, path: str):
+    """Drop the signatures and band keys stored for one use case."""
+    row = conn.execute(
+        "SELECT id, signature, config_signature FROM minhash_signatures WHERE path = ?", (path,)
+    ).fetchone()
+    if not row:
+        return
+    for blob in (row["signature"], row["config_signature"]):
+        if blob:
+            conn.executemany(
+                "DELETE FROM minhash_bands WHERE band_key = ? AND signature_id = ?",
+                [(key, row["id"]) for key in band_keys(SIGNATURE.unpack(blob))],
+            )
+    conn.execute("DELETE FROM minhash_signatures WHERE id = ?", (row["id"],))
+
+def store_signature(conn: sqlite3.Connection, path: str, sha256: str, title: str,
+                    signature: Optional[Tuple[int, ...]], size: int,
+                    config_signature: Optional[Tuple[int, ...]] = None, config_size: int = 0):
+    """
+    Store a use case's signatures and band keys, replacing any previous ones.
+
+    Sources that are not use cases are stored with an empty signature so the
+    next update does not re-read them.
+    """
+    remove_signature(conn, path)
+    cursor = conn.execute(
+        "INSERT INTO minhash_signatures (path, sha256, title, size, signature, config_size, config_signature) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (path, sha256, title, size, SIGNATURE.pack(*signature) if signature else b"",
+         config_size, SIGNATURE.pack(*config_signature) if config_signature else b""),
+    )
+    keys = set()
+    for stored in (signature, config_signature):
+        if stored:
+            keys.update(band_keys(stored))
+    conn.executemany(
+        "INSERT OR IGNORE INTO minhash_bands (band_key, signature_id) VALUES (?, ?)",
+        [(key, cursor.lastrowid) for key in keys],
+    )
+
+def update_signatures(root: str = REPO_ROOT, conn: Optional[sqlite3.Connection] = None,
+                      db_path: str = DEFAULT_DB_PATH) -> Dict[str, int]:
+    """
+    Bring the library index and the signatures up to date.
+
+    The library index is updated first; its per-source SHA-256 then decides
+    which signatures are stale. Returns counts of signatures added, changed,
+    deleted and unchanged.
+    """
+    own_conn = conn is None
+    conn = conn or connect(db_path)
+    library_index.update_index(root, conn=conn)
+    counts = {"added": 0, "changed": 0, "deleted": 0, "unchanged": 0}
+    stored = {
+        row["path"]: row["sha256"]
+        for row in conn.execute("SELECT path, sha256 FROM minhash_signatures")
+    }
+    sources = conn.execute("SELECT path, kind, family, sha256 FROM sources").fetchall()
+
+    with conn:
+        for source in sources:
+            path = source["path"]
+            if stored.get(path) == source["sha256"]:
+                counts["unchanged"] += 1
+                continue
+            record = library_index.load_use_case(
+                source["kind"], os.path.join(root, path), source["family"], root
+            )
+            signature, size = text_signature(record_text(record)) if record else (None, 0)
+            config = job_config(os.path.join(root, path)) if record and source["kind"] == "generated" else None
+            config_signature, config_size = text_signature(config_text(config)) if config else (None, 0)
+            store_signature(conn, path, source["sha256"], record["title"] if record else "",
+                            signature, size, config_signature, config_size)
+            counts["changed" if path in stored else "added"] += 1
+
+        for path in set(stored) - {source["path"] for source in sources}:
+            remove_signature(conn, path)
+            counts["deleted"] += 1
+
+    if own_conn:
+        conn.close()
+    return counts
+
+# -------------------------------------------------------------------------------------
+# Queries
+# -------------------------------------------------------------------------------------
+
+def find_similar(conn: sqlite3.Connection, signature: Tuple[int, ...], size: int,
+                 threshold: float = DEFAULT_THRESHOLD, limit: int = 5) -> List[dict]:
+    """
+    Library use cases whose estimated similarity to the outline with this
+    signature and shingle count is at least `threshold`, most similar first.
+    A generated job scores the higher of its final outline and its config.
+    """
+    keys = band_keys(signature)
+    rows = conn.execute(
+        "SELECT path, title, size, signature, config_size, config_signature FROM minhash_signatures WHERE id IN ("
+        f"SELECT signature_id FROM minhash_bands WHERE band_key IN ({', '.join('?' * len(keys))}))",
+        keys,
+    )
+    matches = []
+    for path, title, other_size, blob, config_size, config_blob in rows:
+        score = max(
+            similarity(signature, size, SIGNATURE.unpack(blob), other_size) if blob else 0.0,
+            similarity(signature, size, SIGNATURE.unpack(config_blob), config_size) if config_blob else 0.0,
+        )
+        if score >= threshold:
+            matches.append({"path": path, "title": title, "similarity": round(score, 3)})
+    matches.sort(key=lambda match: (-match["similarity"], match["path"]))
+    return matches[:limit]
+
+def check_configs(configs: List[dict], threshold: float = DEFAULT_THRESHOLD,
+                  root: str = REPO_ROOT, db_path: str = DEFAULT_DB_PATH,
+                  update: bool = True) -> List[List[dict]]:
+    """
+    Return, for each config, the library use cases it nearly duplicates.
+
+    Configs are also checked against earlier configs of the same batch; such
+    matches have a `batch:<index>` path. Set `update=False` to skip refreshing
+    the index first (e.g. right after an explicit `update`).
+    """
+    conn = connect(db_path)
+    try:
+        if update:
+            update_signatures(root, conn)
+        results = []
+        batch: List[tuple] = []
+        for index, config in enumerate(configs):
+            signature, size = text_signature(config_text(config))
+            if signature is None:
+                results.append([])
+                continue
+            matches = find_similar(conn, signature, size, threshold)
+            for earlier, title, earlier_signature, earlier_size in batch:
+                score = similarity(signature, size, earlier_signature, earlier_size)
+                if score >= threshold:
+                    matches.append({"path": f"batch:{earlier}", "title": title, "similarity": round(score, 3)})
+            matches.sort(key=lambda match: -match["similarity"])
+            results.append(matches)
+            batch.append((index, config.get("title") or "", signature, size))
+        return results
+    finally:
+        conn.close()
+
+def duplicate_pairs(conn: sqlite3.Connection, threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """Pairs of library use cases at or above `threshold`, most similar first."""
+    signatures = {
+        row["id"]: (row["path"], row["title"], row["size"], SIGNATURE.unpack(row["signature"]))
+        for row in conn.execute(
+            "SELECT id, path, title, size, signature FROM minhash_signatures WHERE length(signature) > 0"
+        )
+    }
+    seen = set()
+    pairs = []
+    buckets = conn.execute(
+        "SELECT group_concat(signature_id) FROM minhash_bands GROUP BY band_key HAVING COUNT(*) > 1"
+    )
+    for (joined,) in buckets:
+        ids = sorted(int(value) for value in joined.split(","))
+        for i, first_id in enumerate(ids):
+            for second_id in ids[i + 1:]:
+                if (first_id, second_id) in seen:
+                    continue
+                seen.add((first_id, second_id))
+                first, second = signatures[first_id], signatures[second_id]
+                score = similarity(first[3], first[2], second[3], second[2])
+                if score >= threshold:
+                    pairs.append({
+                        "similarity": round(score, 3),
+                        "first": {"path": first[0], "title": first[1]},
+                        "second": {"path": second[0], "title": second[1]},
+                    })
+    pairs.sort(key=lambda pair: (-pair["similarity"], pair["first"]["path"]))
+    return pairs
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def load_config_files(paths: List[str]) -> List[dict]:
+    """Load configs from JSON files holding one config or a list of them."""
+    configs = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        configs.extend(data if isinstance(data, list) else [data])
+    return configs
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Find near-duplicate use cases with MinHash/LSH.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Library index database path")
+    parser.add_argument("--root", default=REPO_ROOT, help="Repository root to index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("update", help="Update the index and the signatures")
+
+    check = subparsers.add_parser("check", help="Check configs against the library")
+    check.add_argument("configs", nargs="+", help="JSON files, each with one config or a list of configs")
+    check.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    check.add_argument("--json", action="store_true", help="Print matches as JSON")
+
+    pairs = subparsers.add_parser("pairs", help="List near-duplicate pairs already in the library")
+    pairs.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "update":
+        counts = update_signatures(args.root, db_path=args.db)
+        print(", ".join(f"{count} {name}" for name, count in counts.items()))
+        return 0
+
+    if args.command == "check":
+        configs = load_config_files(args.configs)
+        results = check_configs(configs, args.threshold, args.root, args.db)
+        if args.json:
+            print(json.dumps([
+                {"title": config.get("title"), "matches": matches}
+                for config, matches in zip(configs, results)
+            ], indent=2))
+        else:
+            for config, matches in zip(configs, results):
+                print(f"{'similar' if matches else 'ok':>7}  {config.get('title')}")
+                for match in matches:
+                    print(f"         {match['similarity']:.2f}  {match['title']}  ({match['path']})")
+        return 1 if any(results) else 0
+
+    conn = connect(args.db)
+    update_signatures(args.root, conn)
+    for pair in duplicate_pairs(conn, args.threshold):
+        print(f"{pair['similarity']:.2f}  {pair['first']['title']}  <->  {pair['second']['title']}")
+        print(f"      {pair['first']['path']}")
+        print(f"      {pair['second']['path']}")
+    conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Targeted Regeneration of Failing Sections
+
+A polished use case (step 4) or example solution (step 5) that is mostly
+right used to be kept with a printed warning, or regenerated in full. This
+module finds the sections that fail, asks the model for just those sections
+and splices them back into the artifact, so a fix costs the tokens and
+latency of a few steps instead of the whole document.
+
+Design:
+- Checks are plain functions over the saved JSON and make no API calls:
+  `check_final_use_case` compares the polished use case with the refined
+  draft it was polished from (missing, surplus or empty steps, empty title
+  or description, a time estimate without minutes or outside 10-30), and
+  `check_example_solution` aligns the solution's steps with the use case's
+  steps one to one (missing, surplus or empty steps, empty lists, a short
+  demo script, a demo time outside 1-5 minutes).
+- Each issue names one section by path ("steps[2]", "solution.validation",
+  "demo_script"). Polished steps are matched to refined steps by title, so
+  a step dropped from the middle is regenerated in its place; solution
+  steps, which have no titles, are matched by position. A surplus step is
+  merged into the step before it, whose slot is regenerated to cover both.
+- `regenerate_sections` asks the step's own route for a Pydantic model built
+  from only the failing sections' types, with the whole current artifact
+  and each section's source (the use case step a solution step demonstrates,
+  the refined step a polished step comes from) as context. Sections outside
+  the request are left byte for byte as they were.
+- The generator passes itself in (`generator`) for its model calls and
+  prompts; importing the script by name from steps 4 and 5 would load a
+  second copy of it when it runs as `__main__`.
+- Regeneration is best effort: when the model fails or answers off-schema
+  the artifact is kept as it was. Every attempt is recorded under
+  `partial_regeneration` in the job's metadata.json with the sections asked
+  for and any issues left.
+
+Steps 4 and 5 run the checks on every new artifact. Saved jobs can be
+checked, and repaired in place, from the command line.
+
+Usage:
+    python partial_regeneration.py check [LIBRARY_DIR_OR_JOB_DIR ...] [--json]
+    python partial_regeneration.py repair JOB_DIR [--step final_use_case|example_solution]
+"""
+
+import re
+import sys
+import json
+import copy
+import difflib
+import logging
+import argparse
+from types import ModuleType
+from typing import Any, Dict, List, Optional, Union
+
+# Route that regenerates the sections of each artifact (its own step's route)
+ARTIFACT_ROUTES = {
+    "final_use_case": "polish",
+    "example_solution": "example_solution",
+}
+
+TIME_RANGE = (10, 30)  # minutes, per USE_CASE_GUIDELINES
+DEMO_TIME_RANGE = (1, 5)  # minutes, for a 2-3 minute demo
+MIN_DEMO_SCRIPT_WORDS = 100
+SOLUTION_LISTS = ["prerequisites", "validation", "key_points", "common_issues"]
+
+MINUTES_RE = re.compile(r"(\d+)\s*(?:-\s*\d+\s*)?min", re.IGNORECASE)
+PATH_TOKEN_RE = re.compile(r"([A-Za-z_]\w*)|\[(\d+)\]")
+
+# -------------------------------------------------------------------------------------
+# Section paths
+# -------------------------------------------------------------------------------------
+
+def parse_path(path: str) -> List[Union[str, int]]:
+    """"solution.steps[2]" -> ["solution", "steps", 2]."""
+    return [name if name else int(index) for name, index in PATH_TOKEN_RE.findall(path)]
+
+def field_name(path: str) -> str:
+    """The patch model field for a section: "solution.steps[2]" -> "solution_steps_2"."""
+    return "_".join(str(token) for token in parse_path(path))
+
+def get_section(data: Any, path: str) -> Any:
+    """The value at `path`."""
+    for token in parse_path(path):
+        data = data[token]
+    return data
+
+def set_section(data: Any, path: str, value: Any):
+    """Set the value at `path`."""
+    tokens = parse_path(path)
+    for token in tokens[:-1]:
+        data = data[token]
+    data[tokens[-1]] = value
+
+def splice(data: dict, issues: List[dict], sections: Dict[str, Any]) -> dict:
+    """
+    A copy of `data` with each issue's section replaced by its regenerated
+    value in `sections`. A step list whose issues carry a `layout` is first
+    rebuilt from it: slot k holds the current step layout[k], or the
+    regenerated one when layout[k] is None; steps not in it are dropped.
+    """
+    spliced = copy.deepcopy(data)
+    for issue in issues:
+        if "layout" in issue:
+            parent = issue["path"][:issue["path"].rindex("[")]
+            current = get_section(spliced, parent)
+            set_section(spliced, parent, [None if index is None else current[index] for index in issue["layout"]])
+            break
+    for issue in issues:
+        if issue["path"] in sections:
+            set_section(spliced, issue["path"], sections[issue["path"]])
+    return spliced
+
+# -------------------------------------------------------------------------------------
+# Checks
+# -------------------------------------------------------------------------------------
+
+def minutes(text: Any) -> Optional[int]:
+    """Leading minutes of a time estimate ("20 minutes", "15-20 min"), or None."""
+    match = MINUTES_RE.search(text) if isinstance(text, str) else None
+    return int(match.group(1)) if match else None
+
+def align_steps(steps: list, sources: list, key: Optional[str] = None) -> List[Optional[int]]:
+    """
+    For each source step, the index of the step aligned with it, or None.
+
+    Without `key`, steps align by position. With it, steps and sources are
+    matched in order by the similarity of their `key` field, so a dropped or
+    added step in the middle is found where it is.
+    """
+    if key is None:
+        return [index if index < len(steps) else None for index in range(len(sources))]
+
+    def similarity(step: dict, source: dict) -> float:
+        return difflib.SequenceMatcher(
+            None, str((step or {}).get(key) or "").lower(), str((source or {}).get(key) or "").lower()
+        ).ratio()
+
+    n, m = len(steps), len(sources)
+    scores = [[similarity(step, source) for source in sources] for step in steps]
+    best = [[0.0] * (m + 1) for _ in range(n + 1)]
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            best[i][j] = max(best[i - 1][j], best[i][j - 1], best[i - 1][j - 1] + scores[i - 1][j - 1])
+    layout: List[Optional[int]] = [None] * m
+    i, j = n, m
+    while i and j:
+        if best[i][j] == best[i - 1][j - 1] + scores[i - 1][j - 1]:
+            layout[j - 1] = i - 1
+            i, j = i - 1, j - 1
+        elif best[i][j] == best[i - 1][j]:
+            i -= 1
+        else:
+            j -= 1
+    return layout
+
+def check_steps(steps: list, sources: list, prefix: str, required: List[str], what: str,
+                key: Optional[str] = None) -> List[dict]:
+    """
+    Align `steps` one to one with `sources` (the steps they come from or
+    demonstrate, see align_steps): missing, surplus and empty steps. A step
+    aligned with no source is merged into the slot of the step before it.
+    """
+    if not sources:
+        return []
+    layout = align_steps(steps, sources, key)
+    surplus: Dict[int, List[int]] = {}
+    for index in range(len(steps)):
+        if index not in layout:
+            before = [slot for slot, aligned in enumerate(layout) if aligned is not None and aligned < index]
+            after = [slot for slot, aligned in enumerate(layout) if aligned is not None and aligned > index]
+            slot = before[-1] if before else (after[0] if after else 0)
+            surplus.setdefault(slot, []).append(index)
+    issues = []
+    for slot, index in enumerate(layout):
+        issue = {"path": f"{prefix}[{slot}]", "source": sources[slot]}
+        if index is None:
+            issue["reason"] = f"missing: step {slot + 1} of {what} has no counterpart"
+            if slot in surplus:
+                issue["surplus"] = [steps[i] for i in surplus[slot]]
+        elif slot in surplus:
+            extra = sorted([index] + surplus[slot])
+            issue["reason"] = f"{what} has {len(sources)} steps: merge steps {', '.join(str(i + 1) for i in extra)} into one"
+            issue["surplus"] = [steps[i] for i in extra]
+        else:
+            empty = [field for field in required if not str((steps[index] or {}).get(field) or "").strip()]
+            if not empty:
+                continue
+            issue["reason"] = f"empty {', '.join(empty)}"
+        issues.append(issue)
+    if layout != list(range(len(steps))):
+        for issue in issues:
+            issue["layout"] = layout
+    return issues
+
+def check_final_use_case(use_case: dict, refined: Optional[dict] = None,
+                         use_case_config: Optional[dict] = None) -> List[dict]:
+    """Failing sections of a polished use case, checked against its refined draft."""
+    issues = []
+    for field in ("title", "description"):
+        if not str(use_case.get(field) or "").strip():
+            issues.append({"path": field, "reason": f"empty {field}", "source": (refined or {}).get(field)})
+    estimate = minutes(use_case.get("time_to_complete"))
+    configured = minutes((use_case_config or {}).get("time_estimate"))
+    if estimate is None:
+        issues.append({"path": "time_to_complete", "reason": "no estimate in minutes",
+                       "source": (refined or {}).get("time_to_complete")})
+    elif not TIME_RANGE[0] <= estimate <= TIME_RANGE[1] and estimate != configured:
+        issues.append({"path": "time_to_complete",
+                       "reason": f"{estimate} minutes is outside {TIME_RANGE[0]}-{TIME_RANGE[1]}",
+                       "source": (refined or {}).get("time_to_complete")})
+    steps = use_case.get("steps") or []
+    sources = (refined or {}).get("steps") or steps
+    issues.extend(check_steps(steps, sources, "steps", ["step_title", "step_instructions"], "the refined draft",
+                              key="step_title"))
+    return issues
+
+def check_example_solution(example: dict, use_case_steps: list) -> List[dict]:
+    """
+    Failing sections of an example solution. Its steps must map one to one
+    onto `use_case_steps` (step dicts, or titles when only those are known).
+    """
+    solution = example.get("solution") or {}
+    sources = [step if isinstance(step, dict) else {"step_title": step} for step in use_case_steps]
+    issues = check_steps(solution.get("steps") or [], sources, "solution.steps",
+                         ["action", "code_or_prompt"], "the use case")
+    for field in ("title", "scenario"):
+        if not str(solution.get(field) or "").strip():
+            issues.append({"path": f"solution.{field}", "reason": f"empty {field}"})
+    for field in SOLUTION_LISTS:
+        if not solution.get(field):
+            issues.append({"path": f"solution.{field}", "reason": f"empty {field}"})
+    demo_time = solution.get("demo_time")
+    if not isinstance(demo_time, int) or not DEMO_TIME_RANGE[0] <= demo_time <= DEMO_TIME_RANGE[1]:
+        issues.append({"path": "solution.demo_time",
+                       "reason": f"demo time {demo_time!r} is outside {DEMO_TIME_RANGE[0]}-{DEMO_TIME_RANGE[1]} minutes"})
+    words = len(str(example.get("demo_script") or "").split())
+    if words < MIN_DEMO_SCRIPT_WORDS:
+        issues.append({"path": "demo_script",
+                       "reason": f"demo script has {words} words, fewer than {MIN_DEMO_SCRIPT_WORDS}"})
+    return issues
+
+def load_json(content: Optional[str]) -> Optional[dict]:
+    try:
+        data = json.loads(content) if content else None
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+def check_job(job_dir: str) -> Dict[str, List[dict]]:
+    """Failing sections of a saved job's final use case and example solution."""
+    from markdown_render import read_artifact
+    use_case = load_json(read_artifact(job_dir, "final_use_case"))
+    if use_case is None:
+        return {}
+    results = {"final_use_case": check_final_use_case(
+        use_case, load_json(read_artifact(job_dir, "refined_draft")), use_case.get("metadata")
+    )}
+    example = load_json(read_artifact(job_dir, "example_solution"))
+    if example is not None:
+        results["example_solution"] = check_example_solution(example, use_case.get("steps") or [])
+    return results
+
+# -------------------------------------------------------------------------------------
+# Regeneration
+# -------------------------------------------------------------------------------------
+
+def section_annotation(model_cls, path: str):
+    """The type of the section at `path` of `model_cls`, e.g. Step for "solution.steps[2]"."""
+    from typing import get_args
+    from structured_output import unwrap_optional
+    annotation = model_cls
+    for token in parse_path(path):
+        if isinstance(token, int):
+            annotation = get_args(annotation)[0]
+        else:
+            annotation = annotation.model_fields[token].annotation
+        annotation, _ = unwrap_optional(annotation)
+    return annotation
+
+def patch_model(model_cls, issues: List[dict]):
+    """A Pydantic model with one required field per failing section."""
+    from pydantic import create_model
+    fields = {field_name(issue["path"]): (section_annotation(model_cls, issue["path"]), ...) for issue in issues}
+    return create_model(f"{model_cls.__name__}Patch", **fields)
+
+def describe_issue(issue: dict) -> str:
+    """One section of the request: its field, path, reason and source."""
+    lines = [f"- {field_name(issue['path'])} (replaces {issue['path']}): {issue['reason']}"]
+    if issue.get("source") is not None:
+        lines.append(f"  Derive it from: {json.dumps(issue['source'], ensure_ascii=False)}")
+    if issue.get("surplus"):
+        lines.append(f"  Cover everything in these steps: {json.dumps(issue['surplus'], ensure_ascii=False)}")
+    return "\n".join(lines)
+
+def build_messages(generator: ModuleType, step_name: str, data: dict, issues: List[dict]) -> list:
+    """The messages asking for only the failing sections of `data`."""
+    what = "example solution" if step_name == "example_solution" else "use case"
+    guidelines = generator.BRAND_LANGUAGE_GUIDELINES
+    if step_name == "final_use_case":
+        guidelines = f"{guidelines}\n\n{generator.USE_CASE_GUIDELINES}"
+    system_prompt = (
+        f"You repair individual sections of a finished {what}. The rest of the document is final and "
+        "will be kept exactly as it is, so each section you write must fit between its neighbours: the "
+        "same terminology, tools, versions, tone and level of detail. A step must cover exactly the use "
+        "case step it is derived from. Return JSON with one field per requested section and nothing else.\n\n"
+        f"{guidelines}"
+    )
+    user_prompt = (
+        f"Rewrite only these sections:\n{chr(10).join(describe_issue(issue) for issue in issues)}\n\n"
+        f"The current {what}, for context:\n{json.dumps(data, indent=2, ensure_ascii=False)}"
+    )
+    return [
+        {"role": "developer", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+def regenerate_sections(generator: ModuleType, openai_client, job_manager, step_name: str, content: str,
+                        issues: List[dict], recheck=None) -> str:
+    """
+    Regenerate the sections of `content` named by `issues` in one call and
+    splice them in. Returns the new JSON, or `content` unchanged when there
+    is nothing to fix or the call fails. `recheck(data)` lists the issues
+    left afterwards, for the metadata.
+    """
+    import use_case_models
+    import structured_output
+    import circuit_breakers
+    if not issues:
+        return content
+    data = json.loads(content)
+    route = ARTIFACT_ROUTES[step_name]
+    model_cls = getattr(use_case_models, structured_output.ARTIFACT_MODELS[step_name])
+    messages = build_messages(generator, step_name, data, issues)
+    event = {"step": step_name, "sections": [issue["path"] for issue in issues],
+             "reasons": [issue["reason"] for issue in issues]}
+    logging.warning(f"{step_name}: regenerating {', '.join(event['sections'])}")
+    generator.log_prompt(f"Partial Regeneration ({step_name})", messages)
+    try:
+        patch = generator.call_structured(job_manager, route, openai_client, messages, patch_model(model_cls, issues))
+    except (structured_output.StructuredOutputError, circuit_breakers.FallbackExhaustedError) as e:
+        logging.warning(f"{step_name}: partial regeneration failed, keeping the artifact as it was: {e}")
+        job_manager.append_metadata("partial_regeneration", {**event, "status": "failed", "error": str(e)})
+        return content
+    if patch is None:
+        logging.warning(f"{step_name}: the model refused partial regeneration, keeping the artifact as it was")
+        job_manager.append_metadata("partial_regeneration", {**event, "status": "refused"})
+        return content
+    values = patch.model_dump()
+    spliced = splice(data, issues, {issue["path"]: values[field_name(issue["path"])] for issue in issues})
+    remaining = recheck(spliced) if recheck else []
+    for issue in remaining:
+        logging.warning(f"{step_name}: {issue['path']} still fails: {issue['reason']}")
+    job_manager.append_metadata("partial_regeneration", {
+        **event, "status": "spliced", "remaining": [issue["path"] for issue in remaining],
+    })
+    spliced_json = json.dumps(spliced, indent=2)
+    generator.log_ai_interaction(f"Partial Regeneration ({step_name})", messages[-1]["content"], spliced_json)
+    return spliced_json
+
+def repair_final_use_case(generator: ModuleType, openai_client, job_manager, content: str,
+                          refined: Optional[dict] = None, use_case_config: Optional[dict] = None) -> str:
+    """Check a polished use case and regenerate its failing sections."""
+    def check(data: dict) -> List[dict]:
+        return check_final_use_case(data, refined, use_case_config)
+    return regenerate_sections(generator, openai_client, job_manager, "final_use_case", content,
+                               check(json.loads(content)), recheck=check)
+
+def repair_example_solution(generator: ModuleType, openai_client, job_manager, content: str,
+                            use_case_steps: list) -> str:
+    """Check an example solution against the use case steps and regenerate its failing sections."""
+    def check(data: dict) -> List[dict]:
+        return check_example_solution(data, use_case_steps)
+    return regenerate_sections(generator, openai_client, job_manager, "example_solution", content,
+                               check(json.loads(content)), recheck=check)
+
+def repair_job(job_dir: str, steps: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Repair the saved artifacts of a job in place and re-render its page.
+    Returns the number of sections asked for per step.
+    """
+    import model_routing
+    import markdown_render
+    import use_case_generator as generator
+    steps = steps or list(ARTIFACT_ROUTES)
+    job_manager = generator.JobManager.open(job_dir)
+    token = generator.CURRENT_JOB.set(job_manager.job_id)
+    routes_token = model_routing.CURRENT_ROUTES.set(generator.job_routes(job_manager.load_use_case_config(), job_manager))
+    asked = {}
+    try:
+        openai_client = generator.get_openai_client()
+        use_case_json = generator.load_partial_result(job_manager, "final_use_case")
+        if not use_case_json:
+            raise ValueError(f"{job_dir}: no final use case to repair")
+        if "final_use_case" in steps:
+            refined = load_json(generator.load_partial_result(job_manager, "refined_draft"))
+            config = job_manager.load_use_case_config()
+            asked["final_use_case"] = len(check_final_use_case(json.loads(use_case_json), refined, config))
+            repaired = repair_final_use_case(generator, openai_client, job_manager, use_case_json, refined, config)
+            if repaired != use_case_json:
+                generator.save_partial_result(job_manager, "final_use_case", repaired)
+                use_case_json = repaired
+        example_json = generator.load_partial_result(job_manager, "example_solution")
+        if "example_solution" in steps and example_json:
+            use_case_steps = json.loads(use_case_json).get("steps") or []
+            asked["example_solution"] = len(check_example_solution(json.loads(example_json), use_case_steps))
+            repaired = repair_example_solution(generator, openai_client, job_manager, example_json, use_case_steps)
+            if repaired != example_json:
+                generator.save_partial_result(job_manager, "example_solution", repaired)
+        markdown_render.render_job_dir(job_dir)
+    finally:
+        model_routing.CURRENT_ROUTES.reset(routes_token)
+        generator.CURRENT_JOB.reset(token)
+        job_manager.close()
+    return asked
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def format_checks(results: Dict[str, Dict[str, List[dict]]]) -> str:
+    """Failing sections per job and step, then a one-line total."""
+    lines = []
+    failing = 0
+    for job_dir, steps in results.items():
+        issues = [(step, issue) for step, step_issues in steps.items() for issue in step_issues]
+        if not issues:
+            continue
+        failing += 1
+        lines.append(job_dir)
+        for step, issue in issues:
+            lines.append(f"  {step:<18} {issue['path']:<24} {issue['reason']}")
+    lines.append(f"{failing} of {len(results)} jobs have failing sections")
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    from markdown_render import DEFAULT_LIBRARY_DIRS, find_job_dirs
+    parser = argparse.ArgumentParser(description="Find and regenerate failing sections of saved use cases.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    check = subparsers.add_parser("check", help="List failing sections (no API calls)")
+    check.add_argument("paths", nargs="*", help="Library or job directories (default: the library)")
+    check.add_argument("--json", action="store_true", help="Print the issues as JSON")
+    repair = subparsers.add_parser("repair", help="Regenerate the failing sections of a job in place")
+    repair.add_argument("job_dir", help="Job directory")
+    repair.add_argument("--step", choices=list(ARTIFACT_ROUTES), action="append",
+                        help="Only repair this artifact (repeatable; default: both)")
+    args = parser.parse_args(argv)
+
+    if args.command == "check":
+        results = {job_dir: check_job(job_dir) for job_dir in find_job_dirs(args.paths or DEFAULT_LIBRARY_DIRS)}
+        if args.json:
+            print(json.dumps(results, indent=2, ensure_ascii=False))
+        else:
+            print(format_checks(results))
+        return 1 if any(issues for steps in results.values() for issues in steps.values()) else 0
+
+    import use_case_generator as generator
+    generator.setup_console_logging()
+    generator.validate_environment()
+    asked = repair_job(args.job_dir, args.step)
+    print(", ".join(f"{step}: {count} section(s)" for step, count in asked.items()) or "Nothing to repair")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
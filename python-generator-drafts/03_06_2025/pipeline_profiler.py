@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Per-Step CPU and Memory Profiling for the Use Case Generator
+
+Shows how much local work (prompt building, JSON re-serialization, HTML
+parsing, logging) each pipeline step adds on top of waiting for the APIs,
+without attaching external tools.
+
+With `--profile` (or GENERATOR_PROFILE=1), every step of a job runs under
+cProfile and tracemalloc, and its API calls are timed. The job directory
+gets a `profile/` folder with:
+
+    step<N>_<name>.prof       cProfile stats (open with pstats or snakeviz)
+    step<N>_<name>.alloc.txt  top allocation sites of the step, by net size
+    report.txt                per-step wall, CPU and API time, memory, and
+                              the hottest functions of every step
+
+Design:
+- Steps 1 and 3-6 run in worker threads and are profiled there. Step 2
+  runs on the event loop, so its profile also holds whatever else the loop
+  ran meanwhile (other jobs of a batch).
+- Only one cProfile can be active at a time: per thread up to Python 3.11,
+  per process from 3.12 on (it is built on sys.monitoring there, and
+  `enable()` raises ValueError while another profile is active). A step
+  that starts while another one holds the profiler (step 2 overlaps step 1,
+  and jobs of a batch overlap) gets timings and allocations only.
+- tracemalloc is process-wide: it runs while any job is being profiled,
+  and with concurrent jobs a step's allocations include theirs.
+- API time is the summed duration of the step's API calls. Step 2 makes its
+  calls in parallel, so there it can exceed the wall time.
+- The profilers are imported only when profiling is on.
+
+Usage:
+    python use_case_generator.py run --config my_case.json --profile
+    python pipeline_profiler.py ../use_cases/<job_id> [--sort tottime] [--top 30]
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+PROFILE_DIR = "profile"
+TOP_ALLOCATIONS = 25
+TOP_FUNCTIONS = 15
+
+# Step being profiled in the current task or thread, for API call timing
+CURRENT_STEP: ContextVar[Optional["StepProfile"]] = ContextVar("current_step_profile", default=None)
+
+_thread_state = threading.local()
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+def enabled() -> bool:
+    """Whether GENERATOR_PROFILE asks for profiling."""
+    return os.getenv("GENERATOR_PROFILE", "").lower() in ("1", "true", "yes")
+
+def start_tracing():
+    """Start tracemalloc for one more profiled job."""
+    global _tracing_users
+    import tracemalloc
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+
+def stop_tracing():
+    """Stop tracemalloc once no profiled job needs it."""
+    global _tracing_users
+    import tracemalloc
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+
+def allocation_filters():
+    """Leave out allocations of the profilers themselves and of imports."""
+    import cProfile
+    import profile
+    import tracemalloc
+    return [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, profile.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ]
+
+# -------------------------------------------------------------------------------------
+# Step profiles
+# -------------------------------------------------------------------------------------
+
+class StepProfile:
+    """
+    Context manager that profiles one pipeline step in the current thread.
+
+    Records wall and thread CPU time, API call time, a cProfile profile and
+    the step's net allocations, and writes the `.prof` and `.alloc.txt` files.
+    """
+
+    def __init__(self, profiler: "PipelineProfiler", step: int, name: str):
+        self.profiler = profiler
+        self.step = step
+        self.name = name
+        self.prefix = os.path.join(profiler.profile_dir, f"step{step}_{name}")
+        self.cpu_profile = None
+        self.api_calls = 0
+        self.api_seconds = 0.0
+        self.lock = threading.Lock()
+        self.summary: Dict[str, object] = {"step": step, "name": name}
+
+    def __enter__(self):
+        import tracemalloc
+        self.token = CURRENT_STEP.set(self)
+        self.before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        if not getattr(_thread_state, "profiling", False):
+            import cProfile
+            self.cpu_profile = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.cpu_started = time.thread_time()
+        if self.cpu_profile:
+            try:
+                self.cpu_profile.enable()
+                _thread_state.profiling = True
+            except ValueError:
+                # Python 3.12+: another step's profile is active in the process
+                self.cpu_profile = None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        import tracemalloc
+        if self.cpu_profile:
+            try:
+                self.cpu_profile.disable()
+            finally:
+                _thread_state.profiling = False
+        self.summary.update(
+            wall_seconds=time.perf_counter() - self.started,
+            cpu_seconds=time.thread_time() - self.cpu_started,
+            api_calls=self.api_calls,
+            api_seconds=self.api_seconds,
+            peak_bytes=tracemalloc.get_traced_memory()[1],
+            status="failed" if exc_type else "done",
+            cpu_profiled=self.cpu_profile is not None,
+        )
+        CURRENT_STEP.reset(self.token)
+        after = tracemalloc.take_snapshot()
+        self.write(after.filter_traces(allocation_filters()).compare_to(
+            self.before.filter_traces(allocation_filters()), "lineno"
+        ))
+        self.profiler.steps.append(self)
+        return False
+
+    def record_api_call(self, seconds: float):
+        with self.lock:
+            self.api_calls += 1
+            self.api_seconds += seconds
+
+    def write(self, allocation_diff):
+        """Write the cProfile stats and the allocation top-N of this step."""
+        os.makedirs(self.profiler.profile_dir, exist_ok=True)
+        self.summary["net_bytes"] = sum(diff.size_diff for diff in allocation_diff)
+        lines = [f"Step {self.step} ({self.name}): net allocations by line, largest first", ""]
+        for diff in allocation_diff[:self.profiler.top_allocations]:
+            frame = diff.traceback[0]
+            lines.append(
+                f"{format_bytes(diff.size_diff):>10}  {diff.count_diff:+8d} blocks  {frame.filename}:{frame.lineno}"
+            )
+        with open(f"{self.prefix}.alloc.txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        if self.cpu_profile:
+            self.cpu_profile.dump_stats(f"{self.prefix}.prof")
+
+class PipelineProfiler:
+    """Profiles the steps of one job and writes their reports into the job directory."""
+
+    def __init__(self, job_dir: str, top_allocations: int = TOP_ALLOCATIONS):
+        self.profile_dir = os.path.join(job_dir, PROFILE_DIR)
+        self.top_allocations = top_allocations
+        self.steps: List[StepProfile] = []
+        start_tracing()
+
+    def step(self, step: int, name: str) -> StepProfile:
+        """Context manager for one step, entered in the thread that runs it."""
+        return StepProfile(self, step, name)
+
+    def wrap(self, step: int, name: str, func):
+        """`func` profiled as step `step` in whatever thread calls it (for asyncio.to_thread)."""
+        def profiled(*args, **kwargs):
+            with self.step(step, name):
+                return func(*args, **kwargs)
+        return profiled
+
+    def close(self):
+        """Write report.txt and stop tracing for this job."""
+        try:
+            if self.steps:
+                with open(os.path.join(self.profile_dir, "report.txt"), "w", encoding="utf-8") as f:
+                    f.write(format_report(self.profile_dir, [s.summary for s in self.steps]))
+        finally:
+            stop_tracing()
+
+class api_call:
+    """Times an API call for the step being profiled; does nothing when none is."""
+
+    def __enter__(self):
+        self.step = CURRENT_STEP.get()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.step is not None:
+            self.step.record_api_call(time.perf_counter() - self.started)
+        return False
+
+# -------------------------------------------------------------------------------------
+# Reports
+# -------------------------------------------------------------------------------------
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+def top_functions(prof_path: str, sort: str = "cumulative", top: int = TOP_FUNCTIONS) -> str:
+    """The `top` hottest functions of a `.prof` file, as printed by pstats."""
+    import io
+    import pstats
+    stream = io.StringIO()
+    stats = pstats.Stats(prof_path, stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(top)
+    return stream.getvalue().strip()
+
+def format_report(profile_dir: str, summaries: List[dict], sort: str = "cumulative",
+                  top: int = TOP_FUNCTIONS) -> str:
+    """Per-step timing and memory table, then the hottest functions of each step."""
+    lines = [
+        f"{'step':<24} {'wall s':>8} {'cpu s':>8} {'api s':>8} {'calls':>6} {'net mem':>10} {'peak mem':>10}",
+    ]
+    for s in summaries:
+        lines.append(
+            f"{s['step']} {s['name']:<22} {s['wall_seconds']:>8.2f} {s['cpu_seconds']:>8.2f} "
+            f"{s['api_seconds']:>8.2f} {s['api_calls']:>6} {format_bytes(s['net_bytes']):>10} "
+            f"{format_bytes(s['peak_bytes']):>10}" + ("  (failed)" if s["status"] == "failed" else "")
+        )
+    lines.append("")
+    lines.append("cpu s is the CPU time of the thread that ran the step; step 2 shares the event loop thread.")
+    for s in summaries:
+        lines += ["", "=" * 80, f"Step {s['step']} ({s['name']})", "=" * 80]
+        prof_path = os.path.join(profile_dir, f"step{s['step']}_{s['name']}.prof")
+        if s["cpu_profiled"] and os.path.isfile(prof_path):
+            lines.append(top_functions(prof_path, sort, top))
+        else:
+            lines.append("No CPU profile: another step held the profiler when this one started.")
+    return "\n".join(lines) + "\n"
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Print the hottest functions of each profiled step of a job."""
+    parser = argparse.ArgumentParser(description="Show the step profiles written by --profile.")
+    parser.add_argument("job_dir", help="Job directory that was run with --profile")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key (default: cumulative)")
+    parser.add_argument("--top", type=int, default=TOP_FUNCTIONS, help="Functions per step")
+    args = parser.parse_args(argv)
+
+    profile_dir = os.path.join(args.job_dir, PROFILE_DIR)
+    prof_files = sorted(name for name in os.listdir(profile_dir) if name.endswith(".prof")) \
+        if os.path.isdir(profile_dir) else []
+    if not prof_files:
+        print(f"No step profiles in {profile_dir}")
+        return 1
+    for name in prof_files:
+        print("=" * 80)
+        print(name[:-len(".prof")])
+        print("=" * 80)
+        print(top_functions(os.path.join(profile_dir, name), args.sort, args.top))
+        print()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
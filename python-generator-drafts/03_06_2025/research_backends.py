@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Pluggable Research Backends for Step 2 (Deep Research)
+
+`research_question` in the generator asks the configured backend. Every
+backend answers one question in the same shape:
+
+    {"question": str, "answer": str, "citations": [{"url", "title", "snippet", "relevance_score"}]}
+
+Backends:
+
+1. perplexity (default)
+   - Live `sonar-pro` call through the shared Perplexity client, with the
+     titles and snippets of its search results (page titles are fetched
+     later, only for the citations that get rendered)
+   - Registered by the generator, which passes in its Perplexity call;
+     importing use_case_generator here would load a second copy of the
+     script when it runs as `__main__`
+
+2. local
+   - Answers from a locally stored corpus of tool documentation pages
+     (Gemini, Copilot, Cursor and the like), with no network access
+   - Pages are split into overlapping chunks of about 200 words, stored in
+     SQLite with an FTS5 index. BM25 picks the best passages, which become
+     the answer, cited [1], [2], ... by page URL
+   - Answers take milliseconds, so whole batches can research offline
+
+The backend is chosen with RESEARCH_BACKEND (environment or `.env`), or the
+generator's `--research-backend` option. Other backends can be added with
+`register_backend`.
+
+When the backend fails or its circuit breaker is open (circuit_breakers.py),
+the generator tries the route's fallback models, then RESEARCH_FALLBACKS in
+order (default "cache,local"): "cache" is the most similar earlier answer
+from the research reuse cache regardless of age, and any other name is a
+backend. A question nothing can answer is left out of the research rather
+than answered with an error message.
+
+Usage:
+    python research_backends.py add https://ai.google.dev/gemini-api/docs ... [--title T]
+    python research_backends.py add docs/copilot-chat.html --url https://docs.github.com/...
+    python research_backends.py ask "How do I use Gemini in Google Sheets?"
+    python research_backends.py stats
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import hashlib
+import argparse
+import urllib.request
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CORPUS_PATH = os.path.join(REPO_ROOT, "research_corpus.db")
+DEFAULT_BACKEND = "perplexity"
+
+class ResearchError(RuntimeError):
+    """Raised when a backend cannot answer a question."""
+
+# -------------------------------------------------------------------------------------
+# Backend interface and registry
+# -------------------------------------------------------------------------------------
+
+class ResearchBackend:
+    """Answers one research question; subclasses implement `answer`."""
+
+    name = ""
+
+    async def answer(self, question: str, context_prefix: str = "", model: Optional[str] = None) -> dict:
+        """
+        Return {"question", "answer", "citations"} or raise. `model` picks the
+        provider model for backends that have several.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources held by the backend."""
+
+class PerplexityBackend(ResearchBackend):
+    """Live research with Perplexity `sonar-pro` (the generator's original step 2)."""
+
+    name = "perplexity"
+
+    def __init__(self, research: Callable[..., Awaitable[dict]]):
+        # use_case_generator.perplexity_research(question, context_prefix, model)
+        self.research = research
+
+    async def answer(self, question: str, context_prefix: str = "", model: Optional[str] = None) -> dict:
+        return await self.research(question, context_prefix, model)
+
+BackendFactory = Callable[[], ResearchBackend]
+BACKENDS: Dict[str, BackendFactory] = {}
+
+def register_backend(name: str, factory: BackendFactory):
+    """Make a backend available under `name` (RESEARCH_BACKEND / --research-backend)."""
+    BACKENDS[name] = factory
+
+def fallback_names() -> List[str]:
+    """Fallbacks after the configured backend, from RESEARCH_FALLBACKS."""
+    names = os.getenv("RESEARCH_FALLBACKS", "cache,local")
+    return [name.strip() for name in names.split(",") if name.strip()]
+
+def create_backend(name: Optional[str] = None) -> ResearchBackend:
+    """Create the named backend, or the one configured in RESEARCH_BACKEND."""
+    name = name or os.getenv("RESEARCH_BACKEND") or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown research backend '{name}' (available: {', '.join(sorted(BACKENDS))})")
+    return BACKENDS[name]()
+
+# -------------------------------------------------------------------------------------
+# Local documentation corpus
+# -------------------------------------------------------------------------------------
+
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 50
+PASSAGES = 5
+SNIPPET_LENGTH = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    fetched_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    page_id INTEGER NOT NULL REFERENCES pages(id),
+    ordinal INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_page ON chunks(page_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    title, text, content='', tokenize='porter unicode61'
+);
+"""
+
+class TextExtractor(HTMLParser):
+    """Visible text and <title> of an HTML page, one block per line."""
+
+    SKIP = {"script", "style", "nav", "header", "footer", "noscript", "svg"}
+    BLOCKS = {"p", "div", "section", "article", "li", "tr", "br", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "table"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title = ""
+        self.skipping = 0
+        self.in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.skipping += 1
+        elif tag == "title":
+            self.in_title = True
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self.skipping:
+            self.skipping -= 1
+        elif tag == "title":
+            self.in_title = False
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+        elif not self.skipping:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self.parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
+def extract_text(content: str, is_html: bool) -> tuple:
+    """(title, text) of a page; Markdown and plain text are used as they are."""
+    if not is_html:
+        first = next((line.lstrip("# ").strip() for line in content.splitlines() if line.strip()), "")
+        return first, content
+    extractor = TextExtractor()
+    extractor.feed(content)
+    return " ".join(extractor.title.split()), extractor.text()
+
+def chunk_text(text: str, words: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> Iterator[str]:
+    """Overlapping chunks of about `words` words."""
+    tokens = text.split()
+    step = max(words - overlap, 1)
+    for start in range(0, max(len(tokens) - overlap, 1), step):
+        yield " ".join(tokens[start:start + words])
+
+def fetch_page(url: str, timeout: float = 20.0) -> tuple:
+    """Download a page; returns (content, is_html)."""
+    request = urllib.request.Request(url, headers={"User-Agent": "use-case-generator-research-corpus"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        charset = response.headers.get_content_charset() or "utf-8"
+        content_type = response.headers.get_content_type()
+        return response.read().decode(charset, "replace"), content_type == "text/html"
+
+def connect_corpus(path: str = DEFAULT_CORPUS_PATH) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+def add_page(conn: sqlite3.Connection, url: str, content: str, is_html: bool,
+             title: Optional[str] = None) -> int:
+    """
+    Add or replace one page in the corpus. Returns the number of chunks
+    indexed (0 when the stored copy is identical).
+    """
+    sha256 = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    previous = conn.execute("SELECT id, sha256 FROM pages WHERE url = ?", (url,)).fetchone()
+    if previous and previous["sha256"] == sha256:
+        return 0
+    page_title, text = extract_text(content, is_html)
+    title = title or page_title or url
+    with conn:
+        if previous:
+            remove_page(conn, previous["id"])
+        page_id = conn.execute(
+            "INSERT INTO pages (url, title, sha256, fetched_at) VALUES (?, ?, ?, ?)",
+            (url, title, sha256, datetime.now().isoformat()),
+        ).lastrowid
+        count = 0
+        for ordinal, chunk in enumerate(chunk_text(text)):
+            chunk_id = conn.execute(
+                "INSERT INTO chunks (page_id, ordinal, text) VALUES (?, ?, ?)", (page_id, ordinal, chunk)
+            ).lastrowid
+            conn.execute("INSERT INTO chunks_fts (rowid, title, text) VALUES (?, ?, ?)", (chunk_id, title, chunk))
+            count += 1
+    return count
+
+def remove_page(conn: sqlite3.Connection, page_id: int):
+    """Remove a page and its chunks (the contentless FTS index needs the old values)."""
+    title = conn.execute("SELECT title FROM pages WHERE id = ?", (page_id,)).fetchone()["title"]
+    for chunk in conn.execute("SELECT id, text FROM chunks WHERE page_id = ?", (page_id,)).fetchall():
+        conn.execute(
+            "INSERT INTO chunks_fts (chunks_fts, rowid, title, text) VALUES ('delete', ?, ?, ?)",
+            (chunk["id"], title, chunk["text"]),
+        )
+    conn.execute("DELETE FROM chunks WHERE page_id = ?", (page_id,))
+    conn.execute("DELETE FROM pages WHERE id = ?", (page_id,))
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+QUERY_STOP_WORDS = frozenset("""
+a an and are as at be by can do does for from how i in into is it its of on or that the their
+this to use using what when which with you your
+""".split())
+
+def search_passages(conn: sqlite3.Connection, question: str, limit: int = PASSAGES) -> List[sqlite3.Row]:
+    """Best-matching chunks by BM25, title matches weighted double."""
+    terms = sorted({word for word in WORD_RE.findall(question.lower()) if word not in QUERY_STOP_WORDS})
+    if not terms:
+        return []
+    return conn.execute(
+        "SELECT c.text, p.url, p.title, bm25(chunks_fts, 2.0, 1.0) AS rank "
+        "FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid JOIN pages p ON p.id = c.page_id "
+        "WHERE chunks_fts MATCH ? ORDER BY rank LIMIT ?",
+        (" OR ".join(f'"{term}"' for term in terms), limit),
+    ).fetchall()
+
+def compose_answer(question: str, passages: List[sqlite3.Row]) -> dict:
+    """Answer made of the passages, cited [n] by page in order of first use."""
+    numbers: Dict[str, int] = {}
+    citations: List[dict] = []
+    lines = ["Relevant passages from the local documentation corpus:", ""]
+    best = -passages[0]["rank"] if passages else 1.0
+    for passage in passages:
+        url = passage["url"]
+        if url not in numbers:
+            numbers[url] = len(numbers) + 1
+            citations.append({
+                "url": url,
+                "title": passage["title"],
+                "snippet": passage["text"][:SNIPPET_LENGTH],
+                # BM25 ranks are negative; normalise against the best passage
+                "relevance_score": round(-passage["rank"] / best, 3) if best else None,
+            })
+        lines.append(f"- {passage['text']} [{numbers[url]}]")
+    return {"question": question, "answer": "\n".join(lines), "citations": citations}
+
+class LocalDocsBackend(ResearchBackend):
+    """Offline research over the local documentation corpus (BM25 over chunks)."""
+
+    name = "local"
+
+    def __init__(self, corpus_path: Optional[str] = None):
+        self.corpus_path = corpus_path or os.getenv("RESEARCH_CORPUS") or DEFAULT_CORPUS_PATH
+        if not os.path.isfile(self.corpus_path):
+            raise ResearchError(
+                f"No research corpus at {self.corpus_path}; add pages with `research_backends.py add`"
+            )
+        self.conn = connect_corpus(self.corpus_path)
+
+    def ask(self, question: str) -> dict:
+        passages = search_passages(self.conn, question)
+        if not passages:
+            raise ResearchError(f"No passages in the local corpus match: {question}")
+        return compose_answer(question, passages)
+
+    async def answer(self, question: str, context_prefix: str = "", model: Optional[str] = None) -> dict:
+        # SQLite lookups take milliseconds; no need for a worker thread
+        return self.ask(question)
+
+    def close(self):
+        self.conn.close()
+
+register_backend("local", LocalDocsBackend)
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Manage the local research corpus and try backends.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_PATH, help="Corpus database path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    add = subparsers.add_parser("add", help="Add pages by URL (downloaded) or local file")
+    add.add_argument("sources", nargs="+", help="URLs or files (.html, .md, .txt)")
+    add.add_argument("--url", help="Source URL to cite for a single local file")
+    add.add_argument("--title", help="Title to cite for a single page")
+
+    ask = subparsers.add_parser("ask", help="Answer a question from the local corpus")
+    ask.add_argument("question")
+    ask.add_argument("--json", action="store_true")
+
+    subparsers.add_parser("stats", help="Pages and chunks in the corpus")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "ask":
+        try:
+            result = LocalDocsBackend(args.corpus).ask(args.question)
+        except ResearchError as e:
+            print(e)
+            return 1
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            print(result["answer"])
+            for number, citation in enumerate(result["citations"], 1):
+                print(f"[{number}] {citation['title']} - {citation['url']}")
+        return 0
+
+    conn = connect_corpus(args.corpus)
+    try:
+        if args.command == "stats":
+            pages = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            chunks = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            print(f"{pages} pages, {chunks} chunks in {args.corpus}")
+            return 0
+
+        status = 0
+        for source in args.sources:
+            try:
+                if re.match(r"https?://", source):
+                    content, is_html = fetch_page(source)
+                    url = source
+                else:
+                    with open(source, "r", encoding="utf-8", errors="replace") as f:
+                        content = f.read()
+                    is_html = source.lower().endswith((".html", ".htm"))
+                    url = args.url if args.url and len(args.sources) == 1 else os.path.abspath(source)
+                title = args.title if len(args.sources) == 1 else None
+                count = add_page(conn, url, content, is_html, title)
+                print(f"{count:>5} chunks  {url}" if count else f"unchanged  {url}")
+            except (OSError, ValueError) as e:
+                print(f"FAILED  {source}: {e}")
+                status = 1
+        return status
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Research Reuse Cache for Step 2 (Deep Research)
+
+Step-1 questions for related use cases repeat a lot: every Gemini for
+Workspace config asks how Gemini 2.0 Flash behaves in Workspace. This cache
+answers such questions from earlier `deep_research.json` results instead of
+paying for another `sonar-pro` call.
+
+Design:
+- Every answered question in the library's `deep_research.json` files is
+  stored as one row: question, answer, its citations, and when it was
+  answered. Rows live in `library_index.db`, next to an FTS5 index of the
+  questions. Files are re-read only when their mtime or size changes.
+- A lookup takes the top BM25 candidates from FTS5 (Porter-stemmed), then
+  re-scores them by cosine similarity over word unigram and bigram sets, as
+  in near_duplicates.py. Everything runs offline.
+- Step-1 questions all follow one template ("How can the capabilities of
+  <tool> be leveraged to <objective>..."), so a question about another use
+  case can still share most of its words: swapping "project plans" for
+  "spreadsheet formulas" scores 0.75. Each answer is therefore stored with
+  its use case's topic (title and objective, which the research prompt was
+  given too), and is only reused for a topic at least TOPIC_THRESHOLD
+  similar. Calibrated on the library: different use cases' topics score at
+  most 0.34, distinct questions of one use case at most 0.34, and close
+  rewordings of a question 0.66 and up.
+- The cache is refreshed once per job (`refresh_cache`); lookups then only
+  query the index and can run in parallel.
+- Only answers younger than the freshness window are reused, and never
+  answers that were research errors. A reused answer keeps its original
+  timestamp, so reuse never extends its freshness.
+- `deep_research.json` records, per question, when it was answered, how many
+  of the combined citations belong to it, and where a reused answer came
+  from. Older files without that record are split on their "Q:/A:" blocks,
+  and their citations are attributed from the answers' [n] references when
+  that is unambiguous (see `legacy_citation_counts`).
+
+Settings come from the environment (or `.env`):
+    RESEARCH_REUSE=0                    disable reuse
+    RESEARCH_REUSE_MAX_AGE_DAYS=30      freshness window
+    RESEARCH_REUSE_THRESHOLD=0.6        minimum question similarity
+    RESEARCH_FALLBACK_THRESHOLD=0.5     minimum similarity when the cache stands in
+                                        for failed research (any age)
+
+Usage:
+    python research_cache.py update
+    python research_cache.py lookup "How does Gemini 2.0 Flash ..." [--topic "Create a project plan"] [--threshold 0.6]
+    python research_cache.py stats
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+import library_index
+from near_duplicates import job_config, normalize_tokens, shingles
+
+REPO_ROOT = library_index.REPO_ROOT
+DEFAULT_DB_PATH = library_index.DEFAULT_DB_PATH
+DEFAULT_MAX_AGE_DAYS = 30.0
+DEFAULT_THRESHOLD = 0.6
+TOPIC_THRESHOLD = 0.5
+CANDIDATES = 20
+ERROR_PREFIX = "Error during research"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS research_answers (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    citations TEXT NOT NULL,
+    answered_at TEXT NOT NULL,
+    topic TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS research_answers_source ON research_answers(source);
+CREATE INDEX IF NOT EXISTS research_answers_answered_at ON research_answers(answered_at);
+
+CREATE TABLE IF NOT EXISTS research_sources (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS research_answers_fts USING fts5(
+    question, content='research_answers', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS research_answers_ai AFTER INSERT ON research_answers BEGIN
+    INSERT INTO research_answers_fts(rowid, question) VALUES (new.id, new.question);
+END;
+CREATE TRIGGER IF NOT EXISTS research_answers_ad AFTER DELETE ON research_answers BEGIN
+    INSERT INTO research_answers_fts(research_answers_fts, rowid, question) VALUES ('delete', old.id, old.question);
+END;
+"""
+
+# -------------------------------------------------------------------------------------
+# Settings
+# -------------------------------------------------------------------------------------
+
+def reuse_settings() -> Optional[dict]:
+    """Reuse settings from the environment, or None when reuse is disabled."""
+    if os.getenv("RESEARCH_REUSE", "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    return {
+        "max_age_days": float(os.getenv("RESEARCH_REUSE_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS)),
+        "threshold": float(os.getenv("RESEARCH_REUSE_THRESHOLD", DEFAULT_THRESHOLD)),
+    }
+
+def fallback_settings() -> dict:
+    """
+    Settings for answering from the cache when research fails: any age, and
+    a looser match (RESEARCH_FALLBACK_THRESHOLD, default 0.5).
+    """
+    return {
+        "max_age_days": float(os.getenv("RESEARCH_FALLBACK_MAX_AGE_DAYS", "3650")),
+        "threshold": float(os.getenv("RESEARCH_FALLBACK_THRESHOLD", "0.5")),
+    }
+
+# -------------------------------------------------------------------------------------
+# Reading deep_research.json
+# -------------------------------------------------------------------------------------
+
+QUESTION_RE = re.compile(r"(?m)^Q: ")
+REFERENCE_RE = re.compile(r"\[(\d+)\]")
+
+def split_blocks(content: str) -> List[tuple]:
+    """(question, answer) pairs from the combined "Q: ...\\nA: ..." content."""
+    pairs = []
+    for block in QUESTION_RE.split(content)[1:]:
+        question, separator, answer = block.partition("\nA: ")
+        if separator:
+            pairs.append((question.strip(), answer.strip()))
+    return pairs
+
+def job_metadata(job_dir: str) -> dict:
+    """A job's metadata.json, or {}."""
+    try:
+        with open(os.path.join(job_dir, "metadata.json"), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return metadata if isinstance(metadata, dict) else {}
+
+def job_created_at(job_dir: str) -> Optional[str]:
+    """`created_at` from a job's metadata.json, if any."""
+    return job_metadata(job_dir).get("created_at")
+
+def topic_text(config: Optional[dict]) -> str:
+    """The topic research answers are reused within: a use case's title and objective."""
+    config = config or {}
+    return "\n".join(str(config.get(field) or "").strip() for field in ("title", "objective")).strip()
+
+def job_topic(job_dir: str) -> str:
+    """The topic of a saved job, from the config it was generated from."""
+    return topic_text(job_config(job_dir))
+
+def legacy_citation_counts(pairs: List[tuple], total: int) -> Optional[List[int]]:
+    """
+    How many of the combined citations belong to each answer of an older file.
+
+    Perplexity numbers each answer's citations from [1]. Either the highest
+    reference of each answer adds up to the total, or the citations split
+    evenly with no answer referencing past its share. Otherwise the split
+    is unknown and None is returned.
+    """
+    if not pairs:
+        return None
+    highest = [max((int(n) for n in REFERENCE_RE.findall(answer)), default=0) for _, answer in pairs]
+    if sum(highest) == total:
+        return highest
+    share, remainder = divmod(total, len(pairs))
+    if not remainder and all(reference <= share for reference in highest):
+        return [share] * len(pairs)
+    return None
+
+def read_research_file(path: str) -> List[dict]:
+    """
+    Reusable answers in one `deep_research.json`, each a dict with question,
+    answer, citations, answered_at and the job's topic.
+
+    Research errors, reused answers (their original is indexed already) and
+    legacy answers whose citations can't be attributed are left out.
+    """
+    content = library_index.read_partial_result(path)
+    if not content:
+        return []
+    try:
+        research = json.loads(content)
+    except json.JSONDecodeError:
+        return []
+    if not isinstance(research, dict):
+        return []
+    pairs = split_blocks(research.get("content") or "")
+    citations = research.get("citations") or []
+    questions = research.get("questions")
+
+    if questions and len(questions) == len(pairs):
+        counts = [entry.get("citation_count", 0) for entry in questions]
+    else:
+        counts = legacy_citation_counts(pairs, len(citations))
+        if counts is None:
+            return []
+        fallback = job_created_at(os.path.dirname(path)) or datetime.fromtimestamp(os.path.getmtime(path)).isoformat()
+        questions = [{"answered_at": fallback} for _ in pairs]
+
+    topic = job_topic(os.path.dirname(path))
+    entries = []
+    offset = 0
+    for (question, answer), count, info in zip(pairs, counts, questions):
+        own_citations = citations[offset:offset + count]
+        offset += count
+        if answer.startswith(ERROR_PREFIX) or info.get("reused_from"):
+            continue
+        entries.append({
+            "question": question,
+            "answer": answer,
+            "citations": own_citations,
+            "answered_at": info.get("answered_at") or "",
+            "topic": topic,
+        })
+    return entries
+
+def iter_research_files(dirs: List[str]) -> Iterator[str]:
+    """Every `deep_research.json` one level below the given library directories."""
+    for base in dirs:
+        if not os.path.isdir(base):
+            continue
+        with os.scandir(base) as entries:
+            for entry in entries:
+                path = os.path.join(entry.path, "deep_research.json")
+                if entry.is_dir() and os.path.isfile(path):
+                    yield path
+
+# -------------------------------------------------------------------------------------
+# Index
+# -------------------------------------------------------------------------------------
+
+def connect(db_path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
+    """Open the library index database with the research tables in place."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(research_answers)")}
+    if "topic" not in columns:
+        # Indexed before answers carried their topic: re-read every file
+        with conn:
+            conn.execute("ALTER TABLE research_answers ADD COLUMN topic TEXT NOT NULL DEFAULT ''")
+            conn.execute("DELETE FROM research_sources")
+    return conn
+
+def default_dirs(root: str = REPO_ROOT) -> List[str]:
+    return [os.path.join(root, relative) for relative in library_index.GENERATED_DIRS]
+
+def update_cache(conn: sqlite3.Connection, dirs: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Index answers from new or changed `deep_research.json` files; drop those
+    of files that disappeared. Returns counts of files and answers indexed.
+    """
+    dirs = dirs or default_dirs()
+    known = {row["path"]: row for row in conn.execute("SELECT path, mtime_ns, size FROM research_sources")}
+    counts = {"files": 0, "answers": 0, "removed": 0}
+    seen = set()
+    with conn:
+        for path in iter_research_files(dirs):
+            path = os.path.abspath(path)
+            seen.add(path)
+            stat = os.stat(path)
+            previous = known.get(path)
+            if previous and previous["mtime_ns"] == stat.st_mtime_ns and previous["size"] == stat.st_size:
+                continue
+            conn.execute("DELETE FROM research_answers WHERE source = ?", (path,))
+            entries = read_research_file(path)
+            conn.executemany(
+                "INSERT INTO research_answers (source, question, answer, citations, answered_at, topic) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (path, entry["question"], entry["answer"], json.dumps(entry["citations"]),
+                     entry["answered_at"], entry["topic"])
+                    for entry in entries
+                ],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO research_sources (path, mtime_ns, size) VALUES (?, ?, ?)",
+                (path, stat.st_mtime_ns, stat.st_size),
+            )
+            counts["files"] += 1
+            counts["answers"] += len(entries)
+        # Only forget sources under the directories that were scanned
+        scanned = tuple(os.path.abspath(base) + os.sep for base in dirs)
+        for path in set(known) - seen:
+            if path.startswith(scanned):
+                conn.execute("DELETE FROM research_answers WHERE source = ?", (path,))
+                conn.execute("DELETE FROM research_sources WHERE path = ?", (path,))
+                counts["removed"] += 1
+    return counts
+
+def question_similarity(first: str, second: str) -> float:
+    """Cosine similarity of the word unigram and bigram sets of two questions."""
+    a, b = shingles(first), shingles(second)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / math.sqrt(len(a) * len(b))
+
+def lookup(conn: sqlite3.Connection, question: str, max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+           threshold: float = DEFAULT_THRESHOLD, topic: Optional[str] = None) -> Optional[dict]:
+    """
+    The stored answer whose question is most similar to `question`, if it
+    is at least `threshold` similar and answered within `max_age_days`.
+    With a `topic`, only answers of a topic at least TOPIC_THRESHOLD similar
+    (question_similarity of the two topics) are considered.
+    """
+    terms = sorted(set(normalize_tokens(question)))
+    if not terms:
+        return None
+    cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+    rows = conn.execute(
+        "SELECT a.id, a.source, a.question, a.answer, a.citations, a.answered_at, a.topic "
+        "FROM research_answers_fts JOIN research_answers a ON a.id = research_answers_fts.rowid "
+        "WHERE research_answers_fts MATCH ? AND a.answered_at >= ? "
+        "ORDER BY bm25(research_answers_fts) LIMIT ?",
+        (" OR ".join(f'"{term}"' for term in terms), cutoff, CANDIDATES),
+    ).fetchall()
+    best, best_score = None, threshold
+    for row in rows:
+        if topic and question_similarity(topic, row["topic"]) < TOPIC_THRESHOLD:
+            continue
+        score = question_similarity(question, row["question"])
+        if score >= best_score:
+            best, best_score = row, score
+    if best is None:
+        return None
+    return {
+        "question": best["question"],
+        "answer": best["answer"],
+        "citations": json.loads(best["citations"]),
+        "answered_at": best["answered_at"],
+        "source": best["source"],
+        "similarity": round(best_score, 3),
+    }
+
+def refresh_cache(extra_dirs: Optional[List[str]] = None, db_path: str = DEFAULT_DB_PATH) -> Dict[str, int]:
+    """Index new or changed answers of the library and of `extra_dirs`."""
+    conn = connect(db_path)
+    try:
+        dirs = default_dirs()
+        known = {os.path.abspath(base) for base in dirs}
+        dirs += [base for base in extra_dirs or [] if os.path.abspath(base) not in known]
+        return update_cache(conn, dirs)
+    finally:
+        conn.close()
+
+def lookup_many(questions: List[str], settings: dict, extra_dirs: Optional[List[str]] = None,
+                db_path: str = DEFAULT_DB_PATH, topic: Optional[str] = None,
+                refresh: bool = True) -> Dict[str, dict]:
+    """
+    Refresh the cache (unless `refresh` is False because the caller already
+    did), then look up each question. Returns the hits keyed by question;
+    questions without a fresh, similar enough answer are absent.
+    """
+    if refresh:
+        refresh_cache(extra_dirs, db_path)
+    conn = connect(db_path)
+    try:
+        hits = {}
+        for question in questions:
+            hit = lookup(conn, question, settings["max_age_days"], settings["threshold"], topic)
+            if hit:
+                hits[question] = hit
+        return hits
+    finally:
+        conn.close()
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Reuse earlier deep research answers for similar questions.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Library index database path")
+    parser.add_argument("--dirs", nargs="*", help="Job directories to index (default: the library)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("update", help="Index answers from new or changed deep_research.json files")
+
+    lookup_parser = subparsers.add_parser("lookup", help="Find a reusable answer for a question")
+    lookup_parser.add_argument("question")
+    lookup_parser.add_argument("--max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS)
+    lookup_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    lookup_parser.add_argument("--topic", help="Only reuse answers of a similar use case (title and objective)")
+
+    subparsers.add_parser("stats", help="Count indexed answers by age")
+
+    args = parser.parse_args(argv)
+    conn = connect(args.db)
+    try:
+        counts = update_cache(conn, args.dirs or None)
+        if args.command == "update":
+            print(f"{counts['files']} files read, {counts['answers']} answers indexed, {counts['removed']} removed")
+        elif args.command == "lookup":
+            hit = lookup(conn, args.question, args.max_age_days, args.threshold, args.topic)
+            if not hit:
+                print("No reusable answer")
+                return 1
+            print(f"{hit['similarity']:.2f}  answered {hit['answered_at']}  ({hit['source']})")
+            print(f"Q: {hit['question']}")
+            print(f"A: {hit['answer'][:500]}")
+            print(f"{len(hit['citations'])} citations")
+        else:
+            total = conn.execute("SELECT COUNT(*) FROM research_answers").fetchone()[0]
+            cutoff = (datetime.now() - timedelta(days=DEFAULT_MAX_AGE_DAYS)).isoformat()
+            fresh = conn.execute(
+                "SELECT COUNT(*) FROM research_answers WHERE answered_at >= ?", (cutoff,)
+            ).fetchone()[0]
+            print(f"{total} answers from {conn.execute('SELECT COUNT(*) FROM research_sources').fetchone()[0]} "
+                  f"files; {fresh} answered in the last {DEFAULT_MAX_AGE_DAYS:.0f} days")
+        return 0
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
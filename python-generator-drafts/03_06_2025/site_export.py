@@ -0,0 +1,1031 @@
+#!/usr/bin/env python3
+"""
+Static Site Export of the Use Case Library
+
+Turns the whole library into a static HTML site that needs no server:
+generated job directories (rendered from their saved JSON) and the
+hand-written Markdown in `generic-use-cases/` and `coding-assistant-use-cases/`.
+
+Output layout:
+
+    site/
+      index.html                     Search box and a listing of every use case
+      assets/style.css, search.js    Shared assets
+      search/meta.json               Shard list and index version
+      search/docs.json               Title, URL, labels and summary per use case
+      search/shard-<xx>.json         Inverted index for terms starting with <xx>
+      <section>/<slug>/index.html    One page per use case, plus the images and
+                                     files it links to (per-page assets)
+
+Search runs entirely in the browser: the query's terms pick which shards to
+fetch (the first two characters of a term name its shard), and results are
+ranked by field-weighted term frequency times inverse document frequency,
+with the same field weights as the SQLite index. The last word of a query
+also matches as a prefix.
+
+Builds are incremental and parallel:
+- Pages are built across processes, and each page records a hash of its
+  inputs (source files, referenced assets, exporter and renderer versions)
+  in `.build-manifest.json`
+- Unchanged pages are skipped; their index terms come from the manifest
+- Shard files are rewritten only when their content changes, and pages of
+  deleted use cases are removed
+- A full build of 10,000 use cases takes about a minute on one core and
+  should stay within 30 s on four (`benchmarks.py site`)
+
+Page content is model output, so it is treated as untrusted: raw HTML keeps
+only allowlisted tags and attributes (the rest is escaped), and links and
+images keep only http(s), mailto and relative URLs.
+
+Usage:
+    python site_export.py [--out DIR] [--root ROOT] [--workers N] [--force]
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import html
+import time
+import shutil
+import hashlib
+import argparse
+from collections import Counter
+from urllib.parse import quote, unquote
+from typing import Dict, List, Optional
+
+import library_index
+import markdown_render
+
+REPO_ROOT = library_index.REPO_ROOT
+DEFAULT_SITE_DIR = os.path.join(REPO_ROOT, "site")
+MANIFEST_FILENAME = ".build-manifest.json"
+
+# Bump when page layout or index format changes in a way the templates don't show
+EXPORTER_VERSION = "2"
+
+# Output section per library directory
+GENERATED_SECTION = "generated"
+HAND_WRITTEN_SECTIONS = {
+    "generic-use-cases": "generic",
+    "coding-assistant-use-cases": "coding-assistant",
+}
+
+# -------------------------------------------------------------------------------------
+# Markdown to HTML
+# -------------------------------------------------------------------------------------
+
+FENCE_RE = re.compile(r"^(\s*)(`{3,}|~{3,})\s*([^`\s]*)")
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+HR_RE = re.compile(r"^\s{0,3}([-*_])(\s*\1){2,}\s*$")
+LIST_RE = re.compile(r"^(\s*)([-*+]|\d{1,9}[.)])(\s+|$)")
+QUOTE_RE = re.compile(r"^\s{0,3}>\s?")
+HTML_BLOCK_RE = re.compile(r"^\s{0,3}(<!--|</?[A-Za-z][\w-]*(\s|/?>|$))")
+TABLE_RULE_RE = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+
+CODE_SPAN_RE = re.compile(r"(`+)(.+?)\1")
+AUTOLINK_RE = re.compile(r"<(https?://[^\s<>]+)>")
+INLINE_HTML_RE = re.compile(r"</?[A-Za-z][\w-]*(\s[^<>]*)?/?>|<!--.*?-->")
+# A bare destination may contain balanced parentheses: [x](https://en.wikipedia.org/wiki/Foo_(bar))
+LINK_DEST = r"(<[^>]*>|(?:[^()\s]|\([^()\s]*\))*)"
+IMAGE_RE = re.compile(r"!\[([^\]]*)\]\(\s*" + LINK_DEST + r"(?:\s+\"([^\"]*)\")?\s*\)")
+LINK_RE = re.compile(r"\[((?:[^\[\]]|\[[^\]]*\])+)\]\(\s*" + LINK_DEST + r"(?:\s+\"([^\"]*)\")?\s*\)")
+BOLD_RE = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*|__(?=\S)(.+?)(?<=\S)__")
+STAR_ITALIC_RE = re.compile(r"(?<![*\w])\*(?=\S)(.+?)(?<=\S)\*(?!\*)")
+UNDERSCORE_ITALIC_RE = re.compile(r"(?<![_\w])_(?=\S)(.+?)(?<=\S)_(?![_\w])")
+BARE_URL_RE = re.compile(r"(?<![\"'=>])\bhttps?://[^\s<>\"']+[^\s<>\"'.,;:!?)]")
+PLACEHOLDER_RE = re.compile("\x00(\\d+)\x00")
+HTML_TAG_RE = re.compile(r"<(/?)([A-Za-z][\w-]*)(\s[^<>]*)?(/?)>|<!--.*?-->", re.DOTALL)
+HTML_ATTR_RE = re.compile(r"""([A-Za-z_:][\w:.-]*)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s"'=<>`]+))?""")
+URL_SCHEME_RE = re.compile(r"^([A-Za-z][A-Za-z0-9+.-]*):")
+# First characters that can start a non-paragraph block; plain text lines skip the block regexes
+BLOCK_START_CHARS = frozenset("`~#-*_>+<0123456789")
+
+def slugify(text: str) -> str:
+    """Lowercase, hyphen-separated ASCII slug."""
+    slug = re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+    return slug or "page"
+
+# Page content comes from model output, so raw HTML is rebuilt from an allowlist:
+# these tags with these attributes, and URLs only with the schemes below
+SAFE_URL_SCHEMES = frozenset({"http", "https", "mailto"})
+URL_ATTRIBUTES = frozenset({"href", "src"})
+ALLOWED_TAGS = {
+    "a": {"href", "title"},
+    "img": {"src", "alt", "title", "width", "height", "align"},
+    "video": {"src", "width", "height", "controls", "loop", "muted", "poster"},
+    "source": {"src", "type"},
+    "p": {"align"},
+    "div": {"align"},
+    "details": {"open"},
+    **{tag: set() for tag in ("summary", "span", "br", "hr", "b", "i", "em", "strong", "code", "pre",
+                              "kbd", "sub", "sup", "ul", "ol", "li", "blockquote", "center")},
+}
+
+def safe_url(url: str) -> bool:
+    """True for relative URLs and http(s)/mailto ones; rejects javascript:, data: and the like."""
+    # Browsers ignore whitespace and control characters inside a scheme, so do the same
+    bare = re.sub(r"[\x00-\x20\x7f]", "", unquote(url))
+    scheme = URL_SCHEME_RE.match(bare)
+    return not scheme or scheme.group(1).lower() in SAFE_URL_SCHEMES
+
+def link_target(raw: str) -> str:
+    """Normalise a Markdown link destination (`<with spaces>` or bare) for an href ("" if unsafe)."""
+    if raw.startswith("<") and raw.endswith(">"):
+        raw = raw[1:-1]
+    return quote(raw, safe=":/?#[]@!$&'()*+,;=%~") if safe_url(raw) else ""
+
+def sanitize_tag(tag: str) -> str:
+    """Rebuild one HTML tag from the allowlist; other tags are escaped and comments dropped."""
+    match = HTML_TAG_RE.fullmatch(tag)
+    if not match or not match.group(2):
+        return "" if tag.startswith("<!--") else html.escape(tag)
+    closing, name, attributes, self_closing = match.group(1), match.group(2).lower(), match.group(3), match.group(4)
+    if name not in ALLOWED_TAGS:
+        return html.escape(tag)
+    if closing:
+        return f"</{name}>"
+    kept = []
+    for attribute in HTML_ATTR_RE.finditer(attributes or ""):
+        key, value = attribute.group(1).lower(), attribute.group(2)
+        if key not in ALLOWED_TAGS[name]:
+            continue
+        if value is None:
+            kept.append(key)
+            continue
+        value = html.unescape(value[1:-1] if value[0] in "\"'" else value)
+        if key in URL_ATTRIBUTES and not safe_url(value):
+            continue
+        kept.append(f'{key}="{html.escape(value)}"')
+    return f"<{name}{''.join(' ' + item for item in kept)}{' /' if self_closing else ''}>"
+
+def sanitize_html(fragment: str) -> str:
+    """Escape the text of a raw HTML block and rebuild its tags from the allowlist."""
+    out, last = [], 0
+    for match in HTML_TAG_RE.finditer(fragment):
+        out.append(html.escape(fragment[last:match.start()], quote=False))
+        out.append(sanitize_tag(match.group(0)))
+        last = match.end()
+    out.append(html.escape(fragment[last:], quote=False))
+    return "".join(out)
+
+def render_inline(text: str) -> str:
+    """Render inline Markdown: code, links, images, emphasis, autolinks and inline HTML."""
+    # Each pass runs only if its marker occurs; most lines are plain text
+    if not any(marker in text for marker in ("`", "<", "[", "*", "_", "://")):
+        return html.escape(text, quote=False)
+    stash: List[str] = []
+
+    def keep(fragment: str) -> str:
+        stash.append(fragment)
+        return f"\x00{len(stash) - 1}\x00"
+
+    if "`" in text:
+        text = CODE_SPAN_RE.sub(lambda m: keep(f"<code>{html.escape(m.group(2).strip())}</code>"), text)
+    if "<" in text:
+        text = AUTOLINK_RE.sub(lambda m: keep(f'<a href="{html.escape(m.group(1))}">{html.escape(m.group(1))}</a>'), text)
+        text = INLINE_HTML_RE.sub(lambda m: keep(sanitize_tag(m.group(0))), text)
+    if "](" in text:
+        text = IMAGE_RE.sub(lambda m: keep(render_image(m)), text)
+        text = LINK_RE.sub(lambda m: keep(render_link(m)), text)
+
+    text = html.escape(text, quote=False)
+    if "**" in text or "__" in text:
+        text = BOLD_RE.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+    if "*" in text:
+        text = STAR_ITALIC_RE.sub(lambda m: f"<em>{m.group(1)}</em>", text)
+    if "_" in text:
+        text = UNDERSCORE_ITALIC_RE.sub(lambda m: f"<em>{m.group(1)}</em>", text)
+    if "://" in text:
+        text = BARE_URL_RE.sub(lambda m: f'<a href="{m.group(0)}">{m.group(0)}</a>', text)
+
+    # Restore stashed fragments (links may contain other stashed fragments)
+    while "\x00" in text:
+        text = PLACEHOLDER_RE.sub(lambda m: stash[int(m.group(1))], text)
+    return text
+
+def render_image(match: re.Match) -> str:
+    """An `<img>` for an IMAGE_RE match; just the alt text if the source is unsafe."""
+    target = link_target(match.group(2))
+    if not target and match.group(2):
+        return html.escape(match.group(1))
+    return (f'<img src="{html.escape(target)}" alt="{html.escape(match.group(1))}"'
+            + (f' title="{html.escape(match.group(3))}"' if match.group(3) else "") + ">")
+
+def render_link(match: re.Match) -> str:
+    """An `<a>` for a LINK_RE match; just the link text if the destination is unsafe."""
+    target = link_target(match.group(2))
+    if not target and match.group(2):
+        return render_inline(match.group(1))
+    return (f'<a href="{html.escape(target)}"'
+            + (f' title="{html.escape(match.group(3))}"' if match.group(3) else "")
+            + f">{render_inline(match.group(1))}</a>")
+
+def render_paragraph(lines: List[str]) -> str:
+    parts = []
+    for index, line in enumerate(lines):
+        hard_break = line.endswith("  ") and index < len(lines) - 1
+        parts.append(render_inline(line.strip()) + ("<br>" if hard_break else ""))
+    return "<p>" + "\n".join(parts) + "</p>"
+
+def split_row(line: str) -> List[str]:
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split("|")]
+
+def is_block_start(line: str) -> bool:
+    """Whether a line starts a new block (so it can't continue a paragraph)."""
+    if line.lstrip()[:1] not in BLOCK_START_CHARS:
+        return False
+    return bool(
+        FENCE_RE.match(line) or HEADING_RE.match(line.strip()) or HR_RE.match(line)
+        or QUOTE_RE.match(line) or LIST_RE.match(line) or HTML_BLOCK_RE.match(line)
+    )
+
+def indentation(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+def render_list(lines: List[str], start: int) -> tuple:
+    """Render the list starting at lines[start]; returns (html, next index)."""
+    first = LIST_RE.match(lines[start])
+    base_indent = len(first.group(1))
+    ordered = first.group(2)[0].isdigit()
+    items: List[List[str]] = []
+    loose = False
+    index = start
+    content_column = 0
+
+    while index < len(lines):
+        line = lines[index]
+        marker = LIST_RE.match(line)
+        if marker and len(marker.group(1)) < max(content_column, base_indent + 1) \
+                and marker.group(2)[0].isdigit() == ordered:
+            # A sibling item at this level
+            content_column = len(marker.group(1)) + len(marker.group(2)) + max(len(marker.group(3)), 1)
+            items.append([line[content_column:] if len(line) > content_column else ""])
+            index += 1
+            continue
+        if not line.strip():
+            # A blank line continues the list only if more item content follows
+            ahead = index + 1
+            while ahead < len(lines) and not lines[ahead].strip():
+                ahead += 1
+            if ahead == len(lines):
+                break
+            following = lines[ahead]
+            next_marker = LIST_RE.match(following)
+            if indentation(following) >= content_column or (
+                    next_marker and len(next_marker.group(1)) < content_column
+                    and next_marker.group(2)[0].isdigit() == ordered):
+                loose = loose or bool(next_marker and len(next_marker.group(1)) < content_column)
+                items[-1].append("")
+                index += 1
+                continue
+            break
+        if indentation(line) >= content_column:
+            items[-1].append(line[content_column:])
+        elif marker or is_block_start(line):
+            break
+        else:
+            # Lazy paragraph continuation
+            items[-1].append(line.strip())
+        index += 1
+
+    tag = "ol" if ordered else "ul"
+    start_number = int(first.group(2)[:-1]) if ordered else 1
+    out = [f'<{tag} start="{start_number}">' if ordered and start_number != 1 else f"<{tag}>"]
+    for item_lines in items:
+        while item_lines and not item_lines[-1].strip():
+            item_lines.pop()
+        if len(item_lines) == 1 and not is_block_start(item_lines[0]):
+            # Most items are a single line of text
+            text = render_inline(item_lines[0].strip())
+            out.append(f"<li><p>{text}</p></li>" if loose else f"<li>{text}</li>")
+            continue
+        blocks = render_blocks(item_lines)
+        if not loose:
+            blocks = [b[3:-4] if b.startswith("<p>") and b.endswith("</p>") else b for b in blocks]
+        out.append("<li>" + "\n".join(blocks) + "</li>")
+    out.append(f"</{tag}>")
+    return "\n".join(out), index
+
+def render_blocks(lines: List[str]) -> List[str]:
+    """Render block-level Markdown to a list of HTML blocks."""
+    blocks: List[str] = []
+    paragraph: List[str] = []
+    index = 0
+
+    def flush():
+        if paragraph:
+            blocks.append(render_paragraph(paragraph))
+            paragraph.clear()
+
+    while index < len(lines):
+        line = lines[index]
+        stripped = line.strip()
+
+        if not stripped:
+            flush()
+            index += 1
+            continue
+
+        if stripped[0] not in BLOCK_START_CHARS and "|" not in line:
+            paragraph.append(line)
+            index += 1
+            continue
+
+        fence = FENCE_RE.match(line)
+        if fence:
+            flush()
+            indent, marker, info = len(fence.group(1)), fence.group(2), fence.group(3)
+            code: List[str] = []
+            index += 1
+            while index < len(lines):
+                closing = FENCE_RE.match(lines[index])
+                # Only a bare fence of the same kind closes the block (CommonMark)
+                if closing and closing.group(2)[0] == marker[0] and len(closing.group(2)) >= len(marker) \
+                        and not lines[index].strip()[len(closing.group(2)):].strip():
+                    break
+                code_line = lines[index]
+                code.append(code_line[min(indent, indentation(code_line)):])
+                index += 1
+            index += 1
+            language = f' class="language-{html.escape(info)}"' if info else ""
+            blocks.append(f"<pre><code{language}>{html.escape(chr(10).join(code))}</code></pre>")
+            continue
+
+        heading = HEADING_RE.match(stripped)
+        if heading and not line.startswith("    "):
+            flush()
+            level = len(heading.group(1))
+            blocks.append(f'<h{level} id="{slugify(heading.group(2))}">{render_inline(heading.group(2))}</h{level}>')
+            index += 1
+            continue
+
+        if HR_RE.match(line) and not paragraph:
+            blocks.append("<hr>")
+            index += 1
+            continue
+
+        if QUOTE_RE.match(line):
+            flush()
+            quoted: List[str] = []
+            while index < len(lines) and lines[index].strip() and (
+                    QUOTE_RE.match(lines[index]) or not is_block_start(lines[index])):
+                quoted.append(QUOTE_RE.sub("", lines[index], count=1))
+                index += 1
+            blocks.append("<blockquote>\n" + "\n".join(render_blocks(quoted)) + "\n</blockquote>")
+            continue
+
+        if LIST_RE.match(line) and (not paragraph or LIST_RE.match(line).group(3)):
+            flush()
+            rendered, index = render_list(lines, index)
+            blocks.append(rendered)
+            continue
+
+        if HTML_BLOCK_RE.match(line) and not paragraph:
+            raw: List[str] = []
+            while index < len(lines) and lines[index].strip():
+                raw.append(lines[index])
+                index += 1
+            blocks.append(sanitize_html("\n".join(raw)))
+            continue
+
+        if "|" in line and index + 1 < len(lines) and TABLE_RULE_RE.match(lines[index + 1]) \
+                and "-" in lines[index + 1]:
+            flush()
+            header = split_row(line)
+            rows = []
+            index += 2
+            while index < len(lines) and "|" in lines[index] and lines[index].strip():
+                rows.append(split_row(lines[index]))
+                index += 1
+            out = ["<table>", "<thead><tr>" + "".join(f"<th>{render_inline(c)}</th>" for c in header) + "</tr></thead>", "<tbody>"]
+            for row in rows:
+                out.append("<tr>" + "".join(f"<td>{render_inline(c)}</td>" for c in row) + "</tr>")
+            out.append("</tbody>\n</table>")
+            blocks.append("\n".join(out))
+            continue
+
+        paragraph.append(line)
+        index += 1
+
+    flush()
+    return blocks
+
+def markdown_to_html(text: str) -> str:
+    """Render the Markdown used in the library to HTML (raw HTML is sanitized, see ALLOWED_TAGS)."""
+    return "\n".join(render_blocks(text.replace("\r\n", "\n").replace("\t", "    ").split("\n"))) + "\n"
+
+# -------------------------------------------------------------------------------------
+# Templates and assets
+# -------------------------------------------------------------------------------------
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title} | Use Case Library</title>
+<link rel="stylesheet" href="{root}assets/style.css">
+</head>
+<body>
+<nav><a href="{root}index.html">&larr; Use Case Library</a></nav>
+<header class="labels">{labels}</header>
+<main>
+{body}</main>
+</body>
+</html>
+"""
+
+LABEL = '<span class="label">{name}: {value}</span>'
+
+INDEX_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Use Case Library</title>
+<link rel="stylesheet" href="assets/style.css">
+</head>
+<body>
+<main>
+<h1>Use Case Library</h1>
+<p>{count} use cases. Search runs in your browser.</p>
+<form id="search-form" role="search" onsubmit="return false">
+<input id="search" type="search" placeholder="Search use cases" autocomplete="off" autofocus>
+<select id="family"><option value="">All families</option>
+{family_options}</select>
+</form>
+<p id="status"></p>
+<ol id="results"></ol>
+<div id="listing">
+{listing}</div>
+</main>
+<script src="assets/search.js"></script>
+</body>
+</html>
+"""
+
+LISTING_SECTION = "<h2>{family}</h2>\n<ul>\n{items}</ul>\n"
+LISTING_ITEM = '<li><a href="{url}">{title}</a></li>\n'
+
+STYLE_CSS = """body { font-family: -apple-system, "Segoe UI", Helvetica, Arial, sans-serif; line-height: 1.55;
+  max-width: 52rem; margin: 0 auto; padding: 1.5rem; color: #1f2328; }
+a { color: #0969da; }
+nav { margin-bottom: 1rem; }
+pre { background: #f6f8fa; padding: 0.75rem; overflow-x: auto; border-radius: 6px; }
+code { font-family: ui-monospace, SFMono-Regular, Menlo, monospace; font-size: 0.9em; }
+blockquote { margin: 0; padding-left: 1rem; border-left: 3px solid #d0d7de; color: #57606a; }
+img, video { max-width: 100%; height: auto; }
+table { border-collapse: collapse; } th, td { border: 1px solid #d0d7de; padding: 0.3rem 0.6rem; }
+.labels .label { display: inline-block; margin: 0 0.4rem 0.4rem 0; padding: 0.1rem 0.5rem;
+  background: #ddf4ff; border-radius: 1rem; font-size: 0.85em; }
+#search-form { display: flex; gap: 0.5rem; }
+#search { flex: 1; font-size: 1.1rem; padding: 0.4rem 0.6rem; }
+#results li { margin-bottom: 0.8rem; }
+#results .meta { color: #57606a; font-size: 0.85em; }
+"""
+
+# Search client. Tokenisation and shard keys must match tokenize() and shard_key().
+SEARCH_JS = """(function () {
+  "use strict";
+  var STOPWORDS = new Set(__STOPWORDS__);
+  var MAX_RESULTS = 50;
+  var input = document.getElementById("search");
+  var family = document.getElementById("family");
+  var results = document.getElementById("results");
+  var listing = document.getElementById("listing");
+  var status = document.getElementById("status");
+  var loaded = null, docs = [], documents = 0, shards = {}, timer = null;
+
+  function getJSON(path) {
+    return fetch(path).then(function (r) {
+      if (!r.ok) { throw new Error(path + ": " + r.status); }
+      return r.json();
+    });
+  }
+  function load() {
+    if (!loaded) {
+      loaded = Promise.all([getJSON("search/meta.json"), getJSON("search/docs.json")]).then(function (v) {
+        docs = v[1];
+        documents = v[0].documents;
+        return new Set(v[0].shards);
+      });
+    }
+    return loaded;
+  }
+  function tokenize(text) {
+    return (text.toLowerCase().match(/[\\p{L}\\p{N}_]+/gu) || []).filter(function (t) {
+      return t.length >= 2 && t.length <= 40 && !STOPWORDS.has(t);
+    });
+  }
+  function shardKey(term) {
+    var key = term.slice(0, 2);
+    return /^[a-z0-9]{2}$/.test(key) ? key : "_";
+  }
+  function loadShard(available, key) {
+    if (!available.has(key)) { return Promise.resolve({}); }
+    if (!shards[key]) { shards[key] = getJSON("search/shard-" + key + ".json"); }
+    return shards[key];
+  }
+  // Map of doc id -> score for one query term (prefix match for the last term)
+  function scoreTerm(shard, term, prefix) {
+    var scores = new Map();
+    var terms = prefix ? Object.keys(shard).filter(function (t) { return t.indexOf(term) === 0; })
+                       : (shard[term] ? [term] : []);
+    terms.forEach(function (t) {
+      var postings = shard[t];
+      var idf = Math.log(1 + documents / (postings.length / 2));
+      for (var i = 0; i < postings.length; i += 2) {
+        var score = postings[i + 1] * idf;
+        if (score > (scores.get(postings[i]) || 0)) { scores.set(postings[i], score); }
+      }
+    });
+    return scores;
+  }
+  function show(ranked, total) {
+    results.textContent = "";
+    ranked.forEach(function (hit) {
+      var doc = docs[hit[0]];
+      var li = document.createElement("li");
+      var a = document.createElement("a");
+      a.href = doc.url;
+      a.textContent = doc.title;
+      var meta = document.createElement("div");
+      meta.className = "meta";
+      meta.textContent = [doc.family, doc.tool, doc.mode].filter(Boolean).join(" / ");
+      var summary = document.createElement("div");
+      summary.textContent = doc.description;
+      li.appendChild(a);
+      li.appendChild(meta);
+      li.appendChild(summary);
+      results.appendChild(li);
+    });
+    status.textContent = total + (total === 1 ? " result" : " results");
+  }
+  function run() {
+    var query = input.value;
+    var terms = tokenize(query);
+    var prefixLast = terms.length > 0 && /[\\p{L}\\p{N}_]$/u.test(query);
+    if (!terms.length && !family.value) {
+      results.textContent = "";
+      status.textContent = "";
+      listing.hidden = false;
+      return;
+    }
+    listing.hidden = true;
+    load().then(function (available) {
+      return Promise.all(terms.map(function (t) { return loadShard(available, shardKey(t)); }));
+    }).then(function (loadedShards) {
+      var combined = null;
+      terms.forEach(function (term, i) {
+        var scores = scoreTerm(loadedShards[i], term, prefixLast && i === terms.length - 1);
+        if (combined === null) { combined = scores; return; }
+        var next = new Map();
+        combined.forEach(function (score, id) {
+          if (scores.has(id)) { next.set(id, score + scores.get(id)); }
+        });
+        combined = next;
+      });
+      if (combined === null) {
+        combined = new Map();
+        docs.forEach(function (doc, id) { if (doc) { combined.set(id, 0); } });
+      }
+      var ranked = [];
+      combined.forEach(function (score, id) {
+        if (!family.value || docs[id].family === family.value) { ranked.push([id, score]); }
+      });
+      ranked.sort(function (a, b) { return b[1] - a[1] || docs[a[0]].title.localeCompare(docs[b[0]].title); });
+      show(ranked.slice(0, MAX_RESULTS), ranked.length);
+    }).catch(function (e) { status.textContent = "Search unavailable: " + e.message; });
+  }
+  function schedule() { clearTimeout(timer); timer = setTimeout(run, 120); }
+  input.addEventListener("input", schedule);
+  family.addEventListener("change", run);
+})();
+"""
+
+def exporter_fingerprint() -> str:
+    """Hash of everything that affects every page, so a layout change rebuilds them all."""
+    payload = json.dumps([
+        EXPORTER_VERSION, markdown_render.RENDERER_FINGERPRINT, PAGE_TEMPLATE, LABEL,
+        library_index.FTS_FIELDS, library_index.FTS_WEIGHTS, sorted(STOPWORDS),
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+# -------------------------------------------------------------------------------------
+# Search index
+# -------------------------------------------------------------------------------------
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "com", "for", "from", "has", "have",
+    "how", "http", "https", "if", "in", "into", "is", "it", "its", "of", "on", "or", "that",
+    "the", "their", "then", "this", "to", "use", "was", "will", "with", "www", "you", "your",
+}
+FIELD_WEIGHTS = dict(zip(library_index.FTS_FIELDS, library_index.FTS_WEIGHTS))
+SUMMARY_LENGTH = 240
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, as the search client splits queries."""
+    return [
+        token for token in TOKEN_RE.findall(text.lower())
+        if 2 <= len(token) <= 40 and token not in STOPWORDS
+    ]
+
+def shard_key(term: str) -> str:
+    """Shard holding a term: its first two characters, or "_" for anything else."""
+    key = term[:2]
+    return key if len(key) == 2 and key.isascii() and key.isalnum() else "_"
+
+def term_weights(record: dict) -> Dict[str, float]:
+    """Field-weighted, log-damped term frequencies for one use case."""
+    weights: Dict[str, float] = {}
+    for field, field_weight in FIELD_WEIGHTS.items():
+        counts = Counter(TOKEN_RE.findall(str(record.get(field) or "").lower()))
+        for token, count in counts.items():
+            if 2 <= len(token) <= 40 and token not in STOPWORDS:
+                weights[token] = weights.get(token, 0.0) + field_weight * (1 + math.log(count))
+    return {term: round(weight, 2) for term, weight in weights.items()}
+
+def build_shards(pages: List[dict]) -> Dict[str, dict]:
+    """Inverted index split into shards: {shard: {term: [doc id, weight, doc id, weight, ...]}}."""
+    shards: Dict[str, Dict[str, list]] = {}
+    for page in pages:
+        doc_id = page["id"]
+        for term, weight in page["terms"].items():
+            shard = shards.get(shard_key(term))
+            if shard is None:
+                shard = shards[shard_key(term)] = {}
+            postings = shard.get(term)
+            if postings is None:
+                shard[term] = [doc_id, weight]
+            else:
+                postings.append(doc_id)
+                postings.append(weight)
+    return shards
+
+# -------------------------------------------------------------------------------------
+# Pages
+# -------------------------------------------------------------------------------------
+
+ASSET_REF_RE = re.compile(r"""\]\(\s*(<[^>]+>|[^)\s]+)|\b(?:src|href)\s*=\s*["']([^"']+)["']""")
+
+def local_asset_refs(markdown: str, source_dir: str) -> List[str]:
+    """Relative paths of local files referenced by a Markdown page (images, videos, files)."""
+    refs = []
+    for match in ASSET_REF_RE.finditer(markdown):
+        ref = (match.group(1) or match.group(2)).strip("<>")
+        if re.match(r"^[a-z][a-z0-9+.-]*:|^[#/]", ref, re.IGNORECASE):
+            continue
+        ref = unquote(ref.split("#")[0].split("?")[0])
+        normalised = os.path.normpath(ref)
+        if not ref or normalised.startswith(".."):
+            continue
+        if os.path.isfile(os.path.join(source_dir, normalised)) and normalised not in refs:
+            refs.append(normalised)
+    return refs
+
+def page_inputs(kind: str, path: str) -> tuple:
+    """Read a source's inputs; returns (hash of inputs, source text, asset refs)."""
+    digest = hashlib.sha256()
+    if kind == "generated":
+        for name in markdown_render.RENDER_INPUTS:
+            data = markdown_render.read_input_bytes(path, name)
+            digest.update(name.encode("utf-8"))
+            digest.update(data if data is not None else b"\x00missing")
+        return digest.hexdigest(), None, []
+
+    with open(path, "rb") as f:
+        data = f.read()
+    digest.update(data)
+    text = data.decode("utf-8", "replace")
+    source_dir = os.path.dirname(path)
+    assets = local_asset_refs(text, source_dir)
+    for ref in assets:
+        stat = os.stat(os.path.join(source_dir, ref))
+        digest.update(f"{ref}\x00{stat.st_size}\x00{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest(), text, assets
+
+def page_html(record: dict, body: str, root: str) -> str:
+    labels = "".join(
+        LABEL.format(name=name, value=html.escape(str(record.get(field))))
+        for name, field in (("Family", "family"), ("Tool", "tool"), ("Mode", "mode"),
+                            ("Time", "time_to_complete"))
+        if record.get(field)
+    )
+    return PAGE_TEMPLATE.format(title=html.escape(record["title"]), root=root, labels=labels, body=body)
+
+def build_page(task: tuple) -> dict:
+    """
+    Worker: build one page unless its input hash matches the previous build.
+
+    Returns the page's manifest entry (with "status": built, unchanged or
+    failed).
+    """
+    kind, path, family, url, out_dir, root, previous_hash = task
+    source = os.path.relpath(path, root)
+    try:
+        input_hash, text, assets = page_inputs(kind, path)
+        if input_hash == previous_hash and os.path.isfile(os.path.join(out_dir, url, "index.html")):
+            return {"source": source, "status": "unchanged"}
+
+        record = library_index.load_use_case(kind, path, family, root)
+        if not record:
+            return {"source": source, "status": "skipped"}
+        if kind == "generated":
+            text = markdown_render.render_markdown(
+                markdown_render.read_artifact(path, "final_use_case"),
+                markdown_render.read_artifact(path, "example_solution"),
+                markdown_render.read_artifact(path, "visual_suggestions"),
+                name=os.path.basename(path),
+            )
+
+        page_dir = os.path.join(out_dir, url)
+        os.makedirs(page_dir, exist_ok=True)
+        depth = url.rstrip("/").count("/") + 1
+        write_if_changed(os.path.join(page_dir, "index.html"),
+                         page_html(record, markdown_to_html(text), "../" * depth))
+        for ref in assets:
+            target = os.path.join(page_dir, ref)
+            source_file = os.path.join(os.path.dirname(path), ref)
+            if not os.path.isfile(target) or os.path.getsize(target) != os.path.getsize(source_file) \
+                    or os.path.getmtime(target) < os.path.getmtime(source_file):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(source_file, target)
+
+        return {
+            "source": source,
+            "status": "built",
+            "hash": input_hash,
+            "url": url,
+            "doc": {
+                "title": record["title"],
+                "url": url,
+                "family": record.get("family") or "",
+                "tool": record.get("tool") or "",
+                "mode": record.get("mode") or "",
+                "description": (record.get("description") or "")[:SUMMARY_LENGTH],
+            },
+            "terms": term_weights(record),
+        }
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        return {"source": source, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+
+# -------------------------------------------------------------------------------------
+# Site build
+# -------------------------------------------------------------------------------------
+
+def write_if_changed(path: str, content: str) -> bool:
+    """Write a text file only if its content differs; returns whether it was written."""
+    data = content.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
+def section_for(path: str, root: str) -> str:
+    top = os.path.relpath(path, root).split(os.sep)[0]
+    return HAND_WRITTEN_SECTIONS.get(top, GENERATED_SECTION)
+
+def plan_pages(root: str) -> List[tuple]:
+    """Assign each library source a stable, unique page URL: [(kind, path, family, url)]."""
+    planned = []
+    used = set()
+    for kind, path, family in library_index.iter_library_sources(root):
+        name = os.path.basename(path) if kind == "generated" else os.path.splitext(os.path.basename(path))[0]
+        base = f"{section_for(path, root)}/{slugify(name)}"
+        url, suffix = base, 2
+        while url in used:
+            url, suffix = f"{base}-{suffix}", suffix + 1
+        used.add(url)
+        planned.append((kind, path, family, url + "/"))
+    return planned
+
+def load_manifest(out_dir: str) -> dict:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def remove_page(out_dir: str, url: str):
+    page_dir = os.path.normpath(os.path.join(out_dir, url))
+    if page_dir.startswith(os.path.normpath(out_dir) + os.sep):
+        shutil.rmtree(page_dir, ignore_errors=True)
+
+def build_site(root: str = REPO_ROOT, out_dir: str = DEFAULT_SITE_DIR, workers: Optional[int] = None,
+               force: bool = False, chunksize: int = 32) -> dict:
+    """
+    Export the library to a static site in `out_dir`, incrementally.
+
+    Returns counts of built, unchanged, skipped, failed and removed pages,
+    and how many index files were rewritten.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    fingerprint = exporter_fingerprint()
+    manifest = load_manifest(out_dir)
+    old_pages: Dict[str, dict] = manifest.get("pages", {})
+    full_rebuild = force or manifest.get("fingerprint") != fingerprint
+    previous = {} if full_rebuild else old_pages
+
+    tasks = []
+    for kind, path, family, url in plan_pages(root):
+        source = os.path.relpath(path, root)
+        entry = previous.get(source)
+        previous_hash = entry["hash"] if entry and entry.get("url") == url else None
+        tasks.append((kind, path, family, url, out_dir, root, previous_hash))
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > chunksize:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(build_page, tasks, chunksize=chunksize))
+    else:
+        results = [build_page(task) for task in tasks]
+
+    summary = {"pages": len(tasks), "built": 0, "unchanged": 0, "skipped": 0, "failed": 0,
+               "removed": 0, "index_files_written": 0, "failures": []}
+    pages: Dict[str, dict] = {}
+    built: List[str] = []
+    for result in results:
+        status = result.pop("status")
+        summary[status] += 1
+        source = result["source"]
+        if status == "built":
+            pages[source] = result
+            built.append(source)
+        elif status == "unchanged":
+            pages[source] = previous[source]
+        elif status == "failed":
+            summary["failures"].append(result)
+            if source in previous:
+                # Keep serving the last good page
+                pages[source] = previous[source]
+
+    # Remove pages whose source is gone or moved to a new URL
+    current_urls = {entry["url"] for entry in pages.values()}
+    removed = [source for source, entry in old_pages.items() if source not in pages or pages[source]["url"] != entry["url"]]
+    for source, entry in old_pages.items():
+        if entry["url"] not in current_urls:
+            remove_page(out_dir, entry["url"])
+            summary["removed"] += 1
+
+    if not full_rebuild and not built and not removed:
+        return summary
+
+    # Document ids are stable across incremental builds, so only the shards
+    # holding terms of changed pages need rewriting; --force compacts them
+    changes: Optional[Dict[int, tuple]] = None if full_rebuild else {}
+    next_id = 0 if full_rebuild else max((entry["id"] for entry in old_pages.values()), default=-1) + 1
+    for source in sorted(pages, key=lambda source: pages[source]["url"]):
+        entry = pages[source]
+        old = None if full_rebuild else old_pages.get(source)
+        if "id" not in entry:
+            if old is not None:
+                entry["id"] = old["id"]
+            else:
+                entry["id"] = next_id
+                next_id += 1
+        if changes is not None and source in built:
+            changes[entry["id"]] = (old["terms"] if old else {}, entry["terms"])
+    if changes is not None:
+        for source in removed:
+            if source not in pages:
+                changes[old_pages[source]["id"]] = (old_pages[source]["terms"], {})
+
+    summary["index_files_written"] = write_index(out_dir, sorted(pages.values(), key=lambda p: p["id"]), changes)
+
+    with open(os.path.join(out_dir, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        f.write(json.dumps({"fingerprint": fingerprint, "pages": pages}, separators=(",", ":")))
+    return summary
+
+def shard_path(search_dir: str, key: str) -> str:
+    return os.path.join(search_dir, f"shard-{key}.json")
+
+def write_shards(search_dir: str, pages: List[dict], changes: Optional[Dict[int, tuple]]) -> int:
+    """
+    Write the inverted index shards; returns files rewritten or removed.
+
+    With `changes` ({doc id: (old terms, new terms)}) only the shards holding
+    those terms are patched; otherwise every shard is rebuilt.
+    """
+    written = 0
+    if changes is None:
+        shards = build_shards(pages)
+        stale = {name for name in os.listdir(search_dir) if name.startswith("shard-")}
+    else:
+        keys = {shard_key(term) for old, new in changes.values() for term in (*old, *new)}
+        shards = {}
+        for key in keys:
+            try:
+                with open(shard_path(search_dir, key), "r", encoding="utf-8") as f:
+                    shard = json.load(f)
+            except FileNotFoundError:
+                shard = {}
+            for term in {term for old, _ in changes.values() for term in old if shard_key(term) == key}:
+                postings = shard.get(term, [])
+                kept = []
+                for position in range(0, len(postings), 2):
+                    if postings[position] not in changes:
+                        kept.extend(postings[position:position + 2])
+                shard[term] = kept
+            for doc_id, (_, new) in changes.items():
+                for term, weight in new.items():
+                    if shard_key(term) == key:
+                        shard.setdefault(term, []).extend((doc_id, weight))
+            shards[key] = {term: postings for term, postings in shard.items() if postings}
+        stale = {f"shard-{key}.json" for key, shard in shards.items() if not shard}
+
+    for key, terms in shards.items():
+        if terms:
+            written += write_if_changed(shard_path(search_dir, key),
+                                        json.dumps(terms, sort_keys=True, separators=(",", ":")))
+            stale.discard(f"shard-{key}.json")
+    for filename in stale:
+        if os.path.exists(os.path.join(search_dir, filename)):
+            os.remove(os.path.join(search_dir, filename))
+            written += 1
+    return written
+
+def write_index(out_dir: str, pages: List[dict], changes: Optional[Dict[int, tuple]] = None) -> int:
+    """Write the shared assets, the search index and index.html; returns files rewritten."""
+    assets_dir = os.path.join(out_dir, "assets")
+    search_dir = os.path.join(out_dir, "search")
+    os.makedirs(assets_dir, exist_ok=True)
+    os.makedirs(search_dir, exist_ok=True)
+
+    written = 0
+    written += write_if_changed(os.path.join(assets_dir, "style.css"), STYLE_CSS)
+    written += write_if_changed(os.path.join(assets_dir, "search.js"),
+                                SEARCH_JS.replace("__STOPWORDS__", json.dumps(sorted(STOPWORDS))))
+    written += write_shards(search_dir, pages, changes)
+
+    # docs.json is indexed by document id; ids freed by deleted pages are null
+    docs: List[Optional[dict]] = [None] * (max((page["id"] for page in pages), default=-1) + 1)
+    for page in pages:
+        docs[page["id"]] = page["doc"]
+    written += write_if_changed(os.path.join(search_dir, "docs.json"), json.dumps(docs, separators=(",", ":")))
+    written += write_if_changed(os.path.join(search_dir, "meta.json"), json.dumps({
+        "version": EXPORTER_VERSION,
+        "documents": len(pages),
+        "shards": sorted(name[len("shard-"):-len(".json")] for name in os.listdir(search_dir)
+                         if name.startswith("shard-")),
+    }))
+
+    by_family: Dict[str, List[dict]] = {}
+    for page in pages:
+        by_family.setdefault(page["doc"]["family"] or "Other", []).append(page["doc"])
+    listing = "".join(
+        LISTING_SECTION.format(family=html.escape(family), items="".join(
+            LISTING_ITEM.format(url=html.escape(doc["url"]), title=html.escape(doc["title"]))
+            for doc in sorted(docs, key=lambda d: d["title"].lower())
+        ))
+        for family, docs in sorted(by_family.items())
+    )
+    family_options = "".join(
+        f'<option value="{html.escape(family)}">{html.escape(family)}</option>\n' for family in sorted(by_family)
+    )
+    written += write_if_changed(os.path.join(out_dir, "index.html"), INDEX_TEMPLATE.format(
+        count=len(pages), family_options=family_options, listing=listing,
+    ))
+    return written
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Export the use case library as a static HTML site.")
+    parser.add_argument("--out", default=DEFAULT_SITE_DIR, help="Output directory")
+    parser.add_argument("--root", default=REPO_ROOT, help="Library (repository) root")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Rebuild every page")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    summary = build_site(args.root, args.out, args.workers, args.force)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Exported {summary['pages']} use cases to {args.out} in {elapsed:.2f}s "
+        f"({summary['built']} built, {summary['unchanged']} unchanged, {summary['skipped']} skipped, "
+        f"{summary['failed']} failed, {summary['removed']} removed, "
+        f"{summary['index_files_written']} index files written)"
+    )
+    for failure in summary["failures"]:
+        print(f"  FAILED {failure['source']}: {failure['error']}")
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Local Repair and Bulk Validation of Structured Model Output
+
+Steps 3-5 ask for JSON matching a Pydantic model (use_case_models.py). A
+near-miss answer used to fail the job, or, for citation scoring, reach a bare
+`json.loads`. This module repairs such answers locally, so another paid call
+is only made when the answer cannot be repaired.
+
+Repairs, in order, each recorded by name:
+1. Text: strip a Markdown code fence around the whole answer and any prose
+   around the JSON, drop trailing commas, turn Python literals
+   (True/False/None) into JSON, and escape raw control characters inside
+   strings. Fenced code inside string values is left as it is.
+2. Types, walking the Pydantic model: numbers in strings ("20 minutes" for
+   an int), numbers for strings, a single value for a list, null or a
+   missing field for a required list, a missing nullable field, and keys
+   that differ only in case or spacing.
+Anything else is left to Pydantic, and a StructuredOutputError lists what
+was tried.
+
+`response_format` builds the strict JSON schema the OpenAI SDK's `parse()`
+sends, so steps can call `chat.completions.create` and keep the raw text.
+
+The `validate` command checks every saved artifact in the library against
+the current models in parallel processes. It reports which artifacts are
+valid, which are only repairable and which are invalid, plus schema drift:
+fields the models no longer have and required fields the artifacts lack.
+
+Usage:
+    python structured_output.py validate [LIBRARY_DIR_OR_JOB_DIR ...] [--workers N] [--json]
+"""
+
+import re
+import sys
+import json
+import argparse
+from collections import Counter
+from typing import Any, List, Optional, Tuple, Union, get_args, get_origin
+
+# Saved step results that hold structured output, and the model each must match
+ARTIFACT_MODELS = {
+    "citation_scoring": "CitationScoringOutput",
+    "refined_draft": "UseCaseStructuredOutput",
+    "final_use_case": "UseCaseStructuredOutput",
+    "example_solution": "ExampleSolutionOutput",
+}
+
+# An answer wrapped in a fence; matched only at the start of the answer, up to
+# its last fence, so fenced code inside JSON strings is left alone
+FENCE_RE = re.compile(r"```[a-zA-Z0-9_-]*[ \t]*\n?(.*)```", re.DOTALL)
+LEADING_NUMBER_RE = re.compile(r"\s*(-?\d+(?:\.\d+)?)")
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+class StructuredOutputError(ValueError):
+    """Raised when model output does not match its schema, even after repair."""
+
+    def __init__(self, message: str, repairs: Optional[List[str]] = None):
+        super().__init__(message)
+        self.repairs = repairs or []
+
+# -------------------------------------------------------------------------------------
+# Text repair
+# -------------------------------------------------------------------------------------
+
+def repair_json_text(text: str) -> Tuple[str, List[str]]:
+    """Fix common near-misses in JSON text; returns the text and the repairs made."""
+    repairs: List[str] = []
+    candidate = text.strip()
+    fence = FENCE_RE.match(candidate)
+    if fence:
+        candidate = fence.group(1).strip()
+        repairs.append("stripped code fence")
+
+    starts = [index for index in (candidate.find("{"), candidate.find("[")) if index >= 0]
+    end = max(candidate.rfind("}"), candidate.rfind("]"))
+    if starts and end > min(starts) and (min(starts) > 0 or end < len(candidate) - 1):
+        candidate = candidate[min(starts):end + 1]
+        repairs.append("dropped text around the JSON")
+
+    out: List[str] = []
+    in_string = escaped = False
+    fixed = Counter()
+    i = 0
+    while i < len(candidate):
+        char = candidate[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char in CONTROL_ESCAPES:
+                out.append(CONTROL_ESCAPES[char])
+                fixed["escaped control characters in strings"] += 1
+                i += 1
+                continue
+            out.append(char)
+        elif char == '"':
+            in_string = True
+            out.append(char)
+        elif char == ",":
+            following = candidate[i + 1:].lstrip()
+            if following[:1] in ("}", "]"):
+                fixed["dropped trailing commas"] += 1
+            else:
+                out.append(char)
+        elif char.isalpha():
+            word = re.match(r"\w+", candidate[i:]).group(0)
+            if word in PYTHON_LITERALS:
+                out.append(PYTHON_LITERALS[word])
+                fixed["replaced Python literals"] += 1
+            else:
+                out.append(word)
+            i += len(word)
+            continue
+        else:
+            out.append(char)
+        i += 1
+    repairs.extend(fixed)
+    return "".join(out), repairs
+
+# -------------------------------------------------------------------------------------
+# Type coercion
+# -------------------------------------------------------------------------------------
+
+def is_model(annotation) -> bool:
+    return isinstance(annotation, type) and hasattr(annotation, "model_fields")
+
+def unwrap_optional(annotation) -> Tuple[Any, bool]:
+    """(inner annotation, whether None is allowed) for Optional[X]."""
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0], len(args) < len(get_args(annotation))
+    return annotation, False
+
+def coerce_value(value: Any, annotation, path: str, repairs: List[str]) -> Any:
+    """`value` nudged towards `annotation` where the intent is unambiguous."""
+    annotation, nullable = unwrap_optional(annotation)
+    if value is None:
+        if get_origin(annotation) is list and not nullable:
+            repairs.append(f"{path}: null -> []")
+            return []
+        return None
+    if get_origin(annotation) is list:
+        item = (get_args(annotation) or (Any,))[0]
+        if not isinstance(value, list):
+            repairs.append(f"{path}: wrapped single value in a list")
+            value = [value]
+        return [coerce_value(v, item, f"{path}[{i}]", repairs) for i, v in enumerate(value)]
+    if is_model(annotation):
+        return coerce_object(value, annotation, path, repairs) if isinstance(value, dict) else value
+    if annotation in (int, float) and isinstance(value, str):
+        match = LEADING_NUMBER_RE.match(value)
+        if match:
+            number = float(match.group(1))
+            coerced = int(number) if annotation is int else number
+            repairs.append(f"{path}: {value!r} -> {coerced}")
+            return coerced
+    if annotation is int and isinstance(value, float) and value.is_integer():
+        return int(value)
+    if annotation is str and isinstance(value, (int, float)) and not isinstance(value, bool):
+        repairs.append(f"{path}: {value!r} -> string")
+        return str(value)
+    if annotation is str and isinstance(value, list) and all(isinstance(v, str) for v in value):
+        repairs.append(f"{path}: joined list into a string")
+        return "\n".join(value)
+    return value
+
+def normalize_key(key: str) -> str:
+    return re.sub(r"[\s\-]+", "_", key.strip()).lower()
+
+def coerce_object(data: dict, model_cls, path: str, repairs: List[str]) -> dict:
+    """Coerce the fields of `data` to `model_cls`; unknown keys are kept for Pydantic."""
+    coerced = dict(data)
+    for name, field in model_cls.model_fields.items():
+        field_path = f"{path}.{name}" if path else name
+        if name not in coerced:
+            match = next((key for key in coerced if normalize_key(key) == name), None)
+            if match is not None:
+                coerced[name] = coerced.pop(match)
+                repairs.append(f"{field_path}: renamed from {match!r}")
+            elif field.is_required():
+                inner, nullable = unwrap_optional(field.annotation)
+                if nullable:
+                    coerced[name] = None
+                    repairs.append(f"{field_path}: missing -> null")
+                elif get_origin(inner) is list:
+                    coerced[name] = []
+                    repairs.append(f"{field_path}: missing -> []")
+                continue
+            else:
+                continue
+        coerced[name] = coerce_value(coerced[name], field.annotation, field_path, repairs)
+    return coerced
+
+# -------------------------------------------------------------------------------------
+# Parsing
+# -------------------------------------------------------------------------------------
+
+def parse_model_output(text: Optional[str], model_cls) -> Tuple[Any, List[str]]:
+    """
+    Validate `text` against `model_cls`, repairing it locally if needed.
+
+    Returns the model instance and the repairs made (empty when the text was
+    valid as it was). Raises StructuredOutputError when repair fails.
+    """
+    if not text or not text.strip():
+        raise StructuredOutputError(f"{model_cls.__name__}: empty output")
+    try:
+        return model_cls.model_validate_json(text), []
+    except ValueError as e:
+        first_error = e
+
+    repaired, repairs = repair_json_text(text)
+    try:
+        data = json.loads(repaired)
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"{model_cls.__name__}: not JSON after repair: {e}", repairs) from first_error
+    if isinstance(data, dict):
+        data = coerce_object(data, model_cls, "", repairs)
+    try:
+        return model_cls.model_validate(data), repairs
+    except ValueError as e:
+        raise StructuredOutputError(f"{model_cls.__name__}: {e}", repairs) from e
+
+def strict_schema(node: Any) -> Any:
+    """
+    A Pydantic JSON schema in the strict form structured outputs require:
+    every property required, no additional properties, no defaults.
+    """
+    if isinstance(node, list):
+        return [strict_schema(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    strict = {}
+    for key, value in node.items():
+        if key == "default":
+            continue
+        if key in ("properties", "$defs"):
+            strict[key] = {name: strict_schema(schema) for name, schema in value.items()}
+        else:
+            strict[key] = strict_schema(value)
+    if strict.get("type") == "object":
+        strict["required"] = list(strict.get("properties", {}))
+        strict["additionalProperties"] = False
+    return strict
+
+def response_format(model_cls) -> dict:
+    """`response_format` for chat.completions.create, as `parse()` would send for `model_cls`."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model_cls.__name__,
+            "schema": strict_schema(model_cls.model_json_schema()),
+            "strict": True,
+        },
+    }
+
+# -------------------------------------------------------------------------------------
+# Bulk validation
+# -------------------------------------------------------------------------------------
+
+def schema_drift(data: Any, annotation, path: str, extra: set, missing: set):
+    """Collect field paths present in `data` but not the model, and required fields it lacks."""
+    annotation, _ = unwrap_optional(annotation)
+    if get_origin(annotation) is list and isinstance(data, list):
+        item = (get_args(annotation) or (Any,))[0]
+        for value in data:
+            schema_drift(value, item, f"{path}[]", extra, missing)
+    elif is_model(annotation) and isinstance(data, dict):
+        fields = annotation.model_fields
+        extra.update(f"{path}.{key}" if path else key for key in data if key not in fields)
+        for name, field in fields.items():
+            field_path = f"{path}.{name}" if path else name
+            if name in data:
+                schema_drift(data[name], field.annotation, field_path, extra, missing)
+            elif field.is_required():
+                missing.add(field_path)
+
+def validate_job(job_dir: str) -> List[dict]:
+    """Worker: check the structured artifacts of one job, reporting instead of raising."""
+    import os
+    import use_case_models
+    from use_case_library import read_artifact_bytes
+    results = []
+    for step_name, model_name in ARTIFACT_MODELS.items():
+        result = {"job_dir": job_dir, "artifact": step_name, "model": model_name,
+                  "repairs": [], "errors": None, "extra": [], "missing": []}
+        try:
+            content = read_artifact_bytes(os.path.join(job_dir, f"{step_name}.json"))
+        except (OSError, ValueError) as e:
+            results.append(dict(result, status="invalid", errors=f"unreadable: {e}"))
+            continue
+        if content is None:
+            results.append(dict(result, status="missing"))
+            continue
+        model_cls = getattr(use_case_models, model_name)
+        text = content.decode("utf-8", errors="replace")
+        try:
+            _, result["repairs"] = parse_model_output(text, model_cls)
+            result["status"] = "repairable" if result["repairs"] else "valid"
+        except StructuredOutputError as e:
+            result.update(status="invalid", errors=str(e), repairs=e.repairs)
+        try:
+            extra, missing = set(), set()
+            schema_drift(json.loads(repair_json_text(text)[0]), model_cls, "", extra, missing)
+            result.update(extra=sorted(extra), missing=sorted(missing))
+        except json.JSONDecodeError:
+            pass
+        results.append(result)
+    return results
+
+def validate_library(paths: Optional[List[str]] = None, workers: Optional[int] = None,
+                     chunksize: int = 16) -> dict:
+    """
+    Validate the structured artifacts of every job under `paths` in parallel
+    processes. Returns per-artifact results, status counts and drift counts.
+    """
+    import os
+    from markdown_render import DEFAULT_LIBRARY_DIRS, find_job_dirs
+    job_dirs = list(find_job_dirs(paths or DEFAULT_LIBRARY_DIRS))
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(job_dirs) > chunksize:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            batches = list(executor.map(validate_job, job_dirs, chunksize=chunksize))
+    else:
+        batches = [validate_job(job_dir) for job_dir in job_dirs]
+
+    results = [result for batch in batches for result in batch]
+    return {
+        "jobs": len(job_dirs),
+        "counts": dict(Counter(f"{r['artifact']}:{r['status']}" for r in results)),
+        "extra_fields": dict(Counter(f"{r['model']}.{path}" for r in results for path in r["extra"]).most_common()),
+        "missing_fields": dict(Counter(f"{r['model']}.{path}" for r in results for path in r["missing"]).most_common()),
+        "results": results,
+    }
+
+def format_summary(summary: dict) -> str:
+    lines = [f"Validated {summary['jobs']} jobs"]
+    for artifact in ARTIFACT_MODELS:
+        counts = {status: summary["counts"].get(f"{artifact}:{status}", 0)
+                  for status in ("valid", "repairable", "invalid", "missing")}
+        lines.append(f"  {artifact:<18} " + "  ".join(f"{status} {count}" for status, count in counts.items()))
+    for title, key in (("Fields the models no longer have", "extra_fields"),
+                       ("Required fields missing from artifacts", "missing_fields")):
+        if summary[key]:
+            lines.append(f"\n{title}:")
+            lines.extend(f"  {count:>5}  {path}" for path, count in list(summary[key].items())[:20])
+    invalid = [r for r in summary["results"] if r["status"] == "invalid"]
+    if invalid:
+        lines.append("\nInvalid artifacts:")
+        lines.extend(f"  {r['job_dir']}/{r['artifact']}.json: {r['errors'].splitlines()[0]}" for r in invalid[:20])
+    return "\n".join(lines)
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Validate saved structured output against the current models.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    validate = subparsers.add_parser("validate", help="Check every saved artifact in the library")
+    validate.add_argument("paths", nargs="*", help="Library or job directories (default: all known)")
+    validate.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    validate.add_argument("--json", action="store_true", help="Print every result as JSON")
+    args = parser.parse_args(argv)
+
+    summary = validate_library(args.paths or None, args.workers)
+    print(json.dumps(summary, indent=2) if args.json else format_summary(summary))
+    return 1 if any(r["status"] == "invalid" for r in summary["results"]) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The generator modules are scripts in the parent directory, imported by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
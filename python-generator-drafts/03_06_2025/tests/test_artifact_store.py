@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+import artifact_store
+from artifact_store import ArtifactStore, PackError, PackReader
+
+# A system prompt both jobs log, long enough to span several chunks
+SHARED_PROMPT = "".join(f"Guideline {n}: keep step {n} short and concrete.\n" for n in range(400))
+
+def make_job(library_dir, job_id):
+    job_dir = os.path.join(library_dir, job_id)
+    os.makedirs(os.path.join(job_dir, "profile"))
+    for marker in artifact_store.COMPLETE_MARKERS:
+        with open(os.path.join(job_dir, marker), "w", encoding="utf-8") as f:
+            f.write(f'{{"job": "{job_id}", "artifact": "{marker}"}}\n')
+    with open(os.path.join(job_dir, "execution.log"), "w", encoding="utf-8") as f:
+        f.write(f"Started job: {job_id}\n{SHARED_PROMPT}Job completed: {job_id}\n")
+    with open(os.path.join(job_dir, "profile", "step_1.txt"), "wb") as f:
+        f.write(b"\x00binary\xff" + job_id.encode())
+    return job_dir
+
+def test_packs_round_trip_and_share_chunks(tmp_path):
+    library_dir = str(tmp_path)
+    first, second = make_job(library_dir, "job_a"), make_job(library_dir, "job_b")
+
+    results = artifact_store.pack_jobs([first, second])
+    assert [result["status"] for result in results] == ["packed", "packed"]
+    assert results[0]["shared_chunks"] == 0 and results[1]["shared_chunks"] > 0
+    assert os.path.isdir(first) and os.path.isdir(second)
+
+    with PackReader(os.path.join(library_dir, "job_b.ucpack")) as reader:
+        assert set(reader.external.values()) == {"job_a"}
+        with open(os.path.join(second, "execution.log"), "rb") as f:
+            assert reader.read("execution.log") == f.read()
+        assert "profile/step_1.txt" in reader.names()
+        reader.extract(str(tmp_path / "restored"))
+    assert os.path.getmtime(tmp_path / "restored" / "execution.log") == os.path.getmtime(os.path.join(second, "execution.log"))
+
+def test_reindex_rebuilds_the_store_from_the_packs(tmp_path):
+    library_dir = str(tmp_path)
+    artifact_store.pack_jobs([make_job(library_dir, "job_a"), make_job(library_dir, "job_b")])
+    store = ArtifactStore(library_dir)
+    before = store.stats()
+    store.close()
+    os.remove(os.path.join(library_dir, artifact_store.STORE_DB))
+
+    store = ArtifactStore(library_dir)
+    try:
+        assert store.reindex() == 2
+        assert store.stats() == before
+        digest = artifact_store.chunk_digest(artifact_store.chunk_bytes(SHARED_PROMPT.encode())[1])
+        assert store.locate(digest) == "job_a"
+    finally:
+        store.close()
+
+def test_verify_pack_fails_when_the_job_changed(tmp_path):
+    library_dir = str(tmp_path)
+    job_dir = make_job(library_dir, "job_a")
+    artifact_store.pack_jobs([job_dir])
+    pack = os.path.join(library_dir, "job_a.ucpack")
+
+    with open(os.path.join(job_dir, "final_use_case.json"), "a", encoding="utf-8") as f:
+        f.write("edited\n")
+    with pytest.raises(PackError, match="did not round-trip"):
+        artifact_store.verify_pack(pack, job_dir)
+
+    with open(os.path.join(job_dir, "notes.txt"), "w", encoding="utf-8") as f:
+        f.write("new file\n")
+    with pytest.raises(PackError, match="members differ"):
+        artifact_store.verify_pack(pack, job_dir)
+
+def test_missing_referenced_pack_is_reported(tmp_path):
+    library_dir = str(tmp_path)
+    artifact_store.pack_jobs([make_job(library_dir, "job_a"), make_job(library_dir, "job_b")])
+    os.remove(os.path.join(library_dir, "job_a.ucpack"))
+
+    with PackReader(os.path.join(library_dir, "job_b.ucpack")) as reader:
+        with pytest.raises(PackError, match="references missing pack job_a"):
+            reader.read("execution.log")
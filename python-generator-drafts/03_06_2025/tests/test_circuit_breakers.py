@@ -0,0 +1,102 @@
+import pytest
+
+import circuit_breakers
+import use_case_generator
+
+class StatusError(Exception):
+    """Shaped like openai.APIStatusError."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+
+class APITimeoutError(Exception):
+    """Named like openai's; matched by name."""
+
+class FakeJobManager:
+    def __init__(self):
+        self.fallbacks = []
+
+    def record_fallback(self, event):
+        self.fallbacks.append(event)
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(circuit_breakers, "_breakers", {})
+
+@pytest.mark.parametrize("error, transient", [
+    (StatusError(429), True),
+    (StatusError(503), True),
+    (StatusError(408), True),
+    (APITimeoutError(), True),
+    (TimeoutError(), True),
+    (ConnectionResetError(), True),
+    (StatusError(400), False),
+    (StatusError(401), False),
+    (StatusError(404), False),
+    (ValueError("bad prompt"), False),
+])
+def test_is_transient(error, transient):
+    assert circuit_breakers.is_transient(error) is transient
+
+def failing_then_answering(first_error):
+    models = []
+
+    def method(model, **kwargs):
+        models.append(model)
+        if len(models) == 1:
+            raise first_error
+        return {"model": model}
+    return method, models
+
+def test_client_errors_are_raised_without_fallback():
+    method, models = failing_then_answering(StatusError(400))
+    job_manager = FakeJobManager()
+
+    with pytest.raises(StatusError):
+        use_case_generator.call_model(job_manager, "refine", method, messages=[])
+
+    assert len(models) == 1 and not job_manager.fallbacks
+    primary = circuit_breakers.get_breaker(f"openai:{models[0]}")
+    assert primary.counts["failures"] == 0
+    assert circuit_breakers.get_breaker("openai").counts["failures"] == 0
+
+def test_transient_errors_fall_back_and_count_as_failures():
+    method, models = failing_then_answering(StatusError(503))
+    job_manager = FakeJobManager()
+
+    response = use_case_generator.call_model(job_manager, "refine", method, messages=[])
+
+    assert response == {"model": models[1]} and len(job_manager.fallbacks) == 1
+    assert circuit_breakers.get_breaker(f"openai:{models[0]}").counts["failures"] == 1
+
+def test_cancelled_half_open_trial_is_released(monkeypatch):
+    import asyncio
+
+    started = asyncio.Event()
+
+    class HangingBackend:
+        async def answer(self, question, context_prefix, model):
+            started.set()
+            await asyncio.sleep(3600)
+
+    monkeypatch.setattr(use_case_generator, "research_options", lambda: [("perplexity", "sonar-pro")])
+    monkeypatch.setattr(use_case_generator, "get_research_backend", lambda name=None: HangingBackend())
+    breaker = circuit_breakers.get_breaker("perplexity:sonar-pro")
+    breaker.open_seconds = 0.0
+    with breaker.lock:
+        breaker.trip()
+
+    async def cancel_trial():
+        task = asyncio.create_task(use_case_generator.research_question("q?", ""))
+        await started.wait()
+        assert breaker.state == circuit_breakers.HALF_OPEN and breaker.trial_running
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+
+    assert not breaker.trial_running
+    breaker.before_call()  # a new trial is let through
+    assert not circuit_breakers.get_breaker("perplexity").trial_running
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import generator_service
+import use_case_generator
+
+class FakeJobManager:
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.job_dir = f"/tmp/{job_id}"
+
+    def close(self):
+        pass
+
+async def finished_pipeline(use_case_config, job_manager, on_progress):
+    return {}
+
+FAKE_GENERATOR = SimpleNamespace(
+    PIPELINE_STEPS=use_case_generator.PIPELINE_STEPS,
+    validate_config=use_case_generator.validate_config,
+    run_pipeline=finished_pipeline,
+    get_openai_client=lambda: None,
+    get_research_backend=lambda: None,
+)
+
+@pytest.mark.parametrize("body", ["[]", '"a use case"', "42"])
+def test_non_object_bodies_are_rejected(body):
+    async def post():
+        async with TestClient(TestServer(generator_service.create_app(FAKE_GENERATOR))) as client:
+            response = await client.post("/jobs", data=body, headers={"Content-Type": "application/json"})
+            return response.status, await response.json()
+
+    status, payload = asyncio.run(post())
+    assert status == 400
+    assert "JSON object" in payload["error"]
+
+def test_finished_jobs_are_evicted():
+    async def run_jobs():
+        service = generator_service.GeneratorService(FAKE_GENERATOR, max_finished_jobs=2)
+        service.semaphore = asyncio.Semaphore(1)
+        for number in range(5):
+            job = generator_service.ServiceJob(FakeJobManager(f"job-{number}"), {"title": "t"}, {1: "x"})
+            service.jobs[job.job_manager.job_id] = job
+            await service.run_job(job)
+        return service
+
+    service = asyncio.run(run_jobs())
+    assert list(service.jobs) == ["job-3", "job-4"]
+    assert all(job.status == "done" for job in service.jobs.values())
+
+def test_job_logs_hold_only_their_own_records(tmp_path):
+    import logging
+
+    jobs = [use_case_generator.JobManager("id", title, base_dir=str(tmp_path)) for title in ("one", "two")]
+    try:
+        logging.info("outside any job")
+        for job in jobs:
+            token = use_case_generator.CURRENT_JOB.set(job.job_id)
+            try:
+                logging.info(f"inside {job.job_id}")
+            finally:
+                use_case_generator.CURRENT_JOB.reset(token)
+    finally:
+        for job in jobs:
+            job.close()
+
+    for job in jobs:
+        with open(f"{job.job_dir}/execution.log", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        assert [line.split(" - ", 2)[2] for line in lines] == [f"inside {job.job_id}"]
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("pyarrow")
+
+import pyarrow.parquet as pq
+
+import library_export
+from use_case_library import DEFAULT_LIBRARY_DIRS, UseCaseLibrary
+
+class GrowingLibrary:
+    """The saved jobs, of which only the first `visible` have been generated so far."""
+
+    def __init__(self, manifest_path: str):
+        self.records = UseCaseLibrary([DEFAULT_LIBRARY_DIRS[0]], manifest_path=manifest_path).find(complete_only=True)
+        self.visible = 0
+
+    def find(self, **filters):
+        return self.records[:self.visible]
+
+def test_appends_in_the_same_second_keep_every_part(tmp_path):
+    library = GrowingLibrary(str(tmp_path / "manifest.json"))
+    assert len(library.records) >= 2, "needs at least two saved jobs"
+    out_dir = str(tmp_path / "export")
+
+    library.visible = 1
+    library_export.export_library(out_dir, "parquet", append=True, library=library)
+    library.visible = len(library.records)
+    library_export.export_library(out_dir, "parquet", append=True, library=library)
+
+    parts = sorted(os.listdir(os.path.join(out_dir, "use_cases")))
+    assert len(parts) == 2
+    assert pq.read_table(os.path.join(out_dir, "use_cases")).num_rows == len(library.records)
+
+def fail_on_second_job(monkeypatch):
+    flatten_job = library_export.flatten_job
+    calls = []
+
+    def flaky(record):
+        calls.append(record)
+        if len(calls) == 2:
+            raise OSError("disk went away")
+        return flatten_job(record)
+    monkeypatch.setattr(library_export, "flatten_job", flaky)
+
+@pytest.mark.parametrize("fmt", library_export.FORMATS)
+def test_failed_append_leaves_nothing_to_export_twice(tmp_path, monkeypatch, fmt):
+    library = GrowingLibrary(str(tmp_path / "manifest.json"))
+    assert len(library.records) >= 3, "needs at least three saved jobs"
+    out_dir = str(tmp_path / "export")
+
+    library.visible = 1
+    library_export.export_library(out_dir, fmt, append=True, library=library)
+    library.visible = len(library.records)
+    with monkeypatch.context() as patch:
+        fail_on_second_job(patch)
+        with pytest.raises(OSError):
+            # Batches of one row, so the first job's rows are flushed before the failure
+            library_export.export_library(out_dir, fmt, append=True, library=library, batch_size=1)
+    library_export.export_library(out_dir, fmt, append=True, library=library)
+
+    if fmt == "jsonl":
+        rows = list(library_export.iter_jsonl(os.path.join(out_dir, "use_cases.jsonl")))
+    else:
+        assert all(not name.startswith(".") for name in os.listdir(os.path.join(out_dir, "use_cases")))
+        rows = pq.read_table(os.path.join(out_dir, "use_cases")).to_pylist()
+    job_ids = [row["job_id"] for row in rows]
+    assert sorted(job_ids) == sorted(record.job_id for record in library.records)
+
+@pytest.mark.parametrize("fmt", library_export.FORMATS)
+def test_failed_full_export_keeps_the_previous_tables(tmp_path, monkeypatch, fmt):
+    library = GrowingLibrary(str(tmp_path / "manifest.json"))
+    library.visible = len(library.records)
+    out_dir = str(tmp_path / "export")
+    library_export.export_library(out_dir, fmt, library=library)
+    before = sorted(os.listdir(out_dir)), sorted(os.listdir(os.path.join(out_dir, "use_cases"))) if fmt == "parquet" else None
+
+    fail_on_second_job(monkeypatch)
+    with pytest.raises(OSError):
+        library_export.export_library(out_dir, fmt, library=library, batch_size=1)
+
+    after = sorted(os.listdir(out_dir)), sorted(os.listdir(os.path.join(out_dir, "use_cases"))) if fmt == "parquet" else None
+    assert after == before
+    if fmt == "jsonl":
+        rows = list(library_export.iter_jsonl(os.path.join(out_dir, "use_cases.jsonl")))
+        assert len(rows) == len(library.records)
@@ -0,0 +1,48 @@
+import time
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import link_checker
+
+def fake_request(delays: dict, started: list):
+    async def request(session, method, url):
+        started.append((link_checker.url_host(url), time.monotonic()))
+        await asyncio.sleep(delays.get(link_checker.url_host(url), 0.01))
+        return {"status": 200, "final_url": url, "method": method, "error": None, "host_gone": False}
+    return request
+
+def test_a_busy_host_does_not_hold_up_other_hosts(monkeypatch):
+    started = []
+    monkeypatch.setattr(link_checker, "request", fake_request({"slow.example": 0.2}, started))
+    # The slow host sorts first and has the most links
+    urls = [f"https://slow.example/{n}" for n in range(10)] + [f"https://fast{n}.example/" for n in range(20)]
+
+    began = time.monotonic()
+    results = asyncio.run(link_checker.check_urls(urls, concurrency=4, per_host=1, host_delay=0))
+
+    assert len(results) == len(urls)
+    fast_done = max(at for host, at in started if host != "slow.example") - began
+    # 20 fast checks over the 3 slots the slow host leaves take about 0.07 s; blocked they took over 1 s
+    assert fast_done < 0.5
+
+def test_results_are_stored_as_they_arrive(monkeypatch, tmp_path):
+    db_path = str(tmp_path / "links.db")
+    markdown = tmp_path / "use_case.md"
+    markdown.write_text("[a](https://a.example/) [b](https://b.example/) [c](https://c.example/)\n")
+    stored_before = []
+
+    async def request(session, method, url):
+        if "c.example" in url:
+            # The other hosts are done; their results must already be in the cache
+            await asyncio.sleep(0.1)
+            stored_before.append(len(link_checker.all_cached(link_checker.connect(db_path))))
+        return {"status": 200, "final_url": url, "method": method, "error": None, "host_gone": False}
+
+    monkeypatch.setattr(link_checker, "request", request)
+    assert link_checker.main(["--db", db_path, "check", str(markdown), "--host-delay", "0"]) == 0
+
+    assert stored_before == [2]
+    assert len(link_checker.all_cached(link_checker.connect(db_path))) == 3
@@ -0,0 +1,47 @@
+import log_report
+
+def write_log(path, records):
+    lines = [f"2025-03-06 10:00:{second:02d},000 - INFO - \n{message}" for second, message in records]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+def test_overlapping_steps_are_timed_from_their_own_start(tmp_path):
+    # Step 2 starts researching while step 1 is still running
+    log = write_log(tmp_path / "execution.log", [
+        (0, "Started job: job"),
+        (0, "Starting step 1"),
+        (1, "INITIATING STEP: 1 - Identify Research Questions"),
+        (2, "Starting step 2"),
+        (2, "INITIATING STEP: 2 - Deep Research (Single Question)"),
+        (5, 'HTTP Request: POST https://api.openai.com/v1/chat/completions "HTTP/1.1 200 OK"'),
+        (5, "Completed step 1: Identified research questions"),
+        (18, 'HTTP Request: POST https://api.perplexity.ai/chat/completions "HTTP/1.1 200 OK"'),
+        (20, "Completed step 2: Deep research phase"),
+        (21, "Starting step 3"),
+        (30, "Completed step 3: Refinement (structured)"),
+        (30, "Job completed: job"),
+    ])
+
+    steps = {step["step"]: step for step in log_report.parse_execution_log(log)["steps"]}
+
+    assert [steps[n]["seconds"] for n in (1, 2, 3)] == [5.0, 18.0, 9.0]
+    assert steps[2]["api_seconds"] == 16.0
+    # Only the research after step 1 completed is on the critical path
+    assert [steps[n]["critical_seconds"] for n in (1, 2, 3)] == [5.0, 15.0, 9.0]
+
+def test_logs_without_start_lines_time_steps_back_to_back(tmp_path):
+    log = write_log(tmp_path / "execution.log", [
+        (0, "Started job: job"),
+        (1, "INITIATING STEP: 1 - Identify Research Questions"),
+        (5, 'HTTP Request: POST https://api.openai.com/v1/chat/completions "HTTP/1.1 200 OK"'),
+        (5, "Completed step 1: Identified research questions"),
+        (7, "INITIATING STEP: 3 - Refine Use Case"),
+        (12, 'HTTP Request: POST https://api.openai.com/v1/chat/completions "HTTP/1.1 200 OK"'),
+        (12, "Completed step 3: Refinement (structured)"),
+        (12, "Job completed: job"),
+    ])
+
+    steps = {step["step"]: step for step in log_report.parse_execution_log(log)["steps"]}
+
+    assert steps[1]["seconds"] == 5.0 and steps[1]["local_seconds"] == 1.0
+    assert steps[3]["seconds"] == 7.0 and steps[3]["api_seconds"] == 5.0
@@ -0,0 +1,135 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+import partial_regeneration
+from partial_regeneration import check_example_solution, check_final_use_case, regenerate_sections
+
+STEP_TITLES = ["Collect the failing tests", "Ask for a minimal fix", "Review the diff", "Run the suite again"]
+
+def use_case_step(title, instructions="Do it carefully."):
+    return {"step_title": title, "step_instructions": instructions,
+            "sub_steps": [{"title": f"{title} in detail", "bullets": ["one", "two"]}], "advice": "Take notes."}
+
+def use_case(steps):
+    return {
+        "title": "Fix Flaky Tests", "time_to_complete": "20 minutes",
+        "description": "Find and fix flaky tests with an assistant.",
+        "steps": steps, "resources": ["https://docs.pytest.org"], "metadata": {"id": "UC-1"},
+        "citations": [{"url": "https://example.com", "relevance_score": 0.9}],
+    }
+
+def example_solution(steps):
+    return {
+        "metadata": {"id": "UC-1"},
+        "solution": {
+            "title": "Flaky Test Fix", "setup_time": 5, "demo_time": 3, "prerequisites": ["Python 3.11"],
+            "scenario": "A CI job fails one run in ten.", "steps": steps, "validation": ["Suite passes"],
+            "key_points": ["Reproduce first"], "common_issues": ["Hidden state"], "variations": [],
+        },
+        "demo_script": " ".join(["word"] * partial_regeneration.MIN_DEMO_SCRIPT_WORDS),
+    }
+
+class FakeJobManager:
+    def __init__(self):
+        self.metadata = {}
+
+    def append_metadata(self, key, event):
+        self.metadata.setdefault(key, []).append(event)
+
+def regenerate(step_name, data, issues, regenerated):
+    """Run regenerate_sections with a model answering `regenerated` (values per section path)."""
+    def call_structured(job_manager, route, openai_client, messages, model_cls):
+        return model_cls(**{partial_regeneration.field_name(path): value for path, value in regenerated.items()})
+
+    generator = SimpleNamespace(
+        BRAND_LANGUAGE_GUIDELINES="", USE_CASE_GUIDELINES="", call_structured=call_structured,
+        log_prompt=lambda *args: None, log_ai_interaction=lambda *args: None,
+    )
+    job_manager = FakeJobManager()
+    content = json.dumps(data, indent=2)
+    spliced = regenerate_sections(generator, None, job_manager, step_name, content, issues)
+    assert job_manager.metadata["partial_regeneration"][0]["status"] == "spliced"
+    return json.loads(spliced)
+
+def unchanged(before, after, *keys):
+    """Each section is byte for byte what it was."""
+    for key in keys:
+        assert json.dumps(after[key]) == json.dumps(before[key]), key
+
+def test_step_dropped_from_the_middle_is_regenerated_in_its_place():
+    refined = use_case([use_case_step(title) for title in STEP_TITLES])
+    polished = use_case([use_case_step(title, "Polished.") for title in STEP_TITLES])
+    del polished["steps"][2]
+
+    issues = check_final_use_case(polished, refined)
+    assert [issue["path"] for issue in issues] == ["steps[2]"]
+    assert issues[0]["reason"].startswith("missing") and issues[0]["layout"] == [0, 1, None, 2]
+
+    new_step = use_case_step("Review the diff", "Regenerated.")
+    spliced = regenerate("final_use_case", polished, issues, {"steps[2]": new_step})
+
+    assert [step["step_title"] for step in spliced["steps"]] == STEP_TITLES
+    assert spliced["steps"][2]["step_instructions"] == "Regenerated."
+    for slot, index in ((0, 0), (1, 1), (3, 2)):
+        assert json.dumps(spliced["steps"][slot]) == json.dumps(polished["steps"][index])
+    unchanged(polished, spliced, "title", "time_to_complete", "description", "resources", "metadata", "citations")
+
+def test_surplus_step_is_merged_into_its_predecessor():
+    refined = use_case([use_case_step(title) for title in STEP_TITLES[:3]])
+    polished = use_case([use_case_step(title, "Polished.") for title in STEP_TITLES[:3]])
+    polished["steps"].insert(2, use_case_step("Bonus: celebrate with cake"))
+
+    issues = check_final_use_case(polished, refined)
+    assert [issue["path"] for issue in issues] == ["steps[1]"]
+    assert "merge steps 2, 3" in issues[0]["reason"]
+    assert issues[0]["surplus"] == polished["steps"][1:3] and issues[0]["layout"] == [0, 1, 3]
+
+    merged = use_case_step("Ask for a minimal fix", "Merged.")
+    spliced = regenerate("final_use_case", polished, issues, {"steps[1]": merged})
+
+    assert [step["step_title"] for step in spliced["steps"]] == STEP_TITLES[:3]
+    assert spliced["steps"][1]["step_instructions"] == "Merged."
+    assert json.dumps(spliced["steps"][0]) == json.dumps(polished["steps"][0])
+    assert json.dumps(spliced["steps"][2]) == json.dumps(polished["steps"][3])
+    unchanged(polished, spliced, "title", "time_to_complete", "description", "resources", "metadata", "citations")
+
+def test_one_empty_step_is_regenerated_alone():
+    refined = use_case([use_case_step(title) for title in STEP_TITLES])
+    polished = use_case([use_case_step(title, "Polished.") for title in STEP_TITLES])
+    polished["steps"][1]["step_instructions"] = "  "
+
+    issues = check_final_use_case(polished, refined)
+    assert [(issue["path"], issue["reason"]) for issue in issues] == [("steps[1]", "empty step_instructions")]
+    assert "layout" not in issues[0]
+
+    spliced = regenerate("final_use_case", polished, issues,
+                         {"steps[1]": use_case_step(STEP_TITLES[1], "Filled in.")})
+
+    assert spliced["steps"][1]["step_instructions"] == "Filled in."
+    for index in (0, 2, 3):
+        assert json.dumps(spliced["steps"][index]) == json.dumps(polished["steps"][index])
+    unchanged(polished, spliced, "title", "time_to_complete", "description", "resources", "metadata", "citations")
+
+def test_example_solution_checked_against_step_titles():
+    # Step 5's fallback only knows the use case step titles
+    steps = [{"action": f"Show: {title}", "code_or_prompt": f"prompt {index}"}
+             for index, title in enumerate(STEP_TITLES[:3])]
+    example = example_solution(steps)
+
+    assert check_example_solution(example, STEP_TITLES[:3]) == []
+    issues = check_example_solution(example, STEP_TITLES)
+    assert [issue["path"] for issue in issues] == ["solution.steps[3]"]
+    assert issues[0]["source"] == {"step_title": STEP_TITLES[3]} and issues[0]["layout"] == [0, 1, 2, None]
+
+    new_step = {"action": "Run the suite again", "code_or_prompt": "pytest -q"}
+    spliced = regenerate("example_solution", example, issues, {"solution.steps[3]": new_step})
+
+    assert spliced["solution"]["steps"] == steps + [new_step]
+    for index in range(3):
+        assert json.dumps(spliced["solution"]["steps"][index]) == json.dumps(steps[index])
+    unchanged(example, spliced, "metadata", "demo_script")
+    unchanged(example["solution"], spliced["solution"], *(key for key in example["solution"] if key != "steps"))
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+import related_use_cases
+
+def topic_records(count: int, seed: int = 37) -> list:
+    """Random use cases in which about six at a time share a topic's words."""
+    rng = random.Random(seed)
+    vocabulary = [f"word{index}" for index in range(20000)]
+
+    def words(n: int) -> str:
+        return " ".join(vocabulary[int(len(vocabulary) * rng.random() ** 3)] for _ in range(n))
+
+    topics = [words(15).split() for _ in range(count // 6)]
+    records = []
+    for _ in range(count):
+        topic = rng.choice(topics)[:]
+        rng.shuffle(topic)
+        records.append({
+            "title": " ".join(topic[:4] + [words(3)]),
+            "description": words(30),
+            "steps_text": " ".join([words(30)] + topic[4:]),
+        })
+    return records
+
+def test_pruned_neighbours_find_every_strong_neighbour():
+    matrix = related_use_cases.tfidf_matrix(topic_records(1200))
+    exact = related_use_cases.top_k_neighbours(matrix)
+    pruned = related_use_cases.top_k_neighbours(matrix, exact_limit=0)
+
+    strong = [(row, column) for row, related in enumerate(exact) for column, score in related if score >= 0.15]
+    assert len(strong) > 1000
+    found = {(row, column) for row, related in enumerate(pruned) for column, _ in related}
+    assert all(pair in found for pair in strong)
+    for related in pruned:
+        assert all(score >= related_use_cases.MIN_SCORE for _, score in related)
+        assert [score for _, score in related] == sorted((score for _, score in related), reverse=True)
+
+def test_pruned_scores_are_exact_cosines():
+    matrix = related_use_cases.tfidf_matrix(topic_records(600))
+    for row, related in enumerate(related_use_cases.top_k_neighbours(matrix, exact_limit=0)):
+        for column, score in related:
+            assert column != row
+            assert score == pytest.approx(matrix[row].multiply(matrix[column]).sum(), abs=1e-5)
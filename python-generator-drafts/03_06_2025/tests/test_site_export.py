@@ -0,0 +1,41 @@
+import site_export
+
+# Page content comes from model output, so raw HTML and links must not be able to run script
+
+def test_script_tags_are_escaped():
+    inline = site_export.render_inline("Run <script>alert(1)</script> now")
+    block = site_export.markdown_to_html("<script>alert(1)</script>")
+
+    assert "<script" not in inline and "&lt;script&gt;" in inline
+    assert "<script" not in block and "&lt;script&gt;" in block
+
+def test_event_handler_attributes_are_dropped():
+    inline = site_export.render_inline("a <div onclick=x>b</div>")
+    block = site_export.markdown_to_html('<div onclick="x()">\nb\n</div>')
+
+    assert "onclick" not in inline and "<div>" in inline
+    assert "onclick" not in block and "<div>" in block
+
+def test_javascript_links_are_not_rendered():
+    rendered = site_export.render_inline("[x](javascript:alert(1)) and ![y](data:text/html,hi)")
+
+    assert "href" not in rendered and "src" not in rendered
+    assert "javascript" not in rendered and "data:" not in rendered
+
+def test_link_destinations_keep_balanced_parentheses():
+    rendered = site_export.render_inline("[Foo](https://en.wikipedia.org/wiki/Foo_(bar)) [m](mailto:a@b.c) [r](docs/a.md)")
+
+    assert '<a href="https://en.wikipedia.org/wiki/Foo_(bar)">Foo</a>' in rendered
+    assert '<a href="mailto:a@b.c">m</a>' in rendered
+    assert '<a href="docs/a.md">r</a>' in rendered
+
+def test_library_html_keeps_allowed_tags_and_attributes():
+    rendered = site_export.markdown_to_html(
+        '<p align="center">\n  <video width="600" controls>\n    <source src="demo.mp4" type="video/mp4">\n'
+        '  </video>\n</p>\n\n<img src="javascript:alert(1)" alt="x">'
+    )
+
+    assert '<p align="center">' in rendered
+    assert '<video width="600" controls>' in rendered
+    assert '<source src="demo.mp4" type="video/mp4">' in rendered
+    assert '<img alt="x">' in rendered
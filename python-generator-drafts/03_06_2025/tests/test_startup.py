@@ -0,0 +1,11 @@
+import benchmarks
+
+# Generous: the budget in `benchmarks.py startup` is 100 ms; this only catches
+# an SDK or a heavy module creeping back into the import path
+IMPORT_SECONDS_LIMIT = 2.0
+
+def test_cold_import_stays_lazy():
+    result = benchmarks.measure_import("use_case_generator", benchmarks.NETWORK_MODULES)
+
+    assert result["loaded"] == [], f"imported at startup: {result['loaded']}"
+    assert result["seconds"] < IMPORT_SECONDS_LIMIT
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import structured_output
+import use_case_models
+from structured_output import StructuredOutputError, parse_model_output, repair_json_text
+
+def test_fence_around_the_answer_is_stripped():
+    text, repairs = repair_json_text('```json\n{"a": 1}\n```')
+    assert json.loads(text) == {"a": 1}
+    assert repairs == ["stripped code fence"]
+
+def test_fenced_code_inside_strings_is_kept():
+    near_miss = '{"code": "```python\\nprint(1)\\n```", "n": 1,}'
+    text, repairs = repair_json_text(near_miss)
+    assert json.loads(text) == {"code": "```python\nprint(1)\n```", "n": 1}
+    assert repairs == ["dropped trailing commas"]
+
+def test_fenced_answer_with_fenced_code_inside():
+    answer = '```json\n{"code": "```python\\nprint(1)\\n```"}\n```'
+    text, _ = repair_json_text(answer)
+    assert json.loads(text) == {"code": "```python\nprint(1)\n```"}
+
+def test_prose_around_the_json_is_dropped():
+    text, repairs = repair_json_text('Here it is:\n```json\n{"a": [1, 2,]}\n```\nHope this helps!')
+    assert json.loads(text) == {"a": [1, 2]}
+    assert "dropped text around the JSON" in repairs and "dropped trailing commas" in repairs
+
+def test_python_literals_and_control_characters():
+    text, repairs = repair_json_text('{"ok": True, "none": None, "bad": False, "s": "True\nline"}')
+    assert json.loads(text) == {"ok": True, "none": None, "bad": False, "s": "True\nline"}
+    assert set(repairs) == {"replaced Python literals", "escaped control characters in strings"}
+
+def test_valid_output_is_not_repaired():
+    parsed, repairs = parse_model_output('{"url": "https://example.com"}', use_case_models.Citation)
+    assert parsed.url == "https://example.com" and repairs == []
+
+def test_types_are_coerced_to_the_model():
+    answer = {
+        "Title": "Search", "setup_time": "5 minutes", "demo_time": 3.0,
+        "prerequisites": "Python 3", "scenario": 42,
+        "steps": [{"action": "Run", "code_or_prompt": "```python\nprint(1)\n```"}],
+        "validation": None, "key_points": ["a", "b"], "common_issues": [],
+    }
+    parsed, repairs = parse_model_output(json.dumps(answer), use_case_models.ExampleSolution)
+
+    assert parsed.title == "Search" and parsed.setup_time == 5 and parsed.demo_time == 3
+    assert parsed.prerequisites == ["Python 3"] and parsed.scenario == "42"
+    assert parsed.steps[0].code_or_prompt == "```python\nprint(1)\n```"
+    assert parsed.validation == [] and parsed.variations == []
+    assert "title: renamed from 'Title'" in repairs
+    assert "setup_time: '5 minutes' -> 5" in repairs
+    assert "variations: missing -> []" in repairs
+
+def test_unrepairable_output_lists_the_repairs_tried():
+    with pytest.raises(StructuredOutputError) as error:
+        parse_model_output('```json\n{"title": True,}\n```', use_case_models.Citation)
+    assert "stripped code fence" in error.value.repairs
+
+def test_strict_schema_requires_every_property():
+    schema = structured_output.response_format(use_case_models.UseCaseStructuredOutput)["json_schema"]["schema"]
+    for node in [schema, *schema["$defs"].values()]:
+        if node.get("type") == "object":
+            assert node["required"] == list(node["properties"])
+            assert node["additionalProperties"] is False
+    assert '"default"' not in json.dumps(schema)
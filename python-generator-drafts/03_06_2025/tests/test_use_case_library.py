@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+from use_case_library import DEFAULT_LIBRARY_DIRS, UseCaseLibrary
+
+pytest.importorskip("pydantic")
+
+SAVED_JOBS_DIR = DEFAULT_LIBRARY_DIRS[0]
+
+@pytest.fixture
+def library(tmp_path):
+    return UseCaseLibrary([SAVED_JOBS_DIR], manifest_path=str(tmp_path / "manifest.json"))
+
+def test_saved_jobs_load_their_bodies(library):
+    records = library.find()
+    assert records, f"no saved jobs in {SAVED_JOBS_DIR}"
+    for record in records:
+        use_case = record.use_case
+        assert use_case.title
+        assert len(use_case.steps) == record.step_count
+        # The saved metadata is the raw config, without e.g. complexity_level
+        assert use_case.metadata.complexity_level is None
+        assert use_case.metadata.family == record.family
+        if os.path.isfile(os.path.join(record.job_dir, "example_solution.json")):
+            assert record.example_solution.solution.steps
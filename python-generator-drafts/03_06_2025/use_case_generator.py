@@ -26,37 +26,38 @@ USE_CASE_CONFIG = {
 }
 
 # Format the use case content in the expected XML-like format
-def format_use_case_content():
-    """Format all USE_CASE_CONFIG fields into a structured XML-like format."""
+def format_use_case_content(use_case_config=None):
+    """Format all use case config fields (USE_CASE_CONFIG by default) into a structured XML-like format."""
+    config = use_case_config or USE_CASE_CONFIG
     # Core sections that need special formatting
-    prerequisites_str = "\n".join(f"- {prereq}" for prereq in USE_CASE_CONFIG['prerequisites'])
-    steps_str = "\n".join(f"- {step}" for step in USE_CASE_CONFIG['steps'])
+    prerequisites_str = "\n".join(f"- {prereq}" for prereq in config['prerequisites'])
+    steps_str = "\n".join(f"- {step}" for step in config['steps'])
 
     # Optional lists that need array formatting
-    department_str = ", ".join(USE_CASE_CONFIG['department']) if USE_CASE_CONFIG.get('department') else ""
-    role_str = ", ".join(USE_CASE_CONFIG['role']) if USE_CASE_CONFIG.get('role') else ""
+    department_str = ", ".join(config['department']) if config.get('department') else ""
+    role_str = ", ".join(config['role']) if config.get('role') else ""
 
     return f"""
-<Use_Case_ID>{USE_CASE_CONFIG['id']}</Use_Case_ID>
-<Use_Case>{USE_CASE_CONFIG['title']}</Use_Case>
-<Family>{USE_CASE_CONFIG['family']}</Family>
-<AI_Tool>{USE_CASE_CONFIG['ai_tool']}</AI_Tool>
-<Objective>{USE_CASE_CONFIG['objective']}</Objective>
-<Description>{USE_CASE_CONFIG['description']}</Description>
+<Use_Case_ID>{config['id']}</Use_Case_ID>
+<Use_Case>{config['title']}</Use_Case>
+<Family>{config['family']}</Family>
+<AI_Tool>{config['ai_tool']}</AI_Tool>
+<Objective>{config['objective']}</Objective>
+<Description>{config['description']}</Description>
 <Prerequisites>
 {prerequisites_str}
 </Prerequisites>
-<Time_Estimate>{USE_CASE_CONFIG['time_estimate']}</Time_Estimate>
+<Time_Estimate>{config['time_estimate']}</Time_Estimate>
 <Steps>
 {steps_str}
 </Steps>
-<Tool>{USE_CASE_CONFIG['tool']}</Tool>
+<Tool>{config.get('tool', '')}</Tool>
 <Department>{department_str}</Department>
 <Role>{role_str}</Role>
-<Mode>{USE_CASE_CONFIG['mode']}</Mode>
-<Model>{USE_CASE_CONFIG['model']}</Model>
-<Coding_Language>{USE_CASE_CONFIG['coding_language']}</Coding_Language>
-"""
+<Mode>{config.get('mode', '')}</Mode>
+<Model>{config.get('model', '')}</Model>
+<Coding_Language>{config.get('coding_language', '')}</Coding_Language>
+""" + (f"<Locale>{config['locale']}</Locale>\n" if config.get("locale") else "")
 
 # -------------------------------------------------------------------------------------
 # Rest of imports and constants
@@ -65,36 +66,46 @@ def format_use_case_content():
 """
 Single File AI Workflow for Use Case Generation
 
-Workflow Steps:
+Workflow Steps (models shown are the defaults; a routes file can change the
+model and reasoning effort per step and use case class, see model_routing.py):
 
 1. IDENTIFY RESEARCH QUESTIONS (OpenAI mini model)
    - Reviews use case requirements and design
    - Generates 2-4 focused research questions
    - Each question is self-contained with enough context for independent processing
    - Uses o3-mini-2025-01-31 model for efficient analysis
+   - Streams the completion and hands each question to step 2 as soon as its line is complete
 
-2. DEEP RESEARCH (Perplexity sonar-pro)
-   - Executes all research questions in parallel using Perplexity API
+2. DEEP RESEARCH (Perplexity sonar-pro, or another research backend)
+   - Executes all research questions in parallel using Perplexity API, starting
+     each one while step 1 is still generating the rest
    - Uses sonar-pro model for each question
+   - RESEARCH_BACKEND=local answers from a local documentation corpus instead (research_backends.py)
    - Combines results into a comprehensive research document
    - Includes context prefix with use case title, family, and objective
+   - Keeps citation URLs and snippets; page titles are fetched after step 4, only
+     for the citations the final use case renders (backfill_citation_titles)
 
 3. REFINE USE CASE WITH OPENAI REASONING (Structured Output)
    - Combines original use case content with research findings
    - Applies brand guidelines and use case guidelines
    - Outputs structured JSON matching UseCaseStructuredOutput schema
-   - Uses OpenAI's parse() method with o3-mini-2025-01-31 model
+   - Uses o3-mini-2025-01-31 with a strict JSON schema; near-miss output is
+     repaired locally before another call is made (structured_output.py)
 
 4. FINAL POLISH WITH OPENAI CHAT (Structured Output)
    - Ensures clarity, brand compliance, and 8th-grade reading level
    - Maintains structured format using UseCaseStructuredOutput schema
    - Uses GPT-4o model for final refinement
+   - Sections that lost or emptied a refined step, or an empty or out-of-range
+     field, are regenerated on their own and spliced in (partial_regeneration.py)
    - Generates both JSON and Markdown outputs
 
 5. EXAMPLE SOLUTION GENERATION (OpenAI GPT-4o)
    - Creates a practical, demonstrable solution for the use case
    - Generates a 2-3 minute video-ready demonstration script
-   - Ensures solution steps align with use case steps
+   - Ensures solution steps align with use case steps; missing, surplus or empty
+     steps and failing fields are regenerated on their own, not the whole solution
    - Includes setup time, prerequisites, validation steps
    - Provides key teaching points and common pitfalls
    - Outputs structured JSON matching ExampleSolutionOutput schema
@@ -118,203 +129,194 @@ Output formats:
 - Intermediate steps: JSON stored in job-specific directories
 - Final output: Both structured JSON and formatted Markdown
 - Markdown output includes all metadata and is ready for documentation
+
+Command line:
+- run      Generate one use case (USE_CASE_CONFIG or --config FILE); the default
+- batch    Generate several configs in one process with a concurrency limit
+- resume   Continue an interrupted job from its directory
+- render   Re-render use_case.md from saved JSON, without any API calls
+- render-all  Re-render every job in the library in parallel (markdown_render.py)
+- serve    Long-lived HTTP service (see generator_service.py) that keeps clients
+           warm and streams job progress over Server-Sent Events
 """
 
 import os
 import json
 import sys
+import time
 import logging
-from typing import List, Optional, Dict
-import asyncio
-from pydantic import BaseModel
-from openai import OpenAI, AsyncOpenAI
-from dotenv import load_dotenv
+import threading
+import contextvars
+from typing import AsyncIterator, List, Optional, Dict, Callable, TYPE_CHECKING
 from datetime import datetime
-import uuid
-import aiohttp
-from bs4 import BeautifulSoup
-
-# -------------------------------------------------------------------------------------
-# Pydantic Models for Steps 3 & 4
-# -------------------------------------------------------------------------------------
-
-class UseCaseMetadata(BaseModel):
-    """Holds all miscellaneous metadata about the use case,
-    including basic IDs, tool references, complexity levels, etc.
-    """
-    id: Optional[str]
-    ai_tool: Optional[str]
-    family: Optional[str]
-    status: Optional[str]
-    complexity_level: Optional[str]
-    customization_level: Optional[str]
-    time_minutes: Optional[int]
-    department: Optional[List[str]]
-    role: Optional[List[str]]
-    notes: Optional[str]
-    tool: Optional[str]
-    mode: Optional[str]
-    model: Optional[str]
-    coding_language: Optional[str]
-    # Add any other metadata fields you need here
-
-class SubStep(BaseModel):
-    """
-    Represents a single substep within a step.
 
-    Attributes:
-      - title: Brief title of the substep
-      - description: Optional longer description or bullet points
-      - bullets: Optional list of bullet points for additional detail
-    """
-    title: str
-    description: Optional[str] = None
-    bullets: Optional[List[str]] = None
-
-class UseCaseStep(BaseModel):
-    """
-    Represents a single step in the use case workflow.
-
-    Attributes:
-      - step_title: Brief name of the step, e.g. "Draft a docstring."
-      - step_instructions: Concise instructions for the user (1-3 sentences).
-      - sub_steps: Optional list of SubStep objects for more detailed breakdown
-      - advice: (Optional) Best practices, troubleshooting tips, or cautionary notes.
-    """
-    step_title: str
-    step_instructions: str
-    sub_steps: Optional[List[SubStep]] = None
-    advice: Optional[str] = None
-
-class Citation(BaseModel):
-    """
-    Represents a citation for a research source.
-    
-    Attributes:
-        url: The URL of the source
-        title: The title of the source
-        snippet: A relevant snippet/quote from the source
-        relevance_score: AI-assigned score for relevance (0-1)
-    """
-    url: str
-    title: Optional[str] = None
-    snippet: Optional[str] = None
-    relevance_score: Optional[float] = None
+import model_routing
+import generator_metrics
+import pipeline_profiler
+import structured_output
+import partial_regeneration
 
-class UseCaseStructuredOutput(BaseModel):
-    """
-    Fields:
-      - title: e.g. "Craft Effective Code Prompts for AI Assistance"
-      - time_to_complete: e.g. "20 minutes"
-      - description: 2-3 sentences describing the primary objective
-      - steps: A list of UseCaseStep objects
-      - resources: A list of resource links or doc references
-      - metadata: A UseCaseMetadata object for ID, tool references, prerequisites, etc.
-      - citations: A list of Citation objects for research sources
-    """
-    title: str
-    time_to_complete: str
-    description: str
-    steps: List[UseCaseStep]
-    resources: List[str]
-    metadata: Optional[UseCaseMetadata] = None
-    citations: Optional[List[Citation]] = None
-
-class Step(BaseModel):
-    """
-    Represents a single step in the example solution.
-    """
-    action: str
-    code_or_prompt: str
+if TYPE_CHECKING:
+    import aiohttp
+    from openai import OpenAI, AsyncOpenAI
 
-class ExampleSolution(BaseModel):
-    """
-    Represents a complete example solution for a use case.
-    
-    Fields:
-      - title: Brief title for the example (e.g. "Binary Search Implementation with AI-Assisted Comments")
-      - setup_time: Estimated setup time in minutes
-      - demo_time: Estimated demo time in minutes (2-3 minutes target)
-      - prerequisites: List of required setup steps (environment, tools, etc.)
-      - scenario: A real-world context for the example
-      - steps: Ordered list of demo steps with code/prompts
-      - validation: How to verify the solution works
-      - key_points: Teaching points to emphasize
-      - common_issues: Potential problems to watch for
-      - variations: Optional variations for different contexts
-    """
-    title: str
-    setup_time: int
-    demo_time: int
-    prerequisites: List[str]
-    scenario: str
-    steps: List[Step]
-    validation: List[str]
-    key_points: List[str]
-    common_issues: List[str]
-    variations: List[str]  # Make this required but allow empty list
-
-class ExampleSolutionOutput(BaseModel):
-    """
-    The complete output including metadata and the solution.
-    """
-    metadata: UseCaseMetadata
-    solution: ExampleSolution
-    demo_script: str  # Natural language script for 2-3 min demo
+# Heavy dependencies (openai, pydantic, aiohttp, bs4, dotenv, asyncio) are
+# imported on first use so that rendering, indexing and --help stay fast and
+# never pull in the network SDKs.
 
 # -------------------------------------------------------------------------------------
 # Load environment variables (API keys, etc.)
 # -------------------------------------------------------------------------------------
-load_dotenv()
-PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+_environment_loaded = False
+
+def load_environment() -> None:
+    """Load `.env` once, the first time API keys are needed."""
+    global _environment_loaded
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _environment_loaded = True
 
 # -------------------------------------------------------------------------------------
-# Initialize API Clients
+# Initialize API Clients (lazily, on first use)
 # -------------------------------------------------------------------------------------
-perplexity_client = AsyncOpenAI(api_key=PERPLEXITY_API_KEY, base_url="https://api.perplexity.ai")
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+_clients: Dict[str, object] = {}
+
+def get_openai_client() -> "OpenAI":
+    """Return the shared OpenAI client, creating it on first use."""
+    if "openai" not in _clients:
+        load_environment()
+        from openai import OpenAI
+        _clients["openai"] = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _clients["openai"]
+
+def get_perplexity_client() -> "AsyncOpenAI":
+    """Return the shared Perplexity client, creating it on first use."""
+    if "perplexity" not in _clients:
+        load_environment()
+        from openai import AsyncOpenAI
+        _clients["perplexity"] = AsyncOpenAI(
+            api_key=os.getenv("PERPLEXITY_API_KEY"),
+            base_url="https://api.perplexity.ai",
+        )
+    return _clients["perplexity"]
+
+_LAZY_MODELS = {
+    "UseCaseMetadata", "SubStep", "UseCaseStep", "Citation", "OfficialResource", "CitationScoringOutput",
+    "UseCaseStructuredOutput", "Step", "ExampleSolution", "ExampleSolutionOutput",
+}
+
+def __getattr__(name: str):
+    """Resolve clients and Pydantic models lazily for `use_case_generator.<name>` access."""
+    if name == "openai_client":
+        return get_openai_client()
+    if name == "perplexity_client":
+        return get_perplexity_client()
+    if name in ("OPENAI_API_KEY", "PERPLEXITY_API_KEY"):
+        load_environment()
+        return os.getenv(name)
+    if name in _LAZY_MODELS:
+        import use_case_models
+        return getattr(use_case_models, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # -------------------------------------------------------------------------------------
 # Basic Configuration Constants
 # -------------------------------------------------------------------------------------
-WORK_DIR = "partial_results"  # Base directory for all partial results
-os.makedirs(WORK_DIR, exist_ok=True)
+DEFAULT_JOBS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "use_cases")
+REQUIRED_CONFIG_FIELDS = ["id", "title", "family", "ai_tool", "objective", "description",
+                          "prerequisites", "time_estimate", "steps"]
+
+# Job whose log file should receive records from the current task or thread.
+# Lets several jobs run in one process (batch and service modes) without
+# their execution logs bleeding into each other.
+CURRENT_JOB: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("current_job", default=None)
+
+_console_handler: Optional[logging.Handler] = None
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+def setup_console_logging():
+    """Attach the process-wide console handler to the root logger (once)."""
+    global _console_handler
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    if _console_handler is None:
+        _console_handler = logging.StreamHandler()
+        _console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root_logger.addHandler(_console_handler)
+
+class JobLogFilter(logging.Filter):
+    """Only pass records emitted while the given job is the current job."""
+
+    def __init__(self, job_id: str):
+        super().__init__()
+        self.job_id = job_id
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Records from outside any job (service access logs, batch summaries)
+        # only go to the console
+        return CURRENT_JOB.get() == self.job_id
 
 class JobManager:
     """Manages unique job directories for partial results."""
     
-    def __init__(self, use_case_id: str, title: str):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_title = "_".join(title.lower().split())
-        self.job_id = f"{safe_title}_{timestamp}"
-        # Create directory in use_cases/
-        self.job_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "use_cases", self.job_id)
+    def __init__(self, use_case_id: str, title: str, base_dir: Optional[str] = None,
+                 job_dir: Optional[str] = None, with_logging: bool = True):
+        if job_dir:
+            # Re-open an existing job directory (resume, render)
+            self.job_dir = os.path.abspath(job_dir)
+            self.job_id = os.path.basename(self.job_dir.rstrip(os.sep))
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            safe_title = "_".join(title.lower().split())
+            self.job_id = f"{safe_title}_{timestamp}"
+            # Create directory in use_cases/
+            self.job_dir = os.path.join(base_dir or DEFAULT_JOBS_DIR, self.job_id)
+            suffix = 2
+            while os.path.exists(self.job_dir):
+                # Same title started within the same second (batch mode)
+                self.job_id = f"{safe_title}_{timestamp}_{suffix}"
+                self.job_dir = os.path.join(base_dir or DEFAULT_JOBS_DIR, self.job_id)
+                suffix += 1
         os.makedirs(self.job_dir, exist_ok=True)
+        # Steps in worker threads and tasks on the event loop update the metadata concurrently
+        self.metadata_lock = threading.Lock()
         
+        self.file_handler: Optional[logging.Handler] = None
         # Set up logging
-        self.setup_logging()
+        if with_logging:
+            self.setup_logging()
+
+    @classmethod
+    def open(cls, job_dir: str, with_logging: bool = True) -> "JobManager":
+        """Open an existing job directory instead of creating a new one."""
+        if not os.path.isdir(job_dir):
+            raise FileNotFoundError(f"Job directory not found: {job_dir}")
+        return cls("", "", job_dir=job_dir, with_logging=with_logging)
         
     def setup_logging(self):
         """Configure logging to write to both file and console."""
         log_file = os.path.join(self.job_dir, "execution.log")
         
         # Create a formatter that includes timestamp
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        formatter = logging.Formatter(LOG_FORMAT)
         
-        # File handler
+        # File handler, restricted to records that belong to this job
         file_handler = logging.FileHandler(log_file)
         file_handler.setFormatter(formatter)
+        file_handler.addFilter(JobLogFilter(self.job_id))
+        self.file_handler = file_handler
         
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
-        
-        # Configure root logger
-        root_logger = logging.getLogger()
-        root_logger.setLevel(logging.INFO)
-        root_logger.addHandler(file_handler)
-        root_logger.addHandler(console_handler)
+        # Configure root logger; the console handler is shared by every job
+        logging.getLogger().addHandler(file_handler)
+        setup_console_logging()
+
+    def close(self):
+        """Detach and close this job's log file handler."""
+        if self.file_handler:
+            logging.getLogger().removeHandler(self.file_handler)
+            self.file_handler.close()
+            self.file_handler = None
         
     def get_filepath(self, step_name: str) -> str:
         """Get the full filepath for a step result."""
@@ -326,11 +328,62 @@ class JobManager:
             "job_id": self.job_id,
             "created_at": datetime.now().isoformat(),
             "use_case_id": use_case_config["id"],
-            "use_case_title": use_case_config["title"]
+            "use_case_title": use_case_config["title"],
+            # Full config so the job can be resumed from its directory alone
+            "use_case_config": use_case_config,
         }
         with open(os.path.join(self.job_dir, "metadata.json"), "w") as f:
             json.dump(metadata, f, indent=2)
 
+    def load_metadata(self) -> dict:
+        """Load job metadata, or an empty dict if none was saved."""
+        path = os.path.join(self.job_dir, "metadata.json")
+        if not os.path.isfile(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def update_metadata(self, updates: dict):
+        """Merge `updates` into the saved job metadata."""
+        with self.metadata_lock:
+            metadata = self.load_metadata()
+            metadata.update(updates)
+            with open(os.path.join(self.job_dir, "metadata.json"), "w") as f:
+                json.dump(metadata, f, indent=2)
+
+    def append_metadata(self, key: str, event: dict):
+        """Append a timestamped event to the list `key` in the job metadata."""
+        with self.metadata_lock:
+            metadata = self.load_metadata()
+            metadata.setdefault(key, []).append(dict(event, time=datetime.now().isoformat()))
+            with open(os.path.join(self.job_dir, "metadata.json"), "w") as f:
+                json.dump(metadata, f, indent=2)
+
+    def record_fallback(self, event: dict):
+        """Append a provider/model fallback decision to `fallbacks` in the job metadata."""
+        self.append_metadata("fallbacks", event)
+
+    def load_use_case_config(self) -> dict:
+        """
+        Recover the use case config for this job.
+
+        Newer jobs store it in metadata.json; older jobs only have it as the
+        metadata attached to the refined or final use case.
+        """
+        config = self.load_metadata().get("use_case_config")
+        if config:
+            return config
+        for step_name in ("final_use_case", "refined_draft"):
+            content = load_partial_result(self, step_name)
+            if content:
+                try:
+                    config = json.loads(content).get("metadata")
+                except json.JSONDecodeError:
+                    config = None
+                if config and config.get("title"):
+                    return config
+        raise ValueError(f"No use case config found for job {self.job_id}")
+
 # Update helper functions to use JobManager
 def load_partial_result(job_manager: JobManager, step_name: str) -> Optional[str]:
     """Load a partial result from the job-specific directory."""
@@ -433,153 +486,115 @@ def log_prompt(step: str, messages: list):
         logging.info(f"{'-'*40}")
     logging.info(f"{'='*80}\n")
 
-def convert_json_to_markdown(json_content: str, example_solution_json: Optional[str] = None, visual_suggestions: Optional[str] = None) -> str:
-    """Convert the structured JSON output to a readable markdown format."""
+def call_model(job_manager: "JobManager", route: str, method: Callable, **kwargs):
+    """
+    Call an OpenAI client method with the model of `route`, then with each of
+    the route's fallback models while the call fails with a transient error
+    (circuit_breakers.is_transient) or the model's circuit breaker is open.
+    A fallback that answers is recorded in the job metadata. Client errors
+    (400, 401, 404, ...) are raised at once: another model would get the
+    same request. Raises FallbackExhaustedError when no model answered.
+    """
+    import circuit_breakers
+    candidates = model_routing.route_candidates(route)
+    provider = circuit_breakers.get_breaker("openai")
+    provider.before_call()
+    errors: List[str] = []
+    last_error: Optional[Exception] = None
+    answered = False
     try:
-        data = json.loads(json_content)
-        
-        markdown = f"""# {data['title']}
-
-**Time to Complete:** {data['time_to_complete']}
-
-## Description
-{data['description']}
-
-## Steps
-"""
-        for i, step in enumerate(data['steps'], 1):
-            markdown += f"### Step {i}: {step['step_title']}\n"
-                
-            markdown += f"{step['step_instructions']}\n\n"
-            
-            if step.get('sub_steps'):
-                for j, sub_step in enumerate(step['sub_steps'], 1):
-                    markdown += f"{j}. **{sub_step['title']}**\n"
-                    if sub_step.get('description'):
-                        markdown += f"   {sub_step['description']}\n"
-                    if sub_step.get('bullets'):
-                        for bullet in sub_step['bullets']:
-                            markdown += f"   - {bullet}\n"
-                    markdown += "\n"
-                
-            if step.get('advice'):
-                markdown += f"{step['advice']}\n\n"
-
-        if data['resources']:
-            markdown += "## Resources\n"
-            # Group resources by type
-            resources_by_type = {
-                'tool': [],
-                'language': [],
-                'mode': []
-            }
-            
-            for resource in data['resources']:
-                if isinstance(resource, dict):
-                    resource_type = resource.get('type', 'tool')  # Default to tool if not specified
-                    resources_by_type[resource_type].append(resource)
-                else:
-                    # Legacy format - treat as tool resource
-                    resources_by_type['tool'].append({'url': resource, 'title': 'Official Resource'})
-            
-            # Output resources in priority order with headers
-            type_headers = {
-                'tool': 'Tool Documentation',
-                'language': 'Language Documentation',
-                'mode': 'Mode-specific Documentation'
-            }
-            
-            for res_type, header in type_headers.items():
-                resources = resources_by_type[res_type]
-                if resources:
-                    markdown += f"### {header}\n"
-                    for resource in resources:
-                        title = resource.get('title', 'Official Resource')
-                        url = resource['url']
-                        section = resource.get('section', '')
-                        markdown += f"* [{title}]({url})"
-                        if section:
-                            markdown += f" - {section}"
-                        markdown += "\n"
-                    markdown += "\n"
-
-        if data.get('citations'):
-            markdown += "## Additional References\n"
-            # Sort citations by relevance score (highest first)
-            sorted_citations = sorted(
-                data['citations'], 
-                key=lambda x: float(x.get('relevance_score', 0)), 
-                reverse=True
-            )
-            for citation in sorted_citations:
-                markdown += f"* [{citation.get('title', 'Untitled')}]({citation['url']})"
-                if citation.get('snippet'):
-                    markdown += f"\n  > {citation['snippet']}"
-                markdown += "\n"
-            markdown += "\n"
-
-        if example_solution_json:
-            example = json.loads(example_solution_json)
-            solution = example['solution']
-            
-            markdown += f"""## Example Solution: {solution['title']}
-
-**Setup Time:** {solution['setup_time']} minutes  
-**Demo Time:** {solution['demo_time']} minutes
-
-### Scenario
-{solution['scenario']}
+        for attempt, model_kwargs in enumerate(candidates):
+            breaker = circuit_breakers.get_breaker(f"openai:{model_kwargs['model']}")
+            try:
+                started = breaker.before_call()
+            except circuit_breakers.CircuitOpenError as e:
+                errors.append(str(e))
+                last_error = e
+                continue
+            try:
+                with generator_metrics.api_call("openai", model_kwargs["model"]) as call, pipeline_profiler.api_call():
+                    response = method(**model_kwargs, **kwargs)
+                    call.usage(response)
+            except Exception as e:
+                if not circuit_breakers.is_transient(e):
+                    # The provider answered; the request itself was rejected
+                    breaker.record(True, started)
+                    answered = True
+                    raise
+                breaker.record(False, started)
+                logging.warning(f"{route}: {model_kwargs['model']} failed: {e}")
+                errors.append(f"{model_kwargs['model']}: {type(e).__name__}: {e}")
+                last_error = e
+                continue
+            breaker.record(True, started)
+            answered = True
+            if attempt:
+                logging.warning(f"{route}: fell back to {model_kwargs['model']}")
+                job_manager.record_fallback({
+                    "route": route,
+                    "from": model_routing.describe(candidates[0]),
+                    "to": model_routing.describe(model_kwargs),
+                    "reasons": errors,
+                })
+            return response
+    finally:
+        provider.record(answered)
+    raise circuit_breakers.FallbackExhaustedError(
+        f"No model answered {route}: {'; '.join(errors)}"
+    ) from last_error
+
+def call_structured(job_manager: "JobManager", route: str, openai_client, messages: list, model_cls,
+                    attempts: int = 2):
+    """
+    Ask the model of `route` for output matching `model_cls` (strict JSON
+    schema, as `parse()` would) and validate it locally.
+
+    Near-miss output is repaired by structured_output.py before another paid
+    call is made; repairs and failed attempts are recorded under
+    `structured_output` in the job metadata. Returns the model instance, or
+    None when the model refused. Raises StructuredOutputError when no
+    attempt could be repaired.
+    """
+    error: Optional[structured_output.StructuredOutputError] = None
+    for attempt in range(1, attempts + 1):
+        completion = call_model(
+            job_manager, route, openai_client.chat.completions.create,
+            messages=messages,
+            response_format=structured_output.response_format(model_cls),
+        )
+        message = completion.choices[0].message
+        if getattr(message, "refusal", None):
+            return None
+        try:
+            parsed, repairs = structured_output.parse_model_output(message.content, model_cls)
+        except structured_output.StructuredOutputError as e:
+            logging.warning(f"{route}: attempt {attempt} did not match {model_cls.__name__}: {e}")
+            job_manager.append_metadata("structured_output", {
+                "route": route, "attempt": attempt, "status": "failed", "error": str(e), "repairs": e.repairs,
+            })
+            error = e
+            continue
+        if repairs:
+            logging.warning(f"{route}: repaired output locally: {'; '.join(repairs)}")
+            job_manager.append_metadata("structured_output", {
+                "route": route, "attempt": attempt, "status": "repaired", "repairs": repairs,
+            })
+        return parsed
+    raise error
+
+def convert_json_to_markdown(json_content: str, example_solution_json: Optional[str] = None, visual_suggestions: Optional[str] = None,
+                             related: Optional[List[dict]] = None) -> str:
+    """
+    Convert the structured JSON output to a readable markdown format.
 
-### Prerequisites
-"""
-            for prereq in solution['prerequisites']:
-                markdown += f"* {prereq}\n"
-            
-            markdown += "\n### Demo Steps\n"
-            for i, step in enumerate(solution['steps'], 1):
-                markdown += f"{i}. **{step['action']}**\n"
-                if 'code_or_prompt' in step:
-                    markdown += f"```\n{step['code_or_prompt']}\n```\n"
-            
-            markdown += "\n### Validation\n"
-            for check in solution['validation']:
-                markdown += f"* {check}\n"
-            
-            markdown += "\n### Key Teaching Points\n"
-            for point in solution['key_points']:
-                markdown += f"* {point}\n"
-            
-            markdown += "\n### Common Issues to Watch For\n"
-            for issue in solution['common_issues']:
-                markdown += f"* {issue}\n"
-            
-            if solution.get('variations'):
-                markdown += "\n### Variations\n"
-                for variation in solution['variations']:
-                    markdown += f"* {variation}\n"
-            
-            markdown += f"\n### Demo Script\n{example['demo_script']}\n"
-
-        # Add visual suggestions section if provided
-        if visual_suggestions:
-            markdown += "\n## Visual Elements\n"
-            markdown += "The following visual elements are recommended to enhance this use case:\n\n"
-            markdown += visual_suggestions + "\n"
-
-        if data.get('metadata'):
-            markdown += "\n## Metadata\n"
-            meta = data['metadata']
-            for key, value in meta.items():
-                if value is not None:
-                    if isinstance(value, list):
-                        markdown += f"* **{key}:** {', '.join(value)}\n"
-                    else:
-                        markdown += f"* **{key}:** {value}\n"
-
-        return markdown
-    except Exception as e:
-        print(f"Error converting JSON to Markdown: {e}")
-        return ""
+    Thin wrapper around markdown_render, which streams the output through
+    precompiled templates. `related` is a list of {"title", "url"} links for
+    the "Related Use Cases" section (see related_use_cases.py). Raises
+    markdown_render.RenderError on malformed input instead of returning an
+    empty document.
+    """
+    from markdown_render import render_markdown
+    return render_markdown(json_content, example_solution_json, visual_suggestions, related=related)
 
 def write_markdown_file(markdown_content: str, use_case_id: str, title: str, job_manager: JobManager):
     """Write the markdown content to a file in the use cases directory."""
@@ -597,18 +612,56 @@ def write_markdown_file(markdown_content: str, use_case_id: str, title: str, job
 # -------------------------------------------------------------------------------------
 # STEP 1: IDENTIFY RESEARCH QUESTIONS (OpenAI Reasoning)
 # -------------------------------------------------------------------------------------
-def identify_research_questions(openai_client, use_case_content, job_manager: JobManager):
+def identify_research_questions(openai_client, use_case_content, job_manager: JobManager,
+                                on_question: Optional[Callable[[str], None]] = None):
     """
     Use OpenAI to generate 2-4 distinct research questions for Perplexity.
     Each question should be self-contained with enough context and incorporate
     critical elements from the use case configuration.
+
+    The completion is streamed, and `on_question` is called with each question
+    as soon as its line is complete, so step 2 can start researching it while
+    the rest are still being generated (from the thread running this step).
+    If a model fails mid-stream, the questions it already produced are kept and
+    the fallback model's questions are added to them.
     """
+    from types import SimpleNamespace
     step_name = "research_questions"
+    questions: List[str] = []
+
+    def dispatch(line: str):
+        question = line.strip()
+        if question and question not in questions:
+            questions.append(question)
+            if on_question:
+                on_question(question)
+
     existing_content = load_partial_result(job_manager, step_name)
     if existing_content:
         print("[Resume] Found existing identified research questions...")
+        for line in existing_content.split("\n"):
+            dispatch(line)
         return existing_content.split("\n")
 
+    def streamed(**kwargs):
+        """One streamed completion, dispatching complete lines; returns it as a regular response."""
+        text: List[str] = []
+        pending = ""
+        usage = None
+        stream = openai_client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **kwargs)
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            text.append(delta)
+            *lines, pending = (pending + delta).split("\n")
+            for line in lines:
+                dispatch(line)
+        dispatch(pending)
+        message = SimpleNamespace(content="".join(text), refusal=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
     messages = [
         {
             "role": "developer",
@@ -649,13 +702,7 @@ def identify_research_questions(openai_client, use_case_content, job_manager: Jo
         # Log the full prompt before execution
         log_prompt("1 - Identify Research Questions", messages)
         
-        response = openai_client.chat.completions.create(
-            model="o3-mini-2025-01-31",
-            reasoning_effort="medium",
-            messages=messages,
-        )
-        questions = response.choices[0].message.content.strip().split("\n")
-        questions = [q.strip() for q in questions if q.strip()]
+        call_model(job_manager, "research_questions", streamed, messages=messages)
         
         log_ai_interaction(
             "1 - Identify Research Questions",
@@ -670,13 +717,14 @@ def identify_research_questions(openai_client, use_case_content, job_manager: Jo
         raise
 
 # -------------------------------------------------------------------------------------
-# STEP 2: RESEARCH ALL QUESTIONS (Perplexity API)
+# STEP 2: RESEARCH ALL QUESTIONS (Perplexity API or another research backend)
 # -------------------------------------------------------------------------------------
-async def fetch_url_title(url: str, session: aiohttp.ClientSession) -> Optional[str]:
+async def fetch_url_title(url: str, session: "aiohttp.ClientSession") -> Optional[str]:
     """
     Fetch the title of a webpage asynchronously.
     Returns None if the request fails or no title is found.
     """
+    from bs4 import BeautifulSoup
     try:
         async with session.get(url, timeout=5) as response:
             if response.status == 200:
@@ -689,69 +737,258 @@ async def fetch_url_title(url: str, session: aiohttp.ClientSession) -> Optional[
         print(f"Warning: Could not fetch title for {url}: {e}")
     return None
 
-async def research_question(question: str, context_prefix: str) -> dict:
-    """Execute a single research question against Perplexity API."""
+# Page titles fetched in this process, shared by the jobs of a batch
+_url_titles: Dict[str, Optional[str]] = {}
+
+async def backfill_citation_titles(final_use_case_json: str, job_manager: JobManager) -> str:
+    """
+    Fetch the page titles of the citations and resources the final use case
+    renders without one, and save them into final_use_case.json.
+
+    Titles are resolved only for what survived citation scoring and the
+    final polish, instead of for every URL the research returned. Pages
+    that give no title keep none. Returns the updated JSON, or the input
+    unchanged when it has nothing to resolve.
+    """
+    import asyncio
+    import aiohttp
     try:
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    "You are a specialized AI for research, providing relevant info for educational "
-                    "content creation. Format your response to be directly usable in educational "
-                    "materials about AI technologies and software development practices. "
-                    "Include specific examples, code samples when relevant, and cite recent sources."
-                )
-            },
-            {
-                "role": "user",
-                "content": f"{context_prefix}{question}"
-            }
-        ]
-        
-        # Log the full prompt before execution
-        log_prompt("2 - Deep Research (Single Question)", messages)
-        
-        response = await perplexity_client.chat.completions.create(
-            model="sonar-pro",
-            messages=messages,
-        )
-        
-        citations = []
-        if hasattr(response, 'citations') and response.citations:
-            async with aiohttp.ClientSession() as session:
-                title_tasks = [fetch_url_title(url, session) for url in response.citations]
-                titles = await asyncio.gather(*title_tasks)
-                
-                for url, title in zip(response.citations, titles):
-                    citations.append({
-                        'url': url,
-                        'title': title,
-                        'snippet': None,
-                        'relevance_score': None
-                    })
-        
-        return {
-            'question': question,
-            'answer': response.choices[0].message.content.strip(),
-            'citations': citations
-        }
-    except Exception as e:
-        logging.error(f"Error researching question '{question}': {e}")
-        return {
-            'question': question,
-            'answer': f"Error during research: {e}",
-            'citations': []
+        final_struct = json.loads(final_use_case_json)
+    except json.JSONDecodeError:
+        return final_use_case_json
+    untitled = [
+        entry for key in ("citations", "resources") for entry in final_struct.get(key) or []
+        if isinstance(entry, dict) and entry.get("url") and not entry.get("title")
+    ]
+    if not untitled:
+        return final_use_case_json
+
+    urls = list(dict.fromkeys(entry["url"] for entry in untitled))
+    to_fetch = [url for url in urls if url not in _url_titles]
+    generator_metrics.cache_lookups("citation_titles", len(urls) - len(to_fetch), len(to_fetch))
+    if to_fetch:
+        async with aiohttp.ClientSession() as session:
+            titles = await asyncio.gather(*(fetch_url_title(url, session) for url in to_fetch))
+        _url_titles.update(zip(to_fetch, titles))
+    for entry in untitled:
+        entry["title"] = _url_titles.get(entry["url"]) or entry.get("title")
+
+    resolved = sum(1 for url in urls if _url_titles.get(url))
+    job_manager.update_metadata({"citation_titles": {"untitled": len(urls), "fetched": len(to_fetch), "resolved": resolved}})
+    logging.info(f"Resolved {resolved} of {len(urls)} citation titles ({len(to_fetch)} fetched)")
+    final_use_case_json = json.dumps(final_struct, indent=2)
+    save_partial_result(job_manager, "final_use_case", final_use_case_json)
+    return final_use_case_json
+
+async def perplexity_research(question: str, context_prefix: str, model: Optional[str] = None) -> dict:
+    """
+    Answer a single research question with the Perplexity API (the `perplexity` backend).
+
+    Citations keep the title and snippet Perplexity returns with its search
+    results, if any. Page titles are not fetched here; that happens after
+    step 4 for the citations that are rendered (backfill_citation_titles).
+    """
+    messages = [
+        {
+            "role": "system",
+            "content": (
+                "You are a specialized AI for research, providing relevant info for educational "
+                "content creation. Format your response to be directly usable in educational "
+                "materials about AI technologies and software development practices. "
+                "Include specific examples, code samples when relevant, and cite recent sources."
+            )
+        },
+        {
+            "role": "user",
+            "content": f"{context_prefix}{question}"
         }
+    ]
+    
+    # Log the full prompt before execution
+    log_prompt("2 - Deep Research (Single Question)", messages)
+    
+    model = model or model_routing.route_kwargs("deep_research")["model"]
+    response = await get_perplexity_client().chat.completions.create(
+        model=model,
+        messages=messages,
+    )
+    generator_metrics.record_usage("perplexity", model, getattr(response, "usage", None))
+    
+    search_results = {}
+    for result in getattr(response, 'search_results', None) or []:
+        result = result if isinstance(result, dict) else vars(result)
+        if result.get('url'):
+            search_results[result['url']] = result
+
+    citations = []
+    for url in getattr(response, 'citations', None) or []:
+        result = search_results.get(url, {})
+        citations.append({
+            'url': url,
+            'title': result.get('title') or None,
+            'snippet': result.get('snippet') or None,
+            'relevance_score': None
+        })
+    
+    return {
+        'question': question,
+        'answer': response.choices[0].message.content.strip(),
+        'citations': citations
+    }
+
+def get_research_backend(name: Optional[str] = None):
+    """Return the shared research backend `name` (default: RESEARCH_BACKEND), creating it on first use."""
+    import research_backends
+    name = name or os.getenv("RESEARCH_BACKEND") or research_backends.DEFAULT_BACKEND
+    if f"research:{name}" not in _clients:
+        load_environment()
+        research_backends.register_backend(
+            "perplexity", lambda: research_backends.PerplexityBackend(perplexity_research)
+        )
+        _clients[f"research:{name}"] = research_backends.create_backend(name)
+    return _clients[f"research:{name}"]
+
+def research_options() -> List[tuple]:
+    """
+    (source, model) pairs to try for a research question, in order: the
+    configured backend (each route model for perplexity), then the fallbacks.
+    """
+    import research_backends
+    backend = os.getenv("RESEARCH_BACKEND") or research_backends.DEFAULT_BACKEND
+    if backend == "perplexity":
+        options = [(backend, kwargs["model"]) for kwargs in model_routing.route_candidates("deep_research")]
+    else:
+        options = [(backend, None)]
+    options += [(name, None) for name in research_backends.fallback_names() if name != backend]
+    return options
+
+async def research_question(question: str, context_prefix: str, job_manager: Optional[JobManager] = None) -> dict:
+    """
+    Answer a single research question with the configured research backend.
+
+    When the backend fails or its circuit breaker is open, the options from
+    `research_options` are tried in turn, and a fallback that answers is
+    recorded in the job metadata. Raises ResearchError when nothing answered,
+    so failures never reach later steps disguised as research.
+    """
+    import asyncio
+    import circuit_breakers
+    import research_backends
+    import research_cache
+    options = research_options()
+    errors: List[str] = []
+    providers: Dict[str, object] = {}
+    failed: set = set()  # providers with a transient error
+    answered_by: Optional[str] = None
+    cancelled = False
+    try:
+        for attempt, (source, model) in enumerate(options):
+            label = f"{source}:{model}" if model else source
+            try:
+                if source == "cache":
+                    dirs = [os.path.dirname(job_manager.job_dir)] if job_manager else None
+                    topic = research_cache.topic_text(job_manager.load_use_case_config()) if job_manager else None
+                    hit = (await asyncio.to_thread(
+                        research_cache.lookup_many, [question], research_cache.fallback_settings(), dirs,
+                        topic=topic,
+                    )).get(question)
+                    if not hit:
+                        raise research_backends.ResearchError("no similar cached answer")
+                    result = {
+                        'question': question,
+                        'answer': hit['answer'],
+                        'citations': hit['citations'],
+                        'answered_at': hit['answered_at'],
+                        'reused_from': {key: hit[key] for key in ('source', 'question', 'similarity')},
+                    }
+                else:
+                    if source not in providers:
+                        # Checked once per provider; its outcome is recorded below
+                        providers[source] = None
+                        circuit_breakers.get_breaker(source).before_call()
+                        providers[source] = circuit_breakers.get_breaker(source)
+                    if providers[source] is None:
+                        raise circuit_breakers.CircuitOpenError(source, 0.0)
+                    breaker = circuit_breakers.get_breaker(label)
+                    started = breaker.before_call()
+                    try:
+                        with generator_metrics.api_call(source, model or source), pipeline_profiler.api_call():
+                            result = await get_research_backend(source).answer(question, context_prefix, model)
+                    except Exception as e:
+                        # Only transient errors count against the breakers; a miss or a rejected
+                        # request still moves on to the next research option
+                        transient = circuit_breakers.is_transient(e)
+                        breaker.record(not transient, started)
+                        if transient:
+                            failed.add(source)
+                        raise
+                    except asyncio.CancelledError:
+                        # Cancelled because its step failed: no outcome to record
+                        breaker.release()
+                        raise
+                    breaker.record(True, started)
+            except Exception as e:
+                logging.warning(f"Research via {label} failed for '{question}': {e}")
+                errors.append(f"{label}: {type(e).__name__}: {e}")
+                continue
+            answered_by = source
+            if attempt and job_manager:
+                job_manager.record_fallback({
+                    "route": "deep_research",
+                    "question": question,
+                    "from": options[0][1] or options[0][0],
+                    "to": label,
+                    "reasons": errors,
+                })
+            return result
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
+    finally:
+        for source, breaker in providers.items():
+            if breaker is None:
+                continue
+            if cancelled:
+                breaker.release()
+            else:
+                breaker.record(source == answered_by or source not in failed)
+    raise research_backends.ResearchError(f"No research source answered '{question}': {'; '.join(errors)}")
+
+async def iterate_questions(research_questions) -> AsyncIterator[str]:
+    """Non-empty questions from a list or an async iterable (step 1's stream)."""
+    if hasattr(research_questions, "__aiter__"):
+        async for question in research_questions:
+            if question.strip():
+                yield question.strip()
+    else:
+        for question in research_questions:
+            if question.strip():
+                yield question.strip()
 
 async def deep_research(perplexity_client, use_case_content, research_questions, job_manager: JobManager):
     """
-    Execute all research questions in parallel using Perplexity API.
+    Execute all research questions in parallel with the configured research
+    backend (Perplexity unless RESEARCH_BACKEND selects another).
+
+    `research_questions` is a list or an async iterable; each question is
+    researched as soon as it arrives, so step 2 can overlap step 1's stream.
+
+    Questions similar enough to one answered within the freshness window are
+    answered from the research reuse cache instead; each reuse is recorded
+    under `research_reuse` in the job metadata. Questions that no research
+    source could answer are left out and listed under `research_failures`;
+    the step fails only when none was answered.
     """
+    import asyncio
     step_name = "deep_research"
     existing_content = load_partial_result(job_manager, step_name)
     if existing_content:
         print("[Resume] Found existing deep research results...")
-        return existing_content
+        try:
+            # Saved as a JSON string; decode so citations survive a resume
+            return json.loads(existing_content)
+        except json.JSONDecodeError:
+            return existing_content
 
     # Extract context from use case content
     use_case_title = None
@@ -775,11 +1012,74 @@ async def deep_research(perplexity_client, use_case_content, research_questions,
             f"This is for creating developer educational content about AI skills. "
         )
 
+    # Answer questions from earlier research of the same use case topic where
+    # a similar question was answered recently (research_cache.py); only the
+    # rest go to the backend. The cache index is refreshed once, by the first
+    # lookup; the others wait for that refresh, then query in parallel.
+    import research_cache
+    reuse = {"settings": research_cache.reuse_settings(), "refresh": None, "hits": set(), "asked_backend": False}
+    topic = research_cache.topic_text({"title": use_case_title, "objective": use_case_objective})
+
+    async def reused_answer(question: str) -> Optional[dict]:
+        if not reuse["settings"]:
+            return None
+        try:
+            if reuse["refresh"] is None:
+                reuse["refresh"] = asyncio.ensure_future(asyncio.to_thread(
+                    research_cache.refresh_cache, [os.path.dirname(job_manager.job_dir)]
+                ))
+            await asyncio.shield(reuse["refresh"])
+            hit = (await asyncio.to_thread(
+                research_cache.lookup_many, [question], reuse["settings"], topic=topic, refresh=False,
+            )).get(question)
+        except Exception as e:
+            logging.warning(f"Research reuse cache unavailable, asking the research backend: {e}")
+            reuse["settings"] = None
+            return None
+        generator_metrics.cache_lookups("research_reuse", int(hit is not None), int(hit is None))
+        return hit
+
+    async def answer(question: str) -> dict:
+        hit = await reused_answer(question)
+        if hit:
+            logging.info(f"Reusing research answer ({hit['similarity']:.2f} similar) from {hit['source']}")
+            reuse["hits"].add(question)
+            return {
+                'question': question,
+                'answer': hit['answer'],
+                'citations': hit['citations'],
+                'answered_at': hit['answered_at'],
+                'reused_from': {key: hit[key] for key in ('source', 'question', 'similarity')},
+            }
+        reuse["asked_backend"] = True
+        result = await research_question(question, context_prefix, job_manager)
+        return dict({'answered_at': datetime.now().isoformat()}, **result)
+
+    questions: List[str] = []
+    tasks = []
     try:
-        # Execute all questions in parallel
-        tasks = [research_question(q, context_prefix) for q in research_questions]
-        results = await asyncio.gather(*tasks)
-        
+        # Start each question as it arrives; they run in parallel
+        async for question in iterate_questions(research_questions):
+            if question not in questions:
+                questions.append(question)
+                tasks.append(asyncio.create_task(answer(question)))
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        if reuse["asked_backend"]:
+            job_manager.update_metadata({"research_backend": os.getenv("RESEARCH_BACKEND") or "perplexity"})
+        results = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+        failures = [
+            {'question': q, 'error': f"{type(outcome).__name__}: {outcome}"}
+            for q, outcome in zip(questions, outcomes) if isinstance(outcome, BaseException)
+        ]
+        if failures:
+            # Unanswered questions are left out; later steps only see real research
+            job_manager.update_metadata({"research_failures": failures})
+            for failure in failures:
+                logging.error(f"Research failed for '{failure['question']}': {failure['error']}")
+            if len(failures) == len(questions):
+                import research_backends
+                raise research_backends.ResearchError("No research question could be answered")
+
         # Combine results and format for storage
         combined_research = {
             'content': '\n'.join([
@@ -790,53 +1090,85 @@ async def deep_research(perplexity_client, use_case_content, research_questions,
                 citation 
                 for result in results 
                 for citation in result['citations']
-            ]
+            ],
+            # Per question: lets later jobs reuse single answers with their citations
+            'questions': [
+                {
+                    'answered_at': r['answered_at'],
+                    'citation_count': len(r['citations']),
+                    'reused_from': r.get('reused_from'),
+                }
+                for r in results
+            ],
         }
+        if reuse["hits"]:
+            job_manager.update_metadata({"research_reuse": [
+                {
+                    'question': r['question'],
+                    'source': r['reused_from']['source'],
+                    'source_question': r['reused_from']['question'],
+                    'similarity': r['reused_from']['similarity'],
+                    'answered_at': r['answered_at'],
+                }
+                for r in results if r['question'] in reuse["hits"]
+            ]})
         
         log_ai_interaction(
             "2 - Deep Research (Parallel)",
-            "\n".join(research_questions),
+            "\n".join(questions),
             json.dumps(combined_research, indent=2)
         )
         
         save_partial_result(job_manager, step_name, json.dumps(combined_research))
         return combined_research
         
-    except Exception as e:
-        print(f"ERROR in Step 2 (Deep Research): {e}")
+    except BaseException as e:
+        for task in tasks:
+            task.cancel()
+        if reuse["refresh"] is not None:
+            reuse["refresh"].cancel()
+        if isinstance(e, Exception):
+            print(f"ERROR in Step 2 (Deep Research): {e}")
         raise
 
 # -------------------------------------------------------------------------------------
 # STEP 3: REFINE USE CASE WITH OPENAI REASONING (Structured)
 # -------------------------------------------------------------------------------------
-def refine_use_case_with_reasoning(openai_client, raw_research, use_case_content, job_manager: JobManager):
+def load_research_data(raw_research) -> dict:
+    """Step 2's result as {"content", "citations"}, also for legacy string results."""
+    if isinstance(raw_research, str):
+        # Handle legacy format or resumption from string
+        return {'content': raw_research, 'citations': []}
+    return raw_research
+
+def score_citations(openai_client, raw_research, use_case_content, job_manager: JobManager,
+                    use_case_config: Optional[dict] = None) -> dict:
     """
-    Combine the research results with the use case content, producing a structured JSON
-    that matches the UseCaseStructuredOutput Pydantic model.
+    Score the research citations and pick the official resources (first
+    call of step 3). Returns {"official_resources": [...], "citations": [...]}
+    with the citations scored 0.7 or higher.
 
-    We'll store the final JSON as a string in partial results.
+    Saved as `citation_scoring`, so a resumed job, or the variants sharing
+    one research run (use_case_variants.py), don't score again.
     """
-    step_name = "refined_draft"
+    from use_case_models import CitationScoringOutput
+    use_case_config = use_case_config or USE_CASE_CONFIG
+    step_name = "citation_scoring"
     existing_content = load_partial_result(job_manager, step_name)
     if existing_content:
-        print("[Resume] Found existing refined draft.")
-        return existing_content
+        print("[Resume] Found existing citation scores.")
+        return json.loads(existing_content)
 
-    # Load research content and citations
-    if isinstance(raw_research, str):
-        # Handle legacy format or resumption from string
-        research_data = {'content': raw_research, 'citations': []}
-    else:
-        research_data = raw_research
+    research_data = load_research_data(raw_research)
 
     # First, have OpenAI score and select the best citations
     citation_scoring_prompt = (
         "You will be given a list of citations from research. Score each citation's relevance "
         "to our use case (0.0 to 1.0) and classify them into two categories.\n\n"
         f"Context:\n"
-        f"- Tool: {USE_CASE_CONFIG.get('tool', 'Not specified')}\n"
-        f"- Language: {USE_CASE_CONFIG.get('coding_language', 'Not specified')}\n"
-        f"- Mode: {USE_CASE_CONFIG.get('mode', 'Not specified')}\n\n"
+        f"- Tool: {use_case_config.get('tool', 'Not specified')}\n"
+        f"- Language: {use_case_config.get('coding_language', 'Not specified')}\n"
+        f"- Mode: {use_case_config.get('mode', 'Not specified')}\n\n"
         "1. Official Resources (score >= 0.9):\n"
         "   - Official documentation from the tool/language vendor\n"
         "   - Official blogs or tutorials from the tool/language creator\n"
@@ -857,7 +1189,8 @@ def refine_use_case_with_reasoning(openai_client, raw_research, use_case_content
         "   - type: One of ['tool', 'language', 'mode']\n"
         "   - section: Specific section of docs if applicable\n"
         "2. 'citations': Array of other relevant citations with scores >= 0.7\n"
-        "Each citation should include url, title, and relevance_score fields."
+        "Each citation should include url, relevance_score and snippet fields, and the title "
+        "only when the citation has one. Judge citations without a title by their URL and snippet."
     )
 
     citation_messages = [
@@ -874,22 +1207,44 @@ def refine_use_case_with_reasoning(openai_client, raw_research, use_case_content
         }
     ]
 
+    # Log the full prompt before execution
+    log_prompt("3 - Citation Scoring", citation_messages)
+
+    # No scored citations on a refusal
+    scored_results = call_structured(
+        job_manager, "citation_scoring", openai_client, citation_messages, CitationScoringOutput
+    ) or CitationScoringOutput()
+    scored = {
+        "official_resources": [r.model_dump(exclude_none=True) for r in scored_results.official_resources],
+        "citations": [c.model_dump(exclude_none=True) for c in scored_results.citations
+                      if (c.relevance_score or 0) >= 0.7],
+    }
+    save_partial_result(job_manager, step_name, json.dumps(scored, indent=2))
+    return scored
+
+def refine_use_case_with_reasoning(openai_client, raw_research, use_case_content, job_manager: JobManager,
+                                   use_case_config: Optional[dict] = None):
+    """
+    Combine the research results with the use case content, producing a structured JSON
+    that matches the UseCaseStructuredOutput Pydantic model.
+
+    We'll store the final JSON as a string in partial results.
+    """
+    from use_case_models import UseCaseStructuredOutput
+    use_case_config = use_case_config or USE_CASE_CONFIG
+    step_name = "refined_draft"
+    existing_content = load_partial_result(job_manager, step_name)
+    if existing_content:
+        print("[Resume] Found existing refined draft.")
+        return existing_content
+
+    research_data = load_research_data(raw_research)
+
     try:
-        # Log the full prompt before execution
-        log_prompt("3 - Citation Scoring", citation_messages)
-        
         # First get the citations scored and categorized
-        citation_response = openai_client.chat.completions.create(
-            model="o3-mini-2025-01-31",
-            reasoning_effort="low",
-            messages=citation_messages,
-        )
-        scored_results = json.loads(citation_response.choices[0].message.content)
-        
-        # Extract official resources and other citations
-        official_resources = scored_results.get('official_resources', [])
-        other_citations = [c for c in scored_results.get('citations', []) 
-                         if c.get('relevance_score', 0) >= 0.7]
+        scored = score_citations(openai_client, research_data, use_case_content, job_manager, use_case_config)
+        official_resources = scored["official_resources"]
+        other_citations = scored["citations"]
 
         # Now proceed with the main refinement
         system_prompt = (
@@ -960,29 +1315,24 @@ def refine_use_case_with_reasoning(openai_client, raw_research, use_case_content
         # Log the full prompt before execution
         log_prompt("3 - Refine Use Case", messages)
 
-        completion = openai_client.beta.chat.completions.parse(
-            model="o3-mini-2025-01-31",
-            reasoning_effort="high",
-            messages=messages,
-            response_format=UseCaseStructuredOutput,  # Our Pydantic model
+        structured_obj = call_structured(
+            job_manager, "refine", openai_client, messages, UseCaseStructuredOutput  # Our Pydantic model
         )
 
-        parsed_message = completion.choices[0].message
-        if parsed_message.refusal:
+        if structured_obj is None:
             structured_dict = {
                 "title": "Refusal",
                 "time_to_complete": "0 minutes",
                 "description": "The model refused to comply.",
                 "steps": [],
                 "resources": official_resources,
-                "metadata": USE_CASE_CONFIG,
+                "metadata": use_case_config,
                 "citations": []
             }
         else:
-            structured_obj = parsed_message.parsed
             structured_dict = structured_obj.model_dump()
             # Always attach original config as metadata
-            structured_dict["metadata"] = USE_CASE_CONFIG
+            structured_dict["metadata"] = use_case_config
             # Add our official resources and other citations
             structured_dict["resources"] = official_resources
             structured_dict["citations"] = other_citations
@@ -1005,13 +1355,16 @@ def refine_use_case_with_reasoning(openai_client, raw_research, use_case_content
 # -------------------------------------------------------------------------------------
 # STEP 4: FINAL POLISH WITH OPENAI CHAT (Structured)
 # -------------------------------------------------------------------------------------
-def finalize_use_case(openai_client, refined_json, job_manager: JobManager):
+def finalize_use_case(openai_client, refined_json, job_manager: JobManager,
+                      use_case_config: Optional[dict] = None):
     """
     Pass the Step 3 structured JSON to the chat model for final polish,
     returning final structured JSON (UseCaseStructuredOutput).
 
     The entire final result is stored as JSON in partial results.
     """
+    from use_case_models import UseCaseStructuredOutput
+    use_case_config = use_case_config or USE_CASE_CONFIG
     step_name = "final_use_case"
     existing_content = load_partial_result(job_manager, step_name)
     if existing_content:
@@ -1095,28 +1448,34 @@ def finalize_use_case(openai_client, refined_json, job_manager: JobManager):
         # Log the full prompt before execution
         log_prompt("4 - Final Polish", messages)
         
-        completion = openai_client.beta.chat.completions.parse(
-            model="gpt-4o",
-            messages=messages,
-            response_format=UseCaseStructuredOutput,  # same schema
+        polished = call_structured(
+            job_manager, "polish", openai_client, messages, UseCaseStructuredOutput  # same schema
         )
 
-        parsed_message = completion.choices[0].message
-        if parsed_message.refusal:
+        if polished is None:
             final_struct = {
                 "title": "Refusal",
                 "time_to_complete": "0 minutes",
                 "description": "The model refused to comply.",
                 "steps": [],
                 "resources": [],
-                "metadata": USE_CASE_CONFIG
+                "metadata": use_case_config
             }
         else:
-            final_struct = parsed_message.parsed.model_dump()
+            final_struct = polished.model_dump()
             # Always attach original config as metadata
-            final_struct["metadata"] = USE_CASE_CONFIG
+            final_struct["metadata"] = use_case_config
 
         final_json = json.dumps(final_struct, indent=2)
+        if polished is not None:
+            # Regenerate only the sections that lost or emptied a refined step
+            try:
+                refined = json.loads(refined_json)
+            except json.JSONDecodeError:
+                refined = None
+            final_json = partial_regeneration.repair_final_use_case(
+                sys.modules[__name__], openai_client, job_manager, final_json, refined, use_case_config
+            )
 
         log_ai_interaction(
             "4 - Final Polish",
@@ -1134,7 +1493,7 @@ def finalize_use_case(openai_client, refined_json, job_manager: JobManager):
 # STEP 5: EXAMPLE SOLUTION GENERATION
 # -------------------------------------------------------------------------------------
 def generate_example_solution(
-    openai_client: OpenAI,
+    openai_client: "OpenAI",
     use_case_config: dict,
     polished_content: str,
     raw_research: dict,
@@ -1153,6 +1512,7 @@ def generate_example_solution(
     Returns:
         JSON string containing the example solution
     """
+    from use_case_models import ExampleSolutionOutput
     step_name = "example_solution"
     existing_content = load_partial_result(job_manager, step_name)
     if existing_content:
@@ -1168,11 +1528,11 @@ def generate_example_solution(
 
     # Extract steps from the polished use case content
     try:
-        polished_data = json.loads(polished_content)
-        use_case_steps = [step['step_title'] for step in polished_data.get('steps', [])]
+        polished_steps = json.loads(polished_content).get('steps', [])
+        use_case_steps = [step['step_title'] for step in polished_steps]
     except (json.JSONDecodeError, KeyError):
         # Fallback to original use case steps if polished content parsing fails
-        use_case_steps = use_case_config.get('steps', [])
+        use_case_steps = polished_steps = use_case_config.get('steps', [])
 
     # Build the system prompt
     system_prompt = f"""You are an expert AI instructor creating a practical example solution for a software development use case.
@@ -1273,24 +1633,22 @@ Focus on creating a solution that:
         ])
         
         # Generate the structured solution
-        completion = openai_client.beta.chat.completions.parse(
-            model="o3-mini-2025-01-31",
-            reasoning_effort="high",
-            messages=[
+        solution = call_structured(
+            job_manager, "example_solution", openai_client,
+            [
                 {"role": "developer", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            response_format=ExampleSolutionOutput
+            ExampleSolutionOutput,
         )
-
-        # Extract the solution
-        solution = completion.choices[0].message.parsed
-        
-        # Validate that the number of steps matches
-        if len(solution.solution.steps) != len(use_case_steps):
-            print(f"Warning: Generated solution has {len(solution.solution.steps)} steps but use case has {len(use_case_steps)} steps")
+        if solution is None:
+            raise structured_output.StructuredOutputError("The model refused to write an example solution")
         
         solution_json = json.dumps(solution.model_dump(), indent=2)
+        # Regenerate only the steps that don't match the use case's, and any failing fields
+        solution_json = partial_regeneration.repair_example_solution(
+            sys.modules[__name__], openai_client, job_manager, solution_json, polished_steps
+        )
 
         log_ai_interaction(
             "5 - Example Solution Generation",
@@ -1309,7 +1667,7 @@ Focus on creating a solution that:
 # STEP 6: SUGGEST VISUAL ELEMENTS (NEW)
 # -------------------------------------------------------------------------------------
 def suggest_visual_elements(
-    openai_client: OpenAI,
+    openai_client: "OpenAI",
     final_use_case_json: str,
     example_solution_json: str,
     job_manager: JobManager
@@ -1384,8 +1742,8 @@ Ensure all suggestions:
             {"role": "user", "content": user_prompt}
         ])
         
-        response = openai_client.chat.completions.create(
-            model="gpt-4o",
+        response = call_model(
+            job_manager, "visual_suggestions", openai_client.chat.completions.create,
             messages=[
                 {"role": "developer", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
@@ -1403,88 +1761,525 @@ Ensure all suggestions:
         print(f"ERROR in Step 6 (Suggest Visual Elements): {e}")
         raise
 
-# Update main to handle async
-async def async_main():
-    """Async main orchestrator function."""
-    job_manager = JobManager(USE_CASE_CONFIG["id"], USE_CASE_CONFIG["title"])
-    job_manager.save_metadata(USE_CASE_CONFIG)
-    logging.info(f"\nStarted job: {job_manager.job_id}")
-    
-    use_case_content = format_use_case_content()
-    logging.info(f"\nLoaded use case {USE_CASE_CONFIG['id']}")
+# -------------------------------------------------------------------------------------
+# Pipeline orchestration
+# -------------------------------------------------------------------------------------
+PIPELINE_STEPS = {
+    1: "Identify research questions",
+    2: "Deep research",
+    3: "Refine use case",
+    4: "Final polish",
+    5: "Example solution",
+    6: "Visual suggestions",
+}
+
+# Saved result of each step; a step whose file exists is skipped on resume
+STEP_ARTIFACTS = {
+    1: "research_questions",
+    2: "deep_research",
+    3: "refined_draft",
+    4: "final_use_case",
+    5: "example_solution",
+    6: "visual_suggestions",
+}
 
-    questions_to_ask = identify_research_questions(openai_client, use_case_content, job_manager)
+# Saved results that variants agreeing on their inputs share (use_case_variants.py)
+SHARED_STEPS = ["research_questions", "deep_research", "citation_scoring"]
+
+ProgressCallback = Callable[[dict], None]
+
+def notify_progress(on_progress: Optional[ProgressCallback], job_manager: JobManager, step: int, status: str):
+    """Record a pipeline step event in the log and metrics and send it to `on_progress`, if given."""
+    if status == "running":
+        # Steps can overlap, so log_report.py times each step from this line
+        logging.info(f"\nStarting step {step}")
+    generator_metrics.step_event(job_manager.job_id, step, status)
+    if on_progress:
+        on_progress({
+            "job_id": job_manager.job_id,
+            "step": step,
+            "name": PIPELINE_STEPS.get(step, ""),
+            "status": status,
+            "time": datetime.now().isoformat(),
+        })
+
+def job_routes(use_case_config: dict, job_manager: JobManager) -> dict:
+    """The job's model routes, resolved and saved on its first run; a resumed job keeps them."""
+    routes = job_manager.load_metadata().get("model_routes")
+    if not routes:
+        routes = model_routing.resolve_routes(use_case_config)
+        job_manager.update_metadata({"model_routes": routes})
+    return routes
+
+async def research_steps(openai_client, perplexity_client, use_case_content: str, job_manager: JobManager,
+                         on_progress: Optional[ProgressCallback] = None,
+                         profiler: Optional["pipeline_profiler.PipelineProfiler"] = None) -> tuple:
+    """
+    Run steps 1 and 2 of a job, overlapped, and return (questions, research).
+
+    Step 1 streams its questions from a worker thread into a queue, and
+    step 2 researches each one as it arrives.
+    """
+    import asyncio
+    import contextlib
+    loop = asyncio.get_running_loop()
+    question_queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    research_started = []
+
+    def queue_question(question: str):
+        loop.call_soon_threadsafe(question_queue.put_nowait, question)
+
+    async def streamed_questions() -> AsyncIterator[str]:
+        while (question := await question_queue.get()) is not None:
+            if not research_started:
+                research_started.append(True)
+                notify_progress(on_progress, job_manager, 2, "running")
+            yield question
+
+    async def research_step():
+        # Step 2 runs on the event loop, so it is profiled here rather than in a worker thread
+        with profiler.step(2, STEP_ARTIFACTS[2]) if profiler else contextlib.nullcontext():
+            return await deep_research(perplexity_client, use_case_content, streamed_questions(), job_manager)
+
+    step_one = profiler.wrap(1, STEP_ARTIFACTS[1], identify_research_questions) if profiler \
+        else identify_research_questions
+    notify_progress(on_progress, job_manager, 1, "running")
+    questions_task = asyncio.ensure_future(asyncio.to_thread(
+        step_one, openai_client, use_case_content, job_manager, queue_question
+    ))
+    # Sent after the queued questions, since call_soon_threadsafe callbacks run in order
+    questions_task.add_done_callback(lambda _: question_queue.put_nowait(None))
+    research_task = asyncio.create_task(research_step())
+    try:
+        questions_to_ask = await questions_task
+    except BaseException:
+        research_task.cancel()
+        await asyncio.gather(research_task, return_exceptions=True)
+        raise
     logging.info("\nCompleted step 1: Identified research questions\n%s", questions_to_ask)
+    notify_progress(on_progress, job_manager, 1, "done")
 
-    deep_research_results = await deep_research(perplexity_client, use_case_content, questions_to_ask, job_manager)
+    deep_research_results = await research_task
+    if not research_started:
+        notify_progress(on_progress, job_manager, 2, "running")
     logging.info("\nCompleted step 2: Deep research phase")
+    notify_progress(on_progress, job_manager, 2, "done")
+    return questions_to_ask, deep_research_results
 
-    refined_draft_json = refine_use_case_with_reasoning(
-        openai_client,
-        raw_research=deep_research_results,
-        use_case_content=use_case_content,
-        job_manager=job_manager
-    )
-    logging.info("\nCompleted step 3: Refinement (structured)")
+async def run_pipeline(use_case_config: dict, job_manager: JobManager,
+                       on_progress: Optional[ProgressCallback] = None) -> dict:
+    """
+    Run all six steps for one use case inside its job directory.
 
-    final_use_case_json = finalize_use_case(openai_client, refined_draft_json, job_manager)
-    logging.info("\nCompleted step 4: Final polish (structured)")
+    Steps that already have a saved partial result are skipped, so the same
+    function handles fresh runs and resumes. The synchronous OpenAI steps run
+    in worker threads so several jobs can share one event loop. Step 2 starts
+    researching each question while step 1 is still streaming the others.
 
-    example_solution_json = generate_example_solution(
-        openai_client,
-        USE_CASE_CONFIG,
-        final_use_case_json,
-        deep_research_results,
-        job_manager
-    )
-    logging.info("\nCompleted step 5: Example solution generation")
-
-    # NEW STEP 6: SUGGEST VISUAL ELEMENTS
-    visual_suggestions = suggest_visual_elements(
-        openai_client,
-        final_use_case_json,
-        example_solution_json,
-        job_manager
-    )
-    logging.info("\nCompleted step 6: Visual element suggestions\n")
-
-    # Print final results
-    logging.info("\n================= FINAL USE CASE OUTPUT =================\n")
-    logging.info(final_use_case_json)
-    logging.info("\n================= EXAMPLE SOLUTION =================\n")
-    logging.info(example_solution_json)
-    logging.info("\n================= VISUAL SUGGESTIONS =================\n")
-    logging.info(visual_suggestions)
-    logging.info("\n=========================================================\n")
-
-    # Convert JSON to Markdown and write to file
-    markdown_content = convert_json_to_markdown(
-        final_use_case_json, 
-        example_solution_json,
-        visual_suggestions
-    )
-    write_markdown_file(
-        markdown_content, 
-        USE_CASE_CONFIG['id'], 
-        USE_CASE_CONFIG['title'],
-        job_manager
-    )
+    With GENERATOR_PROFILE set (`--profile`), each step is profiled into
+    the job's `profile/` directory (see pipeline_profiler.py).
+
+    Returns a dict with the final use case, example solution, visual
+    suggestions and the path of the written Markdown file.
+    """
+    import asyncio
+    import contextlib
+    openai_client = get_openai_client()
+    perplexity_client = _clients.get("perplexity")  # only created when the perplexity backend runs
+    routes = job_routes(use_case_config, job_manager)
+    token = CURRENT_JOB.set(job_manager.job_id)
+    routes_token = model_routing.CURRENT_ROUTES.set(routes)
+    generator_metrics.job_started(job_manager.job_id, use_case_config["title"], [
+        step for step, step_name in STEP_ARTIFACTS.items() if os.path.isfile(job_manager.get_filepath(step_name))
+    ])
+    job_status = "failed"
+    profiler = pipeline_profiler.PipelineProfiler(job_manager.job_dir) if pipeline_profiler.enabled() else None
+
+    def in_step(step: int, func: Callable) -> Callable:
+        """`func`, profiled as `step` when profiling is on."""
+        return profiler.wrap(step, STEP_ARTIFACTS[step], func) if profiler else func
 
-    logging.info(f"\nJob completed: {job_manager.job_id}")
-    logging.info(f"Results stored in: {job_manager.job_dir}")
+    try:
+        logging.info(f"\nStarted job: {job_manager.job_id}")
+
+        use_case_content = format_use_case_content(use_case_config)
+        logging.info(f"\nLoaded use case {use_case_config['id']}")
+
+        questions_to_ask, deep_research_results = await research_steps(
+            openai_client, perplexity_client, use_case_content, job_manager, on_progress, profiler
+        )
+
+        notify_progress(on_progress, job_manager, 3, "running")
+        refined_draft_json = await asyncio.to_thread(
+            in_step(3, refine_use_case_with_reasoning),
+            openai_client,
+            raw_research=deep_research_results,
+            use_case_content=use_case_content,
+            job_manager=job_manager,
+            use_case_config=use_case_config,
+        )
+        logging.info("\nCompleted step 3: Refinement (structured)")
+        notify_progress(on_progress, job_manager, 3, "done")
+
+        notify_progress(on_progress, job_manager, 4, "running")
+        final_use_case_json = await asyncio.to_thread(
+            in_step(4, finalize_use_case), openai_client, refined_draft_json, job_manager, use_case_config
+        )
+        logging.info("\nCompleted step 4: Final polish (structured)")
+        notify_progress(on_progress, job_manager, 4, "done")
+
+        # Titles of the citations that will be rendered are fetched while
+        # steps 5 and 6 run; neither needs them
+        titles_task = asyncio.create_task(backfill_citation_titles(final_use_case_json, job_manager))
+        try:
+            notify_progress(on_progress, job_manager, 5, "running")
+            example_solution_json = await asyncio.to_thread(
+                in_step(5, generate_example_solution),
+                openai_client,
+                use_case_config,
+                final_use_case_json,
+                deep_research_results,
+                job_manager
+            )
+            logging.info("\nCompleted step 5: Example solution generation")
+            notify_progress(on_progress, job_manager, 5, "done")
+
+            # STEP 6: SUGGEST VISUAL ELEMENTS
+            notify_progress(on_progress, job_manager, 6, "running")
+            visual_suggestions = await asyncio.to_thread(
+                in_step(6, suggest_visual_elements),
+                openai_client,
+                final_use_case_json,
+                example_solution_json,
+                job_manager
+            )
+            logging.info("\nCompleted step 6: Visual element suggestions\n")
+            notify_progress(on_progress, job_manager, 6, "done")
+        except BaseException:
+            titles_task.cancel()
+            await asyncio.gather(titles_task, return_exceptions=True)
+            raise
+        final_use_case_json = await titles_task
+
+        # Print final results
+        logging.info("\n================= FINAL USE CASE OUTPUT =================\n")
+        logging.info(final_use_case_json)
+        logging.info("\n================= EXAMPLE SOLUTION =================\n")
+        logging.info(example_solution_json)
+        logging.info("\n================= VISUAL SUGGESTIONS =================\n")
+        logging.info(visual_suggestions)
+        logging.info("\n=========================================================\n")
+
+        # Render Markdown from the saved artifacts; a resumed job whose inputs
+        # didn't change keeps its existing use_case.md
+        from markdown_render import render_job_dir
+        render_status = render_job_dir(job_manager.job_dir)
+        logging.info(f"use_case.md {render_status}: {job_manager.job_dir}")
+        if render_status != "skipped":
+            generator_metrics.cache_lookups("render", int(render_status == "unchanged"), int(render_status == "rendered"))
+        job_status = "done"
+
+        logging.info(f"\nJob completed: {job_manager.job_id}")
+        logging.info(f"Results stored in: {job_manager.job_dir}")
+
+        return {
+            "job_id": job_manager.job_id,
+            "job_dir": job_manager.job_dir,
+            "final_use_case": final_use_case_json,
+            "example_solution": example_solution_json,
+            "visual_suggestions": visual_suggestions,
+            "markdown_path": os.path.join(job_manager.job_dir, "use_case.md"),
+        }
+    except Exception as e:
+        # Logged here, inside the job context, so it reaches the job's own log
+        logging.error(f"Job failed: {job_manager.job_id}: {type(e).__name__}: {e}")
+        raise
+    finally:
+        if profiler:
+            profiler.close()
+            logging.info(f"Step profiles written to {profiler.profile_dir}")
+        generator_metrics.job_finished(job_manager.job_id, job_status)
+        model_routing.CURRENT_ROUTES.reset(routes_token)
+        CURRENT_JOB.reset(token)
+
+async def run_shared_steps(use_case_config: dict, job_manager: JobManager) -> None:
+    """
+    Run only the steps in SHARED_STEPS (questions, research and citation
+    scoring) in the job's directory, for variants that share them
+    (use_case_variants.py). run_pipeline later finds them saved.
+    """
+    import asyncio
+    openai_client = get_openai_client()
+    routes = job_routes(use_case_config, job_manager)
+    token = CURRENT_JOB.set(job_manager.job_id)
+    routes_token = model_routing.CURRENT_ROUTES.set(routes)
+    try:
+        logging.info(f"\nStarted shared steps: {job_manager.job_id}")
+        use_case_content = format_use_case_content(use_case_config)
+        _, deep_research_results = await research_steps(
+            openai_client, _clients.get("perplexity"), use_case_content, job_manager
+        )
+        await asyncio.to_thread(
+            score_citations, openai_client, deep_research_results, use_case_content, job_manager, use_case_config
+        )
+        logging.info("\nCompleted shared steps: questions, research and citation scoring")
+    finally:
+        model_routing.CURRENT_ROUTES.reset(routes_token)
+        CURRENT_JOB.reset(token)
+
+async def async_main(use_case_config: Optional[dict] = None, base_dir: Optional[str] = None,
+                     on_progress: Optional[ProgressCallback] = None) -> dict:
+    """Async main orchestrator function: run one use case in a new job directory."""
+    use_case_config = use_case_config or USE_CASE_CONFIG
+    job_manager = JobManager(use_case_config["id"], use_case_config["title"], base_dir=base_dir)
+    job_manager.save_metadata(use_case_config)
+    try:
+        return await run_pipeline(use_case_config, job_manager, on_progress)
+    finally:
+        job_manager.close()
+
+async def resume_job(job_dir: str, on_progress: Optional[ProgressCallback] = None) -> dict:
+    """Resume an interrupted job from the last step saved in its directory."""
+    job_manager = JobManager.open(job_dir)
+    try:
+        use_case_config = job_manager.load_use_case_config()
+        return await run_pipeline(use_case_config, job_manager, on_progress)
+    finally:
+        job_manager.close()
+
+async def run_batch(configs: List[dict], base_dir: Optional[str] = None, concurrency: int = 2,
+                    duplicates: str = "off", similarity_threshold: float = 0.6,
+                    progress: bool = False, metrics_file: Optional[str] = None) -> List[dict]:
+    """
+    Run several use cases in one process, at most `concurrency` at a time.
+
+    A failing job is logged and reported but does not stop the others.
+
+    With `progress`, a per-job step view with the batch ETA replaces the
+    console log (warnings still show). With `metrics_file`, the metrics of
+    generator_metrics.py are written to that file every few seconds.
+
+    With `duplicates` set to "flag" or "skip", every config is first checked
+    against the library (and earlier configs of the batch) with the MinHash
+    index in near_duplicates.py, before any API call. Near-duplicates are
+    logged and reported under `similar_to`. With "skip" they are not run.
+    """
+    import asyncio
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    similar: List[List[dict]] = [[] for _ in configs]
+    if duplicates != "off":
+        import near_duplicates
+        similar = await asyncio.to_thread(near_duplicates.check_configs, configs, similarity_threshold)
+        for config, matches in zip(configs, similar):
+            if matches:
+                best = matches[0]
+                logging.warning(
+                    f"Config '{config['title']}' is {best['similarity']:.0%} similar to "
+                    f"'{best['title']}' ({best['path']})"
+                    + ("; skipping" if duplicates == "skip" else "")
+                )
+
+    async def run_one(config: dict, matches: List[dict]) -> dict:
+        if matches and duplicates == "skip":
+            generator_metrics.job_skipped()
+            return {"title": config["title"], "status": "skipped", "similar_to": matches}
+        generator_metrics.job_queued()
+        queued_at = time.monotonic()
+        async with semaphore:
+            generator_metrics.slot_acquired(time.monotonic() - queued_at)
+            try:
+                result = await async_main(config, base_dir)
+                outcome = {"title": config["title"], "status": "done", "job_dir": result["job_dir"]}
+            except Exception as e:
+                logging.error(f"Job '{config['title']}' failed: {e}")
+                outcome = {"title": config["title"], "status": "failed", "error": str(e)}
+        if matches:
+            outcome["similar_to"] = matches
+        return outcome
+
+    monitors = []
+    if progress:
+        setup_console_logging()
+        _console_handler.setLevel(logging.WARNING)
+        monitors.append(asyncio.create_task(generator_metrics.ProgressView(concurrency).run()))
+    if metrics_file:
+        monitors.append(asyncio.create_task(generator_metrics.export_periodically(metrics_file)))
+    try:
+        return await asyncio.gather(*(run_one(config, matches) for config, matches in zip(configs, similar)))
+    finally:
+        for monitor in monitors:
+            monitor.cancel()
+        await asyncio.gather(*monitors, return_exceptions=True)
+        if progress:
+            _console_handler.setLevel(logging.NOTSET)
+
+# -------------------------------------------------------------------------------------
+# Configuration loading
+# -------------------------------------------------------------------------------------
+def validate_config(use_case_config: dict) -> None:
+    """Raise ValueError if a use case config is not an object or is missing required fields."""
+    if not isinstance(use_case_config, dict):
+        raise ValueError(f"A use case config must be a JSON object, not {type(use_case_config).__name__}")
+    missing = [field for field in REQUIRED_CONFIG_FIELDS if field not in use_case_config]
+    if missing:
+        title = use_case_config.get("title", "<untitled>")
+        raise ValueError(f"Use case config '{title}' is missing required fields: {', '.join(missing)}")
+
+def load_configs(paths: List[str]) -> List[dict]:
+    """
+    Load use case configs from JSON files.
+
+    Each file holds either a single config object or a list of them.
+    """
+    configs = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for config in data if isinstance(data, list) else [data]:
+            validate_config(config)
+            configs.append(config)
+    return configs
 
 def validate_environment() -> None:
     """Validate required environment variables are set."""
-    required_vars = ["PERPLEXITY_API_KEY", "OPENAI_API_KEY"]
+    load_environment()
+    required_vars = ["OPENAI_API_KEY"]
+    if (os.getenv("RESEARCH_BACKEND") or "perplexity") == "perplexity":
+        required_vars.insert(0, "PERPLEXITY_API_KEY")
     missing = [var for var in required_vars if not os.getenv(var)]
     if missing:
         raise EnvironmentError(f"Missing required environment variables: {', '.join(missing)}")
 
-def main():
-    """Synchronous entry point that runs async_main."""
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+def build_parser():
+    """Build the argument parser for all subcommands."""
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Generate, resume, batch and render use cases.",
+        epilog="Running without a subcommand generates USE_CASE_CONFIG (same as `run`).",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    run = subparsers.add_parser("run", help="Generate one use case")
+    run.add_argument("--config", help="JSON file with a use case config (default: USE_CASE_CONFIG)")
+    run.add_argument("--output-dir", help="Directory for job directories")
+    run.add_argument("--research-backend", help="Research backend for step 2: perplexity or local (default: RESEARCH_BACKEND)")
+    run.add_argument("--routes", help="Model routes file (default: MODEL_ROUTES)")
+    run.add_argument("--profile", action="store_true",
+                     help="Profile CPU and memory of each step into the job's profile/ directory")
+
+    batch = subparsers.add_parser("batch", help="Generate several use cases in one process")
+    batch.add_argument("configs", nargs="+", help="JSON files, each with one config or a list of configs")
+    batch.add_argument("--concurrency", type=int, default=2, help="Jobs to run at the same time")
+    batch.add_argument("--output-dir", help="Directory for job directories")
+    batch.add_argument("--research-backend", help="Research backend for step 2: perplexity or local (default: RESEARCH_BACKEND)")
+    batch.add_argument("--routes", help="Model routes file (default: MODEL_ROUTES)")
+    batch.add_argument("--profile", action="store_true",
+                       help="Profile CPU and memory of each step into each job's profile/ directory")
+    batch.add_argument("--duplicates", choices=["flag", "skip", "off"], default="flag",
+                       help="Check configs for near-duplicates in the library before running (default: flag)")
+    batch.add_argument("--similarity-threshold", type=float, default=0.6,
+                       help="Overlap score at which a config counts as a near-duplicate")
+    batch.add_argument("--progress", action="store_true",
+                       help="Show per-job step progress and the batch ETA instead of the log")
+    batch.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port at /metrics")
+    batch.add_argument("--metrics-file", help="Write Prometheus metrics to this file every few seconds")
+
+    variants = subparsers.add_parser("variants", help="Generate the variants of one use case, sharing their research")
+    variants.add_argument("file", help="JSON file with a base config and a \"variants\" list (see use_case_variants.py)")
+    variants.add_argument("--concurrency", type=int, default=2, help="Jobs to run at the same time")
+    variants.add_argument("--output-dir", help="Directory for job directories")
+    variants.add_argument("--research-backend", help="Research backend for step 2: perplexity or local (default: RESEARCH_BACKEND)")
+    variants.add_argument("--routes", help="Model routes file (default: MODEL_ROUTES)")
+    variants.add_argument("--profile", action="store_true",
+                          help="Profile CPU and memory of each step into each job's profile/ directory")
+
+    resume = subparsers.add_parser("resume", help="Resume an interrupted job")
+    resume.add_argument("job_dir", help="Job directory to resume")
+    resume.add_argument("--profile", action="store_true",
+                        help="Profile CPU and memory of each step into the job's profile/ directory")
+
+    render = subparsers.add_parser("render", help="Re-render use_case.md from saved JSON (no API calls)")
+    render.add_argument("job_dirs", nargs="+", help="Job directories to render")
+    render.add_argument("--force", action="store_true", help="Re-render even if nothing changed")
+
+    render_all = subparsers.add_parser("render-all", help="Re-render every job in the library in parallel")
+    render_all.add_argument("paths", nargs="*", help="Library directories (default: all known)")
+    render_all.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    render_all.add_argument("--force", action="store_true", help="Re-render even if nothing changed")
+
+    serve = subparsers.add_parser("serve", help="Run a long-lived local HTTP service that accepts jobs")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--max-concurrent-jobs", type=int, default=2)
+    serve.add_argument("--output-dir", help="Directory for job directories")
+    return parser
+
+def main(argv: Optional[List[str]] = None):
+    """Synchronous entry point that dispatches to the subcommands."""
+    args = build_parser().parse_args(argv)
+    command = args.command or "run"
+
+    if command in ("render", "render-all"):
+        # Local only: never touches API keys or network SDKs
+        import markdown_render
+        if command == "render":
+            render_args = ["render"] + args.job_dirs
+        else:
+            render_args = ["render-all"] + args.paths
+            if args.workers:
+                render_args += ["--workers", str(args.workers)]
+        if args.force:
+            render_args.append("--force")
+        sys.exit(markdown_render.main(render_args))
+
+    import asyncio
     try:
+        if getattr(args, "research_backend", None):
+            os.environ["RESEARCH_BACKEND"] = args.research_backend
+        if getattr(args, "routes", None):
+            model_routing.load_routes(args.routes)  # fail early on a bad routes file
+            os.environ["MODEL_ROUTES"] = args.routes
+        if getattr(args, "profile", False):
+            os.environ["GENERATOR_PROFILE"] = "1"
         validate_environment()  # Add environment validation
-        asyncio.run(async_main())
+        if command == "run":
+            config = load_configs([args.config])[0] if getattr(args, "config", None) else USE_CASE_CONFIG
+            asyncio.run(async_main(config, getattr(args, "output_dir", None)))
+        elif command == "batch":
+            if args.metrics_port:
+                generator_metrics.start_http_server(args.metrics_port)
+            results = asyncio.run(run_batch(
+                load_configs(args.configs), args.output_dir, args.concurrency,
+                args.duplicates, args.similarity_threshold, args.progress, args.metrics_file,
+            ))
+            for result in results:
+                detail = result.get("job_dir") or result.get("error") or ""
+                if result.get("similar_to"):
+                    best = result["similar_to"][0]
+                    detail += f"  (similar to '{best['title']}', {best['similarity']:.2f})"
+                print(f"{result['status']:>7}  {result['title']}  {detail.strip()}")
+            if any(result["status"] == "failed" for result in results):
+                sys.exit(1)
+        elif command == "variants":
+            import use_case_variants
+            results = asyncio.run(use_case_variants.run_variants(
+                sys.modules[__name__], use_case_variants.load_variants_file(args.file), args.output_dir, args.concurrency,
+            ))
+            for result in results:
+                detail = result.get("error") or result["job_dir"]
+                print(f"{result['status']:>7}  {result['variant']}  {detail}")
+            if any(result["status"] == "failed" for result in results):
+                sys.exit(1)
+        elif command == "resume":
+            asyncio.run(resume_job(args.job_dir))
+        elif command == "serve":
+            from generator_service import serve
+            # Passed in rather than imported there, which would load a second copy of this script
+            serve(sys.modules[__name__], args.host, args.port, args.max_concurrent_jobs, args.output_dir)
     except Exception as err:
         logging.error(f"Script terminated due to error: {err}")
         raise
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Lazy, Low-Memory Python API over the Generator Job Directories
+
+    from use_case_library import UseCaseLibrary
+
+    library = UseCaseLibrary()
+    for record in library.find(family="Core Skills", tool="GitHub Copilot"):
+        print(record.title, record.step_count)
+        steps = record.use_case.steps          # full body loaded only here
+
+Design:
+- Jobs are listed from a cached directory manifest. A refresh costs one
+  `scandir` per library directory and a `stat` per job. Only jobs whose
+  `final_use_case.json` or `metadata.json` changed are re-read.
+- Each job is a compact `UseCaseRecord` with `__slots__`. It holds only the
+  metadata needed to list and filter the library, with no nested dicts.
+- Filters on family, tool and mode (and the other metadata fields) run on the
+  records, before any job body is touched.
+- Full bodies load lazily on first access. The saved file is memory-mapped,
+  its `{"content": "<json string>"}` wrapper is unwrapped, and the inner JSON
+  goes straight to `UseCaseStructuredOutput.model_validate_json`. Saved jobs
+  keep the raw config as `metadata`, which lacks some UseCaseMetadata fields,
+  so a body that fails strict validation takes the local repair path of
+  structured_output.py (missing nullable fields become None).
+
+Usage:
+    python use_case_library.py list [--family F] [--tool T] [--mode M] [--json]
+"""
+
+import os
+import re
+import sys
+import json
+import mmap
+import argparse
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from use_case_models import ExampleSolutionOutput, UseCaseStructuredOutput
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_LIBRARY_DIRS = [
+    os.path.join(REPO_ROOT, "python-generator-use-cases"),
+    os.path.join(REPO_ROOT, "python-generator-drafts", "use_cases"),
+]
+DEFAULT_MANIFEST_PATH = os.path.join(REPO_ROOT, "use_case_library_manifest.json")
+MANIFEST_VERSION = 1
+
+# -------------------------------------------------------------------------------------
+# Saved artifacts
+# -------------------------------------------------------------------------------------
+
+WRAPPER_RE = re.compile(rb'\s*\{\s*"content"\s*:')
+
+def read_artifact_bytes(path: str) -> Optional[bytes]:
+    """
+    Return the inner JSON of a saved step result, memory-mapping the file.
+
+    `save_partial_result` double-encodes structured output as
+    `{"content": "<json string>"}`; the wrapper is decoded and the inner JSON
+    returned as bytes, ready for `model_validate_json`. Files that hold plain
+    JSON are returned as they are. Returns None for missing or empty files.
+    """
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if not WRAPPER_RE.match(mapped[:64]):
+                    return mapped[:]
+                wrapper = json.loads(mapped[:])
+    except FileNotFoundError:
+        return None
+    if not (isinstance(wrapper, dict) and set(wrapper) == {"content"}):
+        return json.dumps(wrapper).encode("utf-8")
+    content = wrapper["content"]
+    if content is None or content == "":
+        return None
+    if isinstance(content, str):
+        return content.encode("utf-8")
+    # Already-structured content (not double-encoded)
+    return json.dumps(content).encode("utf-8")
+
+def join_list(value) -> str:
+    """Join list values with commas; pass strings through."""
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    return value or ""
+
+def load_model(data: bytes, model_cls):
+    """
+    Validate a saved body against `model_cls`, leniently: the strict path
+    first, then structured_output's repairs. Raises StructuredOutputError
+    when even the repaired body does not match.
+    """
+    from structured_output import parse_model_output
+    model, _ = parse_model_output(data.decode("utf-8"), model_cls)
+    return model
+
+# -------------------------------------------------------------------------------------
+# Records
+# -------------------------------------------------------------------------------------
+
+class UseCaseRecord:
+    """Compact metadata for one job; the full body loads on first access."""
+
+    FIELDS = (
+        "job_id", "job_dir", "status", "use_case_id", "title", "family", "tool", "mode",
+        "department", "role", "model", "coding_language", "time_to_complete", "created_at",
+        "step_count", "citation_count",
+    )
+    __slots__ = FIELDS + ("_use_case", "_example_solution")
+
+    def __init__(self, *values):
+        for name, value in zip(self.FIELDS, values):
+            setattr(self, name, value)
+        self._use_case = None
+        self._example_solution = None
+
+    @property
+    def complete(self) -> bool:
+        return self.status == "complete"
+
+    @property
+    def use_case(self) -> Optional["UseCaseStructuredOutput"]:
+        """The full final use case, validated on first access (None if not generated yet)."""
+        if self._use_case is None:
+            data = read_artifact_bytes(os.path.join(self.job_dir, "final_use_case.json"))
+            if data is not None:
+                from use_case_models import UseCaseStructuredOutput
+                self._use_case = load_model(data, UseCaseStructuredOutput)
+        return self._use_case
+
+    @property
+    def example_solution(self) -> Optional["ExampleSolutionOutput"]:
+        """The example solution, validated on first access (None if not generated yet)."""
+        if self._example_solution is None:
+            data = read_artifact_bytes(os.path.join(self.job_dir, "example_solution.json"))
+            if data is not None:
+                from use_case_models import ExampleSolutionOutput
+                self._example_solution = load_model(data, ExampleSolutionOutput)
+        return self._example_solution
+
+    def release(self):
+        """Drop loaded bodies, keeping only the metadata."""
+        self._use_case = None
+        self._example_solution = None
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __repr__(self) -> str:
+        return f"UseCaseRecord(job_id={self.job_id!r}, title={self.title!r})"
+
+def read_job_fields(job_dir: str) -> Optional[list]:
+    """
+    Read the record fields of one job (everything but job_id and job_dir).
+
+    Fields come from the final use case when it exists, otherwise from the
+    config saved in metadata.json. Returns None if the directory is not a job.
+    """
+    metadata: dict = {}
+    try:
+        with open(os.path.join(job_dir, "metadata.json"), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        pass
+
+    final = None
+    data = read_artifact_bytes(os.path.join(job_dir, "final_use_case.json"))
+    if data is not None:
+        try:
+            final = json.loads(data)
+        except json.JSONDecodeError:
+            final = None
+    if not metadata and not isinstance(final, dict):
+        return None
+
+    final = final if isinstance(final, dict) else {}
+    config = metadata.get("use_case_config") or {}
+    meta = {**config, **(final.get("metadata") or {})}
+    citations = final.get("citations") or []
+    return [
+        "complete" if final else "incomplete",
+        meta.get("id") or metadata.get("use_case_id") or "",
+        final.get("title") or meta.get("title") or metadata.get("use_case_title") or "",
+        meta.get("family") or "",
+        meta.get("tool") or meta.get("ai_tool") or "",
+        meta.get("mode") or "",
+        join_list(meta.get("department")),
+        join_list(meta.get("role")),
+        meta.get("model") or "",
+        meta.get("coding_language") or "",
+        final.get("time_to_complete") or meta.get("time_estimate") or "",
+        metadata.get("created_at") or "",
+        len(final.get("steps") or []),
+        len(citations) + len(final.get("resources") or []),
+    ]
+
+# -------------------------------------------------------------------------------------
+# Library
+# -------------------------------------------------------------------------------------
+
+WATCHED_FILES = ("final_use_case.json", "metadata.json")
+
+def job_signature(job_dir: str) -> Optional[list]:
+    """[mtime_ns, size] of each watched file (None where missing); None if the directory has neither."""
+    signature = []
+    for filename in WATCHED_FILES:
+        try:
+            stat = os.stat(os.path.join(job_dir, filename))
+            signature.append([stat.st_mtime_ns, stat.st_size])
+        except FileNotFoundError:
+            signature.append(None)
+    return signature if any(signature) else None
+
+class UseCaseLibrary:
+    """Lists generator jobs from a cached manifest and filters them before loading any body."""
+
+    def __init__(self, dirs: Optional[List[str]] = None, manifest_path: Optional[str] = DEFAULT_MANIFEST_PATH):
+        self.dirs = [os.path.abspath(d) for d in (dirs or DEFAULT_LIBRARY_DIRS)]
+        self.manifest_path = manifest_path
+        self._records: Dict[str, UseCaseRecord] = {}
+        self._loaded = False
+
+    def _load_manifest(self) -> Dict[str, list]:
+        if not self.manifest_path:
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if manifest.get("version") != MANIFEST_VERSION:
+            return {}
+        return manifest.get("jobs", {})
+
+    def _save_manifest(self, jobs: Dict[str, list]):
+        if not self.manifest_path:
+            return
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": MANIFEST_VERSION, "jobs": jobs}, separators=(",", ":")))
+        os.replace(temp_path, self.manifest_path)
+
+    def refresh(self) -> dict:
+        """
+        Re-scan the library directories, re-reading only jobs that changed.
+
+        Returns counts of read, cached and removed jobs.
+        """
+        cached = self._load_manifest()
+        jobs: Dict[str, list] = {}
+        counts = {"read": 0, "cached": 0, "removed": 0}
+        for library_dir in self.dirs:
+            if not os.path.isdir(library_dir):
+                continue
+            with os.scandir(library_dir) as entries:
+                job_dirs = sorted(entry.path for entry in entries if entry.is_dir())
+            for job_dir in job_dirs:
+                signature = job_signature(job_dir)
+                if signature is None:
+                    continue
+                entry = cached.get(job_dir)
+                if entry and entry[0] == signature:
+                    jobs[job_dir] = entry
+                    counts["cached"] += 1
+                    continue
+                fields = read_job_fields(job_dir)
+                if fields is not None:
+                    jobs[job_dir] = [signature, fields]
+                    counts["read"] += 1
+        counts["removed"] = sum(1 for job_dir in cached if job_dir not in jobs)
+
+        if counts["read"] or counts["removed"] or len(cached) != len(jobs):
+            self._save_manifest(jobs)
+        self._records = {
+            job_dir: UseCaseRecord(os.path.basename(job_dir), job_dir, *fields)
+            for job_dir, (_, fields) in jobs.items()
+        }
+        self._loaded = True
+        return counts
+
+    @property
+    def records(self) -> List[UseCaseRecord]:
+        if not self._loaded:
+            self.refresh()
+        return list(self._records.values())
+
+    def __iter__(self) -> Iterator[UseCaseRecord]:
+        return iter(self.records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, job_id: str) -> Optional[UseCaseRecord]:
+        """Look up a job by its id (directory name) or directory path."""
+        if not self._loaded:
+            self.refresh()
+        record = self._records.get(os.path.abspath(job_id))
+        if record:
+            return record
+        return next((r for r in self._records.values() if r.job_id == job_id), None)
+
+    def find(self, family: Optional[str] = None, tool: Optional[str] = None, mode: Optional[str] = None,
+             complete_only: bool = False, **fields) -> List[UseCaseRecord]:
+        """
+        Records matching every given filter (case-insensitive equality).
+
+        family, tool and mode are the common filters; any other record field
+        (model, department, coding_language, ...) can be passed by name.
+        Filtering uses only the cached metadata; no job body is read.
+        """
+        filters = {"family": family, "tool": tool, "mode": mode, **fields}
+        wanted = {name: str(value).lower() for name, value in filters.items() if value is not None}
+        unknown = set(wanted) - set(UseCaseRecord.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown record fields: {', '.join(sorted(unknown))}")
+        return [
+            record for record in self.records
+            if (not complete_only or record.complete)
+            and all(str(getattr(record, name)).lower() == value for name, value in wanted.items())
+        ]
+
+    def distinct(self, field: str) -> Dict[str, int]:
+        """Count of records per value of a field, e.g. distinct("tool")."""
+        if field not in UseCaseRecord.FIELDS:
+            raise ValueError(f"Unknown record field: {field}")
+        counts: Dict[str, int] = {}
+        for record in self.records:
+            value = getattr(record, field)
+            counts[value] = counts.get(value, 0) + 1
+        return counts
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="List and filter generated use cases.")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST_PATH, help="Directory manifest cache path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="List jobs, optionally filtered")
+    list_parser.add_argument("dirs", nargs="*", help="Library directories (default: all known)")
+    list_parser.add_argument("--family")
+    list_parser.add_argument("--tool")
+    list_parser.add_argument("--mode")
+    list_parser.add_argument("--complete", action="store_true", help="Only jobs with a final use case")
+    list_parser.add_argument("--json", action="store_true", help="Print records as JSON")
+
+    args = parser.parse_args(argv)
+
+    library = UseCaseLibrary(args.dirs or None, args.manifest)
+    records = library.find(family=args.family, tool=args.tool, mode=args.mode, complete_only=args.complete)
+    if args.json:
+        print(json.dumps([record.to_dict() for record in records], indent=2))
+        return 0
+    for record in records:
+        labels = " / ".join(v for v in (record.family, record.tool, record.mode) if v)
+        print(f"{record.title}  [{labels}]  {record.step_count} steps, {record.status}")
+        print(f"    {record.job_dir}")
+    print(f"{len(records)} of {len(library)} jobs")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
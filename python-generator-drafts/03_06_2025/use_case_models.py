@@ -0,0 +1,160 @@
+"""
+Pydantic models shared by the use case generator steps.
+
+Kept in their own module so that tooling which only reads or renders saved
+artifacts does not have to import pydantic.
+"""
+
+from typing import List, Optional
+from pydantic import BaseModel
+
+# -------------------------------------------------------------------------------------
+# Pydantic Models for Steps 3 & 4
+# -------------------------------------------------------------------------------------
+
+class UseCaseMetadata(BaseModel):
+    """Holds all miscellaneous metadata about the use case,
+    including basic IDs, tool references, complexity levels, etc.
+    """
+    id: Optional[str]
+    ai_tool: Optional[str]
+    family: Optional[str]
+    status: Optional[str]
+    complexity_level: Optional[str]
+    customization_level: Optional[str]
+    time_minutes: Optional[int]
+    department: Optional[List[str]]
+    role: Optional[List[str]]
+    notes: Optional[str]
+    tool: Optional[str]
+    mode: Optional[str]
+    model: Optional[str]
+    coding_language: Optional[str]
+    # Add any other metadata fields you need here
+
+class SubStep(BaseModel):
+    """
+    Represents a single substep within a step.
+
+    Attributes:
+      - title: Brief title of the substep
+      - description: Optional longer description or bullet points
+      - bullets: Optional list of bullet points for additional detail
+    """
+    title: str
+    description: Optional[str] = None
+    bullets: Optional[List[str]] = None
+
+class UseCaseStep(BaseModel):
+    """
+    Represents a single step in the use case workflow.
+
+    Attributes:
+      - step_title: Brief name of the step, e.g. "Draft a docstring."
+      - step_instructions: Concise instructions for the user (1-3 sentences).
+      - sub_steps: Optional list of SubStep objects for more detailed breakdown
+      - advice: (Optional) Best practices, troubleshooting tips, or cautionary notes.
+    """
+    step_title: str
+    step_instructions: str
+    sub_steps: Optional[List[SubStep]] = None
+    advice: Optional[str] = None
+
+class Citation(BaseModel):
+    """
+    Represents a citation for a research source.
+    
+    Attributes:
+        url: The URL of the source
+        title: The title of the source
+        snippet: A relevant snippet/quote from the source
+        relevance_score: AI-assigned score for relevance (0-1)
+    """
+    url: str
+    title: Optional[str] = None
+    snippet: Optional[str] = None
+    relevance_score: Optional[float] = None
+
+class OfficialResource(BaseModel):
+    """
+    An official documentation link picked during citation scoring.
+
+    Attributes:
+        url: The documentation URL
+        title: Clear title describing the resource
+        type: One of "tool", "language" or "mode"
+        section: Specific section of the docs, if any
+    """
+    url: str
+    title: Optional[str] = None
+    type: Optional[str] = None
+    section: Optional[str] = None
+
+class CitationScoringOutput(BaseModel):
+    """
+    Step 3 citation scoring: the best official resources, and the other
+    citations with their relevance scores.
+    """
+    official_resources: List[OfficialResource] = []
+    citations: List[Citation] = []
+
+class UseCaseStructuredOutput(BaseModel):
+    """
+    Fields:
+      - title: e.g. "Craft Effective Code Prompts for AI Assistance"
+      - time_to_complete: e.g. "20 minutes"
+      - description: 2-3 sentences describing the primary objective
+      - steps: A list of UseCaseStep objects
+      - resources: A list of resource links or doc references
+      - metadata: A UseCaseMetadata object for ID, tool references, prerequisites, etc.
+      - citations: A list of Citation objects for research sources
+    """
+    title: str
+    time_to_complete: str
+    description: str
+    steps: List[UseCaseStep]
+    resources: List[str]
+    metadata: Optional[UseCaseMetadata] = None
+    citations: Optional[List[Citation]] = None
+
+class Step(BaseModel):
+    """
+    Represents a single step in the example solution.
+    """
+    action: str
+    code_or_prompt: str
+
+class ExampleSolution(BaseModel):
+    """
+    Represents a complete example solution for a use case.
+    
+    Fields:
+      - title: Brief title for the example (e.g. "Binary Search Implementation with AI-Assisted Comments")
+      - setup_time: Estimated setup time in minutes
+      - demo_time: Estimated demo time in minutes (2-3 minutes target)
+      - prerequisites: List of required setup steps (environment, tools, etc.)
+      - scenario: A real-world context for the example
+      - steps: Ordered list of demo steps with code/prompts
+      - validation: How to verify the solution works
+      - key_points: Teaching points to emphasize
+      - common_issues: Potential problems to watch for
+      - variations: Optional variations for different contexts
+    """
+    title: str
+    setup_time: int
+    demo_time: int
+    prerequisites: List[str]
+    scenario: str
+    steps: List[Step]
+    validation: List[str]
+    key_points: List[str]
+    common_issues: List[str]
+    variations: List[str]  # Make this required but allow empty list
+
+class ExampleSolutionOutput(BaseModel):
+    """
+    The complete output including metadata and the solution.
+    """
+    metadata: UseCaseMetadata
+    solution: ExampleSolution
+    demo_script: str  # Natural language script for 2-3 min demo
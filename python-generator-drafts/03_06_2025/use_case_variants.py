@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Variant Fan-Out: One Use Case for Several Tools, Modes or Audiences
+
+A variants file is a use case config with a "variants" list. Each variant
+names itself and overrides some fields of the base config:
+
+    {
+      "id": "UC-101", "title": "Create a project plan", ...,
+      "variants": [
+        {"variant": "gemini"},
+        {"variant": "copilot", "tool": "Microsoft Copilot", "mode": "Copilot in Word"},
+        {"variant": "uk", "locale": "en-GB"}
+      ]
+    }
+
+Design:
+- Every variant is a normal job with its own directory and checkpoints, so
+  `resume` works on each one. Its id is "<base id>-<variant>" unless the
+  variant sets one, and its config keeps the variant name under "variant".
+- Questions, research and citation scoring (SHARED_STEPS in the generator)
+  only depend on SHARED_FIELDS and the models of SHARED_ROUTES. Variants
+  that agree on those form a group. The group's shared steps run once, in
+  its first variant's job directory, and their saved results are copied
+  into the other variants' directories (recorded under `shared_steps` in
+  their metadata.json). Steps 3-6 then run per variant.
+- Overriding only audience and presentation fields (department, role,
+  time_estimate, locale) shares everything up to citation scoring;
+  overriding the tool, mode or model forks the research too.
+- Shared steps and variant jobs run at most `concurrency` at a time.
+- The generator passes itself into `run_variants`; importing the script by
+  name here would load a second copy of it when it runs as `__main__`.
+
+Usage:
+    python use_case_generator.py variants my_case_variants.json [--concurrency 3]
+    python use_case_variants.py plan my_case_variants.json    # show the groups, no API calls
+"""
+
+import os
+import sys
+import json
+import copy
+import time
+import shutil
+import logging
+import argparse
+from types import ModuleType
+from typing import Dict, List, Optional
+
+# Config fields that questions, research and citation scoring depend on
+SHARED_FIELDS = [
+    "title", "family", "ai_tool", "objective", "description", "prerequisites", "steps",
+    "tool", "mode", "model", "coding_language",
+]
+
+# Model routes of the shared steps; variants routed differently don't share them
+SHARED_ROUTES = ["research_questions", "deep_research", "citation_scoring"]
+
+# Metadata the shared steps record, copied along with their results
+SHARED_METADATA = ["research_backend", "research_reuse", "research_failures"]
+
+def load_variants_file(path: str) -> dict:
+    """Load a variants file: one base config with a non-empty "variants" list."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get("variants"), list) or not data["variants"]:
+        raise ValueError(f"{path}: expected a use case config with a non-empty \"variants\" list")
+    return data
+
+def expand_variants(config: dict) -> List[dict]:
+    """The full config of every variant of a variants config, in order."""
+    base = {key: value for key, value in config.items() if key != "variants"}
+    configs = []
+    seen = set()
+    for overrides in config["variants"]:
+        name = overrides.get("variant") if isinstance(overrides, dict) else None
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError(f"Every variant needs a \"variant\" name: {overrides!r}")
+        if name in seen:
+            raise ValueError(f"Duplicate variant name: {name}")
+        seen.add(name)
+        variant = copy.deepcopy(base)
+        variant.update(copy.deepcopy(overrides))
+        if "id" not in overrides:
+            variant["id"] = f"{base['id']}-{name}" if base.get("id") else name
+        configs.append(variant)
+    return configs
+
+def shared_key(config: dict, routes: Optional[dict] = None) -> str:
+    """Everything the shared steps depend on, as a comparable string."""
+    import model_routing
+    resolved = model_routing.resolve_routes(config, routes)
+    return json.dumps({
+        "fields": {field: config.get(field) for field in SHARED_FIELDS},
+        "routes": {route: resolved[route] for route in SHARED_ROUTES},
+    }, sort_keys=True)
+
+def group_variants(configs: List[dict], routes: Optional[dict] = None) -> List[List[dict]]:
+    """Variants grouped by shared_key, groups and members in their original order."""
+    groups: Dict[str, List[dict]] = {}
+    for config in configs:
+        groups.setdefault(shared_key(config, routes), []).append(config)
+    return list(groups.values())
+
+def share_steps(source, target, step_names: List[str]) -> List[str]:
+    """
+    Copy the saved `step_names` (the generator's SHARED_STEPS) of job
+    `source` into job `target`, keeping any `target` already has. Returns
+    the steps copied.
+    """
+    copied = []
+    for step_name in step_names:
+        source_path, target_path = source.get_filepath(step_name), target.get_filepath(step_name)
+        if os.path.isfile(source_path) and not os.path.isfile(target_path):
+            shutil.copyfile(source_path, target_path)
+            copied.append(step_name)
+    if copied:
+        source_metadata = source.load_metadata()
+        updates = {key: source_metadata[key] for key in SHARED_METADATA if key in source_metadata}
+        updates["shared_steps"] = {"job_id": source.job_id, "steps": copied}
+        target.update_metadata(updates)
+    return copied
+
+async def run_variants(generator: ModuleType, config: dict, base_dir: Optional[str] = None,
+                       concurrency: int = 2) -> List[dict]:
+    """
+    Generate every variant of `config` with `generator` (the running
+    use_case_generator module), running the shared steps once per group. A
+    failing variant is logged and reported but does not stop the others;
+    when a group's shared steps fail, all of its variants fail.
+    """
+    import asyncio
+    import generator_metrics
+
+    configs = expand_variants(config)
+    for variant in configs:
+        generator.validate_config(variant)
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run_variant(variant: dict, job_manager) -> dict:
+        outcome = {"variant": variant["variant"], "title": variant["title"], "job_dir": job_manager.job_dir}
+        generator_metrics.job_queued()
+        queued_at = time.monotonic()
+        async with semaphore:
+            generator_metrics.slot_acquired(time.monotonic() - queued_at)
+            try:
+                await generator.run_pipeline(variant, job_manager)
+                outcome["status"] = "done"
+            except Exception as e:
+                logging.error(f"Variant '{variant['variant']}' failed: {e}")
+                outcome.update(status="failed", error=str(e))
+            finally:
+                job_manager.close()
+        return outcome
+
+    async def run_group(group: List[dict]) -> List[dict]:
+        managers = []
+        for variant in group:
+            job_manager = generator.JobManager(variant["id"], f"{variant['title']} {variant['variant']}", base_dir=base_dir)
+            job_manager.save_metadata(variant)
+            managers.append(job_manager)
+        leader = managers[0]
+        try:
+            async with semaphore:
+                await generator.run_shared_steps(group[0], leader)
+        except Exception as e:
+            logging.error(f"Shared steps for variants {', '.join(v['variant'] for v in group)} failed: {e}")
+            for job_manager in managers:
+                job_manager.close()
+            return [
+                {"variant": v["variant"], "title": v["title"], "job_dir": m.job_dir, "status": "failed", "error": str(e)}
+                for v, m in zip(group, managers)
+            ]
+        for job_manager in managers[1:]:
+            share_steps(leader, job_manager, generator.SHARED_STEPS)
+        if len(group) > 1:
+            logging.info(f"Variants {', '.join(v['variant'] for v in group)} share {leader.job_id}'s research")
+        return await asyncio.gather(*(run_variant(v, m) for v, m in zip(group, managers)))
+
+    groups = group_variants(configs)
+    results = await asyncio.gather(*(run_group(group) for group in groups))
+    by_variant = {outcome["variant"]: outcome for group in results for outcome in group}
+    return [by_variant[variant["variant"]] for variant in configs]
+
+def format_plan(config: dict) -> str:
+    """The variants of `config` by shared group, and what each overrides."""
+    configs = expand_variants(config)
+    groups = group_variants(configs)
+    base = {key: value for key, value in config.items() if key != "variants"}
+    lines = [f"{len(configs)} variants, {len(groups)} shared research run(s)"]
+    for number, group in enumerate(groups, 1):
+        lines.append(f"\nGroup {number}: questions, research and citation scoring run once")
+        for variant in group:
+            overrides = sorted(key for key, value in variant.items()
+                               if key not in ("variant", "id") and base.get(key) != value)
+            lines.append(f"  {variant['variant']:<20} {variant['id']:<24} overrides: {', '.join(overrides) or '-'}")
+    return "\n".join(lines)
+
+# -------------------------------------------------------------------------------------
+# Command line interface
+# -------------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Plan use case variants that share research.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    plan = subparsers.add_parser("plan", help="Show which variants share their research (no API calls)")
+    plan.add_argument("file", help="Variants file")
+    plan.add_argument("--routes", help="Model routes file (default: MODEL_ROUTES)")
+    args = parser.parse_args(argv)
+
+    if args.routes:
+        os.environ["MODEL_ROUTES"] = args.routes
+    print(format_plan(load_variants_file(args.file)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())